@@ -0,0 +1,319 @@
+"""
+Asyncio interface to the reconciliation pipeline.
+
+This module runs the blocking stages of a reconciliation run (working copy,
+sheet imports, sheet processing and comparison, save, recalculation) in an
+executor, so that asyncio applications can await a run, follow its progress
+with ``async for`` and reconcile several components concurrently without
+going through the Tk-oriented BackgroundWorker.
+"""
+
+import asyncio
+import functools
+import logging
+from concurrent.futures import Executor
+from typing import Any, AsyncIterator, Callable, Iterable, List, NamedTuple, Optional, Union
+
+from src.uco_to_udo_recon.core.excel_operations import get_working_copy_path
+from src.uco_to_udo_recon.core.pipeline import (
+    RECONCILIATION_STAGES,
+    ReconciliationPipeline,
+    open_recalculation_backend,
+    reconciliation_sheet_imports,
+)
+from src.uco_to_udo_recon.core.recalculation import RecalculationBackend
+from src.uco_to_udo_recon.utils.cancellation import CancellationToken
+from src.uco_to_udo_recon.utils.progress import ProgressTracker
+
+
+class ProgressUpdate(NamedTuple):
+    """A progress update of one reconciliation run."""
+    component_name: str
+    value: int
+    message: Optional[str]
+
+
+class ReconciliationJob(NamedTuple):
+    """The input files of one component's reconciliation run."""
+    target_file: str
+    trial_balance_file: str
+    uco_to_udo_file: str
+    component_name: str
+
+
+_CLOSED = object()
+
+
+class AsyncProgress:
+    """
+    Async iterator over the progress updates of reconciliation runs.
+
+    Stages report progress from executor threads through :meth:`reporter`;
+    the updates are handed to the event loop and come out of ``async for``
+    in the order they were reported. Iteration ends once :meth:`close` is
+    called, or once the run passed to :meth:`follow` has finished.
+    """
+
+    def __init__(self) -> None:
+        """Create the iterator; it must be created on the event loop's thread."""
+        self._loop = asyncio.get_running_loop()
+        self._updates: asyncio.Queue = asyncio.Queue()
+
+    def reporter(self, component_name: str) -> Callable[[int, Optional[str]], None]:
+        """
+        Create a progress callback that can be called from any thread.
+
+        Args:
+            component_name: Component the updates belong to
+
+        Returns:
+            Callable: A callback taking (value, message)
+        """
+        def report(value: int, message: Optional[str] = None) -> None:
+            update = ProgressUpdate(component_name, value, message)
+            self._loop.call_soon_threadsafe(self._updates.put_nowait, update)
+        return report
+
+    def close(self) -> None:
+        """
+        End the iteration after the updates already reported.
+
+        Returns:
+            None
+        """
+        self._loop.call_soon_threadsafe(self._updates.put_nowait, _CLOSED)
+
+    def follow(self, run: Any) -> asyncio.Future:
+        """
+        Schedule a run and close the iterator when it finishes.
+
+        Args:
+            run: Coroutine or future of the run reporting to this iterator
+
+        Returns:
+            asyncio.Future: The scheduled run, to await for its result
+        """
+        future = asyncio.ensure_future(run)
+        future.add_done_callback(lambda _: self.close())
+        return future
+
+    def __aiter__(self) -> AsyncIterator[ProgressUpdate]:
+        return self
+
+    async def __anext__(self) -> ProgressUpdate:
+        update = await self._updates.get()
+        if update is _CLOSED:
+            raise StopAsyncIteration
+        return update
+
+
+async def _run_stage(
+    executor: Optional[Executor],
+    token: CancellationToken,
+    func: Callable[..., Any],
+    *args: Any,
+    **kwargs: Any
+) -> Any:
+    """
+    Run one blocking stage in the executor.
+
+    If the awaiting task is cancelled, the stage's cancellation token is set
+    and the stage is given the chance to stop before the cancellation
+    propagates, so that no stage keeps writing files after its run ended.
+
+    Args:
+        executor: Executor to run the stage in, or None for the loop's default
+        token: Cancellation token checked by the stage
+        func: The stage function
+        *args: Positional arguments for the stage
+        **kwargs: Keyword arguments for the stage
+
+    Returns:
+        Any: The stage's return value
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        token.cancel()
+        await asyncio.wait([future])
+        raise
+
+
+async def reconcile(
+    target_file: str,
+    trial_balance_file: str,
+    uco_to_udo_file: str,
+    component_name: str,
+    logger: Optional[logging.Logger] = None,
+    backend: Union[RecalculationBackend, str, None] = None,
+    recalc_timeout: Optional[float] = None,
+    executor: Optional[Executor] = None,
+    progress: Optional[AsyncProgress] = None,
+    cancellation_token: Optional[CancellationToken] = None,
+    recalc_semaphore: Optional[asyncio.Semaphore] = None
+) -> str:
+    """
+    Run a complete reconciliation, awaiting each blocking stage in an executor.
+
+    Cancelling the task running this coroutine cancels the stage in
+    progress through its cancellation token.
+
+    Args:
+        target_file: Path to the UCO to UDO reconciliation file
+        trial_balance_file: Path to the trial balance file
+        uco_to_udo_file: Path to the UCO to UDO TIER file
+        component_name: The selected component name
+        logger: Logger instance for tracking operations
+        backend: Recalculation backend, or the name of one to create for this run
+        recalc_timeout: Seconds allowed per recalculation attempt, when
+            ``backend`` is a name
+        executor: Executor for the stages, or None for the loop's default executor
+        progress: Optional AsyncProgress receiving this run's progress updates
+        cancellation_token: Optional token to cancel the run from another thread
+        recalc_semaphore: Optional semaphore limiting concurrent recalculations
+
+    Returns:
+        str: Path to the result file
+
+    Raises:
+        asyncio.CancelledError: If the run was cancelled
+    """
+    logger = logger or logging.getLogger(__name__)
+    token = cancellation_token or CancellationToken()
+    reporter = progress.reporter(component_name) if progress else None
+    tracker = ProgressTracker(RECONCILIATION_STAGES, reporter)
+    owned_backend = None
+
+    def check_cancelled() -> None:
+        if token.cancelled:
+            raise asyncio.CancelledError(f"Reconciliation of {component_name} was cancelled")
+
+    try:
+        if isinstance(backend, str):
+            backend = owned_backend = await _run_stage(
+                executor, token, open_recalculation_backend, backend, recalc_timeout, logger
+            )
+        pipeline = ReconciliationPipeline(target_file, component_name, logger, backend=backend)
+
+        # STAGE 1: Create working copy of target file
+        tracker.update(0, "Creating working copy of reconciliation file...")
+        await _run_stage(executor, token, pipeline.prepare_working_copy)
+        tracker.update(100, "Created working copy")
+        tracker.next_stage()
+        check_cancelled()
+
+        # STAGE 2: Copy DO TB and DO UCO to UDO sheets
+        tracker.update(0, f"Copying '{component_name} Total' and 'UCO to UDO' sheets...")
+        imports = reconciliation_sheet_imports(trial_balance_file, uco_to_udo_file, component_name)
+        if not await _run_stage(executor, token, pipeline.import_sheets,
+                                imports, tracker.update, token):
+            check_cancelled()
+            raise RuntimeError(f"Failed to copy sheets '{component_name} Total' and 'UCO to UDO'.")
+        tracker.update(100, "Trial Balance and UCO to UDO sheets copied")
+        tracker.next_stage()
+        check_cancelled()
+
+        # STAGE 3: Process the sheets and compare the tables
+        tracker.update(0, "Starting reconciliation process...")
+        if not await _run_stage(executor, token, pipeline.reconcile, tracker.update, token):
+            check_cancelled()
+            raise RuntimeError("Reconciliation failed. See the log for details.")
+
+        tracker.update(98, "Saving workbook")
+        try:
+            result_file = await _run_stage(executor, token, pipeline.save, token)
+            needs_recalculation = await _run_stage(executor, token,
+                                                   pipeline.needs_recalculation, token)
+        except InterruptedError:
+            check_cancelled()
+            raise
+
+        # Recalculate the saved file only if a formula result is stale
+        if not needs_recalculation:
+            logger.info("No formula result is stale; skipping recalculation.")
+        else:
+            try:
+                if recalc_semaphore is None:
+                    await _run_stage(executor, token, pipeline.recalculate, tracker.update, token)
+                else:
+                    async with recalc_semaphore:
+                        await _run_stage(executor, token, pipeline.recalculate,
+                                         tracker.update, token)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Recalculation failed: {e}. "
+                               "Results may not include all calculated values.")
+            check_cancelled()
+
+        tracker.update(100, "Process completed successfully")
+        return result_file
+
+    except asyncio.CancelledError:
+        token.cancel()
+        logger.info(f"Reconciliation of {component_name} cancelled")
+        raise
+
+    finally:
+        if owned_backend is not None:
+            owned_backend.close()
+
+
+async def reconcile_components(
+    jobs: Iterable[ReconciliationJob],
+    max_concurrency: int = 2,
+    logger: Optional[logging.Logger] = None,
+    backend: Union[RecalculationBackend, str, None] = None,
+    recalc_timeout: Optional[float] = None,
+    executor: Optional[Executor] = None,
+    progress: Optional[AsyncProgress] = None,
+    return_exceptions: bool = True
+) -> List[Union[str, BaseException]]:
+    """
+    Reconcile several components concurrently.
+
+    At most ``max_concurrency`` runs are in progress at a time. A shared
+    backend object is not asked to recalculate more workbooks at once than
+    its ``concurrency``.
+
+    Args:
+        jobs: The runs to perform; each needs its own target file
+        max_concurrency: Maximum number of runs in progress at the same time
+        logger: Logger instance for tracking operations
+        backend: Recalculation backend shared by the runs, or the name of
+            one to create for each run
+        recalc_timeout: Seconds allowed per recalculation attempt, when
+            ``backend`` is a name
+        executor: Executor for the stages, or None for the loop's default executor
+        progress: Optional AsyncProgress receiving every run's progress updates
+        return_exceptions: Whether a failed run's exception is returned in its
+            place instead of being raised
+
+    Returns:
+        List: The result file path, or the exception, of each job in order
+
+    Raises:
+        ValueError: If max_concurrency is below 1 or two jobs share a target file
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1")
+    jobs = list(jobs)
+    working_copies = [get_working_copy_path(job.target_file) for job in jobs]
+    if len(set(working_copies)) != len(working_copies):
+        raise ValueError("Each job needs its own target file; their working copies would collide")
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+    recalc_semaphore = None
+    if isinstance(backend, RecalculationBackend):
+        recalc_semaphore = asyncio.Semaphore(max(1, backend.concurrency))
+
+    async def run(job: ReconciliationJob) -> str:
+        async with semaphore:
+            return await reconcile(
+                *job, logger=logger, backend=backend, recalc_timeout=recalc_timeout,
+                executor=executor, progress=progress, recalc_semaphore=recalc_semaphore
+            )
+
+    return await asyncio.gather(*(run(job) for job in jobs), return_exceptions=return_exceptions)
@@ -0,0 +1,224 @@
+"""
+Checkpoint journal for reconciliation runs.
+
+A run records each stage it completes in a JSON journal next to its result
+file, together with the SHA-256 digests of its input files and the file the
+stage left behind. A later run on the same inputs can resume after the last
+stage whose file is still intact instead of starting over. When any input
+file has changed, the journal and its files are discarded.
+"""
+
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+from src.uco_to_udo_recon.utils.file_utils import file_digest
+
+JOURNAL_VERSION = 1
+
+
+class Checkpoint(NamedTuple):
+    """A completed stage of a reconciliation run."""
+    stage: str
+    artifact: str  # Path of the file the stage produced
+    artifact_digest: str
+    data: Dict[str, Any]  # Stage state needed to resume after it
+    completed_at: float
+
+
+class RunJournal:
+    """
+    The checkpoints of one reconciliation run, stored as JSON.
+
+    The journal is keyed by the run's input files and parameters: loading a
+    journal written for other inputs discards it.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        inputs: Dict[str, str],
+        parameters: Dict[str, Any],
+        logger: Optional[logging.Logger] = None
+    ) -> None:
+        """
+        Initialize the journal and hash the run's input files.
+
+        Args:
+            path: Path of the JSON journal file
+            inputs: Input file paths by role (e.g. {'target_file': ...})
+            parameters: Other run settings a checkpoint depends on
+            logger: Optional logger instance for tracking operations
+        """
+        self.path = path
+        self.logger = logger or logging.getLogger(__name__)
+        self.inputs = {name: {"path": os.path.abspath(file_path), "sha256": file_digest(file_path)}
+                       for name, file_path in inputs.items()}
+        self.parameters = parameters
+        self.checkpoints: List[Checkpoint] = []
+
+    @classmethod
+    def for_output(
+        cls,
+        output_file: str,
+        inputs: Dict[str, str],
+        parameters: Dict[str, Any],
+        logger: Optional[logging.Logger] = None
+    ) -> "RunJournal":
+        """
+        Create the journal of the run writing a given result file.
+
+        Args:
+            output_file: Path of the run's result file
+            inputs: Input file paths by role
+            parameters: Other run settings a checkpoint depends on
+            logger: Optional logger instance for tracking operations
+
+        Returns:
+            RunJournal: The journal, stored next to the result file
+        """
+        return cls(f"{os.path.splitext(output_file)[0]}.journal.json", inputs, parameters, logger)
+
+    def artifact_path(self, stage: str) -> str:
+        """
+        Path for the intermediate file of a stage.
+
+        Args:
+            stage: Name of the stage
+
+        Returns:
+            str: A path next to the journal
+        """
+        return f"{self.path[:-len('.journal.json')]}.checkpoint-{stage}.xlsx"
+
+    def _read(self) -> Optional[Dict[str, Any]]:
+        """Read the stored journal, or None if there is no readable one."""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable run journal {self.path}: {e}")
+            return {}
+
+    def load(self) -> bool:
+        """
+        Read the checkpoints of an earlier run on the same inputs.
+
+        A journal written for different input files or parameters is
+        discarded, along with its intermediate files.
+
+        Returns:
+            bool: True if checkpoints of an earlier run were loaded
+        """
+        record = self._read()
+        if record is None:
+            return False
+        if (record.get("version") != JOURNAL_VERSION or record.get("inputs") != self.inputs
+                or record.get("parameters") != self.parameters):
+            self.logger.info("Input files changed since the interrupted run; "
+                             "discarding its checkpoints")
+            self.reset()
+            return False
+        self.checkpoints = [Checkpoint(**checkpoint)
+                            for checkpoint in record.get("checkpoints", [])]
+        return bool(self.checkpoints)
+
+    def latest(self, stages: Sequence[str]) -> Optional[Checkpoint]:
+        """
+        Find the last checkpoint of the given stages whose file is intact.
+
+        Args:
+            stages: Names of the stages to consider
+
+        Returns:
+            Optional[Checkpoint]: The checkpoint to resume after, or None
+        """
+        for checkpoint in reversed(self.checkpoints):
+            if checkpoint.stage not in stages:
+                continue
+            if (os.path.exists(checkpoint.artifact)
+                    and file_digest(checkpoint.artifact) == checkpoint.artifact_digest):
+                return checkpoint
+            self.logger.warning(f"File of checkpoint '{checkpoint.stage}' is missing "
+                                "or was modified; not using it")
+        return None
+
+    def record(self, stage: str, artifact: str, **data: Any) -> Checkpoint:
+        """
+        Record a completed stage and write the journal.
+
+        Args:
+            stage: Name of the stage
+            artifact: Path of the file the stage produced
+            **data: Stage state needed to resume after it (JSON-serializable)
+
+        Returns:
+            Checkpoint: The recorded checkpoint
+        """
+        checkpoint = Checkpoint(stage, artifact, file_digest(artifact), data, time.time())
+        self.checkpoints = [existing for existing in self.checkpoints if existing.stage != stage]
+        self.checkpoints.append(checkpoint)
+        self._write()
+        self.logger.debug(f"Checkpoint recorded: {stage} ({artifact})")
+        return checkpoint
+
+    def _write(self) -> None:
+        """Write the journal atomically, so an interrupted write leaves the old one."""
+        record = {
+            "version": JOURNAL_VERSION,
+            "inputs": self.inputs,
+            "parameters": self.parameters,
+            "checkpoints": [checkpoint._asdict() for checkpoint in self.checkpoints],
+        }
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as fh:
+            json.dump(record, fh, indent=2)
+        os.replace(temporary, self.path)
+
+    def reset(self) -> None:
+        """
+        Discard the stored journal and the intermediate files it lists.
+
+        Returns:
+            None
+        """
+        record = self._read() or {}
+        artifacts = [checkpoint.get("artifact") for checkpoint in record.get("checkpoints", [])]
+        self._remove(artifact for artifact in artifacts if self._is_intermediate(artifact))
+        self._remove([self.path])
+        self.checkpoints = []
+
+    def discard(self, keep: Iterable[str] = ()) -> None:
+        """
+        Remove the journal and the intermediate files of a finished run.
+
+        Args:
+            keep: Files to keep, such as the run's result file
+
+        Returns:
+            None
+        """
+        kept = {os.path.abspath(path) for path in keep}
+        self._remove(checkpoint.artifact for checkpoint in self.checkpoints
+                     if os.path.abspath(checkpoint.artifact) not in kept)
+        self._remove([self.path])
+        self.checkpoints = []
+
+    def _is_intermediate(self, artifact: Optional[str]) -> bool:
+        """Check whether a path is one of this journal's intermediate files."""
+        prefix = os.path.abspath(self.artifact_path(""))[:-len(".xlsx")]
+        return bool(artifact) and os.path.abspath(artifact).startswith(prefix)
+
+    def _remove(self, paths: Iterable[str]) -> None:
+        """Delete files, ignoring those already gone."""
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                self.logger.warning(f"Could not remove {path}: {e}")
@@ -6,16 +6,46 @@ data between UCO and UDO sheets.
 """
 
 import logging
-from decimal import Decimal
-from typing import Any, Callable, Dict, List, Optional, Tuple, Union, Set
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 from openpyxl.workbook.workbook import Workbook
 from openpyxl.worksheet.worksheet import Worksheet
 from openpyxl.styles import Font, Alignment, PatternFill
+from openpyxl.utils import get_column_letter
 
-from src.uco_to_udo_recon.utils.excel_utils import safe_convert_to_decimal
+from src.uco_to_udo_recon.utils.money import column_to_cents, format_cents, to_cents
+from src.uco_to_udo_recon.utils.label_index import get_label_index, invalidate_label_index
 from src.uco_to_udo_recon.core.reconciliation import (
     add_tickmark, find_component_sheet
 )
+from src.uco_to_udo_recon.core.formula_engine import FormulaEvaluator, evaluate_cells
+from src.uco_to_udo_recon.core.matching import match_amounts
+from src.uco_to_udo_recon.core.workbook_loader import WorkbookViews, resolve_workbook_views
+
+
+def read_cents_columns(
+    data_sheet: Worksheet,
+    rows: Sequence[Tuple[Any, ...]],
+    columns: Sequence[int],
+    logger: logging.Logger
+) -> List[Sequence[int]]:
+    """
+    Read calculated amounts for a range of rows as integer-cent columns.
+
+    Args:
+        data_sheet: The worksheet view with calculated values
+        rows: The range rows (tuples of Cell objects) to read
+        columns: 1-based column numbers to read
+        logger: Logger instance for tracking operations
+
+    Returns:
+        One column of cents per column number (see column_to_cents), aligned
+        with ``rows``
+    """
+    row_numbers = [row[0].row for row in rows]
+    return [
+        column_to_cents((data_sheet.cell(row=r, column=column).value for r in row_numbers), logger)
+        for column in columns
+    ]
 
 
 def print_sample_comparison_rows(
@@ -44,7 +74,7 @@ def process_recon_table(
     component_sheet: Worksheet, 
     data_wb: Workbook, 
     logger: logging.Logger, 
-    new_target_file: str, 
+    new_target_file: Optional[str],
     udo_row: int,
     cancellation_check: Optional[Callable[[], bool]] = None
 ) -> None:
@@ -59,7 +89,7 @@ def process_recon_table(
         component_sheet: The component worksheet to process
         data_wb: The data workbook with calculated values
         logger: Logger instance for tracking operations
-        new_target_file: Path to the target file to save changes to
+        new_target_file: Path to save changes to, or None to leave saving to the caller
         udo_row: The row containing UDO data
         cancellation_check: Optional function to check if operation should be cancelled
     """
@@ -80,50 +110,29 @@ def process_recon_table(
         difference_adjustments_row = None
         difference_adjustments_tickmark_row = None
 
-        # Iterate over actual Cell objects in Column A to find header and total rows
-        for row in component_sheet.iter_rows(min_col=1, max_col=1):
-            # Check for cancellation periodically
-            if cancellation_check and cancellation_check():
-                logger.info("Recon table processing cancelled.")
-                return
-                
-            cell_value = row[0].value  # Get the value of the cell in column A
-            if cell_value == "Contract / Agreement / Sales Order #":
-                header_row = row[0].row  # Get the row number of the cell
-                logger.info(f"Found 'Contract / Agreement / Sales Order #' in Column A at row {header_row}")
-
-            if cell_value == "Providing Bureau UCO Total via their system records:":
-                total_row = row[0].row  # Get the row number of the cell
-                logger.info(f"Found 'Providing Bureau UCO Total via their system records:' in Column A at row {total_row}")
+        # Look up the row labels in Columns A and C; the last occurrence wins
+        labels = get_label_index(component_sheet)
+
+        def last_row(label: str, column: int, strip: bool = False) -> Optional[int]:
+            positions = labels.find_all(label, column, strip)
+            if positions:
+                logger.info(f"Found '{label}' in Column {get_column_letter(column)} "
+                            f"at row {positions[-1][0]}")
+                return positions[-1][0]
+            return None
+
+        header_row = last_row("Contract / Agreement / Sales Order #", 1)
+        total_row = last_row("Providing Bureau UCO Total via their system records:", 1)
+        system_of_record_row = last_row("Difference between: System of Record vs TIER", 1)
+        udo_total_system_row = last_row("UDO total via system records", 3)
+        udo_after_adjustments_row = last_row("UDO after high level adjustments", 3)
+        if udo_after_adjustments_row:
+            udo_tickmark_row = udo_after_adjustments_row + 1  # The tickmark row is the row after this one
+        difference_adjustments_row = last_row(
+            "Difference between: System of Record (after adjustments) vs TIER", 3, strip=True)
+        if difference_adjustments_row:
+            difference_adjustments_tickmark_row = difference_adjustments_row + 1  # The tickmark row is the row after this one
 
-            if cell_value == "Difference between: System of Record vs TIER":
-                system_of_record_row = row[0].row
-                logger.info(f"Found 'Difference between: System of Record vs TIER' in Column A at row {system_of_record_row}")
-
-        # Add additional logic for UDO-related rows in Column C
-        for row in component_sheet.iter_rows(min_col=3, max_col=3):
-            # Check for cancellation periodically
-            if cancellation_check and cancellation_check():
-                logger.info("Recon table processing cancelled.")
-                return
-                
-            cell_value = row[0].value  # Get the value of the cell in column C
-            logger.info(f"Inspecting cell in Column C, row {row[0].row}: {cell_value}")
-        
-            if cell_value == "UDO total via system records":
-                udo_total_system_row = row[0].row  # Get the row number of the cell
-                logger.info(f"Found 'UDO total via system records' in Column C at row {udo_total_system_row}")
-        
-            if cell_value == "UDO after high level adjustments":
-                udo_after_adjustments_row = row[0].row  # Get the row number of the cell
-                udo_tickmark_row = udo_after_adjustments_row + 1  # The tickmark row is the row after this one
-                logger.info(f"Found 'UDO after high level adjustments' in Column C at row {udo_after_adjustments_row}")
-        
-            if cell_value and isinstance(cell_value, str) and cell_value.strip() == "Difference between: System of Record (after adjustments) vs TIER":
-                difference_adjustments_row = row[0].row  # Get the row number of the cell
-                difference_adjustments_tickmark_row = difference_adjustments_row + 1  # The tickmark row is the row after this one
-                logger.info(f"Found 'Difference between: System of Record (after adjustments) vs TIER' in Column C at row {difference_adjustments_row}")
-        
         if not header_row or not total_row or not system_of_record_row or not udo_total_system_row or not udo_after_adjustments_row or not difference_adjustments_row:
             logger.warning("Could not find the required rows in the recon table.")
             return
@@ -135,6 +144,7 @@ def process_recon_table(
             
         # Insert a new column after Column J
         component_sheet.insert_cols(11)  # 11 corresponds to Column J (after J)
+        invalidate_label_index(component_sheet)
         logger.info(f"Inserted a new column after Column J.")
         
         # Adjust the width of the new column (K)
@@ -153,8 +163,8 @@ def process_recon_table(
 
         # Format the rest of the column with no fill, bold red font
         for row_idx in range(header_row + 1, component_sheet.max_row + 1):
-            # Check for cancellation periodically in long loops
-            if cancellation_check and cancellation_check() and row_idx % 50 == 0:
+            # Check for cancellation on every row of long loops
+            if cancellation_check and cancellation_check():
                 logger.info("Recon table processing cancelled during column formatting.")
                 return
                 
@@ -281,9 +291,29 @@ def process_recon_table(
         difference_adjustments_tickmark_cell.alignment = Alignment(horizontal="center", vertical="center")
         
         logger.info(f"Difference After Adjustments tickmark formula added to row {difference_adjustments_tickmark_row}, Column D with formula: {difference_adjustments_formula}")
+
+        # Evaluate the generated formulas against the cached values so the outcomes
+        # are known without Excel
+        generated_cells = [f"{col}{tickmark_row}" for col in columns] + [
+            f"I{tickmark_row}",
+            f"B{system_tickmark_row}",
+            f"D{system_tickmark_row}",
+            f"D{udo_after_adjustments_row}",
+            f"D{difference_adjustments_row}",
+            f"D{udo_tickmark_row}",
+            f"D{difference_adjustments_tickmark_row}",
+        ]
+        outcomes = evaluate_cells(FormulaEvaluator(component_sheet.parent), component_sheet,
+                                  generated_cells, logger)
+        logger.info(
+            f"Recon table tickmarks in '{component_sheet.title}': "
+            f"{sum(1 for v in outcomes.values() if v in ('a', 'b'))} passed, "
+            f"{sum(1 for v in outcomes.values() if v == 'û')} failed"
+        )
         
         # Save the workbook with the new_target_file
-        component_sheet.parent.save(new_target_file)
+        if new_target_file:
+            component_sheet.parent.save(new_target_file)
         
     except Exception as e:
         logger.error(f"An error occurred while processing the recon table: {e}", exc_info=True)
@@ -292,11 +322,11 @@ def process_recon_table(
 def compare_ranges(
     certification_range: List[Any], 
     uco_to_udo_range: List[Any], 
-    target_wb: Workbook, 
-    data_wb: Workbook, 
+    target_wb: WorkbookViews,
+    data_wb: Optional[Workbook],
     logger: logging.Logger, 
     progress_callback: Callable[[int, Optional[str]], None], 
-    new_target_file: str,
+    new_target_file: Optional[str],
     cancellation_check: Optional[Callable[[], bool]] = None
 ) -> None:
     """
@@ -305,11 +335,11 @@ def compare_ranges(
     Args:
         certification_range: The range from the certification sheet
         uco_to_udo_range: The range from the UCO to UDO sheet
-        target_wb: The target workbook with formulas preserved
-        data_wb: The data workbook with calculated values
+        target_wb: The target workbook with formulas preserved, or a DualViewWorkbook
+        data_wb: The data workbook with calculated values (None with a DualViewWorkbook)
         logger: Logger instance for tracking operations
         progress_callback: Callback function to update progress (value, message)
-        new_target_file: Path to the target file to save changes to
+        new_target_file: Path to save changes to, or None to leave saving to the caller
         cancellation_check: Optional function to check if operation should be cancelled
     """
     try:
@@ -321,12 +351,19 @@ def compare_ranges(
         logger.info("Starting comparison of Certification and DO UCO to UDO ranges.")
         progress_callback(80, "Starting comparison of ranges")
 
+        target_wb, data_wb = resolve_workbook_views(target_wb, data_wb)
+
         certification_values = []
         uco_to_udo_values = []
 
-        # Step 1: Process UCO to UDO range first to collect all uco_tier_component_names
-        uco_tier_component_names_set: Set[str] = set()
-        for uco_row in uco_to_udo_range:
+        # Step 1: Process UCO to UDO range first, grouping its rows by uco_tier_component_name
+        # so each certification row is matched with a single lookup. Every row of a group is kept,
+        # so duplicate component names all receive their tickmarks.
+        uco_to_udo_groups: Dict[Any, List[Tuple[Any, ...]]] = {}
+        uco_columns = read_cents_columns(data_wb["DO UCO to UDO"], uco_to_udo_range,
+                                         (5, 8, 12), logger)  # Columns E, H, L
+        for uco_row, uco_component_total_unfilled, uco_trading_partner_total, uco_difference in zip(
+                uco_to_udo_range, *uco_columns):
             # Check for cancellation periodically
             if cancellation_check and cancellation_check():
                 logger.info("Range comparison cancelled during UCO to UDO processing.")
@@ -334,28 +371,23 @@ def compare_ranges(
                 
             # uco_row is a tuple of Cell objects
             uco_tier_component_name = uco_row[0].value  # Column A
+
+            uco_values = (uco_tier_component_name, uco_component_total_unfilled,
+                          uco_trading_partner_total, uco_difference, uco_row)
+            uco_to_udo_values.append(uco_values)
             if uco_tier_component_name:
-                uco_tier_component_names_set.add(uco_tier_component_name)
-
-            uco_component_total_unfilled = safe_convert_to_decimal(
-                data_wb["DO UCO to UDO"].cell(row=uco_row[0].row, column=5).value, logger
-            )  # Column E
-            uco_trading_partner_total = safe_convert_to_decimal(
-                data_wb["DO UCO to UDO"].cell(row=uco_row[0].row, column=8).value, logger
-            )    # Column H
-            uco_difference = safe_convert_to_decimal(
-                data_wb["DO UCO to UDO"].cell(row=uco_row[0].row, column=12).value, logger
-            )           # Column L
-
-            uco_to_udo_values.append(
-                (uco_tier_component_name, uco_component_total_unfilled, uco_trading_partner_total, uco_difference, uco_row)
-            )
+                uco_to_udo_groups.setdefault(uco_tier_component_name, []).append(uco_values)
 
-        logger.info(f"Collected {len(uco_tier_component_names_set)} unique UCO Tier Component Names from UCO to UDO range.")
+        logger.info(f"Collected {len(uco_to_udo_groups)} unique UCO Tier Component Names "
+                    "from UCO to UDO range.")
         progress_callback(83, "Processing certification values")
 
         # Step 2: Process Certification range
-        for cert_row in certification_range[1:]:  # Skip header row
+        cert_rows = certification_range[1:]  # Skip header row
+        cert_columns = read_cents_columns(data_wb["Certification"], cert_rows,
+                                          (4, 5, 6), logger)  # Columns D, E, F
+        for cert_row, component_total_unfilled, trading_partner_total, difference in zip(
+                cert_rows, *cert_columns):
             # Check for cancellation periodically
             if cancellation_check and cancellation_check():
                 logger.info("Range comparison cancelled during certification processing.")
@@ -363,33 +395,17 @@ def compare_ranges(
                 
             # cert_row is a tuple of Cell objects
             tier_component_name = cert_row[1].value  # Column B
-
-            # Accessing data_wb to get calculated values
             row_number = cert_row[0].row  # Get the row number from the first cell
-            component_total_unfilled = safe_convert_to_decimal(
-                data_wb["Certification"].cell(row=row_number, column=4).value, logger
-            )  # Column D
-            trading_partner_total = safe_convert_to_decimal(
-                data_wb["Certification"].cell(row=row_number, column=5).value, logger
-            )    # Column E
-            difference = safe_convert_to_decimal(
-                data_wb["Certification"].cell(row=row_number, column=6).value, logger
-            )              # Column F
 
             if not tier_component_name:
                 logger.debug(f"Row {row_number}: 'tier_component_name' is empty. Skipping.")
                 continue  # Skip rows where there's no component name
 
-            # Ensure values are not None before applying abs()
-            component_total_unfilled = component_total_unfilled if component_total_unfilled is not None else Decimal('0')
-            trading_partner_total = trading_partner_total if trading_partner_total is not None else Decimal('0')
-            difference = difference if difference is not None else Decimal('0')
-
             # Define conditions
-            all_numeric_zero = (difference == Decimal('0') and 
-                              component_total_unfilled == Decimal('0') and 
-                              trading_partner_total == Decimal('0'))
-            tier_not_in_uco = (tier_component_name not in uco_tier_component_names_set)
+            all_numeric_zero = (difference == 0 and
+                              component_total_unfilled == 0 and
+                              trading_partner_total == 0)
+            tier_not_in_uco = (tier_component_name not in uco_to_udo_groups)
 
             # Combined condition: Skip if all numeric values are zero AND tier_component_name not in UCO range
             if all_numeric_zero and tier_not_in_uco:
@@ -421,6 +437,7 @@ def compare_ranges(
                 return
                 
             tier_component_name, component_total_unfilled, trading_partner_total, difference, cert_row = cert_values
+            uco_to_udo_matches = uco_to_udo_groups.get(tier_component_name, [])
 
             # Update progress for each component being processed
             current_progress += progress_increment
@@ -440,24 +457,30 @@ def compare_ranges(
                 logger.info(f"Processing component sheet: {component_sheet.title}")
 
                 # UCO comparison as done previously
-                uco_cell = next((cell for row in component_sheet.iter_rows() for cell in row if isinstance(cell.value, str) and "UCO total reported in TIER" in cell.value), None)
+                labels = get_label_index(component_sheet)
+                uco_position = labels.contains("UCO total reported in TIER")
+                uco_cell = component_sheet.cell(*uco_position) if uco_position else None
                 if uco_cell:
                     # Log the cell reference
                     logger.debug(f"UCO cell found at row {uco_cell.row}, column {2} in '{component_sheet.title}' sheet.")
 
                     # Access calculated UCO value from data_wb
-                    cell_value = component_sheet.cell(row=uco_cell.row, column=2).value
+                    cell_value = data_wb[component_sheet.title].cell(row=uco_cell.row,
+                                                                     column=2).value
                     logger.debug(f"Raw UCO cell value: {cell_value}")
-                    data_uco_value = safe_convert_to_decimal(cell_value, logger)  # Assuming column B
-                    logger.info(f"Processed UCO value from component sheet: {data_uco_value}")
+                    data_uco_value = to_cents(cell_value, logger)  # Assuming column B
+                    logger.info("Processed UCO value from component sheet: "
+                                f"{format_cents(data_uco_value)}")
 
                     # Compare UCO value from component sheet with UCO to UDO value
-                    uco_to_udo_row_match = next((row for row in uco_to_udo_values if row[0] == tier_component_name), None)
+                    uco_to_udo_row_match = uco_to_udo_matches[0] if uco_to_udo_matches else None
                     if uco_to_udo_row_match:
                         uco_to_udo_value = uco_to_udo_row_match[1]  # Column E: component_total_unfilled
-                        is_match = abs(data_uco_value - uco_to_udo_value) < Decimal('0.01')
+                        is_match = data_uco_value == uco_to_udo_value
                         add_tickmark(component_sheet, uco_cell.row + 1, 2, "i" if is_match else "X", "Wingdings", 11, is_match)
-                        logger.info(f"UCO: {data_uco_value} compared with UCO to UDO: {uco_to_udo_value} - {'Match' if is_match else 'No Match'}")
+                        logger.info(f"UCO: {format_cents(data_uco_value)} compared with "
+                                    f"UCO to UDO: {format_cents(uco_to_udo_value)} - "
+                                    f"{'Match' if is_match else 'No Match'}")
                         logger.info(f"Tickmark added to component sheet {component_sheet.title} for TIER Component: {tier_component_name}")
                     else:
                         logger.warning(f"No matching UCO value found in UCO to UDO sheet for {tier_component_name}.")
@@ -470,57 +493,69 @@ def compare_ranges(
                     return
 
                 # UDO comparison
-                udo_cell = next((cell for row in component_sheet.iter_rows() for cell in row if isinstance(cell.value, str) and "UDO total reported in TIER" in cell.value), None)
+                udo_position = labels.contains("UDO total reported in TIER")
+                udo_cell = component_sheet.cell(*udo_position) if udo_position else None
                 if udo_cell:
                     # Log the cell reference
                     logger.debug(f"UDO cell found at row {udo_cell.row}, column {4} in '{component_sheet.title}' sheet.")
 
                     # Access calculated UDO value from data_wb
-                    cell_value = component_sheet.cell(row=udo_cell.row, column=4).value
+                    cell_value = data_wb[component_sheet.title].cell(row=udo_cell.row,
+                                                                     column=4).value
                     logger.debug(f"Raw UDO cell value: {cell_value}")
-                    data_udo_value = safe_convert_to_decimal(cell_value, logger)  # Assuming column D
-                    logger.info(f"Processed UDO value from component sheet: {data_udo_value}")
+                    data_udo_value = to_cents(cell_value, logger)  # Assuming column D
+                    logger.info("Processed UDO value from component sheet: "
+                                f"{format_cents(data_udo_value)}")
 
                     # Compare UDO value with UCO to UDO's trading partner total
-                    uco_to_udo_row_match = next((row for row in uco_to_udo_values if row[0] == tier_component_name), None)
+                    uco_to_udo_row_match = uco_to_udo_matches[0] if uco_to_udo_matches else None
                     if uco_to_udo_row_match:
                         uco_to_udo_trading_partner_value = uco_to_udo_row_match[2]  # Column H: trading_partner_total
-                        is_match = abs(data_udo_value - uco_to_udo_trading_partner_value) < Decimal('0.01')
+                        is_match = data_udo_value == uco_to_udo_trading_partner_value
                         add_tickmark(component_sheet, udo_cell.row + 1, 4, "i" if is_match else "X", "Wingdings", 11, is_match)
                         # Process the recon table and pass new_target_file for saving
                         process_recon_table(component_sheet, data_wb, logger, new_target_file, udo_cell.row, cancellation_check)
-                        logger.info(f"UDO: {data_udo_value} compared with UCO to UDO Trading Partner Total: {uco_to_udo_trading_partner_value} - {'Match' if is_match else 'No Match'}")
+                        logger.info(f"UDO: {format_cents(data_udo_value)} compared with UCO to UDO "
+                                    "Trading Partner Total: "
+                                    f"{format_cents(uco_to_udo_trading_partner_value)} - "
+                                    f"{'Match' if is_match else 'No Match'}")
                         logger.info(f"UDO Tickmark added to component sheet {component_sheet.title} for TIER Component: {tier_component_name}")
                     else:
                         logger.warning(f"No matching UDO value found in UCO to UDO sheet for {tier_component_name}.")
                 else:
                     logger.warning(f"UDO total cell not found in component sheet {component_sheet.title} for {tier_component_name}")
 
-            # Check for cancellation before tickmark processing
-            if cancellation_check and cancellation_check():
-                logger.info("Range comparison cancelled before tickmark processing.")
-                return
-
-            # Handle the match between Certification and DO UCO to UDO sheets
-            for uco_values in uco_to_udo_values:
-                uco_tier_component_name, uco_component_total_unfilled, uco_trading_partner_total, uco_difference, uco_row = uco_values
+        # Check for cancellation before tickmark processing
+        if cancellation_check and cancellation_check():
+            logger.info("Range comparison cancelled before tickmark processing.")
+            return
 
-                if (tier_component_name == uco_tier_component_name and
-                    abs(component_total_unfilled - uco_component_total_unfilled) < Decimal('0.01') and
-                    abs(trading_partner_total - uco_trading_partner_total) < Decimal('0.01') and
-                    abs(difference - uco_difference) < Decimal('0.01')):
+        # Handle the match between Certification and DO UCO to UDO sheets for all rows at once
+        cert_mask, uco_mask = match_amounts(
+            [values[0] for values in certification_values],
+            [[values[i] for values in certification_values] for i in (1, 2, 3)],
+            [values[0] for values in uco_to_udo_values],
+            uco_columns
+        )
+        certification_sheet = target_wb["Certification"]
+        uco_to_udo_sheet = target_wb["DO UCO to UDO"]
 
-                    logger.info(f"Match found for TIER Component Name: {tier_component_name}")
+        for is_match, cert_values in zip(cert_mask, certification_values):
+            if is_match:
+                tier_component_name, cert_row = cert_values[0], cert_values[4]
+                logger.info(f"Match found for TIER Component Name: {tier_component_name}")
 
-                    # Add Tickmark to Certification sheet
-                    certification_sheet = target_wb["Certification"]
-                    add_tickmark(certification_sheet, cert_row[7].row, cert_row[7].column, "i", "Wingdings", 12, True)
+                # Add Tickmark to Certification sheet
+                add_tickmark(certification_sheet, cert_row[7].row, cert_row[7].column, "i", "Wingdings", 12, True)
 
-                    # Add Tickmark to DO UCO to UDO sheet
-                    uco_to_udo_sheet = target_wb["DO UCO to UDO"]
-                    add_tickmark(uco_to_udo_sheet, uco_row[13].row, uco_row[13].column, "8", "Wingdings 2", 12, True)
+        for is_match, uco_values in zip(uco_mask, uco_to_udo_values):
+            if is_match:
+                uco_tier_component_name, uco_row = uco_values[0], uco_values[4]
 
-                    logger.info(f"Tickmarks added to Certification and DO UCO to UDO sheets for TIER Component Name: {tier_component_name}")
+                # Add Tickmark to DO UCO to UDO sheet
+                add_tickmark(uco_to_udo_sheet, uco_row[13].row, uco_row[13].column, "8", "Wingdings 2", 12, True)
+                logger.info("Tickmarks added to Certification and DO UCO to UDO sheets for "
+                            f"TIER Component Name: {uco_tier_component_name}")
 
         # Check for cancellation before saving
         if cancellation_check and cancellation_check():
@@ -528,9 +563,10 @@ def compare_ranges(
             return
 
         # After processing all comparisons, save the workbook once
-        progress_callback(95, "Saving workbook with comparisons")
-        target_wb.save(new_target_file)
-        logger.info(f"Workbook saved with updated comparisons and tickmarks.")
+        if new_target_file:
+            progress_callback(95, "Saving workbook with comparisons")
+            target_wb.save(new_target_file)
+            logger.info("Workbook saved with updated comparisons and tickmarks.")
 
         # Update progress to 100%
         progress_callback(97, "Comparison process completed")
@@ -542,11 +578,11 @@ def compare_ranges(
 def main(
     certification_range: List[Any], 
     uco_to_udo_range: List[Any], 
-    target_wb: Workbook, 
-    data_wb: Workbook, 
+    target_wb: WorkbookViews,
+    data_wb: Optional[Workbook],
     logger: logging.Logger, 
     progress_callback: Callable[[int, Optional[str]], None], 
-    new_target_file: str,
+    new_target_file: Optional[str],
     cancellation_check: Optional[Callable[[], bool]] = None
 ) -> None:
     """
@@ -555,11 +591,12 @@ def main(
     Args:
         certification_range: The range of cells from the Certification sheet
         uco_to_udo_range: The range of cells from the DO UCO to UDO sheet
-        target_wb: The workbook loaded with data_only=False (preserving formulas)
-        data_wb: The workbook loaded with data_only=True (accessing calculated values)
+        target_wb: The workbook loaded with data_only=False (preserving formulas),
+            or a DualViewWorkbook exposing both formulas and cached values
+        data_wb: The workbook loaded with data_only=True (None with a DualViewWorkbook)
         logger: Logger instance for logging
         progress_callback: Callback function to update progress (value, message)
-        new_target_file: Path to save the updated workbook
+        new_target_file: Path to save the updated workbook, or None to leave saving to the caller
         cancellation_check: Optional function to check if operation should be cancelled
     """
     # Check for cancellation
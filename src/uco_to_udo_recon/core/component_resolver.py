@@ -0,0 +1,199 @@
+"""
+Component sheet resolution for the UCO to UDO Reconciliation tool.
+
+This module maps a Certification row (tab name, TIER component name and
+trading partner number) to its component sheet. The component and trading
+partner mappings are loaded from a registry file, and the sheet names of a
+workbook are compiled once into a substring index so each lookup costs a
+few dictionary probes instead of a scan of every sheet name.
+"""
+
+import json
+import os
+import weakref
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, NamedTuple, Optional, Sequence, Tuple
+
+from openpyxl.workbook.workbook import Workbook
+
+DEFAULT_REGISTRY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                     "component_registry.json")
+
+
+class ComponentRegistry(NamedTuple):
+    """Component and trading partner mappings used to find component sheets."""
+    component_mappings: Dict[str, List[str]]
+    trading_partner_mappings: Dict[str, List[str]]
+    skip_sheets: FrozenSet[str]
+
+
+class ComponentMatch(NamedTuple):
+    """A resolved component sheet and the search pattern that found it."""
+    sheet_name: str
+    pattern: str
+    pattern_type: str
+
+
+@lru_cache(maxsize=None)
+def load_component_registry(path: str = DEFAULT_REGISTRY_PATH) -> ComponentRegistry:
+    """
+    Load the component registry from a JSON file.
+
+    Args:
+        path: Path to the registry file
+
+    Returns:
+        ComponentRegistry: The mappings and the sheets that are never component sheets
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return ComponentRegistry(
+        component_mappings={str(k): list(v) for k, v in data.get("component_mappings", {}).items()},
+        trading_partner_mappings={str(k): list(v) for k, v
+                                  in data.get("trading_partner_mappings", {}).items()},
+        skip_sheets=frozenset(data.get("skip_sheets", [])),
+    )
+
+
+class ComponentSheetResolver:
+    """
+    Resolves component sheets against a fixed list of sheet names.
+
+    Every substring of every candidate sheet name (upper-cased) is mapped to
+    the first sheet containing it, so finding the earliest sheet matching a
+    pattern is one dictionary lookup. Results follow the original search:
+    the first sheet in workbook order that contains any of the query's
+    patterns wins, and the pattern reported is the first one, in pattern
+    order, that sheet contains.
+    """
+
+    def __init__(
+        self,
+        sheetnames: Sequence[str],
+        registry: Optional[ComponentRegistry] = None
+    ) -> None:
+        """
+        Compile the resolver for a list of sheet names.
+
+        Args:
+            sheetnames: The workbook's sheet names in order
+            registry: Mappings to use (defaults to the bundled registry file)
+        """
+        self.registry = registry or load_component_registry()
+        self.sheetnames = tuple(sheetnames)
+        self._candidates = [
+            name for name in self.sheetnames if name not in self.registry.skip_sheets
+        ]
+        substrings: Dict[str, int] = {}
+        for position, name in enumerate(self._candidates):
+            upper = name.upper()
+            for start in range(len(upper)):
+                for end in range(start + 1, len(upper) + 1):
+                    substrings.setdefault(upper[start:end], position)
+        self._substrings = substrings
+        self._results: Dict[Tuple[Any, Any, Any], Optional[ComponentMatch]] = {}
+
+    def search_patterns(
+        self,
+        tab_name: Optional[str],
+        tier_component_name: Optional[str],
+        trading_partner_number: Optional[Any]
+    ) -> List[Tuple[str, str]]:
+        """
+        Build the search patterns for a query in priority order.
+
+        Args:
+            tab_name: The tab name to search for (can be None)
+            tier_component_name: The TIER component name (e.g., 'FEM', 'CBP')
+            trading_partner_number: The trading partner number
+
+        Returns:
+            List of (pattern, pattern_type) tuples
+        """
+        component_mappings = self.registry.component_mappings
+        trading_partner_mappings = self.registry.trading_partner_mappings
+        search_patterns = []
+
+        if tab_name is not None:
+            search_patterns.append((str(tab_name), "tab_name"))
+
+        if tier_component_name is not None:
+            if tier_component_name in component_mappings:
+                for variant in component_mappings[tier_component_name]:
+                    search_patterns.append((variant, f"component_mapping_{tier_component_name}"))
+            else:
+                search_patterns.append((str(tier_component_name), "tier_component_name"))
+
+        if trading_partner_number is not None:
+            str_trading_partner = str(trading_partner_number)
+            search_patterns.append((str_trading_partner, "trading_partner_number"))
+            for variant in trading_partner_mappings.get(str_trading_partner, []):
+                search_patterns.append((variant, f"trading_partner_mapping_{str_trading_partner}"))
+
+        return search_patterns
+
+    def resolve(
+        self,
+        tab_name: Optional[str],
+        tier_component_name: Optional[str],
+        trading_partner_number: Optional[Any]
+    ) -> Optional[ComponentMatch]:
+        """
+        Find the component sheet for a Certification row.
+
+        Args:
+            tab_name: The tab name to search for (can be None)
+            tier_component_name: The TIER component name (e.g., 'FEM', 'CBP')
+            trading_partner_number: The trading partner number
+
+        Returns:
+            ComponentMatch or None if no sheet matches
+        """
+        key = (tab_name, tier_component_name, trading_partner_number)
+        if key in self._results:
+            return self._results[key]
+
+        search_patterns = [
+            (pattern, pattern_type)
+            for pattern, pattern_type in self.search_patterns(*key)
+            if pattern
+        ]
+        best = None
+        for pattern, _ in search_patterns:
+            position = self._substrings.get(pattern.upper())
+            if position is not None and (best is None or position < best):
+                best = position
+
+        match = None
+        if best is not None:
+            sheet_name = self._candidates[best]
+            sheet_name_upper = sheet_name.upper()
+            pattern, pattern_type = next(
+                (p, t) for p, t in search_patterns if p.upper() in sheet_name_upper
+            )
+            match = ComponentMatch(sheet_name, pattern, pattern_type)
+        self._results[key] = match
+        return match
+
+
+_resolvers: "weakref.WeakKeyDictionary[Workbook, ComponentSheetResolver]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_component_resolver(workbook: Workbook) -> ComponentSheetResolver:
+    """
+    Get the resolver compiled for a workbook, recompiling if its sheets changed.
+
+    Args:
+        workbook: The Excel workbook object
+
+    Returns:
+        ComponentSheetResolver: The shared resolver for this workbook
+    """
+    sheetnames = tuple(workbook.sheetnames)
+    resolver = _resolvers.get(workbook)
+    if resolver is None or resolver.sheetnames != sheetnames:
+        resolver = ComponentSheetResolver(sheetnames)
+        _resolvers[workbook] = resolver
+    return resolver
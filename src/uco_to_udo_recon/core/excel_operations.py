@@ -9,15 +9,18 @@ import os
 import logging
 import shutil
 import time
-import pythoncom
-from typing import Optional, Union, Callable, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Callable, Any, List, NamedTuple
 from openpyxl import load_workbook
 from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
 from openpyxl.workbook.workbook import Workbook
 from openpyxl.worksheet.worksheet import Worksheet
 from openpyxl.cell import Cell
 
+from src.uco_to_udo_recon.utils.cancellation import sleep_unless_cancelled
 from src.uco_to_udo_recon.utils.file_utils import ensure_file_handle_release
+from src.uco_to_udo_recon.utils.retry import backoff_delay
+from src.uco_to_udo_recon.utils.xlsx_package import XlsxPackage, XlsxPackageError
 
 
 def copy_cell_style(source_cell: Cell, target_cell: Cell) -> None:
@@ -42,6 +45,20 @@ def copy_cell_style(source_cell: Cell, target_cell: Cell) -> None:
         raise RuntimeError(f"Failed to copy cell style: {e}")
 
 
+def get_working_copy_path(target_file: str) -> str:
+    """
+    Returns the path of the working copy created for a target file.
+
+    Args:
+        target_file: Path to the target file
+
+    Returns:
+        str: The target path with " - DO" appended to the file name
+    """
+    file_name, file_extension = os.path.splitext(target_file)
+    return f"{file_name} - DO{file_extension}"
+
+
 def create_copy_of_target_file(target_file: str, logger: logging.Logger) -> str:
     """
     Creates a copy of the target file with a new name.
@@ -57,8 +74,7 @@ def create_copy_of_target_file(target_file: str, logger: logging.Logger) -> str:
         Exception: If file creation fails
     """
     try:
-        file_name, file_extension = os.path.splitext(target_file)
-        new_file_name = f"{file_name} - DO{file_extension}"
+        new_file_name = get_working_copy_path(target_file)
         shutil.copy2(target_file, new_file_name)
         logger.info(f"Created copy of target file: {new_file_name}")
 
@@ -71,113 +87,263 @@ def create_copy_of_target_file(target_file: str, logger: logging.Logger) -> str:
         raise
 
 
-def copy_and_rename_sheet(
-    source_path: str, 
-    source_sheet_name: str, 
-    target_path: str, 
-    new_sheet_name: str, 
-    logger: logging.Logger, 
+def _copy_sheet_cells(
+    source_path: str,
+    source_sheet_name: str,
+    target_path: str,
+    new_sheet_name: str,
+    logger: logging.Logger,
     insert_index: Optional[int] = None,
     cancellation_check: Optional[Callable[[], bool]] = None
 ) -> bool:
     """
-    Copies a sheet from source workbook to target workbook and renames it.
-    
+    Copies a sheet cell by cell through openpyxl.
+
+    Used when the worksheet part cannot be spliced at the package level.
+    Takes the same arguments as :func:`copy_and_rename_sheet`.
+
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    logger.info(f"Loading source workbook: {source_path}")
+    source_wb = load_workbook(source_path, data_only=False)  # data_only=False to preserve formulas
+    if source_sheet_name not in source_wb.sheetnames:
+        logger.error(f"Sheet '{source_sheet_name}' not found in {source_path}")
+        return False
+
+    logger.info(f"Loading target workbook: {target_path}")
+    target_wb = load_workbook(target_path, data_only=False)  # Ensure formulas are preserved in the target too
+    logger.info(f"Copying sheet '{source_sheet_name}' from source to target")
+    source_sheet = source_wb[source_sheet_name]
+
+    if insert_index is not None:
+        target_sheet = target_wb.create_sheet(new_sheet_name, insert_index)
+    else:
+        target_sheet = target_wb.create_sheet(new_sheet_name)
+
+    for row in source_sheet.iter_rows():
+        # Check for cancellation on every row of large sheets
+        if cancellation_check and cancellation_check():
+            logger.info(f"Sheet copying cancelled during row processing for '{source_sheet_name}'.")
+            return False
+
+        for cell in row:
+            target_cell = target_sheet.cell(row=cell.row, column=cell.column, value=cell.value)
+
+            # Preserve formulas
+            if cell.data_type == "f":  # Check if the cell contains a formula
+                target_cell.value = cell.value
+
+            # Copy style attributes
+            if cell.has_style:
+                target_cell.font = cell.font.copy()
+                target_cell.border = cell.border.copy()
+                target_cell.fill = cell.fill.copy()
+                target_cell.number_format = cell.number_format
+                target_cell.protection = cell.protection.copy()
+                target_cell.alignment = cell.alignment.copy()
+
+    # Check for cancellation before copying dimensions
+    if cancellation_check and cancellation_check():
+        logger.info(f"Sheet copying cancelled before copying dimensions for '{source_sheet_name}'.")
+        return False
+
+    # Copy column dimensions
+    for key, value in source_sheet.column_dimensions.items():
+        target_sheet.column_dimensions[key].width = value.width
+        target_sheet.column_dimensions[key].hidden = value.hidden
+
+    # Copy row dimensions
+    for key, value in source_sheet.row_dimensions.items():
+        target_sheet.row_dimensions[key].height = value.height
+        target_sheet.row_dimensions[key].hidden = value.hidden
+
+    logger.info(f"Saving changes to target workbook: {target_path}")
+    target_wb.save(target_path)
+    target_wb.close()
+    source_wb.close()  # Make sure to close source workbook
+    return True
+
+
+class SheetImport(NamedTuple):
+    """A sheet to copy into the target workbook with :func:`import_sheets`."""
+    source_path: str
+    source_sheet_name: str
+    new_sheet_name: str
+    insert_index: Optional[int] = None
+
+
+def _read_source_package(source_path: str) -> XlsxPackage:
+    """Read a source package and parse its shared strings and styles up front."""
+    package = XlsxPackage(source_path)
+    package.shared_strings
+    package.styles
+    return package
+
+
+def splice_sheets(
+    target: XlsxPackage,
+    imports: List[SheetImport],
+    logger: logging.Logger,
+    progress_callback: Optional[Callable[[int], None]] = None,
+    cancellation_check: Optional[Callable[[], bool]] = None
+) -> bool:
+    """
+    Splices sheets from their source files into an in-memory target package.
+
+    The source packages are read in parallel. Nothing is added to the target
+    unless every source sheet exists.
+
     Args:
-        source_path: Path to the source Excel file
-        source_sheet_name: Name of the sheet to copy
+        target: The package to add the sheets to
+        imports: The sheets to copy
+        logger: Logger instance for tracking operations
+        progress_callback: Optional callback receiving percent complete
+        cancellation_check: Optional function to check if operation should be cancelled
+
+    Returns:
+        bool: True if every sheet was added, False if a sheet is missing or cancelled
+
+    Raises:
+        XlsxPackageError: If a package cannot be spliced
+        InterruptedError: If cancelled while rewriting a worksheet
+    """
+    source_paths = list(dict.fromkeys(spec.source_path for spec in imports))
+    logger.info(f"Reading {len(source_paths)} source package(s): {', '.join(source_paths)}")
+    with ThreadPoolExecutor(max_workers=max(len(source_paths), 1)) as executor:
+        sources = dict(zip(source_paths, executor.map(_read_source_package, source_paths)))
+
+    for spec in imports:
+        if spec.source_sheet_name not in sources[spec.source_path].sheetnames:
+            logger.error(f"Sheet '{spec.source_sheet_name}' not found in {spec.source_path}")
+            return False
+
+    for idx, spec in enumerate(imports):
+        if cancellation_check and cancellation_check():
+            logger.info(f"Sheet import cancelled before copying '{spec.source_sheet_name}'.")
+            return False
+        logger.info(f"Splicing sheet '{spec.source_sheet_name}' into target "
+                    f"as '{spec.new_sheet_name}'")
+        target.add_sheet(sources[spec.source_path], spec.source_sheet_name,
+                         spec.new_sheet_name, spec.insert_index, cancellation_check)
+        if progress_callback:
+            progress_callback(int((idx + 1) / len(imports) * 90))
+    return True
+
+
+def import_sheets(
+    imports: List[SheetImport],
+    target_path: str,
+    logger: logging.Logger,
+    progress_callback: Optional[Callable[[int], None]] = None,
+    cancellation_check: Optional[Callable[[], bool]] = None
+) -> bool:
+    """
+    Copies several sheets into the target workbook with one load and one save.
+
+    The source packages are read in parallel, then every worksheet part is
+    spliced into the target, with shared strings and styles remapped, and the
+    target is saved once. Nothing is written unless every sheet was copied.
+    Sheets are inserted in list order, so each insert_index applies to the
+    workbook as left by the previous imports.
+
+    Args:
+        imports: The sheets to copy
         target_path: Path to the target Excel file
-        new_sheet_name: New name for the copied sheet
         logger: Logger instance for tracking operations
-        insert_index: Optional index position to insert the sheet
+        progress_callback: Optional callback receiving percent complete
         cancellation_check: Optional function to check if operation should be cancelled
-        
+
     Returns:
         bool: True if successful, False otherwise
     """
     try:
         # Check for cancellation
         if cancellation_check and cancellation_check():
-            logger.info(f"Sheet copying cancelled for '{source_sheet_name}'.")
-            return False
-            
-        logger.info(f"Loading source workbook: {source_path}")
-        source_wb = load_workbook(source_path, data_only=False)  # data_only=False to preserve formulas
-        if source_sheet_name not in source_wb.sheetnames:
-            logger.error(f"Sheet '{source_sheet_name}' not found in {source_path}")
+            logger.info("Sheet import cancelled before reading source files.")
             return False
 
-        logger.info(f"Loading target workbook: {target_path}")
-        target_wb = load_workbook(target_path, data_only=False)  # Ensure formulas are preserved in the target too
-        logger.info(f"Copying sheet '{source_sheet_name}' from source to target")
-        source_sheet = source_wb[source_sheet_name]
-        
-        if insert_index is not None:
-            target_sheet = target_wb.create_sheet(new_sheet_name, insert_index)
-        else:
-            target_sheet = target_wb.create_sheet(new_sheet_name)
-
-        row_count = 0
-        for row in source_sheet.iter_rows():
-            # Check for cancellation periodically in large sheets
-            row_count += 1
-            if cancellation_check and cancellation_check() and row_count % 50 == 0:
-                logger.info(f"Sheet copying cancelled during row processing for '{source_sheet_name}'.")
+        try:
+            logger.info(f"Reading target package: {target_path}")
+            target = XlsxPackage(target_path)
+            if not splice_sheets(target, imports, logger, progress_callback, cancellation_check):
                 return False
-                
-            for cell in row:
-                target_cell = target_sheet.cell(row=cell.row, column=cell.column, value=cell.value)
-
-                # Preserve formulas
-                if cell.data_type == "f":  # Check if the cell contains a formula
-                    target_cell.value = cell.value
-
-                # Copy style attributes
-                if cell.has_style:
-                    target_cell.font = cell.font.copy()
-                    target_cell.border = cell.border.copy()
-                    target_cell.fill = cell.fill.copy()
-                    target_cell.number_format = cell.number_format
-                    target_cell.protection = cell.protection.copy()
-                    target_cell.alignment = cell.alignment.copy()
-
-        # Check for cancellation before copying dimensions
-        if cancellation_check and cancellation_check():
-            logger.info(f"Sheet copying cancelled before copying dimensions for '{source_sheet_name}'.")
-            return False
-            
-        # Copy column dimensions
-        for key, value in source_sheet.column_dimensions.items():
-            target_sheet.column_dimensions[key].width = value.width
-            target_sheet.column_dimensions[key].hidden = value.hidden
 
-        # Copy row dimensions
-        for key, value in source_sheet.row_dimensions.items():
-            target_sheet.row_dimensions[key].height = value.height
-            target_sheet.row_dimensions[key].hidden = value.hidden
+            # Check for cancellation before saving
+            if cancellation_check and cancellation_check():
+                logger.info("Sheet import cancelled before saving.")
+                return False
 
-        logger.info(f"Saving changes to target workbook: {target_path}")
-        target_wb.save(target_path)
-        target_wb.close()
-        source_wb.close()  # Make sure to close source workbook
+            logger.info(f"Saving changes to target workbook: {target_path}")
+            target.save(target_path)
+        except InterruptedError:
+            logger.info("Sheet import cancelled during row processing.")
+            return False
+        except XlsxPackageError as e:
+            logger.warning(f"Package-level copy not possible ({e}); copying sheets cell by cell")
+            for spec in imports:
+                if not _copy_sheet_cells(spec.source_path, spec.source_sheet_name,
+                                         target_path, spec.new_sheet_name, logger,
+                                         spec.insert_index, cancellation_check):
+                    return False
 
         # Add file handle release after saving
         ensure_file_handle_release(target_path, logger)
+        if progress_callback:
+            progress_callback(100)
 
-        logger.info(f"Successfully copied and renamed sheet to '{new_sheet_name}' with formatting and formulas preserved")
+        names = ", ".join(f"'{spec.new_sheet_name}'" for spec in imports)
+        logger.info(f"Successfully copied sheets {names} with formatting and formulas preserved")
         return True
 
     except Exception as e:
-        logger.error(f"An error occurred while copying sheet: {e}", exc_info=True)
+        logger.error(f"An error occurred while copying sheets: {e}", exc_info=True)
         return False
 
 
+def copy_and_rename_sheet(
+    source_path: str,
+    source_sheet_name: str,
+    target_path: str,
+    new_sheet_name: str,
+    logger: logging.Logger,
+    insert_index: Optional[int] = None,
+    cancellation_check: Optional[Callable[[], bool]] = None
+) -> bool:
+    """
+    Copies a sheet from source workbook to target workbook and renames it.
+
+    The worksheet XML part is moved between the two packages directly, with
+    shared strings and styles remapped, so no cell objects are built and
+    untouched parts of the target are written back unchanged. If the
+    packages cannot be spliced, the sheet is copied cell by cell instead.
+
+    Args:
+        source_path: Path to the source Excel file
+        source_sheet_name: Name of the sheet to copy
+        target_path: Path to the target Excel file
+        new_sheet_name: New name for the copied sheet
+        logger: Logger instance for tracking operations
+        insert_index: Optional index position to insert the sheet
+        cancellation_check: Optional function to check if operation should be cancelled
+
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    return import_sheets(
+        [SheetImport(source_path, source_sheet_name, new_sheet_name, insert_index)],
+        target_path, logger, cancellation_check=cancellation_check
+    )
+
+
 def recalculate_workbook_in_excel(
     file_path: str, 
     logger: logging.Logger, 
     progress_callback: Callable[[int, Optional[str]], None], 
     retries: int = 3,
-    cancellation_check: Optional[Callable[[], bool]] = None
+    cancellation_check: Optional[Callable[[], bool]] = None,
+    timeout: Optional[float] = None,
+    on_excel_started: Optional[Callable[[Any], None]] = None
 ) -> None:
     """
     Recalculate the workbook using Excel application via COM automation.
@@ -188,10 +354,14 @@ def recalculate_workbook_in_excel(
         progress_callback: Callback function to update progress (value, message)
         retries: Number of retry attempts (default: 3)
         cancellation_check: Optional function to check if operation should be cancelled
+        timeout: Optional maximum number of seconds to wait for Excel to finish calculating
+        on_excel_started: Optional callback receiving the Excel application object
+            once it is running (e.g. to record its process id)
         
     Raises:
         Exception: If recalculation fails after retries
     """
+    import pythoncom
     from win32com.client import gencache, constants
     excel = None
     wb = None
@@ -212,6 +382,8 @@ def recalculate_workbook_in_excel(
         excel.DisplayAlerts = False  # Suppress Excel alerts
         excel.AskToUpdateLinks = False  # Prevent prompts to update links
         excel.AlertBeforeOverwriting = False
+        if on_excel_started:
+            on_excel_started(excel)
 
         while attempt < retries and not success:
             # Check for cancellation before each attempt
@@ -236,16 +408,15 @@ def recalculate_workbook_in_excel(
                 # Recalculate all open workbooks
                 excel.CalculateFullRebuild()
 
-                # Wait for calculations to complete, with periodic cancellation checks
-                check_counter = 0
+                # Wait for calculations to complete; a cancellation ends the wait at once
+                calculation_start = time.perf_counter()
                 while excel.CalculationState != constants.xlDone:
-                    time.sleep(0.5)  # Wait half a second before checking again
-                    check_counter += 1
-                    
-                    # Check for cancellation every few loops
-                    if cancellation_check and cancellation_check() and check_counter % 4 == 0:
+                    if sleep_unless_cancelled(0.5, cancellation_check):
                         logger.info("Workbook recalculation cancelled during calculation.")
                         return
+                    if timeout is not None and time.perf_counter() - calculation_start > timeout:
+                        raise TimeoutError(
+                            f"Excel did not finish calculating within {timeout:.0f}s")
 
                 # Check for cancellation before saving
                 if cancellation_check and cancellation_check():
@@ -259,8 +430,11 @@ def recalculate_workbook_in_excel(
             except Exception as e:
                 logger.error(f"Attempt {attempt}: An error occurred while recalculating the workbook in Excel: {e}", exc_info=True)
                 if attempt < retries:
-                    logger.info(f"Retrying in 5 seconds... (Attempt {attempt + 1})")
-                    time.sleep(5)
+                    delay = backoff_delay(attempt)
+                    logger.info(f"Retrying in {delay:.1f} seconds... (Attempt {attempt + 1})")
+                    if sleep_unless_cancelled(delay, cancellation_check):
+                        logger.info("Workbook recalculation cancelled before retrying.")
+                        return
                 else:
                     raise
             finally:
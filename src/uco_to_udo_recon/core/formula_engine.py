@@ -0,0 +1,644 @@
+"""
+Formula evaluation for the UCO to UDO Reconciliation tool.
+
+This module evaluates the small formula subset the reconciliation writes
+(``IF``, ``ROUND``, ``SUM``, ``AND``, comparisons and arithmetic over cell
+references) in Python, against the cached values already stored in the
+workbook. It lets a run know its tickmark outcomes ("a", "b", "û") without
+asking Excel to recalculate.
+"""
+
+import logging
+import re
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple, Union
+
+from openpyxl.utils.cell import column_index_from_string, coordinate_to_tuple
+from openpyxl.worksheet.worksheet import Worksheet
+
+from src.uco_to_udo_recon.utils.xlsx_package import ERROR_VALUES
+
+
+class FormulaSyntaxError(ValueError):
+    """Raised when a formula uses syntax outside the supported subset."""
+
+
+class ExcelError(Exception):
+    """An Excel error value (``#VALUE!``, ``#DIV/0!``, ...) raised during evaluation."""
+
+    def __init__(self, code: str) -> None:
+        super().__init__(code)
+        self.code = code
+
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<space>\s+)
+  | (?P<string>"(?:[^"]|"")*")
+  | (?P<func>[A-Za-z][A-Za-z0-9.]*(?=\())
+  | (?P<ref>(?:(?:'(?:[^']|'')+'|[A-Za-z_][\w.]*)!)?
+        \$?[A-Za-z]{1,3}\$?\d+(?::\$?[A-Za-z]{1,3}\$?\d+)?)
+  | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<bool>TRUE|FALSE)
+  | (?P<op><=|>=|<>|[=<>+\-*/^&(),])
+    """,
+    re.VERBOSE | re.IGNORECASE,
+)
+
+_REF_RE = re.compile(r"\$?([A-Za-z]{1,3})\$?(\d+)")
+
+_STRING_RE = re.compile(r'"(?:[^"]|"")*"')
+_FUNCTION_NAME_RE = re.compile(r"([A-Za-z_][A-Za-z0-9._]*)\s*\(")
+
+SUPPORTED_FUNCTIONS = frozenset({"IF", "ROUND", "SUM", "AND"})
+
+Node = Tuple[Any, ...]
+
+
+def _tokenize(formula: str) -> List[Tuple[str, str]]:
+    tokens = []
+    position = 0
+    while position < len(formula):
+        match = _TOKEN_RE.match(formula, position)
+        if match is None:
+            raise FormulaSyntaxError(f"Unsupported syntax at position {position}: {formula!r}")
+        kind = match.lastgroup
+        if kind != "space":
+            tokens.append((kind, match.group()))
+        position = match.end()
+    return tokens
+
+
+def _parse_ref(text: str) -> Node:
+    sheet = None
+    if "!" in text:
+        sheet, text = text.rsplit("!", 1)
+        if sheet.startswith("'"):
+            sheet = sheet[1:-1].replace("''", "'")
+    corners = []
+    for part in text.split(":"):
+        column, row = _REF_RE.fullmatch(part).groups()
+        corners.append((int(row), column_index_from_string(column.upper())))
+    if len(corners) == 1:
+        return ("ref", sheet, corners[0])
+    (row1, col1), (row2, col2) = corners
+    return ("range", sheet, (min(row1, row2), min(col1, col2)), (max(row1, row2), max(col1, col2)))
+
+
+class _Parser:
+    """Recursive-descent parser producing a tuple-based syntax tree."""
+
+    def __init__(self, formula: str) -> None:
+        self.tokens = _tokenize(formula)
+        self.position = 0
+
+    def peek(self) -> Optional[str]:
+        if self.position < len(self.tokens):
+            return self.tokens[self.position][1]
+        return None
+
+    def take(self) -> Tuple[str, str]:
+        if self.position >= len(self.tokens):
+            raise FormulaSyntaxError("Unexpected end of formula")
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def expect(self, text: str) -> None:
+        _, value = self.take()
+        if value != text:
+            raise FormulaSyntaxError(f"Expected '{text}', found '{value}'")
+
+    def parse(self) -> Node:
+        node = self.comparison()
+        if self.position != len(self.tokens):
+            raise FormulaSyntaxError(f"Unexpected token '{self.peek()}'")
+        return node
+
+    def comparison(self) -> Node:
+        node = self.concatenation()
+        while self.peek() in ("=", "<>", "<", ">", "<=", ">="):
+            node = ("cmp", self.take()[1], node, self.concatenation())
+        return node
+
+    def concatenation(self) -> Node:
+        node = self.additive()
+        while self.peek() == "&":
+            self.take()
+            node = ("concat", node, self.additive())
+        return node
+
+    def additive(self) -> Node:
+        node = self.multiplicative()
+        while self.peek() in ("+", "-"):
+            node = ("binop", self.take()[1], node, self.multiplicative())
+        return node
+
+    def multiplicative(self) -> Node:
+        node = self.power()
+        while self.peek() in ("*", "/"):
+            node = ("binop", self.take()[1], node, self.power())
+        return node
+
+    def power(self) -> Node:
+        node = self.unary()
+        while self.peek() == "^":
+            self.take()
+            node = ("binop", "^", node, self.unary())
+        return node
+
+    def unary(self) -> Node:
+        if self.peek() in ("+", "-"):
+            operator = self.take()[1]
+            operand = self.unary()
+            return ("neg", operand) if operator == "-" else ("pos", operand)
+        return self.primary()
+
+    def primary(self) -> Node:
+        kind, value = self.take()
+        if kind == "number":
+            number = float(value)
+            is_integer = number.is_integer() and "." not in value and "e" not in value.lower()
+            return ("const", int(number) if is_integer else number)
+        if kind == "string":
+            return ("const", value[1:-1].replace('""', '"'))
+        if kind == "bool":
+            return ("const", value.upper() == "TRUE")
+        if kind == "ref":
+            return _parse_ref(value)
+        if kind == "func":
+            name = value.upper()
+            self.expect("(")
+            args: List[Node] = []
+            if self.peek() != ")":
+                args.append(self.comparison())
+                while self.peek() == ",":
+                    self.take()
+                    args.append(self.comparison())
+            self.expect(")")
+            return ("func", name, args)
+        if value == "(":
+            node = self.comparison()
+            self.expect(")")
+            return node
+        raise FormulaSyntaxError(f"Unexpected token '{value}'")
+
+
+_parse_cache: Dict[str, Node] = {}
+
+
+def parse_formula(formula: str) -> Node:
+    """
+    Parse a formula into a syntax tree.
+
+    Args:
+        formula: The formula text, with or without the leading '='
+
+    Returns:
+        Node: The parsed syntax tree
+
+    Raises:
+        FormulaSyntaxError: If the formula is outside the supported subset
+    """
+    text = formula[1:] if formula.startswith("=") else formula
+    node = _parse_cache.get(text)
+    if node is None:
+        node = _Parser(text).parse()
+        _parse_cache[text] = node
+    return node
+
+
+_functions_cache: Dict[str, FrozenSet[str]] = {}
+
+
+def formula_functions(formula: str) -> FrozenSet[str]:
+    """
+    List the functions a formula calls.
+
+    The formula text is scanned rather than parsed, so this also works for
+    formulas outside the supported subset.
+
+    Args:
+        formula: The formula text
+
+    Returns:
+        FrozenSet[str]: Upper-case function names, without the ``_xlfn.`` prefix
+    """
+    functions = _functions_cache.get(formula)
+    if functions is None:
+        text = _STRING_RE.sub('""', formula)
+        functions = frozenset(
+            re.sub(r"^_XLFN\.", "", name.upper()) for name in _FUNCTION_NAME_RE.findall(text)
+        )
+        _functions_cache[formula] = functions
+    return functions
+
+
+def formula_references(
+    formula: str
+) -> List[Tuple[Optional[str], Tuple[int, int], Tuple[int, int]]]:
+    """
+    List the cells and ranges a formula reads.
+
+    Args:
+        formula: The formula text
+
+    Returns:
+        List of (sheet or None, (min_row, min_col), (max_row, max_col)) tuples
+    """
+    references = []
+
+    def walk(node: Node) -> None:
+        kind = node[0]
+        if kind == "ref":
+            references.append((node[1], node[2], node[2]))
+        elif kind == "range":
+            references.append((node[1], node[2], node[3]))
+        elif kind == "func":
+            for arg in node[2]:
+                walk(arg)
+        elif kind in ("cmp", "binop"):
+            walk(node[2])
+            walk(node[3])
+        elif kind == "concat":
+            walk(node[1])
+            walk(node[2])
+        elif kind in ("neg", "pos"):
+            walk(node[1])
+
+    walk(parse_formula(formula))
+    return references
+
+
+def is_supported_formula(formula: str) -> bool:
+    """
+    Check whether a formula can be evaluated by :class:`FormulaEvaluator`.
+
+    Args:
+        formula: The formula text
+
+    Returns:
+        bool: True if the formula parses and only calls supported functions
+    """
+    try:
+        node = parse_formula(formula)
+    except FormulaSyntaxError:
+        return False
+
+    def supported(node: Node) -> bool:
+        kind = node[0]
+        if kind == "func":
+            return node[1] in SUPPORTED_FUNCTIONS and all(supported(arg) for arg in node[2])
+        if kind in ("cmp", "binop"):
+            return supported(node[2]) and supported(node[3])
+        if kind == "concat":
+            return supported(node[1]) and supported(node[2])
+        if kind in ("neg", "pos"):
+            return supported(node[1])
+        return True
+
+    return supported(node)
+
+
+def excel_round(number: float, digits: int) -> float:
+    """
+    Round like Excel's ROUND: half away from zero at 15 significant digits.
+
+    Args:
+        number: The value to round
+        digits: Number of decimal places (negative rounds to tens, hundreds, ...)
+
+    Returns:
+        float: The rounded value
+    """
+    value = Decimal(f"{number:.15g}")
+    if not value.is_finite() or value.as_tuple().exponent >= -digits:
+        # No digit below the rounding position; quantizing could also exceed
+        # the context precision for large values or many decimals
+        return float(value)
+    rounded = value.quantize(Decimal(1).scaleb(-digits), rounding=ROUND_HALF_UP)
+    return float(rounded)
+
+
+class _Range:
+    """The values of a range reference, in row-major order."""
+
+    __slots__ = ("values",)
+
+    def __init__(self, values: List[Any]) -> None:
+        self.values = values
+
+
+def _raise_if_error(value: Any) -> Any:
+    if isinstance(value, str) and value in ERROR_VALUES:
+        raise ExcelError(value)
+    return value
+
+
+def _to_number(value: Any) -> float:
+    value = _raise_if_error(value)
+    if value is None:
+        return 0
+    if isinstance(value, bool):
+        return 1 if value else 0
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value.replace(",", ""))
+        except ValueError:
+            pass
+    raise ExcelError("#VALUE!")
+
+
+def _to_bool(value: Any) -> bool:
+    value = _raise_if_error(value)
+    if value is None:
+        return False
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float, Decimal)):
+        return value != 0
+    if isinstance(value, str) and value.upper() in ("TRUE", "FALSE"):
+        return value.upper() == "TRUE"
+    raise ExcelError("#VALUE!")
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float, Decimal)) and not isinstance(value, bool)
+
+
+def _compare(operator: str, left: Any, right: Any) -> bool:
+    left, right = _raise_if_error(left), _raise_if_error(right)
+    if left is None:
+        left = "" if isinstance(right, str) else False if isinstance(right, bool) else 0
+    if right is None:
+        right = "" if isinstance(left, str) else False if isinstance(left, bool) else 0
+
+    def key(value: Any) -> Tuple[int, Any]:
+        if isinstance(value, bool):
+            return (2, value)
+        if isinstance(value, str):
+            return (1, value.lower())
+        return (0, float(f"{float(value):.15g}"))
+
+    a, b = key(left), key(right)
+    if operator == "=":
+        return a == b
+    if operator == "<>":
+        return a != b
+    if operator == "<":
+        return a < b
+    if operator == ">":
+        return a > b
+    if operator == "<=":
+        return a <= b
+    return a >= b
+
+
+def _sum(args: List[Any]) -> float:
+    total = 0
+    for arg in args:
+        if isinstance(arg, _Range):
+            for value in arg.values:
+                _raise_if_error(value)
+                if _is_number(value):
+                    total += float(value) if isinstance(value, Decimal) else value
+        else:
+            total += _to_number(arg)
+    return total
+
+
+def _and(args: List[Any]) -> bool:
+    seen = False
+    result = True
+    for arg in args:
+        values = arg.values if isinstance(arg, _Range) else [arg]
+        for value in values:
+            _raise_if_error(value)
+            if isinstance(arg, _Range) and not (_is_number(value) or isinstance(value, bool)):
+                continue
+            seen = True
+            result = _to_bool(value) and result
+    if not seen:
+        raise ExcelError("#VALUE!")
+    return result
+
+
+class FormulaEvaluator:
+    """
+    Evaluates formula cells of a workbook in Python.
+
+    Non-formula cells supply their stored value. Formula cells supply their
+    cached result when the workbook kept one (``DualValueCell.cached_value``)
+    and ``use_cached`` is set; otherwise they are evaluated recursively.
+    Formulas outside the supported subset always supply their cached result
+    when there is one.
+    Results are memoized until :meth:`reset` is called.
+    """
+
+    def __init__(self, workbook: Any, use_cached: bool = True) -> None:
+        """
+        Initialize the evaluator.
+
+        Args:
+            workbook: A workbook or DualViewWorkbook whose worksheets hold the formulas
+            use_cached: Use stored cached results of formula cells when present
+        """
+        self.workbook = workbook
+        self.use_cached = use_cached
+        self._results: Dict[Tuple[str, int, int], Any] = {}
+        self._active: set = set()
+
+    def reset(self) -> None:
+        """Forget memoized results after cells were changed."""
+        self._results.clear()
+
+    def _sheet(self, title: str) -> Worksheet:
+        try:
+            return self.workbook[title]
+        except KeyError:
+            raise ExcelError("#REF!")
+
+    def _cell_value(self, sheet: Worksheet, row: int, column: int) -> Any:
+        key = (sheet.title, row, column)
+        if key in self._results:
+            return self._results[key]
+        cell = sheet._cells.get((row, column))
+        if cell is None:
+            return None
+        if cell.data_type != 'f':
+            return cell._value
+        cached = getattr(cell, 'cached_value', None)
+        if cached is not None and (self.use_cached or not is_supported_formula(cell._value)):
+            return cached
+        if key in self._active:
+            raise ExcelError("#REF!")  # Circular reference
+        self._active.add(key)
+        try:
+            result = self.evaluate_formula(cell._value, sheet)
+        finally:
+            self._active.discard(key)
+        self._results[key] = result
+        return result
+
+    def evaluate_cell(
+        self,
+        sheet: Union[str, Worksheet],
+        row: Union[int, str],
+        column: Optional[int] = None
+    ) -> Any:
+        """
+        Evaluate a cell, computing its formula if it has one.
+
+        Args:
+            sheet: The worksheet or its title
+            row: 1-based row index, or a coordinate such as 'B14'
+            column: 1-based column index (omit with a coordinate)
+
+        Returns:
+            The cell's value; Excel errors are returned as their code (e.g. '#VALUE!')
+
+        Raises:
+            FormulaSyntaxError: If a formula involved is outside the supported subset
+        """
+        if isinstance(sheet, str):
+            sheet = self._sheet(sheet)
+        if column is None:
+            row, column = coordinate_to_tuple(row)
+        try:
+            return self._cell_value(sheet, row, column)
+        except ExcelError as e:
+            return e.code
+
+    def evaluate_formula(self, formula: str, sheet: Worksheet) -> Any:
+        """
+        Evaluate formula text in the context of a worksheet.
+
+        Args:
+            formula: The formula text
+            sheet: The worksheet unqualified references point to
+
+        Returns:
+            The result of the formula
+
+        Raises:
+            ExcelError: If the formula evaluates to an Excel error
+            FormulaSyntaxError: If the formula is outside the supported subset
+        """
+        result = self._evaluate(parse_formula(formula), sheet)
+        if isinstance(result, _Range):
+            if len(result.values) != 1:
+                raise ExcelError("#VALUE!")
+            result = result.values[0]
+        return _raise_if_error(result)
+
+    def _evaluate(self, node: Node, sheet: Worksheet) -> Any:
+        kind = node[0]
+        if kind == "const":
+            return node[1]
+        if kind == "ref":
+            target = self._sheet(node[1]) if node[1] else sheet
+            return self._cell_value(target, *node[2])
+        if kind == "range":
+            target = self._sheet(node[1]) if node[1] else sheet
+            (min_row, min_col), (max_row, max_col) = node[2], node[3]
+            return _Range([
+                self._cell_value(target, row, column)
+                for row in range(min_row, max_row + 1)
+                for column in range(min_col, max_col + 1)
+            ])
+        if kind == "neg":
+            return -_to_number(self._scalar(node[1], sheet))
+        if kind == "pos":
+            return self._scalar(node[1], sheet)
+        if kind == "binop":
+            left = _to_number(self._scalar(node[2], sheet))
+            right = _to_number(self._scalar(node[3], sheet))
+            operator = node[1]
+            if operator == "+":
+                return left + right
+            if operator == "-":
+                return left - right
+            if operator == "*":
+                return left * right
+            if operator == "/":
+                if right == 0:
+                    raise ExcelError("#DIV/0!")
+                return left / right
+            return left ** right
+        if kind == "concat":
+            parts = [_raise_if_error(self._scalar(n, sheet)) for n in node[1:]]
+            return "".join("" if p is None else str(p) for p in parts)
+        if kind == "cmp":
+            return _compare(node[1], self._scalar(node[2], sheet), self._scalar(node[3], sheet))
+        if kind == "func":
+            return self._call(node[1], node[2], sheet)
+        raise FormulaSyntaxError(f"Unknown node {kind}")
+
+    def _scalar(self, node: Node, sheet: Worksheet) -> Any:
+        value = self._evaluate(node, sheet)
+        if isinstance(value, _Range):
+            if len(value.values) != 1:
+                raise ExcelError("#VALUE!")
+            return value.values[0]
+        return value
+
+    def _call(self, name: str, args: List[Node], sheet: Worksheet) -> Any:
+        if name == "IF":
+            if not 1 <= len(args) <= 3:
+                raise ExcelError("#VALUE!")
+            if _to_bool(self._scalar(args[0], sheet)):
+                return self._scalar(args[1], sheet) if len(args) > 1 else True
+            return self._scalar(args[2], sheet) if len(args) > 2 else False
+        if name == "ROUND":
+            if len(args) != 2:
+                raise ExcelError("#VALUE!")
+            number, digits = (_to_number(self._scalar(arg, sheet)) for arg in args)
+            return excel_round(number, int(digits))
+        if name == "SUM":
+            return _sum([self._evaluate(arg, sheet) for arg in args])
+        if name == "AND":
+            return _and([self._evaluate(arg, sheet) for arg in args])
+        raise ExcelError("#NAME?")
+
+
+def evaluate_cells(
+    evaluator: FormulaEvaluator,
+    sheet: Worksheet,
+    coordinates: List[str],
+    logger: logging.Logger,
+    store: bool = True
+) -> Dict[str, Any]:
+    """
+    Evaluate formula cells and log their outcomes.
+
+    With ``store`` set, each result is also kept as the cell's cached value
+    (on workbooks whose cells carry one), so it is written to the saved file.
+
+    Args:
+        evaluator: The evaluator to use
+        sheet: The worksheet holding the cells
+        coordinates: Coordinates of the cells to evaluate (e.g. ['B14', 'D14'])
+        logger: Logger instance for tracking operations
+        store: Whether to store the results as the cells' cached values
+
+    Returns:
+        Dict mapping each coordinate to its result; cells whose formula is
+        outside the supported subset are left out
+    """
+    evaluator.reset()
+    results = {}
+    for coordinate in coordinates:
+        try:
+            results[coordinate] = evaluator.evaluate_cell(sheet, coordinate)
+        except FormulaSyntaxError as e:
+            logger.warning(f"Could not evaluate {sheet.title}!{coordinate}: {e}")
+            continue
+        logger.info(f"Evaluated {sheet.title}!{coordinate}: {results[coordinate]!r}")
+        cell = sheet[coordinate]
+        if store and hasattr(cell, 'cached_value'):
+            cell.cached_value = results[coordinate]
+    return results
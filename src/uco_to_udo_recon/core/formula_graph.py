@@ -0,0 +1,291 @@
+"""
+Formula dependency tracking for the UCO to UDO Reconciliation tool.
+
+This module maps which formula cells read which cells across the sheets of
+a workbook, and uses that map to decide whether the cached formula results
+are still current. A cached result is stale when it is missing, when it no
+longer matches its inputs, when a cell it reads was edited or replaced
+after it was calculated, when it calls a volatile function such as TODAY,
+or when it reads another stale formula. Excel only needs to recalculate the
+workbook when at least one result is stale.
+"""
+
+import logging
+import math
+import time
+from collections import Counter, deque
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from openpyxl.utils.cell import coordinate_to_tuple, get_column_letter
+
+from src.uco_to_udo_recon.core.formula_engine import (
+    ExcelError,
+    FormulaEvaluator,
+    FormulaSyntaxError,
+    formula_functions,
+    formula_references,
+    is_supported_formula,
+)
+from src.uco_to_udo_recon.utils.xlsx_package import iter_formula_cells
+
+CellKey = Tuple[str, int, int]
+Reference = Tuple[str, Tuple[int, int], Tuple[int, int]]
+
+# Reasons a cached formula result is stale
+MISSING_RESULT = "no cached result"
+MISMATCHED_RESULT = "cached result does not match its inputs"
+CHANGED_INPUT = "reads an edited or replaced cell"
+UNKNOWN_INPUT = "reads cells that cannot be determined"
+VOLATILE_RESULT = "calls a volatile function"
+STALE_INPUT = "reads a stale formula"
+
+# Functions whose result changes on every recalculation
+VOLATILE_FUNCTIONS = frozenset({"NOW", "TODAY", "RAND", "RANDBETWEEN", "RANDARRAY"})
+
+# Functions that can read cells other than the references in the formula text
+DYNAMIC_REFERENCE_FUNCTIONS = frozenset({"INDIRECT", "OFFSET", "INDEX", "CELL", "INFO"})
+
+
+class FormulaDependencyGraph:
+    """
+    The formula cells of a workbook and the cells each of them reads.
+
+    Formulas are indexed by the sheet and column they read, so the formulas
+    that depend on a cell are found without scanning every formula.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty graph."""
+        self.formulas: Dict[CellKey, Optional[str]] = {}
+        self.references: Dict[CellKey, Optional[List[Reference]]] = {}
+        self._readers: Dict[str, Dict[int, List[Tuple[int, int, CellKey]]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.formulas)
+
+    def add_formula(self, sheet: str, row: int, column: int, formula: Optional[str]) -> None:
+        """
+        Add a formula cell and index the cells it reads.
+
+        Args:
+            sheet: Title of the sheet holding the formula
+            row: 1-based row index
+            column: 1-based column index
+            formula: The formula text, or None if it is not known
+        """
+        key = (sheet, row, column)
+        try:
+            references = [
+                (ref_sheet or sheet, start, end)
+                for ref_sheet, start, end in formula_references(formula)
+            ] if formula else None
+        except FormulaSyntaxError:
+            references = None
+        self.formulas[key] = formula
+        self.references[key] = references
+        for ref_sheet, (min_row, min_col), (max_row, max_col) in references or ():
+            columns = self._readers.setdefault(ref_sheet, {})
+            for ref_column in range(min_col, max_col + 1):
+                columns.setdefault(ref_column, []).append((min_row, max_row, key))
+
+    def dependents(self, sheet: str, row: int, column: int) -> List[CellKey]:
+        """
+        List the formula cells that read a cell directly.
+
+        Args:
+            sheet: Title of the sheet holding the cell
+            row: 1-based row index
+            column: 1-based column index
+
+        Returns:
+            List of (sheet, row, column) keys of the reading formulas
+        """
+        readers = self._readers.get(sheet, {}).get(column, ())
+        return [key for min_row, max_row, key in readers if min_row <= row <= max_row]
+
+    def reads_changed_cells(
+        self,
+        key: CellKey,
+        edited: Dict[str, Set[Tuple[int, int]]],
+        replaced_sheets: Set[str]
+    ) -> bool:
+        """
+        Check whether a formula reads an edited cell or a replaced sheet.
+
+        A replaced sheet was swapped in wholesale, so formulas elsewhere that
+        read it are affected, and so are its own formulas that read other
+        sheets; its formulas that only read their own sheet are not.
+
+        Args:
+            key: The formula cell
+            edited: Edited (row, column) positions by sheet title
+            replaced_sheets: Titles of the replaced sheets
+
+        Returns:
+            bool: True if any cell the formula reads changed
+        """
+        for ref_sheet, (min_row, min_col), (max_row, max_col) in self.references[key] or ():
+            if ref_sheet != key[0] and (ref_sheet in replaced_sheets or key[0] in replaced_sheets):
+                return True
+            cells = edited.get(ref_sheet)
+            if not cells:
+                continue
+            if (max_row - min_row + 1) * (max_col - min_col + 1) <= len(cells):
+                if any((row, column) in cells
+                       for row in range(min_row, max_row + 1)
+                       for column in range(min_col, max_col + 1)):
+                    return True
+            elif any(min_row <= row <= max_row and min_col <= column <= max_col
+                     for row, column in cells):
+                return True
+        return False
+
+
+class StalenessReport(NamedTuple):
+    """Outcome of a staleness check."""
+    formula_count: int
+    stale: Dict[str, str]  # 'Sheet!A1' -> reason
+    elapsed: float         # seconds spent on the check
+
+    @property
+    def needs_recalculation(self) -> bool:
+        """Whether any cached formula result is stale."""
+        return bool(self.stale)
+
+    def summary(self) -> str:
+        """Describe the stale formulas by reason, with a few examples."""
+        if not self.stale:
+            return f"all {self.formula_count} formula cell(s) have current results"
+        reasons = ", ".join(f"{reason}: {count}"
+                            for reason, count in Counter(self.stale.values()).items())
+        examples = ", ".join(list(self.stale)[:5])
+        return (f"{len(self.stale)} of {self.formula_count} formula cell(s) are stale "
+                f"({reasons}; e.g. {examples})")
+
+
+def _same_result(computed: Any, cached: Any) -> bool:
+    """Compare a recomputed formula result with the cached one."""
+    if computed is None:
+        computed = "" if isinstance(cached, str) else 0
+    if isinstance(computed, bool) or isinstance(cached, bool):
+        return isinstance(computed, bool) and isinstance(cached, bool) and computed == cached
+    if isinstance(computed, (int, float)) and isinstance(cached, (int, float)):
+        return math.isclose(computed, cached, rel_tol=1e-12, abs_tol=1e-9)
+    return computed == cached
+
+
+def _cell_name(key: CellKey) -> str:
+    sheet, row, column = key
+    return f"{sheet}!{get_column_letter(column)}{row}"
+
+
+def check_formula_staleness(
+    workbook: Any,
+    logger: logging.Logger,
+    replaced_sheets: Iterable[str] = (),
+    cancellation_check: Optional[Callable[[], bool]] = None
+) -> StalenessReport:
+    """
+    Decide whether the cached formula results of a workbook are current.
+
+    Formula cells of parsed sheets are read from the cells themselves: edited
+    cells are tracked through ``DualValueCell.edited``, and formulas the
+    Python evaluator supports are recomputed from their inputs and compared
+    with their cached result. Sheets a :class:`LazyWorkbook` has not parsed
+    are scanned from their XML; they were not edited, so only a missing
+    result or a changed input makes their formulas stale. Formulas calling a
+    volatile function are always stale, and after any change so are formulas
+    that compute the cells they read (INDIRECT, OFFSET, ...). Staleness then
+    spreads to every formula that reads a stale formula.
+
+    Args:
+        workbook: A DualViewWorkbook or LazyWorkbook
+        logger: Logger instance for tracking operations
+        replaced_sheets: Titles of sheets that were replaced wholesale since
+            the workbook was last calculated (e.g. spliced-in source sheets)
+        cancellation_check: Optional function to check if operation should be cancelled
+
+    Returns:
+        StalenessReport: The stale formula cells and why they are stale
+
+    Raises:
+        InterruptedError: If cancelled during the check
+    """
+    def check_cancelled() -> None:
+        if cancellation_check and cancellation_check():
+            raise InterruptedError("Formula check cancelled")
+
+    started = time.perf_counter()
+    replaced_sheets = set(replaced_sheets)
+    graph = FormulaDependencyGraph()
+    cached: Dict[CellKey, Any] = {}
+    has_result: Dict[CellKey, bool] = {}
+    edited: Dict[str, Set[Tuple[int, int]]] = {}
+
+    parsed = {ws.title: ws for ws in workbook._parsed_worksheets()}
+    for ws in parsed.values():
+        check_cancelled()
+        for (row, column), cell in ws._cells.items():
+            if getattr(cell, 'edited', False):
+                edited.setdefault(ws.title, set()).add((row, column))
+            if cell.data_type != 'f':
+                continue
+            key = (ws.title, row, column)
+            formula = cell._value if isinstance(cell._value, str) else None
+            graph.add_formula(ws.title, row, column, formula)
+            cached[key] = getattr(cell, 'cached_value', None)
+            has_result[key] = cached[key] is not None
+
+    package = getattr(workbook, 'package', None)
+    if package is not None:
+        for title in workbook.sheetnames:
+            if title in parsed:
+                continue
+            check_cancelled()
+            for formula_cell in iter_formula_cells(package.sheet_xml(title)):
+                row, column = coordinate_to_tuple(formula_cell.coordinate)
+                graph.add_formula(title, row, column, formula_cell.formula)
+                has_result[(title, row, column)] = formula_cell.has_value
+
+    sheetnames = set(workbook.sheetnames)
+    changed = bool(edited or replaced_sheets)
+    evaluator = FormulaEvaluator(workbook)
+    stale: Dict[CellKey, str] = {}
+    for key, formula in graph.formulas.items():
+        check_cancelled()
+        references = graph.references[key]
+        functions = formula_functions(formula) if formula else frozenset()
+        if not has_result[key]:
+            stale[key] = MISSING_RESULT
+        elif functions & VOLATILE_FUNCTIONS:
+            stale[key] = VOLATILE_RESULT
+        elif references is None or functions & DYNAMIC_REFERENCE_FUNCTIONS:
+            if changed:
+                stale[key] = UNKNOWN_INPUT
+        elif (key in cached and is_supported_formula(formula)
+              and all(ref[0] in parsed or ref[0] not in sheetnames for ref in references)):
+            try:
+                computed = evaluator.evaluate_formula(formula, parsed[key[0]])
+            except ExcelError as e:
+                computed = e.code
+            if not _same_result(computed, cached[key]):
+                stale[key] = MISMATCHED_RESULT
+        elif graph.reads_changed_cells(key, edited, replaced_sheets):
+            stale[key] = CHANGED_INPUT
+
+    pending = deque(stale)
+    while pending:
+        for dependent in graph.dependents(*pending.popleft()):
+            if dependent not in stale:
+                stale[dependent] = STALE_INPUT
+                pending.append(dependent)
+
+    report = StalenessReport(
+        len(graph), {_cell_name(key): reason for key, reason in stale.items()},
+        time.perf_counter() - started
+    )
+    logger.info(
+        f"Formula check took {report.elapsed:.3f}s: {report.summary()}; "
+        f"Excel recalculation {'needed' if report.needs_recalculation else 'not needed'}"
+    )
+    return report
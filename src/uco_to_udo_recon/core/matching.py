@@ -0,0 +1,103 @@
+"""
+Amount matching engine for the UCO to UDO Reconciliation tool.
+
+This module matches Certification rows against DO UCO to UDO rows on the
+component name and the three integer-cent amounts (component total
+unfilled, trading partner total, difference). With NumPy installed the
+match masks for all rows are computed in a few array operations; without
+it a set-based pass gives the same result.
+"""
+
+from typing import Any, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional
+    np = None
+
+
+AmountColumns = Sequence[Sequence[int]]
+
+
+def _component_codes(
+    cert_names: Sequence[Any], uco_names: Sequence[Any]
+) -> Tuple[List[int], List[int]]:
+    codes = {}
+    cert_codes = [codes.setdefault(name, len(codes)) for name in cert_names]
+    uco_codes = [codes.setdefault(name, len(codes)) if name else -1 for name in uco_names]
+    return cert_codes, uco_codes
+
+
+def _match_masks_numpy(
+    cert_codes: List[int],
+    cert_amounts: AmountColumns,
+    uco_codes: List[int],
+    uco_amounts: AmountColumns
+) -> Tuple[List[bool], List[bool]]:
+    def matrix(codes: List[int], amounts: AmountColumns) -> "np.ndarray":
+        columns = [np.asarray(codes, dtype=np.int64)]
+        columns += [np.asarray(column, dtype=np.int64) for column in amounts]
+        return np.column_stack(columns)
+
+    cert_keys = matrix(cert_codes, cert_amounts)
+    uco_keys = matrix(uco_codes, uco_amounts)
+    _, key_ids = np.unique(np.vstack([cert_keys, uco_keys]), axis=0, return_inverse=True)
+    key_ids = key_ids.reshape(-1)
+    cert_ids, uco_ids = key_ids[:len(cert_codes)], key_ids[len(cert_codes):]
+    return np.isin(cert_ids, uco_ids).tolist(), np.isin(uco_ids, cert_ids).tolist()
+
+
+def _match_masks_python(
+    cert_codes: List[int],
+    cert_amounts: AmountColumns,
+    uco_codes: List[int],
+    uco_amounts: AmountColumns
+) -> Tuple[List[bool], List[bool]]:
+    cert_keys = list(zip(cert_codes, *cert_amounts))
+    uco_keys = list(zip(uco_codes, *uco_amounts))
+    cert_set, uco_set = set(cert_keys), set(uco_keys)
+    return [key in uco_set for key in cert_keys], [key in cert_set for key in uco_keys]
+
+
+def match_amounts(
+    cert_names: Sequence[Any],
+    cert_amounts: AmountColumns,
+    uco_names: Sequence[Any],
+    uco_amounts: AmountColumns,
+    use_numpy: Optional[bool] = None
+) -> Tuple[List[bool], List[bool]]:
+    """
+    Compute which Certification and DO UCO to UDO rows have a matching row.
+
+    A Certification row matches a DO UCO to UDO row when the component names
+    are equal and all three amounts are equal in cents. Rows of a duplicated
+    component name are matched independently, so every matching row is
+    flagged.
+
+    Args:
+        cert_names: TIER component names of the Certification rows
+        cert_amounts: Columns D, E and F of the Certification rows, in cents
+        uco_names: TIER component names of the DO UCO to UDO rows (empty names never match)
+        uco_amounts: Columns E, H and L of the DO UCO to UDO rows, in cents
+        use_numpy: Force the NumPy (True) or pure-Python (False) engine;
+            by default NumPy is used when it is installed. Amounts that do
+            not fit in 64 bits always use the pure-Python engine.
+
+    Returns:
+        Tuple of (certification mask, DO UCO to UDO mask), one bool per row
+    """
+    if not cert_names or not uco_names:
+        return [False] * len(cert_names), [False] * len(uco_names)
+
+    if use_numpy is None:
+        use_numpy = np is not None
+    if use_numpy and np is None:
+        raise ImportError("NumPy is required for the vectorized matching engine")
+
+    cert_codes, uco_codes = _component_codes(cert_names, uco_names)
+    if use_numpy:
+        try:
+            return _match_masks_numpy(cert_codes, cert_amounts, uco_codes, uco_amounts)
+        except OverflowError:
+            pass  # An amount does not fit in 64 bits; the set-based pass handles any int
+    return _match_masks_python(cert_codes, cert_amounts, uco_codes, uco_amounts)
@@ -0,0 +1,528 @@
+"""
+In-memory reconciliation pipeline for the UCO to UDO Reconciliation tool.
+
+This module runs the stages of a reconciliation run (working copy, sheet
+imports, sheet processing) against a single in-memory workbook and writes
+the working copy to disk once, at the end. Recalculation (in Excel or
+another backend) then reads that final file. ``run_reconciliation`` runs
+the whole sequence and is what the GUI queues on its background worker;
+when asked to, it records its progress in a RunJournal so that an
+interrupted run can resume after its last completed stage.
+"""
+
+import logging
+import zipfile
+from typing import Callable, Iterable, List, Optional, Set, Union
+
+from src.uco_to_udo_recon.core.checkpoint import RunJournal
+from src.uco_to_udo_recon.core.excel_operations import (
+    SheetImport,
+    get_working_copy_path,
+    splice_sheets,
+)
+from src.uco_to_udo_recon.core.formula_engine import (
+    FormulaEvaluator,
+    FormulaSyntaxError,
+    is_supported_formula,
+)
+from src.uco_to_udo_recon.core.formula_graph import check_formula_staleness
+from src.uco_to_udo_recon.core.recalculation import (
+    RecalculationBackend,
+    create_recalculation_backend,
+)
+from src.uco_to_udo_recon.core.reconciliation import reconcile_workbook
+from src.uco_to_udo_recon.core.workbook_loader import LazyWorkbook
+from src.uco_to_udo_recon.utils.file_utils import ensure_file_handle_release
+from src.uco_to_udo_recon.utils.progress import ProgressTracker
+from src.uco_to_udo_recon.utils.xlsx_package import XlsxPackage, XlsxPackageError
+
+
+class ReconciliationPipeline:
+    """
+    Runs the reconciliation stages on one in-memory workbook.
+
+    Each stage hands the same package or workbook object to the next one
+    instead of saving and reloading the working copy. ``save()`` writes the
+    working copy once, and ``recalculate()`` then recalculates that file with
+    the configured backend.
+    """
+
+    def __init__(
+        self,
+        target_file: str,
+        component_name: str,
+        logger: logging.Logger,
+        backend: Optional[RecalculationBackend] = None
+    ) -> None:
+        """
+        Initialize the pipeline.
+
+        Args:
+            target_file: Path to the UCO to UDO reconciliation file
+            component_name: The selected component name
+            logger: Logger instance for tracking operations
+            backend: Recalculation backend; by default one is picked for this
+                system for each recalculation and closed afterwards
+        """
+        self.target_file = target_file
+        self.component_name = component_name
+        self.logger = logger
+        self.backend = backend
+        self.output_file = get_working_copy_path(target_file)
+        self.package: Optional[XlsxPackage] = None
+        self.book: Optional[LazyWorkbook] = None
+        self.replaced_sheets: Set[str] = set()
+
+    def prepare_working_copy(self) -> None:
+        """Read the target file into memory as the working copy."""
+        self.logger.info(f"Reading target file into memory: {self.target_file}")
+        self.package = XlsxPackage(self.target_file)
+        self.book = None
+        self.replaced_sheets = set()
+
+    def resume_working_copy(self, checkpoint_file: str, replaced_sheets: Iterable[str]) -> None:
+        """
+        Read a working copy saved by save_checkpoint() back into memory.
+
+        Args:
+            checkpoint_file: Path of the saved working copy
+            replaced_sheets: Names of the sheets imported before it was saved
+        """
+        self.logger.info(f"Resuming from saved working copy: {checkpoint_file}")
+        self.package = XlsxPackage(checkpoint_file)
+        self.book = None
+        self.replaced_sheets = set(replaced_sheets)
+
+    def import_sheets(
+        self,
+        imports: List[SheetImport],
+        progress_callback: Optional[Callable[[int], None]] = None,
+        cancellation_check: Optional[Callable[[], bool]] = None
+    ) -> bool:
+        """
+        Splice sheets from their source files into the working copy.
+
+        Args:
+            imports: The sheets to copy
+            progress_callback: Optional callback receiving percent complete
+            cancellation_check: Optional function to check if operation should be cancelled
+
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        if self.package is None:
+            raise RuntimeError("prepare_working_copy() must run before import_sheets()")
+        try:
+            if not splice_sheets(self.package, imports, self.logger,
+                                 progress_callback, cancellation_check):
+                return False
+            self.replaced_sheets.update(spec.new_sheet_name for spec in imports)
+            return True
+        except InterruptedError:
+            self.logger.info("Sheet import cancelled during row processing.")
+            return False
+        except XlsxPackageError as e:
+            self.logger.error(f"Failed to copy sheets into the working copy: {e}")
+            return False
+
+    def reconcile(
+        self,
+        progress_callback: Callable[[int, Optional[str]], None],
+        cancellation_check: Optional[Callable[[], bool]] = None
+    ) -> bool:
+        """
+        Process the reconciliation sheets of the working copy in memory.
+
+        Stale formula results are brought up to date first, so that the
+        comparisons read results calculated from the imported sheets.
+
+        Args:
+            progress_callback: Callback function to update progress (value, message)
+            cancellation_check: Optional function to check if operation should be cancelled
+
+        Returns:
+            bool: True if all sheets were processed, False if aborted or cancelled
+        """
+        if self.package is None:
+            raise RuntimeError("prepare_working_copy() must run before reconcile()")
+        progress_callback(30, "Loading workbook")
+        self.book = LazyWorkbook(self.package, self.logger, cancellation_check)
+        if self.replaced_sheets:
+            self.refresh_stale_results(progress_callback, cancellation_check)
+        return reconcile_workbook(
+            self.book, self.component_name, self.logger, progress_callback, cancellation_check
+        )
+
+    def refresh_stale_results(
+        self,
+        progress_callback: Optional[Callable[[int, Optional[str]], None]] = None,
+        cancellation_check: Optional[Callable[[], bool]] = None
+    ) -> None:
+        """
+        Bring stale formula results up to date before they are compared.
+
+        The template's cached results were calculated against the sheets the
+        imports replaced. Stale results of formulas in the supported subset
+        are recomputed in Python; if any other result is stale, the working
+        copy is saved, recalculated with the backend and read back.
+
+        Args:
+            progress_callback: Optional callback function to update progress (value, message)
+            cancellation_check: Optional function to check if operation should be cancelled
+        """
+        report = check_formula_staleness(
+            self.book, self.logger, self.replaced_sheets, cancellation_check
+        )
+        if not report.needs_recalculation:
+            return
+
+        evaluator = FormulaEvaluator(self.book, use_cached=False)
+        results = {}
+        for name in report.stale:
+            title, _, coordinate = name.rpartition('!')
+            cell = self.book[title][coordinate]
+            if not isinstance(cell.value, str) or not is_supported_formula(cell.value):
+                break
+            try:
+                results[cell] = evaluator.evaluate_cell(cell.parent, coordinate)
+            except FormulaSyntaxError:
+                break  # Reads an unsupported formula with no cached result
+        else:
+            for cell, value in results.items():
+                cell.cached_value = value
+            self.logger.info(f"Recomputed {len(results)} stale formula result(s) in Python")
+            return
+
+        self.logger.info("Stale formula results outside the supported subset; "
+                         "recalculating the working copy before comparison")
+        self.save(cancellation_check)
+        try:
+            self.recalculate(progress_callback, cancellation_check)
+        except InterruptedError:
+            raise
+        except Exception as e:
+            self.logger.warning(f"Recalculation failed: {e}. "
+                                "Comparing cached formula results.")
+            return
+        self.package = XlsxPackage(self.output_file)
+        self.book = LazyWorkbook(self.package, self.logger, cancellation_check)
+
+    def save(self, cancellation_check: Optional[Callable[[], bool]] = None) -> str:
+        """
+        Write the working copy to disk.
+
+        Args:
+            cancellation_check: Optional function to check if operation should be cancelled
+
+        Returns:
+            str: Path to the saved working copy
+
+        Raises:
+            InterruptedError: If cancelled before the file is complete
+        """
+        if self.book is not None:
+            self.book.save(self.output_file, cancellation_check)
+        elif self.package is not None:
+            self.package.save(self.output_file, cancellation_check=cancellation_check)
+        else:
+            raise RuntimeError("prepare_working_copy() must run before save()")
+        self.logger.info(f"Saved working copy: {self.output_file}")
+        ensure_file_handle_release(self.output_file, self.logger)
+        return self.output_file
+
+    def save_checkpoint(
+        self,
+        path: str,
+        cancellation_check: Optional[Callable[[], bool]] = None
+    ) -> None:
+        """
+        Write the unprocessed working copy to an intermediate file.
+
+        The file is stored uncompressed, since it is only read back by
+        resume_working_copy().
+
+        Args:
+            path: Path of the intermediate file
+            cancellation_check: Optional function to check if operation should be cancelled
+
+        Raises:
+            InterruptedError: If cancelled before the file is complete
+        """
+        if self.package is None:
+            raise RuntimeError("prepare_working_copy() must run before save_checkpoint()")
+        self.package.save(path, zipfile.ZIP_STORED, cancellation_check)
+        ensure_file_handle_release(path, self.logger)
+
+    def needs_recalculation(self, cancellation_check: Optional[Callable[[], bool]] = None) -> bool:
+        """
+        Check whether the saved working copy still needs an Excel recalculation.
+
+        The imported sheets count as replaced, so formulas that read them
+        across sheets are only trusted if they can be recomputed in Python.
+
+        Args:
+            cancellation_check: Optional function to check if operation should be cancelled
+
+        Returns:
+            bool: False when every formula result in the working copy is current
+        """
+        if self.book is None:
+            self.logger.info("Workbook was not processed in memory; Excel recalculation needed")
+            return True
+        return check_formula_staleness(
+            self.book, self.logger, self.replaced_sheets, cancellation_check
+        ).needs_recalculation
+
+    def recalculate(
+        self,
+        progress_callback: Optional[Callable[[int, Optional[str]], None]] = None,
+        cancellation_check: Optional[Callable[[], bool]] = None
+    ) -> None:
+        """
+        Recalculate the saved working copy.
+
+        Args:
+            progress_callback: Optional callback function to update progress (value, message)
+            cancellation_check: Optional function to check if operation should be cancelled
+        """
+        if self.backend is not None:
+            self.backend.recalculate(self.output_file, self.logger,
+                                     progress_callback, cancellation_check)
+            return
+        with create_recalculation_backend() as backend:
+            self.logger.info(f"Recalculating with the {backend.name} backend")
+            backend.recalculate(self.output_file, self.logger,
+                                progress_callback, cancellation_check)
+
+
+RECONCILIATION_STAGES = [
+    ("Prepare working copy", 5),
+    ("Copy Trial Balance and UCO to UDO sheets", 20),
+    ("Process reconciliation", 75)
+]
+
+
+def reconciliation_sheet_imports(
+    trial_balance_file: str,
+    uco_to_udo_file: str,
+    component_name: str
+) -> List[SheetImport]:
+    """
+    List the sheets a reconciliation run copies into the working copy.
+
+    Args:
+        trial_balance_file: Path to the trial balance file
+        uco_to_udo_file: Path to the UCO to UDO TIER file
+        component_name: The selected component name
+
+    Returns:
+        List[SheetImport]: The trial balance and UCO to UDO sheet imports
+    """
+    return [
+        SheetImport(trial_balance_file, f"{component_name} Total", "DO TB", 3),
+        SheetImport(uco_to_udo_file, "UCO to UDO", "DO UCO to UDO", 4),
+    ]
+
+
+def open_recalculation_backend(
+    name: str,
+    timeout: Optional[float],
+    logger: logging.Logger
+) -> RecalculationBackend:
+    """
+    Create the named recalculation backend, or pick one if it is unavailable.
+
+    Args:
+        name: Backend name, as accepted by create_recalculation_backend
+        timeout: Seconds allowed per recalculation attempt
+        logger: Logger instance for tracking operations
+
+    Returns:
+        RecalculationBackend: The backend to recalculate workbooks with
+    """
+    try:
+        backend = create_recalculation_backend(name, timeout=timeout)
+    except (ImportError, FileNotFoundError, ValueError) as e:
+        logger.warning(f"Recalculation backend '{name}' is not available ({e}); "
+                       "choosing one automatically")
+        backend = create_recalculation_backend("auto", timeout=timeout)
+    logger.info(f"Using the {backend.name} recalculation backend")
+    return backend
+
+
+def run_reconciliation(
+    target_file: str,
+    trial_balance_file: str,
+    uco_to_udo_file: str,
+    component_name: str,
+    logger: Optional[logging.Logger] = None,
+    backend: Union[RecalculationBackend, str, None] = None,
+    recalc_timeout: Optional[float] = None,
+    progress_callback: Optional[Callable[[int, Optional[str]], None]] = None,
+    cancellation_check: Optional[Callable[[], bool]] = None,
+    resume: bool = False
+) -> str:
+    """
+    Run a complete reconciliation and write the result file.
+
+    This is a module-level function so that BackgroundWorker can also run it
+    in a worker process; pass the recalculation backend by name there.
+
+    With ``resume``, completed stages are recorded in a journal next to the
+    result file, and a run whose input files are unchanged since an
+    interrupted resumable run skips the stages that run completed. The
+    journal is removed once the run succeeds. Without ``resume`` no journal
+    or intermediate file is written and the workbook is saved only once.
+
+    Args:
+        target_file: Path to the UCO to UDO reconciliation file
+        trial_balance_file: Path to the trial balance file
+        uco_to_udo_file: Path to the UCO to UDO TIER file
+        component_name: The selected component name
+        logger: Logger instance for tracking operations
+        backend: Recalculation backend, or the name of one to create for this run
+        recalc_timeout: Seconds allowed per recalculation attempt, when
+            ``backend`` is a name
+        progress_callback: Optional callback for progress updates (value, message)
+        cancellation_check: Optional function to check if operation was cancelled
+        resume: Whether to checkpoint the run and resume after the last
+            checkpoint of an interrupted run
+
+    Returns:
+        str: Path to the result file, or "Operation canceled"
+    """
+    logger = logger or logging.getLogger(__name__)
+    progress_tracker = ProgressTracker(RECONCILIATION_STAGES, progress_callback)
+    owned_backend = None
+
+    try:
+        if isinstance(backend, str):
+            backend = owned_backend = open_recalculation_backend(backend, recalc_timeout, logger)
+
+        # All stages share one in-memory workbook; it is saved once at the end
+        pipeline = ReconciliationPipeline(target_file, component_name, logger, backend=backend)
+
+        # Checkpointing hashes the inputs and writes an extra copy of the
+        # workbook, so it is only done for resumable runs
+        journal = None
+        checkpoint = None
+        if resume:
+            journal = RunJournal.for_output(
+                pipeline.output_file,
+                {
+                    "target_file": target_file,
+                    "trial_balance_file": trial_balance_file,
+                    "uco_to_udo_file": uco_to_udo_file,
+                },
+                {"component_name": component_name},
+                logger
+            )
+            if journal.load():
+                checkpoint = journal.latest(["import_sheets", "reconcile"])
+            if checkpoint is None:
+                journal.reset()
+            else:
+                logger.info(f"Resuming interrupted run after its '{checkpoint.stage}' stage")
+
+        if checkpoint is None:
+            # STAGE 1: Create working copy of target file
+            progress_tracker.update(0, "Creating working copy of reconciliation file...")
+            pipeline.prepare_working_copy()
+            progress_tracker.update(100, "Created working copy")
+            progress_tracker.next_stage()
+
+            if cancellation_check and cancellation_check():
+                return "Operation canceled"
+
+            # STAGE 2: Copy DO TB and DO UCO to UDO sheets
+            progress_tracker.update(
+                0, f"Copying '{component_name} Total' and 'UCO to UDO' sheets...")
+            sheet_imports = reconciliation_sheet_imports(trial_balance_file, uco_to_udo_file,
+                                                         component_name)
+            if not pipeline.import_sheets(sheet_imports,
+                                          progress_callback=progress_tracker.update,
+                                          cancellation_check=cancellation_check):
+                if cancellation_check and cancellation_check():
+                    return "Operation canceled"
+                raise Exception(f"Failed to copy sheets '{component_name} Total' and 'UCO to UDO'.")
+            if journal is not None:
+                checkpoint_file = journal.artifact_path("import_sheets")
+                pipeline.save_checkpoint(checkpoint_file, cancellation_check)
+                journal.record("import_sheets", checkpoint_file,
+                               replaced_sheets=sorted(pipeline.replaced_sheets))
+            progress_tracker.update(100, "Trial Balance and UCO to UDO sheets copied")
+            progress_tracker.next_stage()
+        else:
+            progress_tracker.next_stage()
+            progress_tracker.next_stage()
+            if checkpoint.stage == "import_sheets":
+                pipeline.resume_working_copy(checkpoint.artifact,
+                                             checkpoint.data["replaced_sheets"])
+
+        if cancellation_check and cancellation_check():
+            return "Operation canceled"
+
+        def progress_mapper(value: int, message: Optional[str] = None) -> None:
+            """Map progress from the reconciliation stages to the progress tracker."""
+            progress_tracker.update(value, message)
+            # Check for cancellation during long-running operations
+            if cancellation_check and cancellation_check():
+                raise InterruptedError("Operation canceled by user")
+
+        if checkpoint is None or checkpoint.stage == "import_sheets":
+            # STAGE 3: Execute main reconciliation
+            progress_tracker.update(0, "Starting reconciliation process...")
+
+            # Run the main reconciliation on the in-memory workbook
+            if not pipeline.reconcile(progress_mapper, cancellation_check):
+                if cancellation_check and cancellation_check():
+                    return "Operation canceled"
+                raise Exception("Reconciliation failed. See the log for details.")
+
+            # Save the working copy once
+            progress_mapper(98, "Saving workbook")
+            new_target_file = pipeline.save(cancellation_check)
+            needs_recalculation = pipeline.needs_recalculation(cancellation_check)
+            if journal is not None:
+                journal.record("reconcile", new_target_file,
+                               needs_recalculation=needs_recalculation)
+        else:
+            # The saved working copy only lacks its recalculation
+            progress_tracker.update(98, "Using saved workbook")
+            new_target_file = checkpoint.artifact
+            needs_recalculation = checkpoint.data["needs_recalculation"]
+
+        # Recalculate the saved file only if a formula result is stale
+        if not needs_recalculation:
+            logger.info("No formula result is stale; skipping recalculation.")
+        else:
+            try:
+                pipeline.recalculate(progress_callback=progress_mapper,
+                                     cancellation_check=cancellation_check)
+            except InterruptedError:
+                raise
+            except Exception as e:
+                logger.warning(f"Recalculation failed: {e}. "
+                               "Results may not include all calculated values.")
+            if cancellation_check and cancellation_check():
+                return "Operation canceled"
+
+        if journal is not None:
+            journal.discard(keep=[new_target_file])
+        return new_target_file
+
+    except InterruptedError as e:
+        if cancellation_check and cancellation_check():
+            logger.info(f"Operation canceled: {e}")
+            return "Operation canceled"
+        logger.error(f"Error during operation: {e}", exc_info=True)
+        raise
+
+    except Exception as e:
+        # Log the error and re-raise
+        logger.error(f"Error during operation: {e}", exc_info=True)
+        raise
+
+    finally:
+        if owned_backend is not None:
+            owned_backend.close()
@@ -0,0 +1,715 @@
+"""
+Workbook recalculation backends for the UCO to UDO Reconciliation tool.
+
+A backend recalculates a saved workbook in place so that its cached formula
+results are current. Excel is driven over COM on Windows. Elsewhere a pool
+of headless LibreOffice processes does the same job and stays running
+between workbooks. The Python backend evaluates the supported formula
+subset without any spreadsheet application, and the no-op backend leaves
+the file alone.
+
+Every backend call made through :func:`create_recalculation_backend` runs
+under a :class:`RecalculationWatchdog`, which enforces a timeout per
+attempt, stops hung engines and retries with jittered exponential backoff.
+"""
+
+import glob
+import logging
+import os
+import queue
+import random
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Union
+
+from src.uco_to_udo_recon.core.excel_operations import recalculate_workbook_in_excel
+from src.uco_to_udo_recon.core.formula_engine import (
+    FormulaEvaluator,
+    FormulaSyntaxError,
+    is_supported_formula,
+)
+from src.uco_to_udo_recon.core.workbook_loader import load_dual_view_workbook
+from src.uco_to_udo_recon.utils.cancellation import sleep_unless_cancelled
+from src.uco_to_udo_recon.utils.retry import backoff_delay
+
+# Places LibreOffice installs soffice when it is not on the PATH
+_SOFFICE_CANDIDATES = (
+    "/usr/lib/libreoffice/program/soffice",
+    "/opt/libreoffice*/program/soffice",
+    "/Applications/LibreOffice.app/Contents/MacOS/soffice",
+    r"C:\Program Files\LibreOffice\program\soffice.exe",
+)
+
+_XLSX_FILTER = "Calc MS Excel 2007 XML"
+
+
+class RecalculationBackend:
+    """
+    Recalculates saved workbooks in place.
+
+    Backends are reusable across workbooks and must be closed when no longer
+    needed so that any engine processes they keep running are stopped.
+    """
+
+    name = "base"
+    concurrency = 1  # Workbooks the backend can recalculate at the same time
+
+    def recalculate(
+        self,
+        file_path: str,
+        logger: logging.Logger,
+        progress_callback: Optional[Callable[[int, Optional[str]], None]] = None,
+        cancellation_check: Optional[Callable[[], bool]] = None
+    ) -> None:
+        """
+        Recalculate a workbook and save it in place.
+
+        Args:
+            file_path: Path to the Excel file
+            logger: Logger instance for tracking operations
+            progress_callback: Optional callback function to update progress (value, message)
+            cancellation_check: Optional function to check if operation should be cancelled
+
+        Raises:
+            Exception: If the workbook cannot be recalculated
+        """
+        raise NotImplementedError
+
+    def abort(self, logger: logging.Logger) -> None:
+        """
+        Stop the engines of calls that are still running.
+
+        Called from another thread when a call hangs; the hung call should
+        then fail promptly. Backends without an engine process do nothing.
+
+        Args:
+            logger: Logger instance for tracking operations
+        """
+
+    def close(self) -> None:
+        """Stop any engine processes the backend keeps running."""
+
+    def __enter__(self) -> "RecalculationBackend":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+class ExcelComBackend(RecalculationBackend):
+    """Recalculates workbooks in Excel through COM automation (Windows only)."""
+
+    name = "excel"
+
+    def __init__(self, retries: int = 1, timeout: Optional[float] = None) -> None:
+        """
+        Initialize the backend.
+
+        Args:
+            retries: Number of attempts per workbook within one Excel session
+            timeout: Optional maximum number of seconds to wait for Excel to finish calculating
+        """
+        self.retries = retries
+        self.timeout = timeout
+        self._pids: Set[int] = set()
+
+    @staticmethod
+    def available() -> bool:
+        """Whether the pywin32 COM modules can be imported."""
+        try:
+            import pythoncom  # noqa: F401
+            import win32com.client  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def recalculate(
+        self,
+        file_path: str,
+        logger: logging.Logger,
+        progress_callback: Optional[Callable[[int, Optional[str]], None]] = None,
+        cancellation_check: Optional[Callable[[], bool]] = None
+    ) -> None:
+        pids = []
+
+        def record_pid(excel: Any) -> None:
+            try:
+                import win32process
+                pids.append(win32process.GetWindowThreadProcessId(excel.Hwnd)[1])
+                self._pids.add(pids[-1])
+            except Exception as e:
+                logger.debug(f"Could not determine the Excel process id: {e}")
+
+        try:
+            recalculate_workbook_in_excel(
+                file_path, logger, progress_callback or (lambda value, message=None: None),
+                retries=self.retries, cancellation_check=cancellation_check,
+                timeout=self.timeout, on_excel_started=record_pid
+            )
+        finally:
+            self._pids.difference_update(pids)
+
+    def abort(self, logger: logging.Logger) -> None:
+        for pid in list(self._pids):
+            logger.warning(f"Terminating Excel process {pid}")
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError as e:
+                logger.error(f"Could not terminate Excel process {pid}: {e}")
+            self._pids.discard(pid)
+
+
+def find_soffice() -> Optional[str]:
+    """
+    Locate the LibreOffice ``soffice`` executable.
+
+    Returns:
+        Optional[str]: Path to soffice, or None if LibreOffice is not installed
+    """
+    for name in ("soffice", "libreoffice"):
+        path = shutil.which(name)
+        if path:
+            return path
+    for pattern in _SOFFICE_CANDIDATES:
+        for path in sorted(glob.glob(pattern)):
+            if os.access(path, os.X_OK):
+                return path
+    return None
+
+
+class _OfficeProcess:
+    """One headless soffice process with its own profile, reached over a UNO pipe."""
+
+    def __init__(self, soffice: str, uno: Any) -> None:
+        self.soffice = soffice
+        self.uno = uno
+        self.pipe_name = f"uco_recalc_{uuid.uuid4().hex}"
+        self.profile_dir = tempfile.mkdtemp(prefix="uco_recalc_lo_")
+        self.process: Optional[subprocess.Popen] = None
+        self.desktop: Any = None
+
+    @property
+    def running(self) -> bool:
+        return self.process is not None and self.process.poll() is None and self.desktop is not None
+
+    def _properties(self, **values: Any) -> tuple:
+        properties = []
+        for name, value in values.items():
+            prop = self.uno.createUnoStruct("com.sun.star.beans.PropertyValue")
+            prop.Name, prop.Value = name, value
+            properties.append(prop)
+        return tuple(properties)
+
+    def start(self, logger: logging.Logger, timeout: float) -> None:
+        connection = f"pipe,name={self.pipe_name};urp;StarOffice.ComponentContext"
+        logger.info(f"Starting headless LibreOffice ({self.pipe_name})")
+        self.process = subprocess.Popen(
+            [
+                self.soffice, "--headless", "--invisible", "--nologo", "--norestore",
+                "--nodefault", "--nolockcheck",
+                f"-env:UserInstallation={Path(self.profile_dir).as_uri()}",
+                f"--accept={connection}",
+            ],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        local = self.uno.getComponentContext()
+        resolver = local.ServiceManager.createInstanceWithContext(
+            "com.sun.star.bridge.UnoUrlResolver", local)
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                context = resolver.resolve(f"uno:{connection}")
+                break
+            except Exception:
+                if self.process.poll() is not None or time.monotonic() > deadline:
+                    self.stop()
+                    raise RuntimeError(
+                        f"LibreOffice did not accept connections within {timeout:.0f}s")
+                time.sleep(0.25)
+        self.desktop = context.ServiceManager.createInstanceWithContext(
+            "com.sun.star.frame.Desktop", context)
+
+    def recalculate(self, file_path: str) -> None:
+        url = self.uno.systemPathToFileUrl(os.path.abspath(file_path))
+        document = self.desktop.loadComponentFromURL(
+            url, "_blank", 0, self._properties(Hidden=True, UpdateDocMode=0))
+        if document is None:
+            raise RuntimeError(f"LibreOffice could not open {file_path}")
+        try:
+            document.calculateAll()
+            document.storeToURL(url, self._properties(FilterName=_XLSX_FILTER, Overwrite=True))
+        finally:
+            document.close(True)
+
+    def kill(self) -> None:
+        if self.process is not None and self.process.poll() is None:
+            self.process.kill()
+
+    def stop(self) -> None:
+        terminated = False
+        if self.desktop is not None:
+            try:
+                terminated = self.desktop.terminate()
+            except Exception:
+                pass  # The process is killed below if it did not exit
+            self.desktop = None
+        if self.process is not None:
+            if not terminated and self.process.poll() is None:
+                self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+            self.process = None
+
+    def remove_profile(self) -> None:
+        shutil.rmtree(self.profile_dir, ignore_errors=True)
+
+
+class LibreOfficeBackend(RecalculationBackend):
+    """
+    Recalculates workbooks in a pool of headless LibreOffice processes.
+
+    Each process has its own user profile, so several workbooks can be
+    recalculated at once. Processes are started on first use and kept
+    running between workbooks; a process that fails is restarted for the
+    next workbook.
+    """
+
+    name = "libreoffice"
+
+    def __init__(
+        self,
+        pool_size: int = 2,
+        soffice_path: Optional[str] = None,
+        start_timeout: float = 60.0
+    ) -> None:
+        """
+        Initialize the pool.
+
+        Args:
+            pool_size: Number of soffice processes (workbooks recalculated at once)
+            soffice_path: Path to soffice; found automatically by default
+            start_timeout: Seconds to wait for a new soffice process to accept connections
+
+        Raises:
+            ImportError: If LibreOffice's Python UNO bridge is not installed
+            FileNotFoundError: If soffice cannot be found
+        """
+        try:
+            import uno
+        except ImportError:
+            raise ImportError("The LibreOffice backend requires LibreOffice's Python UNO bridge "
+                              "('uno' module)")
+        self.soffice = soffice_path or find_soffice()
+        if not self.soffice:
+            raise FileNotFoundError("LibreOffice (soffice) was not found")
+        self.concurrency = max(1, pool_size)
+        self.start_timeout = start_timeout
+        self._processes = [_OfficeProcess(self.soffice, uno) for _ in range(self.concurrency)]
+        self._idle: "queue.Queue[_OfficeProcess]" = queue.Queue()
+        self._busy: Set[_OfficeProcess] = set()
+        for process in self._processes:
+            self._idle.put(process)
+
+    @staticmethod
+    def available() -> bool:
+        """Whether soffice and the UNO bridge are both installed."""
+        try:
+            import uno  # noqa: F401
+        except ImportError:
+            return False
+        return find_soffice() is not None
+
+    def recalculate(
+        self,
+        file_path: str,
+        logger: logging.Logger,
+        progress_callback: Optional[Callable[[int, Optional[str]], None]] = None,
+        cancellation_check: Optional[Callable[[], bool]] = None
+    ) -> None:
+        process = self._idle.get()
+        self._busy.add(process)
+        try:
+            if cancellation_check and cancellation_check():
+                logger.info("Workbook recalculation cancelled before starting.")
+                return
+            if progress_callback:
+                progress_callback(5, "Recalculating workbook in LibreOffice")
+            if not process.running:
+                process.start(logger, self.start_timeout)
+            logger.info(f"Recalculating in LibreOffice: {file_path}")
+            try:
+                process.recalculate(file_path)
+            except Exception:
+                process.stop()  # Restarted for the next workbook
+                raise
+            logger.info("Workbook recalculated and saved successfully in LibreOffice.")
+            if progress_callback:
+                progress_callback(25, "Workbook recalculated successfully")
+        finally:
+            self._busy.discard(process)
+            self._idle.put(process)
+
+    def abort(self, logger: logging.Logger) -> None:
+        for process in list(self._busy):
+            logger.warning(f"Killing hung LibreOffice process ({process.pipe_name})")
+            process.kill()
+
+    def close(self) -> None:
+        for process in self._processes:
+            process.stop()
+            process.remove_profile()
+
+
+class PythonEvaluatorBackend(RecalculationBackend):
+    """
+    Recalculates the supported formula subset in Python.
+
+    Formulas using other functions, or reading a formula without a cached
+    result that uses them, keep the cached result they have, so the file is
+    only fully current when every formula is in the subset.
+    """
+
+    name = "python"
+
+    def recalculate(
+        self,
+        file_path: str,
+        logger: logging.Logger,
+        progress_callback: Optional[Callable[[int, Optional[str]], None]] = None,
+        cancellation_check: Optional[Callable[[], bool]] = None
+    ) -> None:
+        book = load_dual_view_workbook(file_path, logger)
+        try:
+            evaluator = FormulaEvaluator(book, use_cached=False)
+            evaluated = unsupported = 0
+            for ws in book._parsed_worksheets():
+                if cancellation_check and cancellation_check():
+                    logger.info("Workbook recalculation cancelled.")
+                    return
+                for cell in list(ws._cells.values()):
+                    if cell.data_type != 'f':
+                        continue
+                    if not isinstance(cell._value, str) or not is_supported_formula(cell._value):
+                        unsupported += 1
+                        continue
+                    try:
+                        cell.cached_value = evaluator.evaluate_cell(ws, cell.row, cell.column)
+                    except FormulaSyntaxError:
+                        unsupported += 1  # Reads an unsupported formula with no cached result
+                        continue
+                    evaluated += 1
+            book.save(file_path)
+        finally:
+            book.close()
+        logger.info(
+            f"Recalculated {evaluated} formula cell(s) in Python; "
+            f"{unsupported} outside the supported subset kept their cached results"
+        )
+        if progress_callback:
+            progress_callback(25, "Workbook recalculated successfully")
+
+
+class NoOpBackend(RecalculationBackend):
+    """Leaves workbooks as they are; Excel recalculates them when opened."""
+
+    name = "none"
+
+    def recalculate(
+        self,
+        file_path: str,
+        logger: logging.Logger,
+        progress_callback: Optional[Callable[[int, Optional[str]], None]] = None,
+        cancellation_check: Optional[Callable[[], bool]] = None
+    ) -> None:
+        logger.info(f"Recalculation disabled; leaving {file_path} unchanged")
+
+
+class FakeBackend(RecalculationBackend):
+    """
+    Stand-in backend with injected latencies, for testing without an engine.
+
+    Each call takes the next entry of ``latencies``: the seconds the call
+    "calculates" for, or an exception to raise. The last entry repeats.
+    :meth:`abort` ends a running call with an error, like killing an engine.
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        latencies: Iterable[Union[float, Exception]] = (0.0,),
+        concurrency: int = 1
+    ) -> None:
+        """
+        Initialize the backend.
+
+        Args:
+            latencies: Seconds or exceptions for successive calls
+            concurrency: Workbooks the backend claims to handle at once
+        """
+        self.latencies = list(latencies) or [0.0]
+        self.concurrency = concurrency
+        self.calls: List[str] = []
+        self.aborts = 0
+        self._aborted = threading.Event()
+        self._lock = threading.Lock()
+
+    def recalculate(
+        self,
+        file_path: str,
+        logger: logging.Logger,
+        progress_callback: Optional[Callable[[int, Optional[str]], None]] = None,
+        cancellation_check: Optional[Callable[[], bool]] = None
+    ) -> None:
+        with self._lock:
+            latency = self.latencies[min(len(self.calls), len(self.latencies) - 1)]
+            self.calls.append(file_path)
+            self._aborted.clear()
+        if isinstance(latency, Exception):
+            raise latency
+        if self._aborted.wait(latency):
+            raise RuntimeError("Engine was killed")
+
+    def abort(self, logger: logging.Logger) -> None:
+        self.aborts += 1
+        self._aborted.set()
+
+
+class AttemptTiming(NamedTuple):
+    """How long one recalculation attempt took and how it ended."""
+    attempt: int
+    seconds: float
+    outcome: str  # 'succeeded', 'timed out', 'failed' or 'cancelled'
+
+
+class RecalculationTimeout(TimeoutError):
+    """Raised when a recalculation attempt exceeds the watchdog's timeout."""
+
+
+class RecalculationWatchdog(RecalculationBackend):
+    """
+    Runs another backend's calls under a timeout, with retries.
+
+    Each attempt runs on its own thread. An attempt that exceeds the timeout
+    has its engine stopped through the backend's :meth:`abort`, and failed
+    attempts are retried after a jittered exponential backoff. The timing of
+    every attempt is logged and kept in :attr:`last_attempts`.
+    """
+
+    def __init__(
+        self,
+        backend: RecalculationBackend,
+        timeout: Optional[float] = None,
+        retries: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        rng: Optional[random.Random] = None,
+        cancel_grace: float = 2.0
+    ) -> None:
+        """
+        Initialize the watchdog.
+
+        Args:
+            backend: The backend whose calls are supervised
+            timeout: Maximum seconds per attempt, or None to wait indefinitely
+            retries: Number of attempts per workbook
+            base_delay: Backoff delay ceiling after the first failure, in seconds
+            max_delay: Upper bound for the backoff delay, in seconds
+            rng: Optional random number generator for the backoff jitter
+            cancel_grace: Seconds a cancelled attempt may take to stop on its own
+                before its engine is stopped
+        """
+        self.backend = backend
+        self.timeout = timeout
+        self.retries = max(1, retries)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rng = rng
+        self.cancel_grace = cancel_grace
+        self.poll_interval = 0.05
+        self.last_attempts: List[AttemptTiming] = []
+
+    @property
+    def name(self) -> str:
+        return self.backend.name
+
+    @property
+    def concurrency(self) -> int:
+        return self.backend.concurrency
+
+    def _run_attempt(
+        self,
+        file_path: str,
+        logger: logging.Logger,
+        progress_callback: Optional[Callable[[int, Optional[str]], None]],
+        cancellation_check: Optional[Callable[[], bool]]
+    ) -> Optional[Exception]:
+        """Run one attempt; return None on success or the error that ended it."""
+        errors: List[Exception] = []
+
+        def run() -> None:
+            try:
+                self.backend.recalculate(file_path, logger, progress_callback, cancellation_check)
+            except Exception as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=run, name=f"recalc-{self.name}", daemon=True)
+        thread.start()
+        deadline = None if self.timeout is None else time.perf_counter() + self.timeout
+        cancel_deadline = None
+        while True:
+            thread.join(self.poll_interval)
+            if not thread.is_alive():
+                return errors[0] if errors else None
+            now = time.perf_counter()
+            if cancel_deadline is None and cancellation_check and cancellation_check():
+                cancel_deadline = now + self.cancel_grace
+            if cancel_deadline is not None and now >= cancel_deadline:
+                logger.warning("Recalculation did not stop after cancellation; "
+                               f"stopping the {self.name} engine")
+                self.backend.abort(logger)
+                thread.join(self.cancel_grace)
+                return None
+            if deadline is not None and now >= deadline:
+                logger.warning(f"Recalculation exceeded {self.timeout:.0f}s; "
+                               f"stopping the {self.name} engine")
+                self.backend.abort(logger)
+                thread.join(self.cancel_grace)
+                return RecalculationTimeout(
+                    f"Recalculation with {self.name} exceeded {self.timeout:.0f}s")
+
+    def recalculate(
+        self,
+        file_path: str,
+        logger: logging.Logger,
+        progress_callback: Optional[Callable[[int, Optional[str]], None]] = None,
+        cancellation_check: Optional[Callable[[], bool]] = None
+    ) -> None:
+        attempts: List[AttemptTiming] = []
+        try:
+            for attempt in range(1, self.retries + 1):
+                started = time.perf_counter()
+                error = self._run_attempt(file_path, logger, progress_callback, cancellation_check)
+                elapsed = time.perf_counter() - started
+                if error is None:
+                    cancelled = bool(cancellation_check and cancellation_check())
+                    outcome = "cancelled" if cancelled else "succeeded"
+                else:
+                    outcome = "timed out" if isinstance(error, RecalculationTimeout) else "failed"
+                attempts.append(AttemptTiming(attempt, elapsed, outcome))
+                logger.info(
+                    f"Recalculation attempt {attempt}/{self.retries} with {self.name} {outcome} "
+                    f"after {elapsed:.2f}s" + (f": {error}" if error is not None else "")
+                )
+                if error is None:
+                    return
+                if attempt == self.retries:
+                    raise error
+
+                delay = backoff_delay(attempt, self.base_delay, self.max_delay, self.rng)
+                logger.info(f"Retrying recalculation in {delay:.2f}s")
+                if sleep_unless_cancelled(delay, cancellation_check):
+                    logger.info("Workbook recalculation cancelled before retrying.")
+                    return
+        finally:
+            self.last_attempts = attempts
+
+    def abort(self, logger: logging.Logger) -> None:
+        self.backend.abort(logger)
+
+    def close(self) -> None:
+        self.backend.close()
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (ExcelComBackend, LibreOfficeBackend, PythonEvaluatorBackend, NoOpBackend)
+}
+
+
+def create_recalculation_backend(
+    name: str = "auto",
+    timeout: Optional[float] = None,
+    retries: int = 3,
+    **options: Any
+) -> RecalculationWatchdog:
+    """
+    Create a recalculation backend by name, supervised by a watchdog.
+
+    ``"auto"`` picks Excel when the COM modules are installed, then
+    LibreOffice when soffice and its UNO bridge are, and the Python
+    evaluator otherwise.
+
+    Args:
+        name: One of 'auto', 'excel', 'libreoffice', 'python' or 'none'
+        timeout: Maximum seconds per recalculation attempt, or None for no limit
+        retries: Number of attempts per workbook
+        **options: Keyword arguments for the backend's constructor
+
+    Returns:
+        RecalculationWatchdog: The new backend, wrapped in its watchdog
+
+    Raises:
+        ValueError: If the name is unknown
+    """
+    if name == "auto":
+        if ExcelComBackend.available():
+            name = "excel"
+        elif LibreOfficeBackend.available():
+            name = "libreoffice"
+        else:
+            name = "python"
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown recalculation backend '{name}' "
+                         f"(expected one of: auto, {', '.join(BACKENDS)})")
+    return RecalculationWatchdog(BACKENDS[name](**options), timeout=timeout, retries=retries)
+
+
+def recalculate_workbooks(
+    file_paths: List[str],
+    backend: RecalculationBackend,
+    logger: logging.Logger,
+    max_workers: Optional[int] = None,
+    cancellation_check: Optional[Callable[[], bool]] = None
+) -> Dict[str, Optional[Exception]]:
+    """
+    Recalculate several workbooks concurrently.
+
+    Args:
+        file_paths: Paths to the Excel files
+        backend: The backend to recalculate with
+        logger: Logger instance for tracking operations
+        max_workers: Workbooks recalculated at once (default: the backend's concurrency)
+        cancellation_check: Optional function to check if operation should be cancelled
+
+    Returns:
+        Dict mapping each path to None on success or the exception that failed it
+    """
+    def run(path: str) -> Optional[Exception]:
+        try:
+            backend.recalculate(path, logger, cancellation_check=cancellation_check)
+            return None
+        except Exception as e:
+            logger.error(f"Failed to recalculate {path}: {e}")
+            return e
+
+    workers = max(1, min(max_workers or backend.concurrency, len(file_paths) or 1))
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="recalc") as executor:
+        results = dict(zip(file_paths, executor.map(run, file_paths)))
+    failed = sum(1 for error in results.values() if error is not None)
+    logger.info(
+        f"Recalculated {len(file_paths) - failed} of {len(file_paths)} workbook(s) with the "
+        f"{backend.name} backend in {time.perf_counter() - started:.2f}s ({workers} at a time)"
+    )
+    return results
@@ -6,11 +6,9 @@ data tables in Excel sheets for reconciliation.
 """
 
 import logging
-import time
 from pathlib import Path
 from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 from decimal import Decimal
-from openpyxl import load_workbook
 from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
 from openpyxl.utils.exceptions import InvalidFileException
 from openpyxl.utils import get_column_letter
@@ -18,11 +16,21 @@ from openpyxl.workbook.workbook import Workbook
 from openpyxl.worksheet.worksheet import Worksheet
 from openpyxl.cell import Cell
 
-from src.uco_to_udo_recon.core.excel_operations import recalculate_workbook_in_excel
+from src.uco_to_udo_recon.core.component_resolver import get_component_resolver
+from src.uco_to_udo_recon.core.formula_engine import FormulaEvaluator, evaluate_cells
+from src.uco_to_udo_recon.core.formula_graph import check_formula_staleness
+from src.uco_to_udo_recon.core.recalculation import (
+    RecalculationBackend, create_recalculation_backend
+)
+from src.uco_to_udo_recon.core.workbook_loader import (
+    WorkbookViews, load_lazy_workbook, resolve_workbook_views
+)
 from src.uco_to_udo_recon.utils.excel_utils import (
     get_cell_value, get_calculated_value, safe_convert_to_decimal
 )
-from src.uco_to_udo_recon.utils.file_utils import open_excel_file
+from src.uco_to_udo_recon.utils.file_utils import open_excel_file, wait_for_file_ready
+from src.uco_to_udo_recon.utils.label_index import get_label_index
+from src.uco_to_udo_recon.utils.money import cents_to_decimal, format_cents, to_cents
 
 
 def format_tickmark_cell(tickmark_cell: Cell, logger: logging.Logger) -> None:
@@ -135,90 +143,17 @@ def find_component_sheet(
             logger.info("Component sheet search cancelled.")
             return None
             
-        # Complete component mappings based on the Excel sheet
-        component_mappings = {
-            "CBP": ["CBP", "CBP-7005"],
-            "CG": ["USCG", "CG", "USCG-7006"],
-            "CIS": ["CIS", "CIS-7001"],
-            "CYB": ["CISA", "CYB", "CISA-7009"],
-            "FEM": ["FEMA", "FEM", "FEMA-7007"],
-            "ICE": ["ICE", "ICE-7019"],
-            "MGA": ["MGA", "MGA-7021"],
-            "MGT": ["MGT", "MGT-7003"],
-            "OIG": ["OIG", "OIG-7002"],
-            "SS": ["USSS", "SS", "USSS-7004"],
-            "ST": ["ST", "STA-7008"],
-            "TSA": ["TSA", "TSA-7011"],
-            "WMD": ["CWMD", "WMD", "CWMD-7023"]
-        }
-
-        # Trading partner mappings
-        trading_partner_mappings = {
-            "7005": ["CBP-7005"],
-            "7006": ["USCG-7006"],
-            "7001": ["CIS-7001"],
-            "7009": ["CISA-7009"],
-            "7007": ["FEMA-7007"],
-            "7019": ["ICE-7019"],
-            "7021": ["MGA-7021"],
-            "7003": ["MGT-7003"],
-            "7002": ["OIG-7002"],
-            "7004": ["USSS-7004"],
-            "7008": ["STA-7008"],
-            "7011": ["TSA-7011"],
-            "7023": ["CWMD-7023"]
-        }
-
-        # Normalize input values and create search patterns
-        search_patterns = []
-        
-        # Build search patterns, handling None values
-        if tab_name is not None:
-            search_patterns.append((str(tab_name), "tab_name"))
-        
-        if tier_component_name is not None:
-            # Add all possible component variations
-            if tier_component_name in component_mappings:
-                for variant in component_mappings[tier_component_name]:
-                    search_patterns.append((variant, f"component_mapping_{tier_component_name}"))
-            else:
-                search_patterns.append((str(tier_component_name), "tier_component_name"))
-        
-        if trading_partner_number is not None:
-            # Add trading partner variations
-            str_trading_partner = str(trading_partner_number)
-            search_patterns.append((str_trading_partner, "trading_partner_number"))
-            if str_trading_partner in trading_partner_mappings:
-                for variant in trading_partner_mappings[str_trading_partner]:
-                    search_patterns.append((variant, f"trading_partner_mapping_{str_trading_partner}"))
-
-        # List of sheets to skip
-        skip_sheets = {
-            "Instructions", 
-            "Certification", 
-            "DO TB", 
-            "DO UCO to UDO"
-        }
-
-        # Search through all patterns
-        for sheet_name in workbook.sheetnames:
-            # Check for cancellation periodically
-            if cancellation_check and cancellation_check():
-                logger.info("Component sheet search cancelled.")
-                return None
-                
-            # Skip certain sheet names
-            if sheet_name in skip_sheets:
-                continue
-                
-            sheet_name_upper = sheet_name.upper()
-            
-            for pattern, pattern_type in search_patterns:
-                if pattern and pattern.upper() in sheet_name_upper:
-                    logger.info(f"Found sheet '{sheet_name}' using {pattern_type} pattern: {pattern}")
-                    return workbook[sheet_name]
+        # Look the row up in the resolver compiled for this workbook's sheet names
+        resolver = get_component_resolver(workbook)
+        match = resolver.resolve(tab_name, tier_component_name, trading_partner_number)
+        if match:
+            logger.info(f"Found sheet '{match.sheet_name}' using {match.pattern_type} "
+                        f"pattern: {match.pattern}")
+            return workbook[match.sheet_name]
 
         # If no match found, log detailed information
+        search_patterns = resolver.search_patterns(tab_name, tier_component_name,
+                                                   trading_partner_number)
         logger.warning(
             f"No matching sheet found for TIER Component: {tier_component_name}\n"
             f"Search details:\n"
@@ -231,13 +166,17 @@ def find_component_sheet(
         # Additional debugging information
         if tier_component_name:
             logger.debug(f"Component mappings available for {tier_component_name}: "
-                        f"{component_mappings.get(tier_component_name, 'None')}")
+                        f"{resolver.registry.component_mappings.get(tier_component_name, 'None')}")
         if trading_partner_number:
+            mappings = resolver.registry.trading_partner_mappings
             logger.debug(f"Trading partner mappings available for {trading_partner_number}: "
-                        f"{trading_partner_mappings.get(str(trading_partner_number), 'None')}")
+                        f"{mappings.get(str(trading_partner_number), 'None')}")
 
         return None
 
+    except InterruptedError as e:
+        logger.info(f"Component sheet search cancelled: {e}")
+        return None
     except Exception as e:
         logger.error(
             f"Error in find_component_sheet:\n"
@@ -252,8 +191,8 @@ def find_component_sheet(
 
 
 def process_certification_sheet(
-    target_wb: Workbook, 
-    data_wb: Workbook, 
+    target_wb: WorkbookViews,
+    data_wb: Optional[Workbook],
     logger: logging.Logger, 
     progress_callback: Callable[[int, Optional[str]], None],
     cancellation_check: Optional[Callable[[], bool]] = None
@@ -262,8 +201,8 @@ def process_certification_sheet(
     Process the Certification sheet and extract necessary information for comparison.
     
     Args:
-        target_wb: The target workbook with formulas preserved
-        data_wb: The data workbook with calculated values
+        target_wb: The target workbook with formulas preserved, or a DualViewWorkbook
+        data_wb: The data workbook with calculated values (None with a DualViewWorkbook)
         logger: Logger instance for tracking operations
         progress_callback: Callback function to update progress (value, message)
         cancellation_check: Optional function to check if operation should be cancelled
@@ -277,43 +216,31 @@ def process_certification_sheet(
             logger.info("Certification sheet processing cancelled.")
             return None, None
             
-        # Access the sheets from both workbooks
+        # Access the sheets from both workbook views
+        target_wb, data_wb = resolve_workbook_views(target_wb, data_wb)
         sheet = target_wb["Certification"]
         data_sheet = data_wb["Certification"]
         logger.info("Processing 'Certification' sheet.")
         progress_callback(10, "Processing Certification sheet")
 
-        # Find 'Trading Partner Number' cell in the target workbook
-        trading_partner_cell = None
-        for row in sheet.iter_rows(max_col=1, max_row=sheet.max_row):
-            # Check for cancellation periodically
-            if cancellation_check and cancellation_check():
-                logger.info("Certification sheet processing cancelled.")
-                return None, None
-                
-            if row[0].value == "Trading Partner Number":
-                trading_partner_cell = row[0]
-                break
-
-        if not trading_partner_cell:
+        # Find 'Trading Partner Number' and 'Total ' cells in Column A of the target workbook
+        labels = get_label_index(sheet)
+        trading_partner_position = labels.exact("Trading Partner Number", column=1)
+        if not trading_partner_position:
             logger.error("'Trading Partner Number' cell not found in 'Certification' sheet.")
             return None, None
+        trading_partner_cell = sheet.cell(*trading_partner_position)
 
-        # Find 'Total ' cell in the target workbook
-        total_cell = None
-        for row in sheet.iter_rows(max_col=1, max_row=sheet.max_row):
-            # Check for cancellation periodically
-            if cancellation_check and cancellation_check():
-                logger.info("Certification sheet processing cancelled.")
-                return None, None
-                
-            if row[0].value == "Total ":
-                total_cell = row[0]
-                break
-
-        if not total_cell:
+        total_position = labels.exact("Total ", column=1)
+        if not total_position:
             logger.error("'Total ' cell not found in 'Certification' sheet.")
             return None, None
+        total_cell = sheet.cell(*total_position)
+
+        # Check for cancellation after the label lookups
+        if cancellation_check and cancellation_check():
+            logger.info("Certification sheet processing cancelled.")
+            return None, None
 
         progress_callback(20, "Extracting certification data")
 
@@ -364,14 +291,17 @@ def process_certification_sheet(
         progress_callback(50, "Certification sheet processing complete")
         return table_range, row_data
 
+    except InterruptedError as e:
+        logger.info(f"Certification sheet processing cancelled: {e}")
+        return None, None
     except Exception as e:
         logger.error(f"An error occurred while processing the 'Certification' sheet: {e}", exc_info=True)
         return None, None
 
 
 def process_do_tb_sheet(
-    target_wb: Workbook, 
-    data_wb: Workbook, 
+    target_wb: WorkbookViews,
+    data_wb: Optional[Workbook],
     certification_total: Decimal, 
     certification_sheet: Worksheet, 
     total_cell: Cell, 
@@ -383,8 +313,8 @@ def process_do_tb_sheet(
     Process the DO TB sheet.
     
     Args:
-        target_wb: The target workbook with formulas preserved
-        data_wb: The data workbook with calculated values
+        target_wb: The target workbook with formulas preserved, or a DualViewWorkbook
+        data_wb: The data workbook with calculated values (None with a DualViewWorkbook)
         certification_total: The total from the certification sheet
         certification_sheet: The certification worksheet
         total_cell: The total cell in the certification sheet
@@ -398,7 +328,8 @@ def process_do_tb_sheet(
             logger.info("DO TB sheet processing cancelled.")
             return
             
-        # Access the sheets from both workbooks
+        # Access the sheets from both workbook views
+        target_wb, data_wb = resolve_workbook_views(target_wb, data_wb)
         sheet = target_wb["DO TB"]
         data_sheet = data_wb["DO TB"]
         logger.info("Processing 'DO TB' sheet.")
@@ -434,9 +365,10 @@ def process_do_tb_sheet(
                     value_in_column_h = None  # Optionally, skip or handle differently
 
                 if value_in_column_h is not None:
-                    # Convert to Decimal
-                    decimal_value = safe_convert_to_decimal(value_in_column_h, logger)
-                    found_values[cell_value] = decimal_value
+                    # Convert to integer cents, keeping a Decimal for the worksheet
+                    cents_value = to_cents(value_in_column_h, logger)
+                    decimal_value = cents_to_decimal(cents_value)
+                    found_values[cell_value] = cents_value
                     first_occurrences[cell_value] = cell.row
                     logger.info(f"Found '{cell_value}' in row {cell.row}, value in Column H: {decimal_value}")
 
@@ -470,19 +402,20 @@ def process_do_tb_sheet(
         sum_cell.border = border_style
         sum_cell.number_format = number_format
         logger.info(f"Sum formula '{sum_formula}' entered in Column N at row {sum_row}.")
+        evaluate_cells(FormulaEvaluator(sheet.parent), sheet, [sum_cell.coordinate], logger)
 
         # Auto-fit Column N
         auto_fit_column(sheet, 'N', logger)
 
         # Calculate the sum directly in Python
         calculated_sum = sum(found_values.values())
-        logger.info(f"Calculated sum directly in Python: {calculated_sum}")
+        logger.info(f"Calculated sum directly in Python: {format_cents(calculated_sum)}")
 
-        # Convert certification_total to Decimal if not already
-        certification_total = safe_convert_to_decimal(certification_total, logger)
+        # Convert certification_total to cents if not already
+        certification_total = to_cents(certification_total, logger)
 
-        # Compare the sums
-        if abs(calculated_sum - certification_total) < Decimal('0.01'):
+        # Compare the sums; both are whole cents, so within a cent means equal
+        if calculated_sum == certification_total:
             add_tickmark(sheet, sum_row, 15, "8", "Wingdings 2", 10)
             add_tickmark(certification_sheet, total_cell.row + 1, 4, "a", "Marlett", 12)
             logger.info(f"Sums match. Tickmarks added.")
@@ -492,13 +425,15 @@ def process_do_tb_sheet(
             logger.info(f"Sums do not match. X marks added.")
 
         progress_callback(75, "DO TB sheet processing complete")
+    except InterruptedError as e:
+        logger.info(f"DO TB sheet processing cancelled: {e}")
     except Exception as e:
         logger.error(f"An error occurred while processing the 'DO TB' sheet: {e}", exc_info=True)
 
 
 def process_uco_to_udo_sheet(
-    target_wb: Workbook, 
-    data_wb: Workbook, 
+    target_wb: WorkbookViews,
+    data_wb: Optional[Workbook],
     component_name: str, 
     logger: logging.Logger, 
     progress_callback: Callable[[int, Optional[str]], None],
@@ -508,8 +443,8 @@ def process_uco_to_udo_sheet(
     Process the UCO to UDO sheet.
     
     Args:
-        target_wb: The target workbook with formulas preserved
-        data_wb: The data workbook with calculated values
+        target_wb: The target workbook with formulas preserved, or a DualViewWorkbook
+        data_wb: The data workbook with calculated values (None with a DualViewWorkbook)
         component_name: The selected component name
         logger: Logger instance for tracking operations
         progress_callback: Callback function to update progress (value, message)
@@ -524,43 +459,31 @@ def process_uco_to_udo_sheet(
             logger.info("UCO to UDO sheet processing cancelled.")
             return None
             
-        # Access the sheets from both workbooks
+        # Access the sheets from both workbook views
+        target_wb, data_wb = resolve_workbook_views(target_wb, data_wb)
         sheet = target_wb["DO UCO to UDO"]
         data_sheet = data_wb["DO UCO to UDO"]
         logger.info("Processing 'DO UCO to UDO' sheet.")
         progress_callback(80, "Processing UCO to UDO sheet")
 
-        # Find 'Component' cell in the target workbook
-        component_cell = None
-        for row in sheet.iter_rows(max_col=1, max_row=sheet.max_row):
-            # Check for cancellation periodically
-            if cancellation_check and cancellation_check():
-                logger.info("UCO to UDO sheet processing cancelled.")
-                return None
-                
-            if row[0].value == "Component":
-                component_cell = row[0]
-                break
-        
-        if not component_cell:
+        # Find 'Component' and '{component_name} Total' cells in Column A of the target workbook
+        labels = get_label_index(sheet)
+        component_position = labels.exact("Component", column=1)
+        if not component_position:
             logger.error("'Component' cell not found in 'DO UCO to UDO' sheet.")
             return None
+        component_cell = sheet.cell(*component_position)
 
-        # Find '{component_name} Total' cell in the target workbook
-        total_component_cell = None
-        for row in sheet.iter_rows(max_col=1, max_row=sheet.max_row):
-            # Check for cancellation periodically
-            if cancellation_check and cancellation_check():
-                logger.info("UCO to UDO sheet processing cancelled.")
-                return None
-                
-            if row[0].value == f"{component_name} Total":
-                total_component_cell = row[0]
-                break
-        
-        if not total_component_cell:
+        total_component_position = labels.exact(f"{component_name} Total", column=1)
+        if not total_component_position:
             logger.error(f"'{component_name} Total' cell not found in 'DO UCO to UDO' sheet.")
             return None
+        total_component_cell = sheet.cell(*total_component_position)
+
+        # Check for cancellation after the label lookups
+        if cancellation_check and cancellation_check():
+            logger.info("UCO to UDO sheet processing cancelled.")
+            return None
 
         progress_callback(85, "Adding tickmarks")
 
@@ -577,7 +500,7 @@ def process_uco_to_udo_sheet(
 
         progress_callback(90, "Processing component totals")
 
-        # Process the relevant totals and convert them using safe_convert_to_decimal
+        # Process the relevant totals and convert them to integer cents
         for target_row in sheet.iter_rows(min_row=table_start_row, max_row=table_end_row):
             # Check for cancellation periodically
             if cancellation_check and cancellation_check():
@@ -589,26 +512,103 @@ def process_uco_to_udo_sheet(
 
             # Access values from the data-only workbook
             uco_tier_component_name = data_row_cells[0].value  # Column A
-            uco_component_total_unfilled = safe_convert_to_decimal(data_row_cells[4].value, logger)  # Column E (5th column)
-            uco_trading_partner_total = safe_convert_to_decimal(data_row_cells[7].value, logger)     # Column H (8th column)
-            uco_difference = safe_convert_to_decimal(data_row_cells[11].value, logger)               # Column L (12th column)
+            # Columns E, H and L (5th, 8th and 12th columns)
+            uco_component_total_unfilled = to_cents(data_row_cells[4].value, logger)
+            uco_trading_partner_total = to_cents(data_row_cells[7].value, logger)
+            uco_difference = to_cents(data_row_cells[11].value, logger)
 
-            logger.info(f"Row {row_num} - UCO Total: {uco_component_total_unfilled}, Trading Partner Total: {uco_trading_partner_total}, Difference: {uco_difference}")
+            logger.info(f"Row {row_num} - UCO Total: {format_cents(uco_component_total_unfilled)}, "
+                        f"Trading Partner Total: {format_cents(uco_trading_partner_total)}, "
+                        f"Difference: {format_cents(uco_difference)}")
 
         progress_callback(95, "UCO to UDO sheet processing complete")
         return table_range
 
+    except InterruptedError as e:
+        logger.info(f"UCO to UDO sheet processing cancelled: {e}")
+        return None
     except Exception as e:
         logger.error(f"An error occurred while processing 'DO UCO to UDO' sheet: {e}", exc_info=True)
         return None
 
 
+def reconcile_workbook(
+    book: WorkbookViews,
+    component_name: str,
+    logger: logging.Logger,
+    progress_callback: Callable[[int, Optional[str]], None],
+    cancellation_check: Optional[Callable[[], bool]] = None
+) -> bool:
+    """
+    Process the reconciliation sheets of an open workbook without saving it.
+
+    Args:
+        book: The workbook with formulas and cached values (a DualViewWorkbook)
+        component_name: The selected component name
+        logger: Logger instance for tracking operations
+        progress_callback: Callback function to update progress (value, message)
+        cancellation_check: Optional function to check if operation should be cancelled
+
+    Returns:
+        bool: True if all sheets were processed, False if aborted or cancelled
+    """
+    # Process Certification sheet
+    certification_range, certification_row_data = process_certification_sheet(
+        book, None, logger, progress_callback, cancellation_check
+    )
+    if certification_range is None or certification_row_data is None:
+        logger.error("Failed to process Certification sheet. Aborting operation.")
+        return False
+
+    # Check for cancellation after processing certification sheet
+    if cancellation_check and cancellation_check():
+        logger.info("Table range processing cancelled after processing certification sheet.")
+        return False
+
+    # Process UCO to UDO sheet
+    uco_to_udo_range = process_uco_to_udo_sheet(
+        book, None, component_name, logger, progress_callback, cancellation_check
+    )
+    if uco_to_udo_range is None:
+        logger.error("Failed to process UCO to UDO sheet. Aborting operation.")
+        return False
+
+    # Check for cancellation after processing UCO to UDO sheet
+    if cancellation_check and cancellation_check():
+        logger.info("Table range processing cancelled after processing UCO to UDO sheet.")
+        return False
+
+    # Import here to avoid circular imports
+    from src.uco_to_udo_recon.core.comparison import main as compare_main
+
+    # Compare both UCO and UDO values; the caller saves the workbook once
+    if certification_range and uco_to_udo_range:
+        compare_main(
+            certification_range,
+            uco_to_udo_range,
+            book,
+            None,
+            logger,
+            progress_callback,
+            None,
+            cancellation_check
+        )
+
+    # Check for cancellation after comparison
+    if cancellation_check and cancellation_check():
+        logger.info("Table range processing cancelled after comparison.")
+        return False
+
+    return True
+
+
 def find_table_range(
     new_target_file: str, 
     component_name: str, 
     logger: logging.Logger, 
     progress_callback: Callable[[int, Optional[str]], None],
-    cancellation_check: Optional[Callable[[], bool]] = None
+    cancellation_check: Optional[Callable[[], bool]] = None,
+    backend: Optional[RecalculationBackend] = None
 ) -> None:
     """
     Main function to find table ranges, process sheets, and call comparison functions.
@@ -619,6 +619,7 @@ def find_table_range(
         logger: Logger instance for tracking operations
         progress_callback: Callback function to update progress (value, message)
         cancellation_check: Optional function to check if operation should be cancelled
+        backend: Recalculation backend; by default one is picked for this system
     """
     try:
         # Check for cancellation
@@ -626,83 +627,47 @@ def find_table_range(
             logger.info("Table range processing cancelled.")
             return
             
-        # Recalculate the workbook using Excel and refresh any external links or queries.
-        progress_callback(5, "Recalculating workbook in Excel")
-        recalculate_workbook_in_excel(new_target_file, logger, 
-                                     lambda val: progress_callback(val, "Recalculating workbook"),
-                                     cancellation_check=cancellation_check)
-        
-        # Check for cancellation after recalculation
-        if cancellation_check and cancellation_check():
-            logger.info("Table range processing cancelled after recalculation.")
-            return
-            
-        # Ensure a short delay to allow Excel to release the file
-        time.sleep(1)
+        # Open the workbook once; sheets are parsed only when first accessed
+        progress_callback(5, "Checking formula results")
+        book = load_lazy_workbook(new_target_file, logger, cancellation_check)
 
-        # Load the workbook twice
-        progress_callback(30, "Loading workbooks")
-        logger.info(f"Loading workbook with data_only=False: {new_target_file}")
-        target_wb = load_workbook(new_target_file, data_only=False)  # Preserves formulas
-        
-        logger.info(f"Loading workbook with data_only=True: {new_target_file}")
-        data_wb = load_workbook(new_target_file, data_only=True)     # Accesses calculated values
+        # Recalculate the workbook using Excel only if a cached formula result is stale
+        staleness = check_formula_staleness(book, logger, cancellation_check=cancellation_check)
+        if staleness.needs_recalculation:
+            book.close()
 
-        # Check for cancellation after loading
-        if cancellation_check and cancellation_check():
-            logger.info("Table range processing cancelled after loading workbooks.")
-            return
+            def progress(val: int, message: Optional[str] = None) -> None:
+                progress_callback(val, "Recalculating workbook")
 
-        # Process Certification sheet
-        certification_range, certification_row_data = process_certification_sheet(
-            target_wb, data_wb, logger, progress_callback, cancellation_check
-        )
-        if certification_range is None or certification_row_data is None:
-            logger.error("Failed to process Certification sheet. Aborting operation.")
-            return
-        
-        # Check for cancellation after processing certification sheet
-        if cancellation_check and cancellation_check():
-            logger.info("Table range processing cancelled after processing certification sheet.")
-            return
-        
-        # Process UCO to UDO sheet
-        uco_to_udo_range = process_uco_to_udo_sheet(
-            target_wb, data_wb, component_name, logger, progress_callback, cancellation_check
-        )
-        if uco_to_udo_range is None:
-            logger.error("Failed to process UCO to UDO sheet. Aborting operation.")
-            return
-            
-        # Check for cancellation after processing UCO to UDO sheet
+            if backend is not None:
+                backend.recalculate(new_target_file, logger, progress, cancellation_check)
+            else:
+                with create_recalculation_backend() as default_backend:
+                    default_backend.recalculate(new_target_file, logger, progress,
+                                                cancellation_check)
+
+            # Check for cancellation after recalculation
+            if cancellation_check and cancellation_check():
+                logger.info("Table range processing cancelled after recalculation.")
+                return
+
+            # Wait until Excel has released the file
+            wait_for_file_ready(new_target_file, logger)
+            progress_callback(30, "Loading workbook")
+            book = load_lazy_workbook(new_target_file, logger, cancellation_check)
+
+        # Check for cancellation after loading
         if cancellation_check and cancellation_check():
-            logger.info("Table range processing cancelled after processing UCO to UDO sheet.")
+            logger.info("Table range processing cancelled after loading workbook.")
             return
 
-        # Import here to avoid circular imports
-        from src.uco_to_udo_recon.core.comparison import main as compare_main
-
-        # Call the updated compare_main function to compare both UCO and UDO values
-        if certification_range and uco_to_udo_range:
-            compare_main(
-                certification_range,
-                uco_to_udo_range,
-                target_wb,
-                data_wb,
-                logger,
-                progress_callback,
-                new_target_file,
-                cancellation_check
-            )
-
-        # Check for cancellation after comparison
-        if cancellation_check and cancellation_check():
-            logger.info("Table range processing cancelled after comparison.")
+        if not reconcile_workbook(book, component_name, logger, progress_callback,
+                                  cancellation_check):
             return
 
         # Save the final workbook
         progress_callback(98, "Saving workbook")
-        target_wb.save(new_target_file)
+        book.save(new_target_file, cancellation_check)
         logger.info(f"Workbook saved with updated tables and tickmark columns.")
 
         # Update progress after completion
@@ -711,7 +676,9 @@ def find_table_range(
         # Open the Excel file to show results to the user
         open_excel_file(new_target_file, logger)
 
+    except InterruptedError as e:
+        logger.info(f"Table range processing cancelled: {e}")
     except InvalidFileException as e:
         logger.error(f"Invalid Excel file: {e}", exc_info=True)
     except Exception as e:
-        logger.error(f"An unexpected error occurred: {e}", exc_info=True)
\ No newline at end of file
+        logger.error(f"An unexpected error occurred: {e}", exc_info=True)
@@ -0,0 +1,685 @@
+"""
+Workbook loading for the UCO to UDO Reconciliation tool.
+
+This module provides a loader that parses every worksheet part once and
+keeps both the formula text and the cached value of each formula cell,
+replacing the pattern of loading the same file twice with
+``data_only=False`` and ``data_only=True``. A lazy variant parses each
+worksheet only when it is first accessed.
+"""
+
+import logging
+import warnings
+import zipfile
+from io import BytesIO
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from openpyxl.cell import Cell, MergedCell
+from openpyxl.comments.comment_sheet import CommentSheet
+from openpyxl.drawing.spreadsheet_drawing import SpreadsheetDrawing
+from openpyxl.packaging.relationship import RelationshipList, get_dependents, get_rels_path
+from openpyxl.pivot.table import TableDefinition
+from openpyxl.reader.drawings import find_images
+from openpyxl.reader.excel import ExcelReader, _find_workbook_part
+from openpyxl.reader.workbook import WorkbookParser
+from openpyxl.styles.stylesheet import apply_stylesheet
+from openpyxl.utils import coordinate_to_tuple, range_boundaries
+from openpyxl.workbook.workbook import Workbook
+from openpyxl.worksheet._reader import WorkSheetParser, WorksheetReader
+from openpyxl.worksheet.table import Table
+from openpyxl.worksheet.worksheet import Worksheet
+from openpyxl.writer.excel import save_workbook
+from openpyxl.xml.constants import COMMENTS_NS, XLTM, XLTX
+from openpyxl.xml.functions import fromstring
+
+from src.uco_to_udo_recon.utils.xlsx_package import HYPERLINK_REL, XlsxPackage, set_cached_values
+
+
+class DualValueCell(Cell):
+    """
+    A worksheet cell that also remembers the cached value of its formula.
+
+    The cached value is the ``<v>`` element Excel stored the last time it
+    calculated the workbook. It travels with the cell when rows or columns
+    are inserted, and it is cleared whenever a new value is assigned.
+    ``edited`` records that a value was assigned after the cell was loaded.
+    """
+
+    __slots__ = ('cached_value', 'edited')
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        self.cached_value = None
+        self.edited = False
+        super().__init__(*args, **kwargs)
+
+    def _bind_value(self, value: Any) -> None:
+        super()._bind_value(value)
+        self.cached_value = None
+        self.edited = True
+
+
+class DualViewWorksheet(Worksheet):
+    """A worksheet whose new cells are :class:`DualValueCell` objects too."""
+
+    def _get_cell(self, row: int, column: int) -> Cell:
+        if not 0 < row < 1048577:
+            raise ValueError("Row numbers must be between 1 and 1048576")
+        coordinate = (row, column)
+        if coordinate not in self._cells:
+            self._add_cell(DualValueCell(self, row=row, column=column))
+        return self._cells[coordinate]
+
+
+class _DualViewWorksheetParser(WorkSheetParser):
+    """Worksheet parser that keeps the cached value of formula cells."""
+
+    def parse_cell(self, element: Any) -> Dict[str, Any]:
+        cell = super().parse_cell(element)
+        if cell['data_type'] == 'f':
+            # Parse the same element again in data-only mode to decode <v>
+            self.col_counter = cell['column'] - 1
+            self.data_only = True
+            try:
+                cell['cached_value'] = super().parse_cell(element)['value']
+            finally:
+                self.data_only = False
+        return cell
+
+
+class _DualViewWorksheetReader(WorksheetReader):
+    """Worksheet reader that binds :class:`DualValueCell` objects."""
+
+    def __init__(
+        self,
+        ws: Worksheet,
+        xml_source: Any,
+        shared_strings: list,
+        cancellation_check: Optional[Callable[[], bool]] = None
+    ) -> None:
+        self.ws = ws
+        self.cancellation_check = cancellation_check
+        self.parser = _DualViewWorksheetParser(
+            xml_source, shared_strings, False, ws.parent.epoch,
+            ws.parent._date_formats, ws.parent._timedelta_formats
+        )
+        self.tables = []
+
+    def bind_cells(self) -> None:
+        for _, row in self.parser.parse():
+            if self.cancellation_check and self.cancellation_check():
+                raise InterruptedError(f"Cancelled while parsing worksheet '{self.ws.title}'")
+            for cell in row:
+                style = self.ws.parent._cell_styles[cell['style_id']]
+                c = DualValueCell(self.ws, row=cell['row'], column=cell['column'],
+                                  style_array=style)
+                c._value = cell['value']
+                c.data_type = cell['data_type']
+                c.cached_value = cell.get('cached_value')
+                self.ws._cells[(cell['row'], cell['column'])] = c
+        self.ws.formula_attributes = self.parser.array_formulae
+        if self.ws._cells:
+            self.ws._current_row = self.ws.max_row
+
+
+class DualViewReader(ExcelReader):
+    """
+    Excel package reader that parses each worksheet part a single time.
+
+    Formula cells keep their formula text as the cell value and expose the
+    cached result through :attr:`DualValueCell.cached_value`. Parsing stops
+    with InterruptedError when ``cancellation_check`` returns True.
+    """
+
+    def __init__(
+        self,
+        filename: Any,
+        keep_links: bool = True,
+        cancellation_check: Optional[Callable[[], bool]] = None
+    ) -> None:
+        super().__init__(filename, read_only=False, keep_vba=False,
+                         data_only=False, keep_links=keep_links)
+        self.cancellation_check = cancellation_check
+
+    def read_worksheet(self, sheet: Any, rel: Any) -> Worksheet:
+        """
+        Parse one worksheet part into the workbook.
+
+        Args:
+            sheet: The sheet entry from workbook.xml
+            rel: The workbook relationship pointing at the worksheet part
+
+        Returns:
+            Worksheet: The newly bound worksheet
+        """
+        rels_path = get_rels_path(rel.target)
+        rels = RelationshipList()
+        if rels_path in self.valid_files:
+            rels = get_dependents(self.archive, rels_path)
+
+        with self.archive.open(rel.target) as fh:
+            ws = DualViewWorksheet(parent=self.wb, title=sheet.name)
+            self.wb._add_sheet(ws)
+            ws._rels = rels
+            ws_parser = _DualViewWorksheetReader(ws, fh, self.shared_strings,
+                                                 self.cancellation_check)
+            ws_parser.bind_all()
+
+        # Assign any comments to cells
+        for r in rels.find(COMMENTS_NS):
+            src = self.archive.read(r.target)
+            comment_sheet = CommentSheet.from_tree(fromstring(src))
+            for ref, comment in comment_sheet.comments:
+                cell = ws[ref]
+                if isinstance(cell, MergedCell):
+                    warnings.warn(
+                        f"Cell '{ws.title}':{cell.coordinate} is part of a merged range "
+                        f"but has a comment which will be removed."
+                    )
+                    continue
+                cell.comment = comment
+
+        ws.legacy_drawing = None
+
+        for t in ws_parser.tables:
+            ws.add_table(Table.from_tree(fromstring(self.archive.read(t))))
+
+        for drawing_rel in rels.find(SpreadsheetDrawing._rel_type):
+            charts, images = find_images(self.archive, drawing_rel.target)
+            for chart in charts:
+                ws.add_chart(chart, chart.anchor)
+            for image in images:
+                ws.add_image(image, image.anchor)
+
+        for pivot_rel in rels.find(TableDefinition.rel_type):
+            pivot = TableDefinition.from_tree(fromstring(self.archive.read(pivot_rel.Target)))
+            pivot.cache = self.parser.pivot_caches[pivot.cacheId]
+            ws.add_pivot(pivot)
+
+        ws.sheet_state = sheet.state
+        return ws
+
+    def read_worksheets(self) -> None:
+        for sheet, rel in self.parser.find_sheets():
+            if rel.target not in self.valid_files:
+                continue
+            if "chartsheet" in rel.Type:
+                self.read_chartsheet(sheet, rel)
+                continue
+            self.read_worksheet(sheet, rel)
+
+
+class ValueCell:
+    """A read-only stand-in for a cell in a ``data_only=True`` workbook."""
+
+    __slots__ = ('row', 'column', 'value')
+
+    def __init__(self, row: int, column: int, value: Any) -> None:
+        self.row = row
+        self.column = column
+        self.value = value
+
+
+class CachedValueSheet:
+    """
+    Read-only view of a worksheet that returns cached values for formulas.
+
+    Supports the subset of the :class:`Worksheet` API the reconciliation code
+    uses on ``data_only`` workbooks: ``cell()``, ``sheet[row]``,
+    ``sheet["A1"]``, ``sheet["A1:H10"]`` and ``iter_rows()``. Looking cells up
+    never creates them in the underlying worksheet.
+    """
+
+    def __init__(self, worksheet: Worksheet) -> None:
+        self.worksheet = worksheet
+
+    @property
+    def title(self) -> str:
+        return self.worksheet.title
+
+    @property
+    def max_row(self) -> int:
+        return self.worksheet.max_row
+
+    @property
+    def max_column(self) -> int:
+        return self.worksheet.max_column
+
+    def value(self, row: int, column: int) -> Any:
+        """
+        Get the calculated value at a position.
+
+        Args:
+            row: 1-based row index
+            column: 1-based column index
+
+        Returns:
+            The cached result for formula cells, the stored value otherwise
+        """
+        cell = self.worksheet._cells.get((row, column))
+        if cell is None:
+            return None
+        if cell.data_type == 'f':
+            return getattr(cell, 'cached_value', None)
+        return cell._value
+
+    def cell(self, row: int, column: int) -> ValueCell:
+        return ValueCell(row, column, self.value(row, column))
+
+    def iter_rows(
+        self,
+        min_row: Optional[int] = None,
+        max_row: Optional[int] = None,
+        min_col: Optional[int] = None,
+        max_col: Optional[int] = None
+    ) -> Iterator[Tuple[ValueCell, ...]]:
+        min_row = min_row or 1
+        min_col = min_col or 1
+        max_row = max_row or self.max_row
+        max_col = max_col or self.max_column
+        for row in range(min_row, max_row + 1):
+            yield tuple(self.cell(row, col) for col in range(min_col, max_col + 1))
+
+    def __getitem__(self, key: Union[int, str]) -> Any:
+        if isinstance(key, int):
+            return next(self.iter_rows(min_row=key, max_row=key))
+        if ":" not in key:
+            row, column = coordinate_to_tuple(key)
+            return self.cell(row, column)
+        min_col, min_row, max_col, max_row = range_boundaries(key)
+        return tuple(self.iter_rows(min_row, max_row, min_col, max_col))
+
+
+class CachedValueView:
+    """Workbook-level view that hands out :class:`CachedValueSheet` objects."""
+
+    def __init__(self, workbook: Workbook) -> None:
+        self.workbook = workbook
+        self._sheets: Dict[str, CachedValueSheet] = {}
+
+    @property
+    def sheetnames(self) -> list:
+        return self.workbook.sheetnames
+
+    def __getitem__(self, name: str) -> CachedValueSheet:
+        if name not in self._sheets:
+            self._sheets[name] = CachedValueSheet(self.workbook[name])
+        return self._sheets[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.workbook.sheetnames
+
+
+def cached_formula_values(worksheet: Worksheet) -> Dict[str, Any]:
+    """
+    Collect the cached results of a worksheet's formula cells.
+
+    Args:
+        worksheet: The worksheet to scan
+
+    Returns:
+        Dict mapping coordinates of formula cells that have a cached value to that value
+    """
+    return {
+        cell.coordinate: cell.cached_value
+        for cell in worksheet._cells.values()
+        if cell.data_type == 'f' and getattr(cell, 'cached_value', None) is not None
+    }
+
+
+def write_cached_values(package: XlsxPackage, worksheets: List[Worksheet]) -> int:
+    """
+    Store the cached formula results of worksheets in their rendered XML parts.
+
+    openpyxl writes formula cells with an empty ``<v/>``; this puts the
+    results held by :class:`DualValueCell` back, so the saved file opens
+    already calculated.
+
+    Args:
+        package: The package the worksheets were rendered into
+        worksheets: The worksheets whose parts should be updated
+
+    Returns:
+        int: The number of formula cells that received a cached value
+    """
+    total = 0
+    for ws in worksheets:
+        values = cached_formula_values(ws)
+        if not values:
+            continue
+        xml, updated = set_cached_values(package.sheet_xml(ws.title), values)
+        package.write(package.sheet(ws.title).part, xml)
+        total += updated
+    return total
+
+
+def save_with_cached_values(
+    workbook: Workbook,
+    filename: Any,
+    cancellation_check: Optional[Callable[[], bool]] = None
+) -> None:
+    """
+    Save a workbook with openpyxl, keeping the cached results of its formulas.
+
+    Args:
+        workbook: The workbook to save
+        filename: Destination path or binary file-like object
+        cancellation_check: Optional function to check if operation should be cancelled
+
+    Raises:
+        InterruptedError: If cancelled before the file is complete
+    """
+    buffer = BytesIO()
+    save_workbook(workbook, buffer)
+    if cancellation_check and cancellation_check():
+        raise InterruptedError("Cancelled while saving workbook")
+    package = XlsxPackage(buffer.getvalue())
+    write_cached_values(package, [ws for ws in workbook.worksheets if isinstance(ws, Worksheet)])
+    package.save(filename, cancellation_check=cancellation_check)
+
+
+class DualViewWorkbook:
+    """
+    A workbook loaded once that exposes both formulas and cached values.
+
+    ``workbook`` is the editable openpyxl workbook (formulas preserved) and
+    ``values`` is a read-only view returning the cached results, so the pair
+    can be passed wherever a ``target_wb``/``data_wb`` pair was used before.
+    """
+
+    def __init__(self, workbook: Workbook) -> None:
+        self.workbook = workbook
+        self.values = CachedValueView(workbook)
+
+    @property
+    def sheetnames(self) -> list:
+        return self.workbook.sheetnames
+
+    def __getitem__(self, name: str) -> Worksheet:
+        return self.workbook[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.workbook.sheetnames
+
+    def _parsed_worksheets(self) -> List[Worksheet]:
+        return [ws for ws in self.workbook.worksheets if isinstance(ws, Worksheet)]
+
+    def missing_cached_values(self) -> List[str]:
+        """
+        List the formula cells that have no cached result.
+
+        Returns:
+            List of 'Sheet!A1' references; empty when every formula has a result
+        """
+        return [
+            f"{ws.title}!{cell.coordinate}"
+            for ws in self._parsed_worksheets()
+            for cell in ws._cells.values()
+            if cell.data_type == 'f' and getattr(cell, 'cached_value', None) is None
+        ]
+
+    def save(self, filename: str, cancellation_check: Optional[Callable[[], bool]] = None) -> None:
+        save_with_cached_values(self.workbook, filename, cancellation_check)
+
+    def close(self) -> None:
+        self.workbook.close()
+
+
+class _LazyBackingWorkbook(Workbook):
+    """Workbook holding the parsed worksheets; saving goes through the lazy owner."""
+
+    _owner: Optional["LazyWorkbook"] = None
+
+    def save(self, filename: Any) -> None:
+        if self._owner is None:
+            super().save(filename)
+        else:
+            self._owner.save(filename)
+
+
+class _LazyWorkbookParser(WorkbookParser):
+    """Workbook parser that builds a :class:`_LazyBackingWorkbook`."""
+
+    def __init__(self, archive: Any, workbook_part_name: str, keep_links: bool = True) -> None:
+        super().__init__(archive, workbook_part_name, keep_links)
+        self.wb = _LazyBackingWorkbook()
+
+
+class _LazyWorkbookReader(DualViewReader):
+    """Reader that loads the workbook skeleton up front and worksheets on demand."""
+
+    def read_workbook(self) -> None:
+        wb_part = _find_workbook_part(self.package)
+        self.parser = _LazyWorkbookParser(self.archive, wb_part.PartName[1:],
+                                          keep_links=self.keep_links)
+        self.parser.parse()
+        wb = self.parser.wb
+        wb._sheets = []
+        wb._data_only = False
+        wb._read_only = False
+        wb.template = wb_part.ContentType in (XLTX, XLTM)
+        self.wb = wb
+
+    def read(self) -> None:
+        self.read_manifest()
+        self.read_strings()
+        self.read_workbook()
+        self.read_properties()
+        self.read_theme()
+        apply_stylesheet(self.archive, self.wb)
+        self.sheet_rels = {
+            sheet.name: (sheet, rel) for sheet, rel in self.parser.find_sheets()
+            if rel.target in self.valid_files
+        }
+
+    def materialize(self, name: str) -> Any:
+        sheet, rel = self.sheet_rels[name]
+        if "chartsheet" in rel.Type:
+            self.read_chartsheet(sheet, rel)
+            return self.wb._sheets[-1]
+        return self.read_worksheet(sheet, rel)
+
+
+class LazyWorkbook(DualViewWorkbook):
+    """
+    A dual-view workbook whose worksheets are parsed on first access.
+
+    Shared strings, styles and defined names are read when the workbook is
+    opened; a worksheet part is only parsed when the sheet is looked up. On
+    save, the sheets that were accessed are serialized again and spliced into
+    the original package, so sheets that were never accessed are written back
+    byte-for-byte. When a spliced sheet would lose related parts (comments,
+    tables, drawings), the whole workbook is parsed and saved by openpyxl.
+    """
+
+    def __init__(
+        self,
+        filename: Any,
+        logger: Optional[logging.Logger] = None,
+        cancellation_check: Optional[Callable[[], bool]] = None
+    ) -> None:
+        self.logger = logger or logging.getLogger(__name__)
+        if isinstance(filename, XlsxPackage):
+            # An in-memory package handed over by an earlier pipeline stage
+            self.package = filename
+            data = filename.to_bytes(zipfile.ZIP_STORED)
+        else:
+            if hasattr(filename, "read"):
+                data = filename.read()
+            else:
+                with open(filename, "rb") as fh:
+                    data = fh.read()
+            self.package = XlsxPackage(data)
+        self._reader = _LazyWorkbookReader(BytesIO(data), cancellation_check=cancellation_check)
+        self._reader.read()
+        self._workbook = self._reader.wb
+        self._workbook._owner = self
+        self._fully_loaded = False
+        super().__init__(self)
+
+    @property
+    def sheetnames(self) -> List[str]:
+        return list(self._reader.sheet_rels)
+
+    @property
+    def loaded_sheetnames(self) -> List[str]:
+        """Names of the sheets that have been parsed so far."""
+        return self._workbook.sheetnames
+
+    @property
+    def worksheets(self) -> List[Worksheet]:
+        self._load_all()
+        return self._workbook.worksheets
+
+    def _parsed_worksheets(self) -> List[Worksheet]:
+        return [ws for ws in self._workbook._sheets if isinstance(ws, Worksheet)]
+
+    def __getitem__(self, name: str) -> Worksheet:
+        if name in self._workbook.sheetnames:
+            return self._workbook[name]
+        if name not in self._reader.sheet_rels:
+            raise KeyError(f"Worksheet {name} does not exist.")
+        self.logger.debug(f"Parsing worksheet on first access: {name}")
+        return self._reader.materialize(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._reader.sheet_rels
+
+    def _load_all(self) -> None:
+        if self._fully_loaded:
+            return
+        for name in self.sheetnames:
+            self[name]
+        order = self.sheetnames
+        self._workbook._sheets.sort(
+            key=lambda ws: order.index(ws.title) if ws.title in order else len(order)
+        )
+        self._reader.parser.assign_names()
+        self._fully_loaded = True
+
+    def _render_loaded_sheets(self) -> Tuple[Optional[XlsxPackage], str]:
+        """
+        Serialize the parsed sheets and check they can be spliced.
+
+        Returns:
+            Tuple of the rendered package (None if splicing is not possible)
+            and the reason splicing was ruled out
+        """
+        sheets = self._workbook._sheets
+        if any(ws.title not in self._reader.sheet_rels for ws in sheets):
+            return None, "sheets were added or renamed"
+        if not any(ws.sheet_state == "visible" for ws in sheets):
+            return None, "no visible sheet was accessed"
+        if any(not isinstance(ws, Worksheet) for ws in sheets):
+            return None, "a chartsheet was accessed"
+
+        buffer = BytesIO()
+        save_workbook(self._workbook, buffer)
+        rendered = XlsxPackage(buffer.getvalue())
+        for ws in sheets:
+            for rel in rendered.part_relationships(rendered.sheet(ws.title).part):
+                if rel.type != HYPERLINK_REL:
+                    return None, f"sheet '{ws.title}' has related parts"
+        write_cached_values(rendered, sheets)
+        return rendered, ""
+
+    def save(self, filename: Any, cancellation_check: Optional[Callable[[], bool]] = None) -> None:
+        """
+        Save the workbook, re-serializing only the sheets that were accessed.
+
+        Args:
+            filename: Destination path or binary file-like object
+            cancellation_check: Optional function to check if operation should be cancelled
+
+        Raises:
+            InterruptedError: If cancelled before the file is complete
+        """
+        rendered = None
+        if not self._fully_loaded and self._workbook._sheets:
+            rendered, reason = self._render_loaded_sheets()
+            if rendered is None:
+                self.logger.info(f"Saving full workbook because {reason}")
+                self._load_all()
+        if self._fully_loaded:
+            save_with_cached_values(self._workbook, filename, cancellation_check)
+            return
+
+        loaded = self.loaded_sheetnames
+        for name in loaded:
+            self.package.replace_sheet(name, rendered)
+        if loaded:
+            self.package.drop_calc_chain()
+        self.package.save(filename, cancellation_check=cancellation_check)
+        self.logger.info(
+            f"Saved {len(loaded)} of {len(self.sheetnames)} sheets; the rest were copied unchanged"
+        )
+
+    def close(self) -> None:
+        self._reader.archive.close()
+
+
+WorkbookViews = Union[Workbook, DualViewWorkbook]
+
+
+def load_dual_view_workbook(
+    filename: Any,
+    logger: Optional[logging.Logger] = None,
+    cancellation_check: Optional[Callable[[], bool]] = None
+) -> DualViewWorkbook:
+    """
+    Load a workbook once with both formula text and cached values available.
+
+    Args:
+        filename: Path or binary file-like object of the .xlsx package
+        logger: Optional logger instance for tracking operations
+        cancellation_check: Optional function to check if operation should be cancelled
+
+    Returns:
+        DualViewWorkbook: The loaded workbook and its cached-value view
+    """
+    if logger:
+        logger.info(f"Loading workbook (formulas and cached values): {filename}")
+    reader = DualViewReader(filename, cancellation_check=cancellation_check)
+    reader.read()
+    return DualViewWorkbook(reader.wb)
+
+
+def resolve_workbook_views(target_wb: WorkbookViews, data_wb: Any = None) -> Tuple[Workbook, Any]:
+    """
+    Normalize the workbook arguments accepted by the reconciliation functions.
+
+    Args:
+        target_wb: A :class:`DualViewWorkbook`, or a formula workbook
+        data_wb: The calculated-values workbook when target_wb is a plain workbook
+
+    Returns:
+        Tuple of (formula workbook, calculated-values workbook or view)
+
+    Raises:
+        ValueError: If a plain workbook is given without a data workbook
+    """
+    if isinstance(target_wb, DualViewWorkbook):
+        return target_wb.workbook, target_wb.values
+    if data_wb is None:
+        raise ValueError("data_wb is required when target_wb is not a DualViewWorkbook")
+    return target_wb, data_wb
+
+
+def load_lazy_workbook(
+    filename: Any,
+    logger: Optional[logging.Logger] = None,
+    cancellation_check: Optional[Callable[[], bool]] = None
+) -> LazyWorkbook:
+    """
+    Open a workbook whose worksheets are parsed only when accessed.
+
+    Args:
+        filename: Path, binary file-like object or in-memory XlsxPackage
+        logger: Optional logger instance for tracking operations
+        cancellation_check: Optional function to check if parsing should be cancelled
+
+    Returns:
+        LazyWorkbook: The opened workbook and its cached-value view
+    """
+    if logger:
+        logger.info(f"Opening workbook (sheets parsed on first access): {filename}")
+    return LazyWorkbook(filename, logger, cancellation_check)
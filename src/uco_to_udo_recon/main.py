@@ -6,6 +6,7 @@ startup, logging configuration, and the primary execution flow.
 """
 
 import logging
+import multiprocessing
 import os
 import sys
 import traceback
@@ -87,4 +88,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # Needed for the background worker process in frozen (PyInstaller) builds
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
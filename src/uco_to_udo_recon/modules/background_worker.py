@@ -3,54 +3,638 @@ Background worker module for handling long-running tasks.
 
 This module provides a background worker implementation using 
 threading to keep the GUI responsive during long-running operations.
+Tasks can also be run in a child process, so that CPU-bound work does not
+hold the GUI's interpreter lock and the memory it used is returned to the
+operating system when the child is recycled.
 """
 
 import threading
 import queue
 import time
 import traceback
+import collections
+import functools
+import hashlib
+import heapq
+import itertools
 import logging
-import sys
-from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+import math
+import multiprocessing
+import os
+import pickle
+from concurrent.futures import CancelledError, Future
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+from src.uco_to_udo_recon.utils.cancellation import CancellationToken
+from src.uco_to_udo_recon.utils.progress import ProgressTracker  # noqa: F401 (re-exported)
+
+
+EXECUTION_BACKENDS = ("thread", "process")
+STOP_MODES = ("abort", "drain")
+PRIORITY_LEVELS = ("high", "normal", "low")  # In the order tasks are taken from the queue
+OVERFLOW_POLICIES = ("block", "reject", "drop_lowest")
+
+# Queued once per worker thread by stop(); a worker thread exits when it takes one
+_STOP_SENTINEL = object()
+
+
+def _accepts_argument(func: Callable[..., Any], name: str) -> bool:
+    """
+    Check whether a function has a parameter or local variable with a given name.
+
+    Args:
+        func: The function to inspect
+        name: The name to look for
+
+    Returns:
+        bool: True if the name is found; False for functions without code
+        objects, such as builtins
+    """
+    code = getattr(func, '__code__', None)
+    return code is not None and name in code.co_varnames
+
+
+def task_fingerprint(task_func: Callable[..., Any], args: Tuple = (),
+                     kwargs: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Identify a task submission by its function and inputs.
+
+    Arguments naming an existing file are identified by the file's size and
+    modification time, so resubmitting a task for a file that was edited in
+    the meantime is not treated as a duplicate. The contents are not read:
+    this runs on the submitting (GUI) thread.
+
+    Args:
+        task_func: The function to execute
+        args: Positional arguments to pass to the function
+        kwargs: Keyword arguments to pass to the function
+
+    Returns:
+        str: A digest that is equal for identical submissions
+    """
+    def describe(value: Any) -> str:
+        if isinstance(value, (str, os.PathLike)) and os.path.isfile(value):
+            stat = os.stat(value)
+            return f"file:{os.path.abspath(value)}:{stat.st_size}:{stat.st_mtime_ns}"
+        return repr(value)
+
+    name = getattr(task_func, '__qualname__', repr(task_func))
+    parts = [f"{getattr(task_func, '__module__', '')}.{name}"]
+    parts.extend(describe(value) for value in args)
+    parts.extend(f"{key}={describe(value)}" for key, value in sorted((kwargs or {}).items()))
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+class _PipeLogHandler(logging.Handler):
+    """Logging handler that sends the records of a worker process to its parent."""
+
+    def __init__(self, send: Callable[[Tuple], None]):
+        """
+        Initialize the handler.
+
+        Args:
+            send: Function sending a message to the parent process
+        """
+        super().__init__()
+        self.send = send
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """
+        Send a record to the parent process.
+
+        The message and traceback are formatted here, since record arguments
+        and tracebacks are not always picklable.
+
+        Args:
+            record: The record to send
+        """
+        try:
+            exc_text = record.exc_text
+            if record.exc_info and not exc_text:
+                exc_text = logging.Formatter().formatException(record.exc_info)
+            state = dict(record.__dict__, msg=record.getMessage(), args=None,
+                         exc_info=None, exc_text=exc_text)
+            self.send(("log", state))
+        except Exception:
+            self.handleError(record)
+
+
+def _run_child_tasks(conn: Any, control: Any, log_level: int) -> None:
+    """
+    Run tasks received from the parent process until told to stop.
+
+    This is the entry point of the worker process started by
+    ProcessTaskRunner. Each task's progress updates, log records and result
+    (or error) are sent back over ``conn``. Cancellation requests arrive on
+    ``control``, where a listener thread reads them and cancels the current
+    task's CancellationToken.
+
+    Args:
+        conn: Duplex connection to the parent process
+        control: Read end of the parent's cancellation pipe
+        log_level: Level of the records to send to the parent process
+    """
+    send_lock = threading.Lock()
+
+    def send(message: Tuple) -> None:
+        """Send a message to the parent; tasks may log from several threads."""
+        with send_lock:
+            conn.send(message)
+
+    root_logger = logging.getLogger()
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+    root_logger.addHandler(_PipeLogHandler(send))
+    root_logger.setLevel(log_level)
+
+    current = {"task": 0, "token": CancellationToken(), "cancel_next": 0}
+    current_lock = threading.Lock()
+
+    def listen_for_cancellation() -> None:
+        """Cancel the current task's token when the parent asks for it."""
+        while True:
+            try:
+                _, task_number = control.recv()
+            except (EOFError, OSError):
+                return
+            with current_lock:
+                # Ignore a request that arrived after its task finished; keep
+                # one that overtook its task on the other pipe
+                if task_number == current["task"]:
+                    current["token"].cancel()
+                elif task_number > current["task"]:
+                    current["cancel_next"] = task_number
+
+    threading.Thread(target=listen_for_cancellation, name="CancellationListener",
+                     daemon=True).start()
+
+    def progress_callback(value: int, message: Optional[str] = None) -> None:
+        """Send a progress update to the parent, which throttles them."""
+        send(("progress", value, message))
+
+    def send_error(error: Exception) -> None:
+        """Send an error to the parent, as text if it cannot be pickled."""
+        details = traceback.format_exc()
+        try:
+            send(("error", error, details))
+        except Exception:
+            send(("error", RuntimeError(f"{type(error).__name__}: {error}"), details))
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        except Exception as e:
+            send_error(e)
+            continue
+        if message[0] == "stop":
+            break
+
+        _, task_number, task_func, args, kwargs, callback_names = message
+        with current_lock:
+            current["task"] = task_number
+            current["token"] = token = CancellationToken()
+            if current["cancel_next"] == task_number:
+                token.cancel()
+
+        if "progress_callback" in callback_names:
+            kwargs["progress_callback"] = progress_callback
+        if "cancellation_check" in callback_names:
+            kwargs["cancellation_check"] = token
+
+        try:
+            result = task_func(*args, **kwargs)
+        except Exception as e:
+            send_error(e)
+            continue
+        try:
+            send(("result", result))
+        except Exception as e:
+            send_error(RuntimeError(f"Task result could not be sent to the parent process: {e}"))
+
+
+class ProcessTaskRunner:
+    """
+    Runs tasks one at a time in a child process.
+
+    The child is started on first use and replaced after
+    ``max_tasks_per_child`` tasks (so the memory a task used is returned to
+    the operating system), or when it dies. Progress updates and log records
+    are relayed from the child over a pipe, and a cancellation request is
+    sent to the child over a second pipe, where it cancels the
+    CancellationToken the task received as its ``cancellation_check``.
+
+    Task functions, their arguments and their results must be picklable, so
+    tasks have to be module-level functions.
+    """
+
+    def __init__(self, max_tasks_per_child: Optional[int] = 10,
+                logger: Optional[logging.Logger] = None,
+                poll_interval: float = 0.05):
+        """
+        Initialize the runner.
+
+        Args:
+            max_tasks_per_child: Tasks a child process runs before it is
+                replaced; None keeps the child for the runner's lifetime
+            logger: Logger instance; records logged in the child at or above
+                its level are handled by the same-named loggers in this process
+            poll_interval: Seconds between cancellation checks while a task runs
+        """
+        self.max_tasks_per_child = max_tasks_per_child
+        self.logger = logger or logging.getLogger(__name__)
+        self.poll_interval = poll_interval
+        # Spawn on every platform: forking a process that runs Tk and worker
+        # threads is not safe
+        self.context = multiprocessing.get_context("spawn")
+        self.process = None
+        self.tasks_run = 0
+        self.busy = False
+        self._conn = None
+        self._control = None
+        self._task_numbers = itertools.count(1)
+
+    @property
+    def pid(self) -> Optional[int]:
+        """The process ID of the current child process, if one is running."""
+        return self.process.pid if self.process is not None else None
+
+    def run(self, task_func: Callable[..., Any],
+            args: Tuple = (),
+            kwargs: Optional[Dict[str, Any]] = None,
+            progress_callback: Optional[Callable[[int, Optional[str]], None]] = None,
+            cancellation_check: Optional[Callable[[], bool]] = None) -> Any:
+        """
+        Run a task in the child process and wait for its result.
+
+        Args:
+            task_func: Module-level function to run
+            args: Positional arguments to pass to the function
+            kwargs: Keyword arguments to pass to the function
+            progress_callback: Callback receiving the task's progress updates;
+                when given, the task receives a ``progress_callback`` argument
+            cancellation_check: Cancellation check of the task; when given,
+                the task receives a CancellationToken that is cancelled once
+                this check returns True. A CancellationToken is relayed as
+                soon as it is cancelled; other checks are polled
+
+        Returns:
+            Any: The task's result
+
+        Raises:
+            TypeError: If the task or its arguments cannot be pickled
+            RuntimeError: If the child process died during the task
+            Exception: Any exception raised by the task
+        """
+        callback_names = tuple(
+            name for name, callback in (("progress_callback", progress_callback),
+                                        ("cancellation_check", cancellation_check))
+            if callback is not None
+        )
+        if self.process is None or not self.process.is_alive():
+            self._discard()
+            self._start()
+
+        task_number = next(self._task_numbers)
+        try:
+            self._conn.send(("run", task_number, task_func, tuple(args), dict(kwargs or {}),
+                             callback_names))
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            raise TypeError(
+                f"Tasks run in a worker process must be picklable module-level functions: {e}"
+            ) from e
+
+        self.busy = True
+        try:
+            return self._wait_for_result(task_number, progress_callback, cancellation_check)
+        finally:
+            self.busy = False
+            self.tasks_run += 1
+            if (self.process is not None and self.max_tasks_per_child
+                    and self.tasks_run >= self.max_tasks_per_child):
+                self.logger.debug(f"Recycling worker process {self.pid} "
+                                  f"after {self.tasks_run} tasks")
+                self.close()
+
+    def close(self) -> None:
+        """
+        Stop the child process.
+
+        An idle child is asked to exit; a child still running a task is
+        terminated.
+
+        Returns:
+            None
+        """
+        if self.process is None:
+            return
+        if not self.busy and self.process.is_alive():
+            try:
+                self._conn.send(("stop",))
+                self.process.join(timeout=2.0)
+            except (OSError, ValueError):
+                pass
+        self._discard()
+
+    def _start(self) -> None:
+        """Start a new child process."""
+        conn, child_conn = self.context.Pipe()
+        control_reader, control = self.context.Pipe(duplex=False)
+        self.process = self.context.Process(
+            target=_run_child_tasks,
+            args=(child_conn, control_reader, self.logger.getEffectiveLevel()),
+            name="BackgroundWorkerProcess",
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        control_reader.close()
+        self._conn, self._control = conn, control
+        self.tasks_run = 0
+        self.logger.debug(f"Started worker process {self.process.pid}")
+
+    def _discard(self) -> None:
+        """Terminate the child process, if any, and close its pipes."""
+        if self.process is not None:
+            if self.process.is_alive():
+                self.process.terminate()
+            self.process.join(timeout=2.0)
+            self.logger.debug(f"Worker process {self.process.pid} stopped")
+        for connection in (self._conn, self._control):
+            if connection is not None:
+                connection.close()
+        self.process = None
+        self._conn = None
+        self._control = None
+
+    def _wait_for_result(self, task_number: int,
+                         progress_callback: Optional[Callable[[int, Optional[str]], None]],
+                         cancellation_check: Optional[Callable[[], bool]]) -> Any:
+        """
+        Relay the child's messages until the task finishes.
+
+        Args:
+            task_number: Number the task was sent to the child with
+            progress_callback: Callback receiving the task's progress updates
+            cancellation_check: Cancellation check of the task
+
+        Returns:
+            Any: The task's result
+        """
+        # close() may run on another thread and reset the attributes
+        process, conn, control = self.process, self._conn, self._control
+        cancel_lock = threading.Lock()
+        cancel_state = {"running": True, "sent": False}
+
+        def send_cancel() -> None:
+            """Ask the child to cancel the task, once, while it is still running."""
+            with cancel_lock:
+                if cancel_state["running"] and not cancel_state["sent"]:
+                    cancel_state["sent"] = True
+                    try:
+                        control.send(("cancel", task_number))
+                    except (OSError, ValueError):
+                        pass
+
+        if isinstance(cancellation_check, CancellationToken):
+            cancellation_check.add_callback(send_cancel)
+        try:
+            while True:
+                try:
+                    if (not cancel_state["sent"] and cancellation_check is not None
+                            and cancellation_check()):
+                        send_cancel()
+                    if not conn.poll(self.poll_interval):
+                        if process.is_alive():
+                            continue
+                        raise EOFError
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    process.join(timeout=1.0)
+                    exit_code = process.exitcode
+                    self._discard()
+                    raise RuntimeError(
+                        f"Worker process exited unexpectedly (exit code {exit_code})")
+                except Exception as e:
+                    raise RuntimeError(
+                        f"Could not read a message from the worker process: {e}") from e
+
+                kind = message[0]
+                if kind == "progress":
+                    if progress_callback:
+                        progress_callback(message[1], message[2])
+                elif kind == "log":
+                    record = logging.makeLogRecord(message[1])
+                    logging.getLogger(record.name).handle(record)
+                elif kind == "result":
+                    return message[1]
+                elif kind == "error":
+                    _, error, details = message
+                    self.logger.debug(f"Worker process traceback:\n{details}")
+                    raise error
+        finally:
+            with cancel_lock:
+                cancel_state["running"] = False
+
+
+class TaskFuture(Future):
+    """
+    A ``concurrent.futures.Future`` for a task queued on a BackgroundWorker
+    or added to a TaskManager.
+
+    It works with ``concurrent.futures.wait`` and ``as_completed``, and
+    carries the ID of its task.
+    """
+
+    def __init__(self, task_id: str, canceller: Optional[Callable[[str], Any]] = None):
+        """
+        Initialize the future.
+
+        Args:
+            task_id: ID of the task
+            canceller: Function cancelling the task by ID
+        """
+        super().__init__()
+        self.task_id = task_id
+        self._canceller = canceller
+
+    def cancel(self) -> bool:
+        """
+        Cancel the task.
+
+        A task that has not started is never run. A running task is asked to
+        stop through its cancellation token; its future then holds whatever
+        the task ends with.
+
+        Returns:
+            bool: True if the future was cancelled before the task started
+        """
+        if self._canceller is not None and not self.done():
+            self._canceller(self.task_id)
+        return super().cancel()
+
+    def __repr__(self) -> str:
+        return f"<TaskFuture {self.task_id} {self._state.lower()}>"
+
+
+def _resolve_future(
+    future: Optional[Future],
+    success: bool,
+    result: Any,
+    error: Optional[Exception]
+) -> None:
+    """
+    Store the outcome of a task in its future, unless it already has one.
+
+    A future of a task that never started is cancelled instead of holding
+    a CancelledError.
+
+    Args:
+        future: The task's future, if any
+        success: Whether the task completed successfully
+        result: Result of the task
+        error: Any error that occurred during task execution
+    """
+    if future is None or future.done():
+        return
+    if success:
+        future.set_result(result)
+    elif isinstance(error, CancelledError) and not future.running():
+        Future.cancel(future)
+    else:
+        future.set_exception(error)
+
+
+class QueuedTask(NamedTuple):
+    """A task waiting in the BackgroundWorker queue."""
+
+    task_func: Callable[..., Any]
+    args: Tuple
+    kwargs: Dict[str, Any]
+    task_name: str
+    task_id: str
+    on_progress: Optional[Callable[[int, Optional[str]], None]] = None
+    on_complete: Optional[Callable[[bool, Any, Optional[Exception]], None]] = None
+    on_start: Optional[Callable[[], None]] = None
+    queued_at: float = 0.0
+    priority: int = 1  # Index into PRIORITY_LEVELS
+    fingerprint: Optional[str] = None  # Set for tasks queued with coalesce=True
+    coalesced: Optional[List[Callable[[bool, Any, Optional[Exception]], None]]] = None
+    future: Optional[TaskFuture] = None
 
 
 class BackgroundWorker:
     """
-    A background worker that runs operations in a separate thread.
+    A background worker that runs operations in separate threads.
     
     This allows the GUI to remain responsive during long-running operations.
     The worker handles task queuing, status updates, and error reporting.
+    Up to ``max_workers`` tasks run at the same time, each on its own worker
+    thread. With the "process" execution backend, each worker thread hands
+    its tasks to its own child process (see ProcessTaskRunner), so CPU-bound
+    tasks also run in parallel.
+
+    Queued tasks are taken by priority, then in the order they were queued.
+    Cancelling a queued task only marks its queue entry as stale; the entry
+    is dropped, and its completion callbacks receive a CancelledError, when
+    a worker thread reaches it. With ``max_queue_size``, ``overflow_policy``
+    decides what happens to a task queued while the queue is full.
     """
     
     def __init__(self, on_progress: Optional[Callable[[int, str], None]] = None,
                 on_complete: Optional[Callable[[bool, Any, Optional[Exception]], None]] = None,
                 on_message: Optional[Callable[[str, str], None]] = None,
-                logger: Optional[logging.Logger] = None):
+                logger: Optional[logging.Logger] = None,
+                execution_backend: str = "thread",
+                max_tasks_per_child: Optional[int] = 10,
+                max_workers: int = 1,
+                max_queue_size: Optional[int] = None,
+                overflow_policy: str = "block"):
         """
         Initialize the background worker.
         
         Args:
             on_progress: Callback function for progress updates (value, message)
-            on_complete: Callback function for task completion (success, result, error)
+                of every task
+            on_complete: Callback function for completion (success, result, error)
+                of every task
             on_message: Callback function for status messages (message, level)
             logger: Logger instance for logging
+            execution_backend: "thread" to run tasks on the worker threads, or
+                "process" to run them in child processes
+            max_tasks_per_child: With the "process" backend, tasks a child
+                process runs before it is replaced
+            max_workers: Number of tasks that can run at the same time
+            max_queue_size: Maximum number of waiting tasks, or None for no limit
+            overflow_policy: With a full queue, "block" waits for a free slot
+                (a task queued from one of the worker threads, such as by a
+                completion callback, is queued over the limit instead, since
+                that thread is the one that would free the slot),
+                "reject" raises queue.Full, and "drop_lowest" cancels the newest
+                queued task of the lowest priority if it ranks below the new
+                task (and otherwise raises queue.Full)
         """
-        self.task_queue = queue.Queue()
+        if execution_backend not in EXECUTION_BACKENDS:
+            raise ValueError(
+                f"Unknown execution backend '{execution_backend}'; "
+                f"expected one of: {', '.join(EXECUTION_BACKENDS)}"
+            )
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(
+                f"Unknown overflow policy '{overflow_policy}'; "
+                f"expected one of: {', '.join(OVERFLOW_POLICIES)}"
+            )
+        if max_queue_size is not None and max_queue_size < 1:
+            raise ValueError("max_queue_size must be at least 1")
+        # Entries are (priority, sequence, task); the sequence keeps equal
+        # priorities in queuing order
+        self.task_queue = queue.PriorityQueue()
         self.on_progress = on_progress
         self.on_complete = on_complete
         self.on_message = on_message
         self.logger = logger or logging.getLogger(__name__)
         self.running = False
         self.stopping = False
-        self.current_task = None
-        self.worker_thread = None
-        self.last_progress_time = 0
-        self.progress_throttle = 0.05  # 50ms minimum between progress updates
-        self.task_cancellation_flags = {}  # Track cancellation flags by task ID
+        self.max_workers = max_workers
+        self.worker_threads: List[threading.Thread] = []
+        self.active_tasks: Dict[str, str] = {}  # task ID -> name of the running tasks
+        self.progress_throttle = 0.05  # 50ms minimum between progress updates of a task
+        # Cancellation token by task ID
+        self.task_cancellation_flags: Dict[str, CancellationToken] = {}
+        self.execution_backend = execution_backend
+        self.process_runners: List[ProcessTaskRunner] = []
+        if execution_backend == "process":
+            self.process_runners = [
+                ProcessTaskRunner(max_tasks_per_child, self.logger) for _ in range(max_workers)
+            ]
+        self.start_latencies = collections.deque(maxlen=1000)  # Seconds from queuing to start
+        self.cancel_latencies = collections.deque(maxlen=1000)  # Seconds from cancel to task end
+        self.max_queue_size = max_queue_size
+        self.overflow_policy = overflow_policy
+        self.queued_tasks: Dict[str, QueuedTask] = {}  # Task ID -> live queue entry
+        self.fingerprints: Dict[str, QueuedTask] = {}  # Fingerprint -> queued or running task
+        self._state_lock = threading.Lock()
+        self._queue_space = threading.Condition(self._state_lock)
+        self._task_counter = itertools.count(1)
+        self._sequence = itertools.count()
+
+    @property
+    def current_task(self) -> Optional[str]:
+        """The name of a running task, or None; see ``active_tasks`` for all of them."""
+        with self._state_lock:
+            return next(iter(self.active_tasks.values()), None)
+
+    @property
+    def queue_depth(self) -> int:
+        """The number of tasks waiting for a free worker, not counting cancelled ones."""
+        return len(self.queued_tasks)
 
     def start(self) -> None:
         """
-        Start the worker thread if it's not already running.
+        Start the worker threads if they're not already running.
         
         Returns:
             None
@@ -58,74 +642,237 @@ class BackgroundWorker:
         if not self.running:
             self.running = True
             self.stopping = False
-            self.worker_thread = threading.Thread(target=self._process_queue, daemon=True)
-            self.worker_thread.start()
-            self.logger.debug("Background worker started")
+            self.worker_threads = [
+                threading.Thread(target=self._process_queue, args=(index,),
+                                 name=f"BackgroundWorker-{index}", daemon=True)
+                for index in range(self.max_workers)
+            ]
+            for thread in self.worker_threads:
+                thread.start()
+            self.logger.debug(f"Background worker started with {self.max_workers} worker(s)")
 
-    def stop(self) -> None:
+    def stop(self, mode: str = "abort", timeout: Optional[float] = None) -> bool:
         """
-        Stop the worker thread.
+        Stop the worker threads and wait for them to exit.
         
+        In "drain" mode, every task already queued runs first. In "abort"
+        mode, queued tasks are discarded (their completion callbacks receive a
+        CancelledError), running tasks are marked for cancellation and child
+        processes are terminated.
+
+        Args:
+            mode: "drain" or "abort"
+            timeout: Maximum seconds to wait for the worker threads, or None
+                to wait until they exit
+
         Returns:
-            None
+            bool: True if every worker thread has exited
         """
-        if self.running:
-            self.stopping = True
-            self.running = False
-            if self.worker_thread and self.worker_thread.is_alive():
-                self.worker_thread.join(timeout=1.0)
+        if mode not in STOP_MODES:
+            raise ValueError(f"Unknown stop mode '{mode}'; "
+                             f"expected one of: {', '.join(STOP_MODES)}")
+        if not self.running:
+            return True
+
+        self.stopping = True
+        self.running = False
+        if mode == "abort":
+            self._discard_queued_tasks()
+            for task_id in list(self.active_tasks):
+                self.cancel_task(task_id)
+            for runner in self.process_runners:
+                runner.close()
+
+        # Wake every worker thread once the tasks ahead of the sentinels are done
+        for _ in self.worker_threads:
+            self.task_queue.put((math.inf, next(self._sequence), _STOP_SENTINEL))
+        deadline = None if timeout is None else time.time() + timeout
+        for thread in self.worker_threads:
+            thread.join(None if deadline is None else max(deadline - time.time(), 0))
+
+        for runner in self.process_runners:
+            runner.close()
+        stopped = not any(thread.is_alive() for thread in self.worker_threads)
+        if stopped:
             self.logger.debug("Background worker stopped")
+        else:
+            self.logger.warning(f"Background worker threads still running after {timeout}s")
+        return stopped
 
     def queue_task(self, task_func: Callable[..., Any], 
                   args: Optional[Tuple] = None, 
                   kwargs: Optional[Dict[str, Any]] = None,
                   task_name: Optional[str] = None,
-                  task_id: Optional[str] = None) -> str:
+                  task_id: Optional[str] = None,
+                  on_progress: Optional[Callable[[int, Optional[str]], None]] = None,
+                  on_complete: Optional[Callable[[bool, Any, Optional[Exception]], None]] = None,
+                  on_start: Optional[Callable[[], None]] = None,
+                  priority: str = "normal",
+                  coalesce: bool = False) -> TaskFuture:
         """
         Queue a task to be executed in the background.
         
+        With ``coalesce``, a submission identical to a task that is queued or
+        running (see task_fingerprint) is not queued again: the existing
+        task's future is returned and ``on_complete`` is called when it finishes.
+
         Args:
             task_func: The function to execute
             args: Positional arguments to pass to the function
             kwargs: Keyword arguments to pass to the function
             task_name: Optional name for the task (for logging)
             task_id: Optional unique identifier for the task
+            on_progress: Optional callback for this task's progress updates
+                (value, message), called in addition to the worker's
+            on_complete: Optional callback for this task's completion
+                (success, result, error), called before the worker's
+            on_start: Optional callback called when a worker starts the task
+            priority: One of PRIORITY_LEVELS
+            coalesce: Whether to merge this submission into an identical one
             
         Returns:
-            str: The task ID assigned to this task
+            TaskFuture: The task's future; its ``task_id`` is the ID assigned to the task
+
+        Raises:
+            queue.Full: If the queue is full and the overflow policy rejects the task
         """
+        if priority not in PRIORITY_LEVELS:
+            raise ValueError(f"Unknown priority '{priority}'; "
+                             f"expected one of: {', '.join(PRIORITY_LEVELS)}")
         args = args or ()
         kwargs = kwargs or {}
         task_name = task_name or task_func.__name__
+        rank = PRIORITY_LEVELS.index(priority)
+        # Hash the input files before taking the lock
+        fingerprint = task_fingerprint(task_func, args, kwargs) if coalesce else None
         
         # Generate a task ID if not provided
         if task_id is None:
-            task_id = f"task_{time.time()}_{id(task_func)}"
-        
-        # Create cancellation flag for this task
-        self.task_cancellation_flags[task_id] = False
+            task_id = f"task_{time.time()}_{id(task_func)}_{next(self._task_counter)}"
         
-        self.task_queue.put((task_func, args, kwargs, task_name, task_id))
-        self.logger.debug(f"Queued task: {task_name} (ID: {task_id})")
+        with self._state_lock:
+            existing = self.fingerprints.get(fingerprint) if fingerprint else None
+            if existing is not None:
+                if on_complete:
+                    existing.coalesced.append(on_complete)
+                self.logger.debug(f"Coalesced task {task_name} into queued or running "
+                                  f"task {existing.task_id}")
+                return existing.future
+            self._wait_for_queue_space(rank, task_name)
+
+            task = QueuedTask(
+                task_func, args, kwargs, task_name, task_id, on_progress, on_complete, on_start,
+                time.perf_counter(), rank, fingerprint, [], TaskFuture(task_id, self.cancel_task)
+            )
+            # Create the cancellation token for this task
+            self.task_cancellation_flags[task_id] = CancellationToken()
+            self.queued_tasks[task_id] = task
+            if fingerprint:
+                self.fingerprints[fingerprint] = task
+            self.task_queue.put((rank, next(self._sequence), task))
+        self.logger.debug(f"Queued task: {task_name} (ID: {task_id}, priority: {priority}, "
+                          f"queue depth: {self.queue_depth})")
         
         # Make sure the worker is running
         if not self.running:
             self.start()
             
-        return task_id
+        return task.future
 
-    def cancel_task(self, task_id: str) -> bool:
+    def _wait_for_queue_space(self, rank: int, task_name: str) -> None:
+        """
+        Apply the overflow policy until the queue has room for another task.
+
+        Must be called with the state lock held.
+
+        Args:
+            rank: Priority rank of the task being queued
+            task_name: Name of the task being queued (for messages)
+
+        Returns:
+            None
+
+        Raises:
+            queue.Full: If the overflow policy rejects the task
+        """
+        while self.max_queue_size is not None and len(self.queued_tasks) >= self.max_queue_size:
+            if self.overflow_policy == "block":
+                if threading.current_thread() in self.worker_threads:
+                    self.logger.debug(f"Queue full; queuing {task_name} from a worker thread "
+                                      "over the limit")
+                    return
+                self._queue_space.wait()
+                continue
+            if self.overflow_policy == "drop_lowest":
+                victim = max(self.queued_tasks.values(),
+                             key=lambda task: (task.priority, task.queued_at))
+                if victim.priority > rank:
+                    self.logger.warning(f"Queue full; dropping task {victim.task_name} "
+                                        f"(ID: {victim.task_id})")
+                    self._cancel_queued_task(victim)
+                    continue
+            raise queue.Full(f"Task queue is full ({self.max_queue_size} tasks); "
+                             f"{task_name} was not queued")
+
+    def _cancel_queued_task(self, task: QueuedTask) -> None:
+        """
+        Mark a queued task's entry as stale so that no worker runs it.
+
+        Must be called with the state lock held.
+
+        Args:
+            task: The queued task
+
+        Returns:
+            None
+        """
+        del self.queued_tasks[task.task_id]
+        if task.fingerprint and self.fingerprints.get(task.fingerprint) is task:
+            del self.fingerprints[task.fingerprint]
+        token = self.task_cancellation_flags.get(task.task_id)
+        if token is not None:
+            token.cancel()
+        self._queue_space.notify()
+
+    def _forget_stale_entry(self, task: QueuedTask) -> None:
+        """
+        Drop the cancellation token of a cancelled task whose entry left the queue.
+
+        Must be called with the state lock held.
+
+        Args:
+            task: The task of the stale entry
+
+        Returns:
+            None
+        """
+        if task.task_id not in self.queued_tasks and task.task_id not in self.active_tasks:
+            self.task_cancellation_flags.pop(task.task_id, None)
+
+    def cancel_task(self, task_id: Union[str, TaskFuture]) -> bool:
         """
         Mark a specific task for cancellation.
         
+        A queued task is never started; a running task sees its cancellation
+        token set.
+
         Args:
-            task_id: The ID of the task to cancel
+            task_id: The ID of the task to cancel, or its future
             
         Returns:
             bool: True if the task was found and marked for cancellation, False otherwise
         """
-        if task_id in self.task_cancellation_flags:
-            self.task_cancellation_flags[task_id] = True
+        if isinstance(task_id, TaskFuture):
+            task_id = task_id.task_id
+        with self._state_lock:
+            task = self.queued_tasks.get(task_id)
+            if task is not None:
+                self._cancel_queued_task(task)
+                self.logger.debug(f"Queued task cancelled: {task_id}")
+                return True
+            token = self.task_cancellation_flags.get(task_id)
+        if token is not None:
+            token.cancel()
             self.logger.debug(f"Task marked for cancellation: {task_id}")
             return True
         return False
@@ -140,119 +887,145 @@ class BackgroundWorker:
         Returns:
             bool: True if the task is marked for cancellation, False otherwise
         """
-        return self.task_cancellation_flags.get(task_id, False)
+        token = self.task_cancellation_flags.get(task_id)
+        return token is not None and token.cancelled
     
     def clear_cancelled_tasks(self) -> None:
         """
-        Remove all cancelled tasks from the queue.
+        Remove the entries of cancelled tasks from the queue now.
+
+        Cancelled entries are otherwise dropped when a worker thread reaches
+        them; this reports them as cancelled without waiting for a free worker.
         
         Returns:
             None
         """
-        new_queue = queue.Queue()
-        cancelled_count = 0
+        with self._state_lock:
+            removed = self._remove_queued_tasks(
+                lambda task: self.queued_tasks.get(task.task_id) is not task)
+        for task in removed:
+            self.logger.debug(f"Removed cancelled task from queue: {task.task_name} "
+                              f"(ID: {task.task_id})")
+            self._complete(task, False, None,
+                           CancelledError(f"Task {task.task_name} was cancelled"))
+        self.logger.debug(f"Cleared {len(removed)} cancelled tasks from queue")
+
+    def _remove_queued_tasks(self, predicate: Callable[[QueuedTask], bool]) -> List[QueuedTask]:
+        """
+        Remove the queue entries whose tasks match a predicate, in place.
         
-        # Move all non-cancelled tasks to a new queue
-        while not self.task_queue.empty():
-            try:
-                task = self.task_queue.get(block=False)
-                task_id = task[4]  # Extract task_id from tuple
-                
-                if not self.is_task_cancelled(task_id):
-                    new_queue.put(task)
-                else:
-                    cancelled_count += 1
-                    self.logger.debug(f"Removed cancelled task from queue: {task[3]} (ID: {task_id})")
-            except queue.Empty:
-                break
+        The queue object is kept, since the worker threads block on it. Must
+        be called with the state lock held.
         
-        self.task_queue = new_queue
-        self.logger.debug(f"Cleared {cancelled_count} cancelled tasks from queue")
+        Args:
+            predicate: Function selecting the tasks to remove
 
-    def _process_queue(self) -> None:
+        Returns:
+            List[QueuedTask]: The removed tasks
+        """
+        with self.task_queue.mutex:
+            entries = self.task_queue.queue
+            kept = [entry for entry in entries
+                    if entry[2] is _STOP_SENTINEL or not predicate(entry[2])]
+            removed = [entry[2] for entry in entries
+                       if entry[2] is not _STOP_SENTINEL and predicate(entry[2])]
+            if removed:
+                entries[:] = kept
+                heapq.heapify(entries)
+                self.task_queue.unfinished_tasks -= len(removed)
+                if not self.task_queue.unfinished_tasks:
+                    self.task_queue.all_tasks_done.notify_all()
+        for task in removed:
+            if self.queued_tasks.get(task.task_id) is task:
+                self._cancel_queued_task(task)
+            self._forget_stale_entry(task)
+        return removed
+
+    def _discard_queued_tasks(self) -> None:
+        """
+        Remove every queued task and report it as cancelled.
+
+        Returns:
+            None
+        """
+        with self._state_lock:
+            removed = self._remove_queued_tasks(lambda task: True)
+        for task in removed:
+            self.logger.debug(f"Discarded queued task: {task.task_name} (ID: {task.task_id})")
+            self._complete(task, False, None, CancelledError(
+                f"Worker stopped before task {task.task_name} started"))
+
+    def _complete(
+        self,
+        task: QueuedTask,
+        success: bool,
+        result: Any,
+        error: Optional[Exception]
+    ) -> None:
         """
-        Process tasks from the queue until stopped.
+        Call the completion callbacks of a task and of the worker, then resolve its future.
         
+        Args:
+            task: The finished, cancelled or discarded task
+            success: Whether the task completed successfully
+            result: Result of the task
+            error: Any error that occurred during task execution
+
         Returns:
             None
         """
-        while self.running:
+        try:
+            if task.on_complete:
+                task.on_complete(success, result, error)
+            for callback in task.coalesced or ():
+                callback(success, result, error)
+            if self.on_complete:
+                self.on_complete(success, result, error)
+        finally:
+            _resolve_future(task.future, success, result, error)
+
+    def _process_queue(self, worker_index: int = 0) -> None:
+        """
+        Process tasks from the queue until a stop sentinel is taken.
+
+        Args:
+            worker_index: Index of this worker thread, which selects its child
+                process with the "process" backend
+
+        Returns:
+            None
+        """
+        runner = self.process_runners[worker_index] if self.process_runners else None
+        while True:
+            # Block until a task (or the stop sentinel) is queued
+            _, _, task = self.task_queue.get()
+            if task is _STOP_SENTINEL:
+                self.task_queue.task_done()
+                break
+            with self._state_lock:
+                live = self.queued_tasks.get(task.task_id) is task
+                if live:
+                    del self.queued_tasks[task.task_id]
+                    self._queue_space.notify()
+                else:
+                    self._forget_stale_entry(task)
+            if live and task.future is not None and not task.future.set_running_or_notify_cancel():
+                # The future was cancelled just after its entry was taken
+                live = False
+                with self._state_lock:
+                    if task.fingerprint and self.fingerprints.get(task.fingerprint) is task:
+                        del self.fingerprints[task.fingerprint]
+                    self._forget_stale_entry(task)
             try:
-                # Get a task from the queue with a timeout
-                try:
-                    task_func, args, kwargs, task_name, task_id = self.task_queue.get(timeout=0.5)
-                except queue.Empty:
-                    continue
-                
-                self.current_task = task_name
-                self.logger.info(f"Starting task: {task_name} (ID: {task_id})")
-                
-                # Send starting message
-                if self.on_message:
-                    self.on_message(f"Starting task: {task_name}", "info")
-                
-                # Create a progress callback that will throttle updates
-                def progress_callback(value: int, message: Optional[str] = None) -> None:
-                    """Throttled progress callback to avoid GUI freezing."""
-                    now = time.time()
-                    if now - self.last_progress_time >= self.progress_throttle:
-                        if self.on_progress:
-                            self.on_progress(value, message)
-                        self.last_progress_time = now
-                
-                # Add a cancellation check function
-                def check_cancelled() -> bool:
-                    """Check if this task has been cancelled."""
-                    return self.is_task_cancelled(task_id)
-                
-                # Execute the task
-                result = None
-                error = None
-                success = False
-                
-                try:
-                    # Add progress_callback to kwargs if task supports it
-                    if 'progress_callback' in kwargs or task_func.__code__.co_varnames.count('progress_callback') > 0:
-                        kwargs['progress_callback'] = progress_callback
-                    
-                    # Add cancellation_check to kwargs if task supports it
-                    if 'cancellation_check' in kwargs or task_func.__code__.co_varnames.count('cancellation_check') > 0:
-                        kwargs['cancellation_check'] = check_cancelled
-                    
-                    # Execute the task
-                    start_time = time.time()
-                    result = task_func(*args, **kwargs)
-                    elapsed_time = time.time() - start_time
-                    success = True
-                    
-                    self.logger.info(f"Task completed: {task_name} in {elapsed_time:.2f}s")
-                    if self.on_message:
-                        self.on_message(f"Task completed: {task_name} in {elapsed_time:.2f}s", "info")
-                        
-                except Exception as e:
-                    elapsed_time = time.time() - start_time
-                    error = e
-                    self.logger.error(f"Task failed: {task_name} after {elapsed_time:.2f}s - {str(e)}")
-                    self.logger.error(traceback.format_exc())
-                    if self.on_message:
-                        self.on_message(f"Task failed: {task_name} - {str(e)}", "error")
-                
-                finally:
-                    # Clean up cancellation flag
-                    if task_id in self.task_cancellation_flags:
-                        del self.task_cancellation_flags[task_id]
-                    
-                    # Mark the task as done
+                if live:
+                    self._run_task(task, runner)
+                else:
+                    # The task was cancelled while queued
                     self.task_queue.task_done()
-                    self.current_task = None
-                    
-                    # Send completion callback
-                    if self.on_complete:
-                        self.on_complete(success, result, error)
-                    
-                    # Send final progress update
-                    if self.on_progress and success:
-                        self.on_progress(100, "Completed")
+                    self.logger.debug(f"Skipped cancelled task: {task.task_name} "
+                                      f"(ID: {task.task_id})")
+                    self._complete(task, False, None,
+                                   CancelledError(f"Task {task.task_name} was cancelled"))
             
             except Exception as e:
                 # Log any unexpected errors in the worker thread
@@ -264,78 +1037,142 @@ class BackgroundWorker:
         
         self.logger.debug("Worker thread exiting")
 
-
-class ProgressTracker:
-    """
-    Tracks progress across multiple sequential tasks.
-    
-    This class allows dividing total progress (0-100) across multiple 
-    sequential operations, each with their own progress range.
-    """
-    
-    def __init__(self, stages: List[Tuple[str, int]], 
-                on_progress: Optional[Callable[[int, str], None]] = None):
+    def _run_task(self, task: QueuedTask, runner: Optional[ProcessTaskRunner]) -> None:
         """
-        Initialize the progress tracker.
+        Run one task and report its progress and completion.
         
         Args:
-            stages: List of (stage_name, weight) tuples, where weight is the 
-                  relative importance of each stage in the overall progress
-            on_progress: Callback function for progress updates (value, message)
-        """
-        self.stages = stages
-        self.on_progress = on_progress
-        self.current_stage = 0
-        self.total_weight = sum(weight for _, weight in stages)
-        self.completed_weight = 0
-    
-    def next_stage(self) -> None:
-        """
-        Move to the next stage.
-        
+            task: The task to run
+            runner: Child process to run the task in, or None to run it on this thread
+
         Returns:
             None
         """
-        if self.current_stage < len(self.stages):
-            _, weight = self.stages[self.current_stage]
-            self.completed_weight += weight
-            self.current_stage += 1
-    
-    def update(self, stage_progress: int, message: Optional[str] = None) -> None:
+        task_func, args, kwargs, task_name, task_id = task[:5]
+        start_latency = time.perf_counter() - task.queued_at
+        with self._state_lock:
+            self.active_tasks[task_id] = task_name
+            self.start_latencies.append(start_latency)
+        self.logger.info(f"Starting task: {task_name} (ID: {task_id})")
+        self.logger.debug(f"Task {task_id} started {start_latency * 1000:.1f}ms "
+                          "after it was queued")
+
+        # Send starting message
+        if task.on_start:
+            task.on_start()
+        if self.on_message:
+            self.on_message(f"Starting task: {task_name}", "info")
+
+        # Each task throttles its own progress updates, so parallel tasks do
+        # not drop each other's updates
+        last_progress_time = 0.0
+
+        def progress_callback(value: int, message: Optional[str] = None) -> None:
+            """Throttled progress callback to avoid GUI freezing."""
+            nonlocal last_progress_time
+            now = time.time()
+            if now - last_progress_time >= self.progress_throttle:
+                self._report_progress(task, value, message)
+                last_progress_time = now
+
+        # The task checks its token directly; checking it is a flag read
+        check_cancelled = self.task_cancellation_flags.get(task_id) or CancellationToken()
+
+        # Execute the task
+        result = None
+        error = None
+        success = False
+        start_time = time.time()
+
+        try:
+            # Check which callbacks the task supports
+            wants_progress = ('progress_callback' in kwargs
+                              or _accepts_argument(task_func, 'progress_callback'))
+            wants_cancellation = ('cancellation_check' in kwargs
+                                  or _accepts_argument(task_func, 'cancellation_check'))
+
+            if runner is not None:
+                # Run in the child process, which builds its own callbacks
+                kwargs = {key: value for key, value in kwargs.items()
+                          if key not in ('progress_callback', 'cancellation_check')}
+                result = runner.run(
+                    task_func, args, kwargs,
+                    progress_callback if wants_progress else None,
+                    check_cancelled if wants_cancellation else None
+                )
+            else:
+                if wants_progress:
+                    kwargs['progress_callback'] = progress_callback
+                if wants_cancellation:
+                    kwargs['cancellation_check'] = check_cancelled
+                result = task_func(*args, **kwargs)
+
+            elapsed_time = time.time() - start_time
+            success = True
+
+            self.logger.info(f"Task completed: {task_name} in {elapsed_time:.2f}s")
+            if self.on_message:
+                self.on_message(f"Task completed: {task_name} in {elapsed_time:.2f}s", "info")
+
+        except Exception as e:
+            elapsed_time = time.time() - start_time
+            error = e
+            self.logger.error(f"Task failed: {task_name} after {elapsed_time:.2f}s - {str(e)}")
+            self.logger.error(traceback.format_exc())
+            if self.on_message:
+                self.on_message(f"Task failed: {task_name} - {str(e)}", "error")
+
+        finally:
+            # Record how long the task took to stop after it was cancelled
+            cancel_latency = check_cancelled.seconds_since_cancel()
+            if cancel_latency is not None:
+                with self._state_lock:
+                    self.cancel_latencies.append(cancel_latency)
+                self.logger.info(f"Task {task_name} stopped {cancel_latency * 1000:.0f}ms "
+                                 "after it was cancelled")
+
+            # Clean up cancellation token
+            self.task_cancellation_flags.pop(task_id, None)
+            with self._state_lock:
+                self.active_tasks.pop(task_id, None)
+                if task.fingerprint and self.fingerprints.get(task.fingerprint) is task:
+                    del self.fingerprints[task.fingerprint]
+
+            # Mark the task as done
+            self.task_queue.task_done()
+
+            # Send completion callbacks
+            self._complete(task, success, result, error)
+
+            # Send final progress update
+            if success:
+                self._report_progress(task, 100, "Completed")
+
+    def _report_progress(self, task: QueuedTask, value: int, message: Optional[str]) -> None:
         """
-        Update the progress for the current stage.
+        Send a progress update to the task's callback and the worker's.
         
         Args:
-            stage_progress: Progress within the current stage (0-100)
+            task: The task reporting progress
+            value: Progress value (0-100)
             message: Optional message to display
             
         Returns:
             None
         """
-        if self.current_stage < len(self.stages):
-            stage_name, stage_weight = self.stages[self.current_stage]
-            
-            # Calculate overall progress
-            stage_contribution = (stage_progress / 100.0) * stage_weight
-            overall_progress = int(
-                ((self.completed_weight + stage_contribution) / self.total_weight) * 100
-            )
-            
-            # Ensure progress is bounded
-            overall_progress = max(0, min(100, overall_progress))
-            
-            # Update display message
-            if message is None:
-                if stage_progress == 100:
-                    display_message = f"Completed: {stage_name}"
-                else:
-                    display_message = f"{stage_name}: {stage_progress}%"
-            else:
-                display_message = message
-            
-            # Report progress
-            if self.on_progress:
-                self.on_progress(overall_progress, display_message)
+        if task.on_progress:
+            task.on_progress(value, message)
+        if self.on_progress:
+            self.on_progress(value, message)
+
+
+class WorkflowTiming(NamedTuple):
+    """Timing of a finished TaskManager workflow."""
+
+    wall_seconds: float
+    task_seconds: Dict[str, float]
+    critical_path: List[str]
+    critical_path_seconds: float
 
 
 class TaskManager:
@@ -343,7 +1180,19 @@ class TaskManager:
     Manages multiple background tasks with dependencies.
     
     This class allows for defining a workflow of tasks with dependencies,
-    where some tasks can only start after others have completed.
+    where some tasks can only start after others have completed. The
+    workflow is scheduled as a DAG: each task counts its unfinished
+    dependencies, and every task whose count reaches zero is queued at once,
+    so independent tasks run in parallel on a worker with several workers.
+    When a task fails or is cancelled, the tasks that depend on it are not
+    run. Each task's result is passed to its dependants as the keyword
+    argument ``<task_id>_result``.
+
+    Task status is one of "pending", "running", "cancelling" (cancelled while
+    running, until the task returns), "completed", "failed", "cancelled" or
+    "skipped" (a dependency failed). add_task returns a
+    TaskFuture for each task; the futures of cancelled and skipped tasks that
+    never started are cancelled.
     """
     
     def __init__(self, worker: BackgroundWorker, logger: Optional[logging.Logger] = None):
@@ -356,18 +1205,30 @@ class TaskManager:
         """
         self.worker = worker
         self.logger = logger or logging.getLogger(__name__)
-        self.tasks = {}  # task_id -> (task_func, args, kwargs, dependencies)
+        self.tasks = {}  # task_id -> (task_func, args, kwargs)
         self.results = {}  # task_id -> result
-        self.status = {}  # task_id -> "pending", "running", "completed", "failed"
-        self.dependencies = {}  # task_id -> [dependent_task_ids]
+        self.errors = {}  # task_id -> exception of failed tasks
+        self.status = {}  # task_id -> status, see the class docstring
+        self.prerequisites = {}  # task_id -> [task_ids it depends on]
+        self.dependents = {}  # task_id -> [task_ids that depend on it]
+        self.remaining = {}  # task_id -> number of unfinished dependencies
+        self.started_at = {}  # task_id -> time the task started
+        self.finished_at = {}  # task_id -> time the task finished
+        self.futures: Dict[str, TaskFuture] = {}  # task_id -> future of the task
+        self.workflow_started_at = None
+        self.timing: Optional[WorkflowTiming] = None
         self.lock = threading.Lock()  # For thread-safe operations on shared data
+        self._finished = threading.Event()
+        # Outcomes decided under the lock; futures are resolved after it is
+        # released, since their callbacks may call back into the manager
+        self._outcomes: List[Tuple[str, str, Any, Optional[Exception]]] = []
         
     def add_task(self, 
                 task_id: str, 
                 task_func: Callable[..., Any], 
                 args: Optional[Tuple] = None, 
                 kwargs: Optional[Dict[str, Any]] = None,
-                dependencies: Optional[List[str]] = None) -> None:
+                dependencies: Optional[List[str]] = None) -> TaskFuture:
         """
         Add a task to the workflow.
         
@@ -379,21 +1240,25 @@ class TaskManager:
             dependencies: List of task IDs that must complete before this task can run
             
         Returns:
-            None
+            TaskFuture: The future of the task's result
         """
         args = args or ()
         kwargs = kwargs or {}
-        dependencies = dependencies or []
+        dependencies = list(dependencies or [])
         
         with self.lock:
+            if task_id in self.tasks:
+                raise ValueError(f"Task already added: {task_id}")
             self.tasks[task_id] = (task_func, args, kwargs)
             self.status[task_id] = "pending"
+            self.prerequisites[task_id] = dependencies
+            self.dependents.setdefault(task_id, [])
+            self.futures[task_id] = future = TaskFuture(task_id, self.cancel_task)
             
             # Register dependencies
             for dep_id in dependencies:
-                if dep_id not in self.dependencies:
-                    self.dependencies[dep_id] = []
-                self.dependencies[dep_id].append(task_id)
+                self.dependents.setdefault(dep_id, []).append(task_id)
+        return future
                 
     def on_task_complete(self, task_id: str, success: bool, result: Any, error: Optional[Exception]) -> None:
         """
@@ -408,96 +1273,343 @@ class TaskManager:
         Returns:
             None
         """
+        dispatches = []
         with self.lock:
-            if success:
+            self.finished_at[task_id] = time.time()
+            if self.status.get(task_id) == "cancelling":
+                self.status[task_id] = "cancelled"
+                self.logger.debug(f"Cancelled task finished: {task_id}")
+                self._outcomes.append((task_id, "cancelled", None,
+                                       error or CancelledError(f"Task {task_id} was cancelled")))
+            elif success:
                 self.results[task_id] = result
                 self.status[task_id] = "completed"
+                self._outcomes.append((task_id, "completed", result, None))
                 self.logger.debug(f"Task completed successfully: {task_id}")
                 
-                # Check if any dependent tasks can now run
-                if task_id in self.dependencies:
-                    for dependent_id in self.dependencies[task_id]:
-                        self._check_and_queue_task(dependent_id)
+                # Queue the dependants whose last dependency this was
+                for dependent_id in self.dependents.get(task_id, []):
+                    self.remaining[dependent_id] -= 1
+                    if self.remaining[dependent_id] == 0 and self.status[dependent_id] == "pending":
+                        dispatches.append(self._dispatch(dependent_id))
             else:
                 self.status[task_id] = "failed"
+                self.errors[task_id] = error
+                self._outcomes.append((task_id, "failed", None, error))
                 self.logger.error(f"Task failed: {task_id}, Error: {error}")
-                
-    def _check_and_queue_task(self, task_id: str) -> None:
+                self._propagate(task_id, "skipped")
+            self._check_finished()
+        # Queue the ready dependants outside the lock; this also resolves the futures
+        self._queue_dispatched(dispatches)
+
+    def _resolve_futures(self) -> None:
         """
-        Check if all dependencies for a task are met and queue it if they are.
+        Store the outcomes decided under the lock in the tasks' futures.
+
+        Must be called without the lock held.
+
+        Returns:
+            None
+        """
+        with self.lock:
+            outcomes, self._outcomes = self._outcomes, []
+        for task_id, status, result, error in outcomes:
+            future = self.futures.get(task_id)
+            if future is None or future.done():
+                continue
+            if status == "completed":
+                future.set_result(result)
+            elif status == "failed":
+                future.set_exception(error)
+            elif not future.running():
+                Future.cancel(future)
+            elif error is not None:
+                # A running task that was cancelled; wait for it to finish otherwise
+                future.set_exception(error)
+
+    def _on_task_start(self, task_id: str) -> None:
+        """
+        Record the time a worker started a task.
         
         Args:
-            task_id: ID of the task to check
+            task_id: ID of the started task
             
         Returns:
             None
         """
-        # Check if all dependencies are completed
-        can_run = True
-        for dep_id, deps in self.dependencies.items():
-            if task_id in deps and self.status.get(dep_id) != "completed":
-                can_run = False
-                break
-                
-        if can_run and self.status.get(task_id) == "pending":
-            task_func, args, kwargs = self.tasks[task_id]
-            self.status[task_id] = "running"
-            
-            # Add result delivery from dependencies
-            for dep_id, deps in self.dependencies.items():
-                if task_id in deps and dep_id in self.results:
-                    # Pass dependency results in kwargs with key = dependency_task_id_result
-                    kwargs[f"{dep_id}_result"] = self.results[dep_id]
-            
-            # Queue the task
-            self.worker.queue_task(
-                task_func, 
-                args, 
-                kwargs, 
-                task_name=task_id,
-                task_id=task_id
+        with self.lock:
+            self.started_at[task_id] = time.time()
+        future = self.futures.get(task_id)
+        if future is not None and not future.done():
+            future.set_running_or_notify_cancel()
+
+    def _dispatch(self, task_id: str) -> Tuple[str, Callable[..., Any], Tuple, Dict[str, Any]]:
+        """
+        Mark a task whose dependencies have all completed as running.
+
+        The task is queued by _queue_dispatched() once the lock is released,
+        since queuing can block on a full queue. Must be called with the lock held.
+
+        Args:
+            task_id: ID of the task to queue
+
+        Returns:
+            Tuple: The task ID, function, positional and keyword arguments to queue
+        """
+        task_func, args, kwargs = self.tasks[task_id]
+        kwargs = dict(kwargs)
+
+        # Pass dependency results in kwargs with key = dependency_task_id_result
+        for dep_id in self.prerequisites[task_id]:
+            kwargs[f"{dep_id}_result"] = self.results[dep_id]
+
+        self.status[task_id] = "running"
+        return task_id, task_func, args, kwargs
+
+    def _queue_dispatched(
+        self,
+        dispatches: List[Tuple[str, Callable[..., Any], Tuple, Dict[str, Any]]]
+    ) -> None:
+        """
+        Queue the tasks marked as running by _dispatch() on the worker.
+
+        A task the worker does not accept fails, and its dependants are
+        skipped. Must be called without the lock held.
+
+        Args:
+            dispatches: The return values of _dispatch()
+
+        Returns:
+            None
+        """
+        for task_id, task_func, args, kwargs in dispatches:
+            try:
+                self.worker.queue_task(
+                    task_func,
+                    args,
+                    kwargs,
+                    task_name=task_id,
+                    task_id=task_id,
+                    on_complete=functools.partial(self.on_task_complete, task_id),
+                    on_start=functools.partial(self._on_task_start, task_id)
+                )
+            except Exception as e:
+                with self.lock:
+                    if self.status[task_id] == "cancelling":
+                        # Cancelled before it could be queued
+                        self.status[task_id] = "cancelled"
+                    else:
+                        self.status[task_id] = "failed"
+                        self.errors[task_id] = e
+                        self._outcomes.append((task_id, "failed", None, e))
+                        self.logger.error(f"Task could not be queued: {task_id}, Error: {e}")
+                        self._propagate(task_id, "skipped")
+                    self._check_finished()
+                continue
+            self.logger.debug(f"Queued task: {task_id}")
+            with self.lock:
+                cancelled = self.status[task_id] == "cancelling"
+            if cancelled:
+                # Cancelled between _dispatch() and queuing
+                self.worker.cancel_task(task_id)
+        self._resolve_futures()
+
+    def _propagate(self, task_id: str, status: str) -> None:
+        """
+        Give every pending task downstream of a task the given status.
+
+        Must be called with the lock held.
+
+        Args:
+            task_id: ID of the task that failed or was cancelled
+            status: Status for the pending dependants
+
+        Returns:
+            None
+        """
+        stack = list(self.dependents.get(task_id, []))
+        while stack:
+            dependent_id = stack.pop()
+            if self.status[dependent_id] == "pending":
+                self.status[dependent_id] = status
+                self._outcomes.append((dependent_id, status, None, None))
+                self.logger.debug(f"Task {status} because {task_id} did not complete: "
+                                  f"{dependent_id}")
+                stack.extend(self.dependents.get(dependent_id, []))
+
+    def _check_finished(self) -> None:
+        """
+        Record the workflow timing once no task is pending or running.
+
+        A cancelled task still counts as running until it has returned.
+        Must be called with the lock held.
+
+        Returns:
+            None
+        """
+        if self._finished.is_set() or any(
+            status in ("pending", "running", "cancelling") for status in self.status.values()
+        ):
+            return
+        self.timing = self._compute_timing()
+        if self.timing.critical_path:
+            self.logger.info(
+                f"Workflow finished in {self.timing.wall_seconds:.2f}s; critical path "
+                f"{' -> '.join(self.timing.critical_path)} "
+                f"({self.timing.critical_path_seconds:.2f}s)"
             )
-            self.logger.debug(f"Queued dependent task: {task_id}")
+        self._finished.set()
+
+    def _compute_timing(self) -> WorkflowTiming:
+        """
+        Compute the wall time and the critical path of the finished workflow.
+
+        The critical path is the chain of dependent tasks with the largest
+        total run time; it bounds how fast the workflow can finish however
+        many workers run it.
+
+        Returns:
+            WorkflowTiming: The workflow timing
+        """
+        task_seconds = {
+            task_id: self.finished_at[task_id] - self.started_at[task_id]
+            for task_id in self.finished_at if task_id in self.started_at
+        }
+
+        # Longest path ending at each task, in topological order
+        path_seconds: Dict[str, float] = {}
+        previous: Dict[str, Optional[str]] = {}
+        for task_id in self._topological_order():
+            if task_id not in task_seconds:
+                continue
+            best = max(
+                (dep_id for dep_id in self.prerequisites[task_id] if dep_id in path_seconds),
+                key=path_seconds.get,
+                default=None
+            )
+            path_seconds[task_id] = task_seconds[task_id] + (path_seconds[best] if best else 0.0)
+            previous[task_id] = best
+
+        critical_path = []
+        end = max(path_seconds, key=path_seconds.get, default=None)
+        node = end
+        while node is not None:
+            critical_path.append(node)
+            node = previous[node]
+        critical_path.reverse()
+
+        wall_seconds = time.time() - (self.workflow_started_at or time.time())
+        return WorkflowTiming(
+            wall_seconds, task_seconds, critical_path, path_seconds[end] if end else 0.0
+        )
+
+    def _topological_order(self) -> List[str]:
+        """
+        Order the tasks so that every task comes after its dependencies.
+
+        Returns:
+            List[str]: The task IDs in dependency order
+
+        Raises:
+            ValueError: If a dependency is unknown or the dependencies form a cycle
+        """
+        for task_id, deps in self.prerequisites.items():
+            unknown = [dep_id for dep_id in deps if dep_id not in self.tasks]
+            if unknown:
+                raise ValueError(f"Task {task_id} depends on unknown tasks: {', '.join(unknown)}")
+
+        in_degree = {task_id: len(deps) for task_id, deps in self.prerequisites.items()}
+        ready = [task_id for task_id, degree in in_degree.items() if degree == 0]
+        order = []
+        while ready:
+            task_id = ready.pop()
+            order.append(task_id)
+            for dependent_id in self.dependents.get(task_id, []):
+                in_degree[dependent_id] -= 1
+                if in_degree[dependent_id] == 0:
+                    ready.append(dependent_id)
+
+        if len(order) != len(self.tasks):
+            cycle = sorted(task_id for task_id, degree in in_degree.items() if degree > 0)
+            raise ValueError(f"Task dependencies form a cycle among: {', '.join(cycle)}")
+        return order
     
     def execute_workflow(self) -> None:
         """
-        Start executing the workflow by queuing tasks with no dependencies.
+        Start executing the workflow by queuing every task with no dependencies.
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: If a dependency is unknown or the dependencies form a cycle
+        """
+        with self.lock:
+            self._topological_order()
+            self._finished.clear()
+            self.timing = None
+            self.workflow_started_at = time.time()
+            self.remaining = {task_id: len(deps) for task_id, deps in self.prerequisites.items()}
+
+            ready = [task_id for task_id, count in self.remaining.items()
+                     if count == 0 and self.status[task_id] == "pending"]
+            dispatches = [self._dispatch(task_id) for task_id in ready]
+            self._check_finished()
+        self._queue_dispatched(dispatches)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until no task of the workflow is pending or running.
+
+        Cancelled tasks that were running are waited for until they return.
+
+        Args:
+            timeout: Maximum seconds to wait, or None to wait indefinitely
+
+        Returns:
+            bool: True if the workflow finished, False on timeout
+        """
+        return self._finished.wait(timeout)
+
+    def cancel_task(self, task_id: Union[str, TaskFuture]) -> None:
+        """
+        Cancel a task and every task that depends on it.
         
+        Args:
+            task_id: ID of the task to cancel, or its future
+
         Returns:
             None
         """
+        if isinstance(task_id, TaskFuture):
+            task_id = task_id.task_id
         with self.lock:
-            # Find all tasks without dependencies
-            for task_id in self.tasks.keys():
-                has_dependencies = False
-                for deps in self.dependencies.values():
-                    if task_id in deps:
-                        has_dependencies = True
-                        break
-                        
-                if not has_dependencies and self.status.get(task_id) == "pending":
-                    task_func, args, kwargs = self.tasks[task_id]
-                    self.status[task_id] = "running"
-                    
-                    # Create a wrapped function that will call our callback
-                    def wrapped_task(*w_args, **w_kwargs):
-                        try:
-                            result = task_func(*w_args, **w_kwargs)
-                            self.on_task_complete(task_id, True, result, None)
-                            return result
-                        except Exception as e:
-                            self.on_task_complete(task_id, False, None, e)
-                            raise
-                    
-                    # Queue the wrapped task
-                    self.worker.queue_task(
-                        wrapped_task, 
-                        args, 
-                        kwargs, 
-                        task_name=task_id,
-                        task_id=task_id
-                    )
-                    self.logger.debug(f"Queued initial task: {task_id}")
+            if self.status.get(task_id) in ("pending", "running"):
+                self._cancel(task_id)
+            self._propagate(task_id, "cancelled")
+            self.logger.debug(f"Task cancelled: {task_id}")
+            self._check_finished()
+        self._resolve_futures()
+
+    def _cancel(self, task_id: str) -> None:
+        """
+        Cancel a pending task, or ask a running task to stop.
+
+        A running task stays "cancelling" until on_task_complete sees it
+        return. Must be called with the lock held.
+
+        Args:
+            task_id: ID of the pending or running task
+
+        Returns:
+            None
+        """
+        if self.status[task_id] == "running":
+            self.worker.cancel_task(task_id)
+            self.status[task_id] = "cancelling"
+        else:
+            self.status[task_id] = "cancelled"
+        self._outcomes.append((task_id, "cancelled", None, None))
     
     def cancel_workflow(self) -> None:
         """
@@ -509,10 +1621,11 @@ class TaskManager:
         with self.lock:
             for task_id, status in self.status.items():
                 if status in ("pending", "running"):
-                    self.worker.cancel_task(task_id)
-                    self.status[task_id] = "cancelled"
+                    self._cancel(task_id)
             
             self.logger.debug("Workflow cancelled")
+            self._check_finished()
+        self._resolve_futures()
     
     def get_workflow_status(self) -> Dict[str, str]:
         """
@@ -522,4 +1635,4 @@ class TaskManager:
             Dict[str, str]: Dictionary of task IDs to their status
         """
         with self.lock:
-            return self.status.copy()
\ No newline at end of file
+            return self.status.copy()
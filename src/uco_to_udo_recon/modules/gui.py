@@ -17,12 +17,10 @@ import threading
 from pathlib import Path
 import webbrowser
 
-from src.uco_to_udo_recon.core.excel_operations import (
-    copy_and_rename_sheet, create_copy_of_target_file, recalculate_workbook_in_excel
-)
-from src.uco_to_udo_recon.core.reconciliation import find_table_range
-from src.uco_to_udo_recon.utils.file_utils import ensure_file_handle_release, open_excel_file
-from src.uco_to_udo_recon.modules.background_worker import BackgroundWorker, ProgressTracker
+from src.uco_to_udo_recon.core.pipeline import open_recalculation_backend, run_reconciliation
+from src.uco_to_udo_recon.core.recalculation import RecalculationBackend
+from src.uco_to_udo_recon.utils.file_utils import open_excel_file
+from src.uco_to_udo_recon.modules.background_worker import BackgroundWorker
 
 
 class TextHandler(logging.Handler):
@@ -233,6 +231,14 @@ class SettingsDialog(tk.Toplevel):
             variable=self.auto_open_var
         ).pack(anchor=tk.W, pady=5)
 
+        # Resume interrupted runs setting
+        self.resume_runs_var = tk.BooleanVar(value=self.settings.get('resume_runs', False))
+        ttk.Checkbutton(
+            general_tab,
+            text="Resume interrupted runs when the input files are unchanged",
+            variable=self.resume_runs_var
+        ).pack(anchor=tk.W, pady=5)
+
         # Default component
         ttk.Label(general_tab, text="Default Component:").pack(anchor=tk.W, pady=(10, 2))
         self.default_component_var = tk.StringVar(value=self.settings.get('default_component', "WMD"))
@@ -393,8 +399,9 @@ class SettingsDialog(tk.Toplevel):
         )
         log_level_combo.pack(anchor=tk.W, pady=(0, 10))
 
-        # COM Timeout setting
-        ttk.Label(advanced_tab, text="Excel COM Operation Timeout (seconds):").pack(anchor=tk.W, pady=(10, 2))
+        # Recalculation timeout setting (per attempt, for every recalculation engine)
+        ttk.Label(advanced_tab, text="Recalculation Timeout (seconds):").pack(
+            anchor=tk.W, pady=(10, 2))
         self.com_timeout_var = tk.IntVar(value=self.settings.get('com_timeout', 30))
         com_timeout_spin = ttk.Spinbox(
             advanced_tab,
@@ -405,6 +412,32 @@ class SettingsDialog(tk.Toplevel):
         )
         com_timeout_spin.pack(anchor=tk.W, pady=(0, 10))
 
+        # Recalculation backend setting
+        ttk.Label(advanced_tab, text="Recalculation Engine:").pack(anchor=tk.W, pady=(10, 2))
+        self.recalc_backend_var = tk.StringVar(value=self.settings.get('recalc_backend', "auto"))
+        recalc_backend_combo = ttk.Combobox(
+            advanced_tab,
+            textvariable=self.recalc_backend_var,
+            values=["auto", "excel", "libreoffice", "python", "none"],
+            state="readonly",
+            width=12
+        )
+        recalc_backend_combo.pack(anchor=tk.W, pady=(0, 10))
+
+        # Execution backend setting: a worker process keeps the window responsive
+        # and returns its memory to the system when it is recycled
+        ttk.Label(advanced_tab, text="Run Operations In:").pack(anchor=tk.W, pady=(10, 2))
+        self.execution_backend_var = tk.StringVar(
+            value=self.settings.get('execution_backend', "thread"))
+        execution_backend_combo = ttk.Combobox(
+            advanced_tab,
+            textvariable=self.execution_backend_var,
+            values=["thread", "process"],
+            state="readonly",
+            width=12
+        )
+        execution_backend_combo.pack(anchor=tk.W, pady=(0, 10))
+
         # Buttons frame
         button_frame = ttk.Frame(main_frame)
         button_frame.pack(fill=tk.X, padx=5, pady=10)
@@ -436,11 +469,14 @@ class SettingsDialog(tk.Toplevel):
     def _restore_defaults(self):
         """Restore default settings."""
         self.auto_open_var.set(True)
+        self.resume_runs_var.set(False)
         self.default_component_var.set("WMD")
         self.recent_files_limit_var.set(5)
         self.default_location_var.set("")
         self.log_level_var.set("INFO")
         self.com_timeout_var.set(30)
+        self.recalc_backend_var.set("auto")
+        self.execution_backend_var.set("thread")
         self.theme_var.set("dark")
         self.ui_density_var.set("normal")
 
@@ -448,11 +484,14 @@ class SettingsDialog(tk.Toplevel):
         """Apply settings and close dialog."""
         # Update settings dict with new values
         self.settings['auto_open_results'] = self.auto_open_var.get()
+        self.settings['resume_runs'] = self.resume_runs_var.get()
         self.settings['default_component'] = self.default_component_var.get()
         self.settings['recent_files_limit'] = self.recent_files_limit_var.get()
         self.settings['default_location'] = self.default_location_var.get()
         self.settings['log_level'] = self.log_level_var.get()
         self.settings['com_timeout'] = self.com_timeout_var.get()
+        self.settings['recalc_backend'] = self.recalc_backend_var.get()
+        self.settings['execution_backend'] = self.execution_backend_var.get()
         self.settings['theme'] = self.theme_var.get()
         self.settings['ui_density'] = self.ui_density_var.get()
 
@@ -477,11 +516,16 @@ class MainWindow(tk.Tk):
         # Initialize settings
         self.settings = {
             'auto_open_results': True,
+            'resume_runs': False,
             'default_component': "WMD",
             'recent_files_limit': 5,
             'default_location': "",
             'log_level': "INFO",
             'com_timeout': 30,
+            'recalc_backend': "auto",
+            'execution_backend': "thread",
+            'max_tasks_per_child': 10,
+            'max_workers': 1,
             'theme': "dark",
             'ui_density': "normal",
             'recent_files': {
@@ -524,23 +568,17 @@ class MainWindow(tk.Tk):
         # Configure log text tags for different levels
         self.configure_log_colors()
 
-        # Initialize background worker
-        self.worker = BackgroundWorker(
-            on_progress=self.update_progress_from_worker,
-            on_complete=self.on_task_complete,
-            on_message=self.on_worker_message,
-            logger=self.logger
-        )
-        
-        # Start the worker thread
+        # Initialize background worker and start the worker thread
+        self.worker = self.create_worker()
         self.worker.start()
 
+        # Recalculation backend, created on first use and kept between runs
+        self.recalc_backend: Optional[RecalculationBackend] = None
+        self._recalc_backend_lock = threading.Lock()
+
         # Add protocol for window closing
         self.protocol("WM_DELETE_WINDOW", self.on_close)
 
-        # Set up progress tracker
-        self.progress_tracker = None
-
         # Apply theme
         self.apply_theme(self.settings.get('theme', 'dark'))
 
@@ -562,13 +600,67 @@ class MainWindow(tk.Tk):
             ):
                 if self.current_task_id:
                     self.worker.cancel_task(self.current_task_id)
-                self.worker.stop()
+                # Give the task a few seconds to honour the cancellation
+                self.worker.stop(timeout=5.0)
+                self.close_recalc_backend()
                 self.destroy()
         else:
             self.worker.stop()
+            self.close_recalc_backend()
             self.save_settings()
             self.destroy()
 
+    def create_worker(self) -> BackgroundWorker:
+        """
+        Create a background worker using the execution backend selected in the settings.
+
+        Returns:
+            BackgroundWorker: The worker, not started yet
+        """
+        return BackgroundWorker(
+            on_progress=self.update_progress_from_worker,
+            on_complete=self.on_task_complete,
+            on_message=self.on_worker_message,
+            logger=self.logger,
+            execution_backend=self.settings.get('execution_backend', "thread"),
+            max_tasks_per_child=self.settings.get('max_tasks_per_child', 10),
+            max_workers=self.settings.get('max_workers', 1)
+        )
+
+    def ensure_worker_backend(self) -> None:
+        """Replace the idle background worker if the execution backend setting changed."""
+        if self.worker.execution_backend != self.settings.get('execution_backend', "thread"):
+            self.worker.stop()
+            self.worker = self.create_worker()
+            self.worker.start()
+            self.logger.info(f"Running operations in a {self.worker.execution_backend}")
+
+    def get_recalc_backend(self) -> RecalculationBackend:
+        """
+        Return the recalculation backend selected in the settings.
+
+        The backend is created on first use and kept, so a LibreOffice pool
+        stays running between reconciliation runs.
+
+        Returns:
+            RecalculationBackend: The backend to recalculate workbooks with
+        """
+        with self._recalc_backend_lock:
+            if self.recalc_backend is None:
+                self.recalc_backend = open_recalculation_backend(
+                    self.settings.get('recalc_backend', "auto"),
+                    self.settings.get('com_timeout', 30),
+                    self.logger
+                )
+            return self.recalc_backend
+
+    def close_recalc_backend(self) -> None:
+        """Close the recalculation backend so it is recreated on next use."""
+        with self._recalc_backend_lock:
+            if self.recalc_backend is not None:
+                self.recalc_backend.close()
+                self.recalc_backend = None
+
     def update_progress_from_worker(self, value: int, message: Optional[str] = None) -> None:
         """Update progress from worker thread."""
         # Schedule UI update on the main thread
@@ -1062,10 +1154,20 @@ class MainWindow(tk.Tk):
             old_theme = self.settings.get('theme', 'dark')
             old_density = self.settings.get('ui_density', 'normal')
 
+            old_backend = self.settings.get('recalc_backend', "auto")
+            old_timeout = self.settings.get('com_timeout', 30)
+
             # Update settings
             self.settings = dialog.result
             self.save_settings()
 
+            backend_changed = (
+                self.settings.get('recalc_backend', "auto") != old_backend
+                or self.settings.get('com_timeout', 30) != old_timeout
+            )
+            if backend_changed and not self.processing:
+                self.close_recalc_backend()
+
             # Apply new settings
             self.component_name_combo.set(self.settings['default_component'])
 
@@ -1678,101 +1780,29 @@ Undelivered Orders (UDO) across multiple Excel files.
         self.logger.info(f"Trial Balance File: {os.path.basename(trial_balance_file)}")
         self.logger.info(f"UCO to UDO TIER File: {os.path.basename(uco_to_udo_file)}")
 
-        # Set up progress tracker for the multistage operation
-        stages = [
-            ("Prepare working copy", 5),
-            ("Copy Trial Balance sheet", 10),
-            ("Copy UCO to UDO sheet", 10),
-            ("Process reconciliation", 75)
-        ]
-        self.progress_tracker = ProgressTracker(stages, self.update_progress)
-
-        # Define the multi-stage operation as a function
-        def process_operation(progress_callback=None, cancellation_check=None) -> str:
-            """
-            Execute the multi-stage reconciliation process in the background.
-
-            Args:
-                progress_callback: Optional callback for progress updates
-                cancellation_check: Optional function to check if operation was cancelled
-
-            Returns:
-                str: Path to the result file
-            """
-            try:
-                # STAGE 1: Create copy of target file
-                self.progress_tracker.update(0, "Creating working copy of reconciliation file...")
-                new_target_file = create_copy_of_target_file(target_file, self.logger)
-                ensure_file_handle_release(new_target_file, self.logger)
-                self.progress_tracker.update(100, "Created working copy")
-                self.progress_tracker.next_stage()
-
-                if cancellation_check and cancellation_check():
-                    return "Operation canceled"
-
-                # STAGE 2: Copy DO TB sheet
-                self.progress_tracker.update(0, f"Copying '{component_name} Total' sheet from Trial Balance file...")
-                if not copy_and_rename_sheet(trial_balance_file, f"{component_name} Total", new_target_file, "DO TB", self.logger, insert_index=3):
-                    raise Exception(f"Failed to copy sheet '{component_name} Total'.")
-                ensure_file_handle_release(new_target_file, self.logger)
-                self.progress_tracker.update(100, "Trial Balance sheet copied")
-                self.progress_tracker.next_stage()
-
-                if cancellation_check and cancellation_check():
-                    return "Operation canceled"
-
-                # STAGE 3: Copy DO UCO to UDO sheet
-                self.progress_tracker.update(0, "Copying 'UCO to UDO' sheet from TIER file...")
-                if not copy_and_rename_sheet(uco_to_udo_file, "UCO to UDO", new_target_file, "DO UCO to UDO", self.logger, insert_index=4):
-                    raise Exception("Failed to copy 'UCO to UDO' sheet.")
-                ensure_file_handle_release(new_target_file, self.logger)
-                self.progress_tracker.update(100, "UCO to UDO sheet copied")
-                self.progress_tracker.next_stage()
-
-                if cancellation_check and cancellation_check():
-                    return "Operation canceled"
-
-                # STAGE 4: Execute main reconciliation
-                self.progress_tracker.update(0, "Starting reconciliation process...")
-
-                def progress_mapper(value: int) -> None:
-                    """Map progress from find_table_range to our progress_tracker."""
-                    self.progress_tracker.update(value)
-                    # Check for cancellation during long-running operations
-                    if cancellation_check and cancellation_check():
-                        raise Exception("Operation canceled by user")
-
-                # Run the main reconciliation function
-                find_table_range(
-                    new_target_file,
-                    component_name,
-                    self.logger,
-                    progress_mapper
-                )
-
-                # Perform Excel recalculation if needed
-                try:
-                    recalculate_workbook_in_excel(
-                        new_target_file, 
-                        self.logger,
-                        progress_callback=progress_mapper,
-                        retries=3
-                    )
-                except Exception as e:
-                    self.logger.warning(f"Excel recalculation failed: {e}. Results may not include all calculated values.")
-
-                return new_target_file
-
-            except Exception as e:
-                # Log the error and re-raise
-                self.logger.error(f"Error during operation: {e}", exc_info=True)
-                raise
-
-        # Queue the operation in the background worker
-        self.current_task_id = self.worker.queue_task(
-            process_operation,
-            task_name="UCO to UDO Reconciliation"
+        # Tasks in a worker process get the recalculation backend by name and
+        # create it there; on the worker thread the warm backend is reused
+        self.ensure_worker_backend()
+        if self.worker.execution_backend == "process":
+            backend = self.settings.get('recalc_backend', "auto")
+        else:
+            backend = self.get_recalc_backend()
+
+        # Queue the operation in the background worker; submitting the same
+        # unchanged files again joins the operation already queued or running
+        future = self.worker.queue_task(
+            run_reconciliation,
+            args=(target_file, trial_balance_file, uco_to_udo_file, component_name),
+            kwargs={
+                'logger': self.logger,
+                'backend': backend,
+                'recalc_timeout': self.settings.get('com_timeout', 30),
+                'resume': self.settings.get('resume_runs', False)
+            },
+            task_name="UCO to UDO Reconciliation",
+            coalesce=True
         )
+        self.current_task_id = future.task_id
 
     def cancel_operation(self) -> None:
         """
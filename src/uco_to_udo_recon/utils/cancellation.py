@@ -0,0 +1,132 @@
+"""
+Cooperative cancellation for the UCO to UDO Reconciliation tool.
+
+Long-running operations take a ``cancellation_check`` callable and poll it
+in their loops. A CancellationToken is such a callable: checking it is a
+single flag read, cheap enough to do on every row, and waiting on it wakes
+up as soon as it is cancelled.
+"""
+
+import threading
+import time
+from typing import Callable, List, Optional
+
+
+class CancellationToken:
+    """
+    A cancellation flag backed by a ``threading.Event``.
+
+    The token is callable and returns True once cancelled, so it can be
+    passed anywhere a ``cancellation_check`` is expected. For tasks run in a
+    worker process, BackgroundWorker relays the cancellation to a token in
+    the child process.
+    """
+
+    def __init__(self) -> None:
+        """Initialize a token that is not cancelled."""
+        self._event = threading.Event()
+        self._callbacks: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+        self.cancelled_at: Optional[float] = None
+
+    def __call__(self) -> bool:
+        """
+        Check whether the token was cancelled.
+
+        Returns:
+            bool: True if the token was cancelled
+        """
+        return self._event.is_set()
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether the token was cancelled."""
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        """
+        Cancel the token and run its callbacks once.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.cancelled_at = time.perf_counter()
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def add_callback(self, callback: Callable[[], None]) -> None:
+        """
+        Register a function to call when the token is cancelled.
+
+        The function is called right away if the token is already cancelled.
+
+        Args:
+            callback: Function taking no arguments
+
+        Returns:
+            None
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until the token is cancelled.
+
+        Args:
+            timeout: Maximum seconds to wait, or None to wait indefinitely
+
+        Returns:
+            bool: True if the token was cancelled
+        """
+        return self._event.wait(timeout)
+
+    def seconds_since_cancel(self) -> Optional[float]:
+        """
+        Seconds elapsed since the token was cancelled.
+
+        Returns:
+            Optional[float]: The elapsed time, or None if not cancelled
+        """
+        if self.cancelled_at is None:
+            return None
+        return time.perf_counter() - self.cancelled_at
+
+
+def sleep_unless_cancelled(
+    seconds: float,
+    cancellation_check: Optional[Callable[[], bool]] = None
+) -> bool:
+    """
+    Sleep, waking up early if the operation is cancelled.
+
+    A CancellationToken wakes the sleep as soon as it is cancelled; other
+    cancellation checks are polled every 50 ms.
+
+    Args:
+        seconds: Seconds to sleep
+        cancellation_check: Optional function to check if operation should be cancelled
+
+    Returns:
+        bool: True if the operation was cancelled
+    """
+    if isinstance(cancellation_check, CancellationToken):
+        return cancellation_check.wait(seconds)
+    if cancellation_check is None:
+        time.sleep(seconds)
+        return False
+    deadline = time.perf_counter() + seconds
+    while not cancellation_check():
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return False
+        time.sleep(min(remaining, 0.05))
+    return True
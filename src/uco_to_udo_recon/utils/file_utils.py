@@ -8,19 +8,122 @@ import os
 import sys
 import subprocess
 import gc
+import hashlib
 import time
 import logging
 from pathlib import Path
-from typing import Optional
+from typing import NamedTuple, Optional
 
 
-def ensure_file_handle_release(file_path: str, logger: logging.Logger) -> None:
+class FileReadiness(NamedTuple):
+    """Outcome of waiting for a file handle to become free."""
+    ready: bool
+    waited: float
+    attempts: int
+
+
+def file_digest(file_path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    Compute the SHA-256 digest of a file's contents.
+
+    Args:
+        file_path: Path to the file to hash
+        chunk_size: Bytes read at a time
+
+    Returns:
+        str: The hexadecimal digest
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _probe_file_ready(file_path: str) -> bool:
+    """
+    Check whether no other process holds the file open.
+
+    Renaming a file onto itself and opening it for writing both fail on
+    Windows while Excel (or another process) has the file open.
+
+    Args:
+        file_path: Path to the file to probe
+
+    Returns:
+        bool: True if the file exists and can be opened exclusively
+    """
+    try:
+        os.rename(file_path, file_path)
+        with open(file_path, 'r+b'):
+            pass
+        return True
+    except OSError:
+        return False
+
+
+def wait_for_file_ready(
+    file_path: str,
+    logger: Optional[logging.Logger] = None,
+    timeout: float = 10.0,
+    initial_delay: float = 0.01,
+    max_delay: float = 0.5
+) -> FileReadiness:
+    """
+    Poll until a file can be opened exclusively, backing off exponentially.
+
+    Returns as soon as the handle is free instead of sleeping for a fixed
+    time, and reports how long the wait took.
+
+    Args:
+        file_path: Path to the file to wait for
+        logger: Optional logger instance for operation tracking
+        timeout: Maximum number of seconds to wait
+        initial_delay: Delay after the first failed probe, doubled after each retry
+        max_delay: Upper bound for the delay between probes
+
+    Returns:
+        FileReadiness: Whether the file became ready, the seconds waited and the probe count
+    """
+    start = time.perf_counter()
+    deadline = start + timeout
+    delay = initial_delay
+    attempts = 0
+    while True:
+        attempts += 1
+        if _probe_file_ready(file_path):
+            result = FileReadiness(True, time.perf_counter() - start, attempts)
+            break
+        now = time.perf_counter()
+        if now >= deadline:
+            result = FileReadiness(False, now - start, attempts)
+            break
+        time.sleep(min(delay, deadline - now))
+        delay = min(delay * 2, max_delay)
+
+    if logger:
+        state = "ready" if result.ready else "still locked"
+        logger.info(
+            f"File {state} after {result.waited:.3f}s ({result.attempts} probe(s)): {file_path}"
+        )
+    return result
+
+
+def ensure_file_handle_release(
+    file_path: str,
+    logger: logging.Logger,
+    timeout: float = 10.0
+) -> None:
     """
     Ensures Python releases the file handle before Excel operations.
+
+    Collects garbage so unreferenced file objects are closed, then waits
+    until the file can actually be opened exclusively.
     
     Args:
         file_path: Path to the file that needs handle release
         logger: Logger instance for operation tracking
+        timeout: Maximum number of seconds to wait for the handle
         
     Returns:
         None
@@ -28,11 +131,13 @@ def ensure_file_handle_release(file_path: str, logger: logging.Logger) -> None:
     try:
         # Force Python garbage collection
         gc.collect()
-        
-        # Give Windows time to release file handles
-        time.sleep(2)
-        
-        logger.info(f"Released file handle for: {file_path}")
+
+        # Wait until Windows has actually released the file handle
+        readiness = wait_for_file_ready(file_path, timeout=timeout)
+        if readiness.ready:
+            logger.info(f"Released file handle for: {file_path} (waited {readiness.waited:.3f}s)")
+        else:
+            logger.warning(f"File handle still held after {readiness.waited:.1f}s: {file_path}")
     except Exception as e:
         logger.warning(f"Error during file handle release: {e}")
 
@@ -0,0 +1,171 @@
+"""
+Label lookup utilities for the UCO to UDO Reconciliation tool.
+
+This module provides an index of the text labels in a worksheet, built in a
+single pass over its cells, so that functions looking for the same labels
+("Trading Partner Number", "UCO total reported in TIER", ...) do not rescan
+the sheet for every lookup.
+"""
+
+import bisect
+import weakref
+from typing import Any, Dict, List, Optional, Tuple
+
+from openpyxl.worksheet.worksheet import Worksheet
+
+Position = Tuple[int, int]
+
+
+class LabelIndex:
+    """
+    Positions of the text values of a worksheet, keyed by text.
+
+    Exact lookups compare the raw cell text, so ``"Total "`` and ``"Total"``
+    are different labels; ``find_all(..., strip=True)`` and the prefix and
+    substring lookups ignore surrounding whitespace. When a label occurs more
+    than once, queries return the first occurrence in row-major order, the
+    order in which a row-by-row scan would have found it.
+    """
+
+    def __init__(self, worksheet: Worksheet) -> None:
+        """
+        Build the index in one pass over the existing cells of a worksheet.
+
+        Args:
+            worksheet: The worksheet to index (no cells are created)
+        """
+        self.title = worksheet.title
+        positions: Dict[str, List[Position]] = {}
+        stripped: Dict[str, List[Position]] = {}
+        for (row, column), cell in worksheet._cells.items():
+            key = self.normalize(cell._value)
+            if key:
+                positions.setdefault(key, []).append((row, column))
+                stripped.setdefault(key.strip(), []).append((row, column))
+        for entries in (*positions.values(), *stripped.values()):
+            entries.sort()
+        self._positions = positions
+        self._stripped = stripped
+        self._keys = sorted(stripped)
+
+    @staticmethod
+    def normalize(value: Any) -> Optional[str]:
+        """
+        Normalize a cell value to an index key.
+
+        Args:
+            value: The cell value
+
+        Returns:
+            The text of non-formula strings, None otherwise
+        """
+        if not isinstance(value, str) or value.startswith("="):
+            return None
+        return value
+
+    def _first(self, positions: Dict[str, List[Position]], keys: List[str],
+               column: Optional[int]) -> Optional[Position]:
+        best = None
+        for key in keys:
+            for position in positions[key]:
+                if column is None or position[1] == column:
+                    if best is None or position < best:
+                        best = position
+                    break
+        return best
+
+    def find_all(self, label: str, column: Optional[int] = None,
+                 strip: bool = False) -> List[Position]:
+        """
+        Find every position holding a label.
+
+        Args:
+            label: The label to look up
+            column: Optional 1-based column to restrict the search to
+            strip: Whether to ignore whitespace around the cell text
+
+        Returns:
+            List of (row, column) positions in row-major order
+        """
+        if strip:
+            positions = self._stripped.get(label.strip(), [])
+        else:
+            positions = self._positions.get(label, [])
+        return [p for p in positions if column is None or p[1] == column]
+
+    def exact(self, label: str, column: Optional[int] = None) -> Optional[Position]:
+        """
+        Find the first cell whose text equals a label.
+
+        Args:
+            label: The label to look up
+            column: Optional 1-based column to restrict the search to
+
+        Returns:
+            The (row, column) position, or None if the label is not present
+        """
+        if label not in self._positions:
+            return None
+        return self._first(self._positions, [label], column)
+
+    def prefix(self, label: str, column: Optional[int] = None) -> Optional[Position]:
+        """
+        Find the first cell whose stripped text starts with a label.
+
+        Args:
+            label: The text the cell value starts with
+            column: Optional 1-based column to restrict the search to
+
+        Returns:
+            The (row, column) position, or None if no cell matches
+        """
+        key = label.strip()
+        start = bisect.bisect_left(self._keys, key)
+        end = start
+        while end < len(self._keys) and self._keys[end].startswith(key):
+            end += 1
+        return self._first(self._stripped, self._keys[start:end], column)
+
+    def contains(self, label: str, column: Optional[int] = None) -> Optional[Position]:
+        """
+        Find the first cell whose stripped text contains a label.
+
+        Args:
+            label: The text the cell value contains
+            column: Optional 1-based column to restrict the search to
+
+        Returns:
+            The (row, column) position, or None if no cell matches
+        """
+        key = label.strip()
+        return self._first(self._stripped, [k for k in self._keys if key in k], column)
+
+
+_indexes: "weakref.WeakKeyDictionary[Worksheet, LabelIndex]" = weakref.WeakKeyDictionary()
+
+
+def get_label_index(worksheet: Worksheet) -> LabelIndex:
+    """
+    Get the label index of a worksheet, building it on first use.
+
+    Args:
+        worksheet: The worksheet to index
+
+    Returns:
+        LabelIndex: The shared index for this worksheet
+    """
+    index = _indexes.get(worksheet)
+    if index is None:
+        index = LabelIndex(worksheet)
+        _indexes[worksheet] = index
+    return index
+
+
+def invalidate_label_index(worksheet: Worksheet) -> None:
+    """
+    Drop the cached index of a worksheet after rows or columns were moved.
+
+    Args:
+        worksheet: The worksheet whose index is stale
+    """
+    _indexes.pop(worksheet, None)
@@ -0,0 +1,120 @@
+"""
+Fixed-point money values for the UCO to UDO Reconciliation tool.
+
+Amounts are held as integer cents (``Cents``), rounded half-up exactly like
+``safe_convert_to_decimal``, so the comparison loops can compare plain ints
+instead of building and quantizing a Decimal for every cell. Whole columns
+convert to a signed 64-bit ``array`` in one call, or to a list when an
+amount does not fit in 64 bits.
+"""
+
+import math
+from array import array
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from typing import Any, Iterable, List, Union
+
+Cents = int
+"""An amount in integer cents, e.g. ``12345`` for 123.45."""
+
+_CENT = Decimal('0.01')
+
+# Floats whose scaled fraction lies this close to .5 (relative to their size) are
+# ties or near-ties; they go through the exact Decimal path to decide the rounding.
+_TIE_TOLERANCE = 1e-9
+
+# Above 2**53 floats are whole numbers and scaling by 100 is no longer exact.
+_FLOAT_EXACT_LIMIT = float(2 ** 53)
+
+
+def to_cents(value: Any, logger: Any) -> Cents:
+    """
+    Convert a cell value to integer cents, rounding half-up.
+
+    Gives the same result as ``safe_convert_to_decimal(value, logger)``
+    scaled by 100, except that NaN converts to 0 rather than Decimal('NaN').
+    Ints and most floats are converted arithmetically; strings, Decimals and
+    floats near a half cent use the Decimal path.
+
+    Args:
+        value: The value to convert
+        logger: A logger instance for recording errors
+
+    Returns:
+        Cents: The converted amount, or 0 if conversion fails
+    """
+    if value is None or value == "":
+        return 0
+
+    value_type = type(value)
+    if value_type is int:
+        return value * 100
+    if value_type is float:
+        if not math.isfinite(value):
+            logger.error(f"Invalid value for conversion to Decimal: {value} - "
+                         "Error: not a finite number")
+            return 0
+        scaled = abs(value) * 100
+        if scaled < _FLOAT_EXACT_LIMIT:
+            whole = math.floor(scaled)
+            fraction = scaled - whole
+            if abs(fraction - 0.5) > _TIE_TOLERANCE * max(1.0, scaled):
+                cents = int(whole) + (1 if fraction > 0.5 else 0)
+                return -cents if value < 0 else cents
+
+    if isinstance(value, str) and value.startswith('='):
+        logger.error(f"Attempted to convert a formula string to Decimal: {value}")
+        return 0
+
+    try:
+        return int(Decimal(str(value)).quantize(_CENT, rounding=ROUND_HALF_UP).scaleb(2))
+    except (InvalidOperation, ValueError) as e:
+        logger.error(f"Invalid value for conversion to Decimal: {value} - Error: {e}")
+        return 0
+
+
+def column_to_cents(values: Iterable[Any], logger: Any) -> Union["array[int]", List[Cents]]:
+    """
+    Convert a column of cell values to integer cents in one pass.
+
+    Accepts every value ``to_cents`` does: a column holding an amount of
+    2**63 cents or more is returned as a list of ints instead.
+
+    Args:
+        values: The cell values, in row order
+        logger: A logger instance for recording errors
+
+    Returns:
+        Signed 64-bit array ('q') of cents, or a list if an amount overflows it
+    """
+    cents = [to_cents(value, logger) for value in values]
+    try:
+        return array('q', cents)
+    except OverflowError:
+        return cents
+
+
+def cents_to_decimal(cents: Cents) -> Decimal:
+    """
+    Convert integer cents back to a two-place Decimal.
+
+    Args:
+        cents: The amount in cents
+
+    Returns:
+        Decimal: The amount, e.g. Decimal('123.45')
+    """
+    return Decimal(cents).scaleb(-2)
+
+
+def format_cents(cents: Cents) -> str:
+    """
+    Format integer cents the way a quantized Decimal prints.
+
+    Args:
+        cents: The amount in cents
+
+    Returns:
+        str: The amount with two decimal places, e.g. '-0.05'
+    """
+    whole, part = divmod(abs(cents), 100)
+    return f"{'-' if cents < 0 else ''}{whole}.{part:02d}"
@@ -0,0 +1,82 @@
+"""
+Progress reporting for multi-stage operations.
+
+ProgressTracker maps the progress of each stage of an operation onto one
+overall 0-100 range. It has no dependencies, so that core modules can report
+progress without importing the background worker.
+"""
+
+from typing import Callable, List, Optional, Tuple
+
+
+class ProgressTracker:
+    """
+    Tracks progress across multiple sequential tasks.
+
+    This class allows dividing total progress (0-100) across multiple
+    sequential operations, each with their own progress range.
+    """
+
+    def __init__(self, stages: List[Tuple[str, int]],
+                on_progress: Optional[Callable[[int, str], None]] = None):
+        """
+        Initialize the progress tracker.
+
+        Args:
+            stages: List of (stage_name, weight) tuples, where weight is the
+                  relative importance of each stage in the overall progress
+            on_progress: Callback function for progress updates (value, message)
+        """
+        self.stages = stages
+        self.on_progress = on_progress
+        self.current_stage = 0
+        self.total_weight = sum(weight for _, weight in stages)
+        self.completed_weight = 0
+
+    def next_stage(self) -> None:
+        """
+        Move to the next stage.
+
+        Returns:
+            None
+        """
+        if self.current_stage < len(self.stages):
+            _, weight = self.stages[self.current_stage]
+            self.completed_weight += weight
+            self.current_stage += 1
+
+    def update(self, stage_progress: int, message: Optional[str] = None) -> None:
+        """
+        Update the progress for the current stage.
+
+        Args:
+            stage_progress: Progress within the current stage (0-100)
+            message: Optional message to display
+
+        Returns:
+            None
+        """
+        if self.current_stage < len(self.stages):
+            stage_name, stage_weight = self.stages[self.current_stage]
+
+            # Calculate overall progress
+            stage_contribution = (stage_progress / 100.0) * stage_weight
+            overall_progress = int(
+                ((self.completed_weight + stage_contribution) / self.total_weight) * 100
+            )
+
+            # Ensure progress is bounded
+            overall_progress = max(0, min(100, overall_progress))
+
+            # Update display message
+            if message is None:
+                if stage_progress == 100:
+                    display_message = f"Completed: {stage_name}"
+                else:
+                    display_message = f"{stage_name}: {stage_progress}%"
+            else:
+                display_message = message
+
+            # Report progress
+            if self.on_progress:
+                self.on_progress(overall_progress, display_message)
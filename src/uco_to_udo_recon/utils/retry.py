@@ -0,0 +1,35 @@
+"""
+Retry timing helpers for the UCO to UDO Reconciliation tool.
+
+This module computes the delays between retries of operations that fail
+intermittently, such as driving Excel over COM.
+"""
+
+import random
+from typing import Optional
+
+
+def backoff_delay(
+    attempt: int,
+    base_delay: float = 1.0,
+    max_delay: float = 30.0,
+    rng: Optional[random.Random] = None
+) -> float:
+    """
+    Compute a jittered exponential backoff delay.
+
+    The delay is drawn uniformly between half and all of
+    ``base_delay * 2 ** (attempt - 1)``, capped at ``max_delay``, so that
+    retries of concurrent jobs do not line up.
+
+    Args:
+        attempt: The 1-based number of the attempt that just failed
+        base_delay: Delay ceiling after the first failure, in seconds
+        max_delay: Upper bound for the delay, in seconds
+        rng: Optional random number generator (for reproducible delays)
+
+    Returns:
+        float: Seconds to wait before the next attempt
+    """
+    ceiling = min(max_delay, base_delay * 2 ** max(attempt - 1, 0))
+    return (rng or random).uniform(ceiling / 2, ceiling)
@@ -0,0 +1,954 @@
+"""
+Zip-level access to .xlsx packages for the UCO to UDO Reconciliation tool.
+
+This module reads and rewrites the parts of an .xlsx package directly, without
+building openpyxl Cell objects. It is used to move worksheet XML parts between
+packages, remapping shared-string and style indexes on the way, and to write
+untouched parts back exactly as they were read.
+"""
+
+import html
+import os
+import posixpath
+import re
+import zipfile
+from decimal import Decimal
+from io import BytesIO
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+from xml.etree import ElementTree
+
+from openpyxl.formula.translate import Translator
+from openpyxl.workbook.child import INVALID_TITLE_REGEX, avoid_duplicate_name
+
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+OFFICE_DOCUMENT_REL = REL_NS + "/officeDocument"
+WORKSHEET_REL = REL_NS + "/worksheet"
+SHARED_STRINGS_REL = REL_NS + "/sharedStrings"
+STYLES_REL = REL_NS + "/styles"
+CALC_CHAIN_REL = REL_NS + "/calcChain"
+HYPERLINK_REL = REL_NS + "/hyperlink"
+
+ERROR_VALUES = frozenset({"#NULL!", "#DIV/0!", "#VALUE!", "#REF!", "#NAME?", "#NUM!", "#N/A"})
+
+CONTENT_TYPES_PART = "[Content_Types].xml"
+WORKSHEET_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"
+SHARED_STRINGS_CONTENT_TYPE = (
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"
+)
+
+_MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_PACKAGE_RELS_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+_ATTR_RE = re.compile(r'([\w:]+)="([^"]*)"')
+_RELATIONSHIP_RE = re.compile(r'<Relationship\b[^>]*?/>', re.S)
+_SHEET_ENTRY_RE = re.compile(r'<sheet\b[^>]*?/>', re.S)
+_SI_RE = re.compile(r'<si\b[^>]*?(?:/>|>.*?</si>)', re.S)
+_PLAIN_SI_RE = re.compile(r'<si><t(?: xml:space="preserve")?>([^<]*)</t></si>$')
+_SHEET_DATA_RE = re.compile(r'<sheetData\b[^>]*?(?:/>|>.*?</sheetData>)', re.S)
+_CELL_RE = re.compile(r'<c\b([^>]*?)(/>|>(.*?)</c>)', re.S)
+_ROW_RE = re.compile(r'<row\b[^>]*>')
+_COL_RE = re.compile(r'<col\b[^>]*>')
+_STYLE_ATTR_RE = re.compile(r'(\ss=")(\d+)"')
+_COL_STYLE_ATTR_RE = re.compile(r'(\sstyle=")(\d+)"')
+_SHARED_TYPE_RE = re.compile(r'\st="s"')
+_VALUE_RE = re.compile(r'<v>(\d+)</v>')
+_DXF_ATTR_RE = re.compile(r'(\sdxfId=")(\d+)"')
+_TAB_SELECTED_RE = re.compile(r'\stabSelected="(?:1|true)"')
+_CODE_NAME_RE = re.compile(r'(<sheetPr\b[^>]*?)\scodeName="[^"]*"')
+_FORMULA_VALUE_RE = re.compile(r'(<f\b[^>]*?(?:/>|>[^<]*</f>))(?:<v\s*/>|<v>[^<]*</v>)?', re.S)
+_TYPE_ATTR_RE = re.compile(r'\st="[^"]*"')
+_FORMULA_RE = re.compile(r'<f\b([^>]*?)(?:/>|>([^<]*)</f>)')
+_HAS_VALUE_RE = re.compile(r'<v>[^<]')
+
+# Worksheet elements that only make sense together with a relationship part
+_RELATED_ELEMENTS = (
+    "drawing", "legacyDrawing", "legacyDrawingHF", "picture",
+    "tableParts", "oleObjects", "controls", "customProperties",
+)
+
+
+class XlsxPackageError(Exception):
+    """Raised when an .xlsx package is missing a part or is malformed."""
+
+
+class Relationship(NamedTuple):
+    """A single entry of a relationships (.rels) part."""
+    id: str
+    type: str
+    target: str
+    target_mode: Optional[str] = None
+
+
+class SheetEntry(NamedTuple):
+    """A ``<sheet>`` entry of workbook.xml resolved to its package part."""
+    name: str
+    sheet_id: int
+    rel_id: str
+    part: str
+    rel_type: str = WORKSHEET_REL
+
+
+def _attributes(tag: str) -> Dict[str, str]:
+    """Parse the attributes of a single XML start tag."""
+    return {key: html.unescape(value) for key, value in _ATTR_RE.findall(tag)}
+
+
+def _set_attribute(tag: str, name: str, value: Any) -> str:
+    """Set or add an attribute on a single XML start tag."""
+    pattern = re.compile(rf'(\s{re.escape(name)}=")[^"]*"')
+    if pattern.search(tag):
+        return pattern.sub(lambda m: f'{m.group(1)}{value}"', tag, count=1)
+    end = len(tag) - 2 if tag.endswith("/>") else len(tag) - 1
+    return f'{tag[:end]} {name}="{value}"{tag[end:]}'
+
+
+def _escape_attribute(value: str) -> str:
+    return html.escape(value, quote=True)
+
+
+def rels_part_for(part: str) -> str:
+    """Return the relationships part path that belongs to a package part."""
+    directory, name = posixpath.split(part)
+    return posixpath.join(directory, "_rels", f"{name}.rels")
+
+
+def resolve_target(source_part: str, target: str) -> str:
+    """Resolve a relationship target relative to the part that owns it."""
+    if target.startswith("/"):
+        return target[1:]
+    return posixpath.normpath(posixpath.join(posixpath.dirname(source_part), target))
+
+
+def parse_relationships(xml: str) -> List[Relationship]:
+    """Parse the entries of a relationships part."""
+    relationships = []
+    for match in _RELATIONSHIP_RE.finditer(xml):
+        attrs = _attributes(match.group(0))
+        relationships.append(Relationship(
+            attrs.get("Id", ""), attrs.get("Type", ""), attrs.get("Target", ""),
+            attrs.get("TargetMode")
+        ))
+    return relationships
+
+
+def render_relationships(relationships: List[Relationship]) -> str:
+    """Render a relationships part from a list of entries."""
+    entries = []
+    for rel in relationships:
+        mode = f' TargetMode="{_escape_attribute(rel.target_mode)}"' if rel.target_mode else ""
+        entries.append(
+            f'<Relationship Id="{_escape_attribute(rel.id)}" Type="{_escape_attribute(rel.type)}" '
+            f'Target="{_escape_attribute(rel.target)}"{mode}/>'
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        f'<Relationships xmlns="{_PACKAGE_RELS_NS}">{"".join(entries)}</Relationships>'
+    )
+
+
+def _canonical(raw: str, ignored: Tuple[Tuple[str, str], ...] = ()) -> Any:
+    """
+    Build a comparison key for a style record.
+
+    Records written by different producers differ in attribute and child
+    order; the key ignores both so equivalent records are recognised.
+    """
+    def key(element: ElementTree.Element) -> Tuple:
+        tag = element.tag.rsplit("}", 1)[-1]
+        attrs = tuple(sorted(
+            (name.rsplit("}", 1)[-1], value) for name, value in element.attrib.items()
+            if (name, value) not in ignored
+        ))
+        children = tuple(sorted(key(child) for child in element))
+        return (tag, attrs, children, (element.text or "").strip())
+
+    try:
+        return key(ElementTree.fromstring(raw))
+    except ElementTree.ParseError:
+        return raw
+
+
+class SharedStringTable:
+    """The ``<si>`` entries of a sharedStrings part, with find-or-append."""
+
+    _EMPTY = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        f'<sst xmlns="{_MAIN_NS}" count="0" uniqueCount="0"></sst>'
+    )
+
+    def __init__(self, xml: Optional[str] = None) -> None:
+        self._xml = xml if xml is not None else self._EMPTY
+        self.modified = xml is None
+        matches = list(_SI_RE.finditer(self._xml))
+        self.items = [m.group(0) for m in matches]
+        if matches:
+            self._head = self._xml[:matches[0].start()]
+            self._tail = self._xml[matches[-1].end():]
+        else:
+            head = re.search(r'<sst\b[^>]*?/?>', self._xml)
+            if head is None:
+                raise XlsxPackageError("sharedStrings part has no <sst> element")
+            if head.group(0).endswith("/>"):
+                self._head = self._xml[:head.start()] + head.group(0)[:-2] + ">"
+                self._tail = "</sst>" + self._xml[head.end():]
+            else:
+                self._head = self._xml[:head.end()]
+                self._tail = self._xml[head.end():]
+        self._index: Optional[Dict[Any, int]] = None
+        self._added_references = 0
+
+    @staticmethod
+    def _key(raw: str) -> Any:
+        plain = _PLAIN_SI_RE.match(raw)
+        return ("t", plain.group(1)) if plain else ("r", raw)
+
+    def add(self, raw: str) -> int:
+        """
+        Find an equivalent ``<si>`` entry or append a new one.
+
+        Args:
+            raw: The ``<si>`` element as it appears in the source part
+
+        Returns:
+            int: The index of the entry in this table
+        """
+        if self._index is None:
+            self._index = {}
+            for idx, item in enumerate(self.items):
+                self._index.setdefault(self._key(item), idx)
+        self._added_references += 1
+        key = self._key(raw)
+        if key not in self._index:
+            self._index[key] = len(self.items)
+            self.items.append(raw)
+            self.modified = True
+        return self._index[key]
+
+    def to_xml(self) -> str:
+        if not self.modified:
+            return self._xml
+        head = re.search(r'<sst\b[^>]*>', self._head)
+        count = int(_attributes(head.group(0)).get("count", len(self.items)))
+        count += self._added_references
+        tag = _set_attribute(head.group(0), "count", max(count, len(self.items)))
+        tag = _set_attribute(tag, "uniqueCount", len(self.items))
+        return (self._head[:head.start()] + tag + self._head[head.end():]
+                + "".join(self.items) + self._tail)
+
+
+class _StyleSection:
+    """One record list of styles.xml (fonts, fills, cellXfs, ...)."""
+
+    def __init__(self, xml: str, name: str, child: str,
+                 ignored: Tuple[Tuple[str, str], ...] = ()) -> None:
+        self.name = name
+        self.ignored = ignored
+        self.match = re.search(rf'<{name}\b([^>]*?)(?:/>|>(.*?)</{name}>)', xml, re.S)
+        content = self.match.group(2) or "" if self.match else ""
+        self.items = re.findall(rf'<{child}\b[^>]*?(?:/>|>.*?</{child}>)', content, re.S)
+        self._index: Optional[Dict[Any, int]] = None
+        self.modified = False
+
+    def add(self, raw: str) -> int:
+        if self._index is None:
+            self._index = {}
+            for idx, item in enumerate(self.items):
+                self._index.setdefault(_canonical(item, self.ignored), idx)
+        key = _canonical(raw, self.ignored)
+        if key not in self._index:
+            self._index[key] = len(self.items)
+            self.items.append(raw)
+            self.modified = True
+        return self._index[key]
+
+    def render(self) -> str:
+        if self.match:
+            open_tag = re.match(rf'<{self.name}\b[^>]*?(?=/?>)', self.match.group(0)).group(0) + ">"
+        else:
+            open_tag = f"<{self.name}>"
+        open_tag = _set_attribute(open_tag, "count", len(self.items))
+        return f"{open_tag}{''.join(self.items)}</{self.name}>"
+
+
+class StyleSheet:
+    """
+    The record lists of a styles part, with cross-package style import.
+
+    Importing a cell format copies the font, fill, border, number format and
+    parent cell style it references, reusing equivalent records that already
+    exist in this stylesheet.
+    """
+
+    _ORDER = ("numFmts", "fonts", "fills", "borders", "cellStyleXfs", "cellXfs",
+              "cellStyles", "dxfs", "tableStyles", "colors", "extLst")
+    _XF_DEFAULTS = (("pivotButton", "0"), ("quotePrefix", "0"))
+
+    def __init__(self, xml: str) -> None:
+        self._xml = xml
+        self.num_fmts = _StyleSection(xml, "numFmts", "numFmt")
+        self.fonts = _StyleSection(xml, "fonts", "font")
+        self.fills = _StyleSection(xml, "fills", "fill")
+        self.borders = _StyleSection(xml, "borders", "border")
+        self.cell_style_xfs = _StyleSection(xml, "cellStyleXfs", "xf", self._XF_DEFAULTS)
+        self.cell_xfs = _StyleSection(xml, "cellXfs", "xf", self._XF_DEFAULTS)
+        self.dxfs = _StyleSection(xml, "dxfs", "dxf")
+        self._formats = {}
+        for raw in self.num_fmts.items:
+            attrs = _attributes(raw)
+            self._formats[int(attrs.get("numFmtId", 0))] = attrs.get("formatCode", "")
+        self._xf_cache: Dict[Tuple[int, int], int] = {}
+        self._dxf_cache: Dict[Tuple[int, int], int] = {}
+
+    @property
+    def modified(self) -> bool:
+        return any(section.modified for section in self._sections())
+
+    def _sections(self) -> List[_StyleSection]:
+        return [self.num_fmts, self.fonts, self.fills, self.borders,
+                self.cell_style_xfs, self.cell_xfs, self.dxfs]
+
+    def _import_num_fmt(self, source: "StyleSheet", num_fmt_id: int) -> int:
+        code = source._formats.get(num_fmt_id)
+        if code is None or self._formats.get(num_fmt_id) == code:
+            return num_fmt_id
+        for existing_id, existing_code in self._formats.items():
+            if existing_code == code:
+                return existing_id
+        new_id = max([163, *self._formats]) + 1
+        self._formats[new_id] = code
+        self.num_fmts.items.append(
+            f'<numFmt numFmtId="{new_id}" formatCode="{_escape_attribute(code)}"/>')
+        self.num_fmts.modified = True
+        return new_id
+
+    def _import_record(self, source: "StyleSheet", raw: str, style_xf: bool) -> str:
+        head = re.match(r'<xf\b[^>]*?(?=/?>)', raw)
+        tag = head.group(0)
+        attrs = _attributes(tag)
+        for name, section, source_section in (
+            ("fontId", self.fonts, source.fonts),
+            ("fillId", self.fills, source.fills),
+            ("borderId", self.borders, source.borders),
+        ):
+            idx = int(attrs.get(name, 0))
+            if idx < len(source_section.items):
+                tag = _set_attribute(tag, name, section.add(source_section.items[idx]))
+        if "numFmtId" in attrs:
+            num_fmt_id = self._import_num_fmt(source, int(attrs["numFmtId"]))
+            tag = _set_attribute(tag, "numFmtId", num_fmt_id)
+        if not style_xf:
+            xf_id = int(attrs.get("xfId", 0))
+            parent = 0
+            if xf_id < len(source.cell_style_xfs.items):
+                parent = self.cell_style_xfs.add(
+                    self._import_record(source, source.cell_style_xfs.items[xf_id], True)
+                )
+            tag = _set_attribute(tag, "xfId", parent)
+        return tag + raw[head.end():]
+
+    def import_xf(self, source: "StyleSheet", index: int) -> int:
+        """
+        Import a cell format (``cellXfs`` entry) from another stylesheet.
+
+        Args:
+            source: The stylesheet the index refers to
+            index: The ``s`` attribute value in the source package
+
+        Returns:
+            int: The equivalent ``cellXfs`` index in this stylesheet
+        """
+        key = (id(source), index)
+        if key not in self._xf_cache:
+            if index >= len(source.cell_xfs.items):
+                self._xf_cache[key] = 0
+            else:
+                raw = self._import_record(source, source.cell_xfs.items[index], False)
+                self._xf_cache[key] = self.cell_xfs.add(raw)
+        return self._xf_cache[key]
+
+    def import_dxf(self, source: "StyleSheet", index: int) -> int:
+        """
+        Import a differential format used by conditional formatting.
+
+        Args:
+            source: The stylesheet the index refers to
+            index: The ``dxfId`` value in the source package
+
+        Returns:
+            int: The equivalent ``dxfs`` index in this stylesheet
+        """
+        key = (id(source), index)
+        if key not in self._dxf_cache:
+            if index >= len(source.dxfs.items):
+                self._dxf_cache[key] = 0
+            else:
+                self._dxf_cache[key] = self.dxfs.add(source.dxfs.items[index])
+        return self._dxf_cache[key]
+
+    def _insertion_point(self, name: str) -> int:
+        for later in self._ORDER[self._ORDER.index(name) + 1:]:
+            match = re.search(rf'<{later}\b', self._xml)
+            if match:
+                return match.start()
+        return self._xml.rindex("</styleSheet>")
+
+    def to_xml(self) -> str:
+        if not self.modified:
+            return self._xml
+        edits = []
+        for section in self._sections():
+            if not section.modified:
+                continue
+            if section.match:
+                edits.append((section.match.start(), section.match.end(), section.render()))
+            else:
+                point = self._insertion_point(section.name)
+                edits.append((point, point, section.render()))
+        xml = self._xml
+        for start, end, text in sorted(edits, key=lambda edit: edit[0], reverse=True):
+            xml = xml[:start] + text + xml[end:]
+        return xml
+
+
+class XlsxPackage:
+    """
+    An .xlsx package held in memory, read and written part by part.
+
+    Parts that are never replaced are written back byte-for-byte on save.
+    The package does not keep the source file open, so the file can be
+    overwritten or handed to Excel while the package is still in use.
+    """
+
+    def __init__(self, source: Union[str, bytes, BinaryIO, Any]) -> None:
+        if isinstance(source, (bytes, bytearray)):
+            data = bytes(source)
+        elif hasattr(source, "read"):
+            data = source.read()
+        else:
+            with open(source, "rb") as fh:
+                data = fh.read()
+        try:
+            self._archive = zipfile.ZipFile(BytesIO(data))
+        except zipfile.BadZipFile as e:
+            raise XlsxPackageError(f"Not an .xlsx package: {e}")
+        self._names = self._archive.namelist()
+        self._parts: Dict[str, bytes] = {}
+        self._removed: Set[str] = set()
+        self._shared_strings: Optional[SharedStringTable] = None
+        self._styles: Optional[StyleSheet] = None
+
+        root_rels = parse_relationships(self.read_text("_rels/.rels"))
+        documents = [rel for rel in root_rels if rel.type == OFFICE_DOCUMENT_REL]
+        if not documents:
+            raise XlsxPackageError("Package has no workbook part")
+        self.workbook_part = resolve_target("", documents[0].target)
+        self.workbook_rels_part = rels_part_for(self.workbook_part)
+
+    # -- raw part access -------------------------------------------------
+
+    def namelist(self) -> List[str]:
+        names = [name for name in self._names if name not in self._removed]
+        return names + [name for name in self._parts if name not in self._names]
+
+    def exists(self, name: str) -> bool:
+        return name in self._parts or (name in self._names and name not in self._removed)
+
+    def read(self, name: str) -> bytes:
+        if name in self._parts:
+            return self._parts[name]
+        if name in self._removed or name not in self._names:
+            raise XlsxPackageError(f"Package has no part '{name}'")
+        return self._archive.read(name)
+
+    def read_text(self, name: str) -> str:
+        return self.read(name).decode("utf-8")
+
+    def write(self, name: str, data: Union[str, bytes]) -> None:
+        self._parts[name] = data.encode("utf-8") if isinstance(data, str) else data
+        self._removed.discard(name)
+
+    def remove(self, name: str) -> None:
+        self._parts.pop(name, None)
+        if name in self._names:
+            self._removed.add(name)
+
+    # -- workbook structure ----------------------------------------------
+
+    def workbook_relationships(self) -> List[Relationship]:
+        return parse_relationships(self.read_text(self.workbook_rels_part))
+
+    def _workbook_target(self, rel_type: str) -> Optional[str]:
+        for rel in self.workbook_relationships():
+            if rel.type == rel_type:
+                return resolve_target(self.workbook_part, rel.target)
+        return None
+
+    @property
+    def sheets(self) -> List[SheetEntry]:
+        """All sheet entries of workbook.xml in tab order."""
+        rels = {rel.id: rel for rel in self.workbook_relationships()}
+        entries = []
+        for match in _SHEET_ENTRY_RE.finditer(self.read_text(self.workbook_part)):
+            attrs = _attributes(match.group(0))
+            rel_id = next((value for key, value in attrs.items() if key.endswith(":id")), "")
+            rel = rels.get(rel_id)
+            entries.append(SheetEntry(
+                attrs.get("name", ""), int(attrs.get("sheetId", 0)), rel_id,
+                resolve_target(self.workbook_part, rel.target) if rel else "",
+                rel.type if rel else ""
+            ))
+        return entries
+
+    @property
+    def sheetnames(self) -> List[str]:
+        return [entry.name for entry in self.sheets]
+
+    def sheet(self, name: str) -> SheetEntry:
+        for entry in self.sheets:
+            if entry.name == name:
+                return entry
+        raise KeyError(f"Worksheet {name} does not exist.")
+
+    def sheet_xml(self, name: str) -> str:
+        return self.read_text(self.sheet(name).part)
+
+    def part_relationships(self, part: str) -> List[Relationship]:
+        rels_part = rels_part_for(part)
+        if not self.exists(rels_part):
+            return []
+        return parse_relationships(self.read_text(rels_part))
+
+    @property
+    def shared_strings(self) -> SharedStringTable:
+        if self._shared_strings is None:
+            part = self._workbook_target(SHARED_STRINGS_REL)
+            self._shared_strings = SharedStringTable(
+                self.read_text(part) if part and self.exists(part) else None
+            )
+        return self._shared_strings
+
+    @property
+    def styles(self) -> StyleSheet:
+        if self._styles is None:
+            part = self._workbook_target(STYLES_REL)
+            if not part or not self.exists(part):
+                raise XlsxPackageError("Package has no styles part")
+            self._styles = StyleSheet(self.read_text(part))
+        return self._styles
+
+    def _add_workbook_relationship(self, rel_type: str, target: str) -> str:
+        xml = self.read_text(self.workbook_rels_part)
+        existing = {rel.id for rel in parse_relationships(xml)}
+        number = len(existing) + 1
+        while f"rId{number}" in existing:
+            number += 1
+        rel_id = f"rId{number}"
+        entry = (f'<Relationship Id="{rel_id}" Type="{rel_type}" '
+                 f'Target="{_escape_attribute(target)}"/>')
+        self.write(self.workbook_rels_part,
+                   xml.replace("</Relationships>", entry + "</Relationships>"))
+        return rel_id
+
+    def _add_content_type(self, part: str, content_type: str) -> None:
+        xml = self.read_text(CONTENT_TYPES_PART)
+        if f'PartName="/{part}"' in xml:
+            return
+        entry = f'<Override PartName="/{part}" ContentType="{content_type}"/>'
+        self.write(CONTENT_TYPES_PART, xml.replace("</Types>", entry + "</Types>"))
+
+    def _remove_content_type(self, part: str) -> None:
+        xml = self.read_text(CONTENT_TYPES_PART)
+        updated = re.sub(rf'<Override\b[^>]*PartName="/{re.escape(part)}"[^>]*/>', "", xml)
+        if updated != xml:
+            self.write(CONTENT_TYPES_PART, updated)
+
+    def drop_calc_chain(self) -> None:
+        """
+        Remove the calculation chain so Excel rebuilds it on open.
+
+        The chain lists every formula cell; it must go whenever worksheet
+        formulas are rewritten, otherwise Excel reports the file as damaged.
+        """
+        xml = self.read_text(self.workbook_rels_part)
+        for rel in parse_relationships(xml):
+            if rel.type != CALC_CHAIN_REL:
+                continue
+            part = resolve_target(self.workbook_part, rel.target)
+            self.remove(part)
+            self._remove_content_type(part)
+            xml = re.sub(rf'<Relationship\b[^>]*Id="{re.escape(rel.id)}"[^>]*/>', "", xml)
+            self.write(self.workbook_rels_part, xml)
+
+    # -- worksheet transplanting -----------------------------------------
+
+    def transplant_sheet_xml(
+        self,
+        source: "XlsxPackage",
+        source_name: str,
+        keep_hyperlinks: bool = True,
+        cancellation_check: Optional[Callable[[], bool]] = None
+    ) -> Tuple[str, List[Relationship]]:
+        """
+        Rewrite a worksheet of another package so it is valid in this one.
+
+        Shared-string and style indexes are remapped into this package's
+        tables. External hyperlinks are carried over; drawings, comments,
+        tables and other related parts are dropped.
+
+        Args:
+            source: The package that owns the worksheet
+            source_name: The name of the worksheet in the source package
+            keep_hyperlinks: Whether to carry over external hyperlinks
+            cancellation_check: Optional function to check if operation should be cancelled
+
+        Returns:
+            Tuple of the rewritten worksheet XML and the relationships it needs
+        """
+        entry = source.sheet(source_name)
+        if entry.rel_type != WORKSHEET_REL:
+            raise XlsxPackageError(f"Sheet '{source_name}' is not a worksheet")
+        xml = source.read_text(entry.part)
+        rels = {rel.id: rel for rel in source.part_relationships(entry.part)}
+        kept = [
+            rel for rel in rels.values()
+            if keep_hyperlinks and rel.type == HYPERLINK_REL and rel.target_mode == "External"
+        ]
+
+        has_styles = source._workbook_target(STYLES_REL) is not None
+        target_styles = self.styles if has_styles else None
+        source_styles = source.styles if has_styles else None
+        has_strings = source._workbook_target(SHARED_STRINGS_REL) is not None
+        source_strings = source.shared_strings.items if has_strings else []
+        strings = self.shared_strings if source_strings else None
+
+        def style(match: "re.Match") -> str:
+            if target_styles is None:
+                return f'{match.group(1)}0"'
+            return f'{match.group(1)}{target_styles.import_xf(source_styles, int(match.group(2)))}"'
+
+        def cell(match: "re.Match") -> str:
+            attrs = _STYLE_ATTR_RE.sub(style, match.group(1))
+            content = match.group(3)
+            if content is None:
+                return f"<c{attrs}/>"
+            if strings is not None and _SHARED_TYPE_RE.search(attrs):
+                content = _VALUE_RE.sub(
+                    lambda v: f"<v>{strings.add(source_strings[int(v.group(1))])}</v>",
+                    content, count=1
+                )
+            return f"<c{attrs}>{content}</c>"
+
+        def sheet_data(match: "re.Match") -> str:
+            rows = match.group(0).split("</row>")
+            for idx, row in enumerate(rows):
+                if cancellation_check and idx % 256 == 0 and cancellation_check():
+                    raise InterruptedError("Worksheet transplant cancelled")
+                row = _ROW_RE.sub(lambda r: _STYLE_ATTR_RE.sub(style, r.group(0)), row, count=1)
+                rows[idx] = _CELL_RE.sub(cell, row)
+            return "</row>".join(rows)
+
+        xml = _SHEET_DATA_RE.sub(sheet_data, xml, count=1)
+        xml = _COL_RE.sub(lambda m: _COL_STYLE_ATTR_RE.sub(style, m.group(0)), xml)
+        if target_styles is not None:
+            def dxf(match: "re.Match") -> str:
+                dxf_id = target_styles.import_dxf(source_styles, int(match.group(2)))
+                return f'{match.group(1)}{dxf_id}"'
+
+            xml = _DXF_ATTR_RE.sub(dxf, xml)
+        xml = _strip_relationships(xml, {rel.id for rel in kept})
+        return xml, kept
+
+    def replace_sheet(
+        self,
+        name: str,
+        source: "XlsxPackage",
+        source_name: Optional[str] = None,
+        cancellation_check: Optional[Callable[[], bool]] = None
+    ) -> None:
+        """
+        Replace the XML part of a worksheet with one from another package.
+
+        Args:
+            name: The worksheet to replace in this package
+            source: The package holding the new worksheet content
+            source_name: The worksheet name in the source (defaults to name)
+            cancellation_check: Optional function to check if operation should be cancelled
+        """
+        entry = self.sheet(name)
+        xml, rels = self.transplant_sheet_xml(source, source_name or name, True, cancellation_check)
+        self.write(entry.part, xml)
+        self._write_part_relationships(entry.part, rels)
+
+    def add_sheet(
+        self,
+        source: "XlsxPackage",
+        source_name: str,
+        new_name: str,
+        index: Optional[int] = None,
+        cancellation_check: Optional[Callable[[], bool]] = None
+    ) -> str:
+        """
+        Copy a worksheet from another package into this one as a new sheet.
+
+        Args:
+            source: The package that owns the worksheet
+            source_name: The name of the worksheet in the source package
+            new_name: The name of the new sheet; made unique like openpyxl does
+            index: Optional tab position to insert the sheet at (appended if None)
+            cancellation_check: Optional function to check if operation should be cancelled
+
+        Returns:
+            str: The name the new sheet was given
+
+        Raises:
+            ValueError: If the new name contains characters Excel does not allow
+        """
+        if INVALID_TITLE_REGEX.search(new_name):
+            raise ValueError(f"Invalid character in sheet title '{new_name}'")
+        xml, rels = self.transplant_sheet_xml(source, source_name, True, cancellation_check)
+        xml = _CODE_NAME_RE.sub(r"\1", _TAB_SELECTED_RE.sub("", xml))
+
+        name = avoid_duplicate_name(self.sheetnames, new_name)
+        directory = posixpath.dirname(self.workbook_part)
+        number = 1
+        while self.exists(posixpath.join(directory, "worksheets", f"sheet{number}.xml")):
+            number += 1
+        part = posixpath.join(directory, "worksheets", f"sheet{number}.xml")
+
+        self.write(part, xml)
+        self._write_part_relationships(part, rels)
+        self._add_content_type(part, WORKSHEET_CONTENT_TYPE)
+        rel_id = self._add_workbook_relationship(WORKSHEET_REL, posixpath.relpath(part, directory))
+        self._insert_sheet_entry(name, rel_id, index)
+        return name
+
+    def _insert_sheet_entry(self, name: str, rel_id: str, index: Optional[int]) -> None:
+        """Add a ``<sheet>`` entry to workbook.xml and shift sheet-index references."""
+        xml = self.read_text(self.workbook_part)
+        entries = list(_SHEET_ENTRY_RE.finditer(xml))
+        prefix_match = re.search(rf'xmlns:(\w+)="{re.escape(REL_NS)}"', xml)
+        prefix = prefix_match.group(1) if prefix_match else "r"
+        sheet_id = max([0, *(int(_attributes(m.group(0)).get("sheetId", 0))
+                             for m in entries)]) + 1
+        tag = (f'<sheet name="{_escape_attribute(name)}" sheetId="{sheet_id}" '
+               f'{prefix}:id="{rel_id}"/>')
+
+        position = len(entries)
+        if index is not None:
+            position = min(max(index if index >= 0 else len(entries) + index, 0), len(entries))
+        if position == len(entries):
+            at = entries[-1].end()
+        else:
+            at = entries[position].start()
+        xml = xml[:at] + tag + xml[at:]
+
+        if position < len(entries):
+            def shift(match: "re.Match") -> str:
+                value = int(match.group(2))
+                return f'{match.group(1)}{value + 1 if value >= position else value}"'
+            xml = re.sub(r'(<definedName\b[^>]*?\slocalSheetId=")(\d+)"', shift, xml)
+            for attribute in ("activeTab", "firstSheet"):
+                xml = re.sub(rf'(<workbookView\b[^>]*?\s{attribute}=")(\d+)"', shift, xml)
+        self.write(self.workbook_part, xml)
+
+    def _write_part_relationships(self, part: str, rels: List[Relationship]) -> None:
+        rels_part = rels_part_for(part)
+        if rels:
+            self.write(rels_part, render_relationships(rels))
+        else:
+            self.remove(rels_part)
+
+    # -- saving ----------------------------------------------------------
+
+    def _flush(self) -> None:
+        if self._shared_strings is not None and self._shared_strings.modified:
+            part = self._workbook_target(SHARED_STRINGS_REL)
+            if part is None:
+                part = posixpath.join(posixpath.dirname(self.workbook_part), "sharedStrings.xml")
+                target = posixpath.relpath(part, posixpath.dirname(self.workbook_part))
+                self._add_workbook_relationship(SHARED_STRINGS_REL, target)
+                self._add_content_type(part, SHARED_STRINGS_CONTENT_TYPE)
+            self.write(part, self._shared_strings.to_xml())
+        if self._styles is not None and self._styles.modified:
+            self.write(self._workbook_target(STYLES_REL), self._styles.to_xml())
+
+    def save(
+        self,
+        target: Union[str, BinaryIO],
+        compression: int = zipfile.ZIP_DEFLATED,
+        cancellation_check: Optional[Callable[[], bool]] = None
+    ) -> None:
+        """
+        Write the package to a path or binary file-like object.
+
+        Args:
+            target: Destination path or writable binary stream
+            compression: Zip compression method; ZIP_STORED is faster for in-memory hand-offs
+            cancellation_check: Optional function to check if operation should be cancelled
+
+        Raises:
+            InterruptedError: If cancelled while writing; a partially written
+                file at a target path is removed
+        """
+        self._flush()
+        try:
+            with zipfile.ZipFile(target, "w", compression) as archive:
+                for name in self.namelist():
+                    if cancellation_check and cancellation_check():
+                        raise InterruptedError("Cancelled while saving workbook")
+                    archive.writestr(name, self.read(name))
+        except InterruptedError:
+            if isinstance(target, (str, os.PathLike)) and os.path.exists(target):
+                os.remove(target)
+            raise
+
+    def to_bytes(self, compression: int = zipfile.ZIP_DEFLATED) -> bytes:
+        buffer = BytesIO()
+        self.save(buffer, compression)
+        return buffer.getvalue()
+
+
+def _cached_value_xml(value: Any) -> Tuple[Optional[str], str]:
+    """Return the cell type attribute and <v> text for a cached formula result."""
+    if isinstance(value, bool):
+        return "b", "1" if value else "0"
+    if isinstance(value, str):
+        if value in ERROR_VALUES:
+            return "e", value
+        return "str", html.escape(value, quote=False)
+    if isinstance(value, Decimal):
+        return None, format(value, "f")
+    if isinstance(value, float):
+        return None, repr(value)
+    return None, str(value)
+
+
+def set_cached_values(xml: str, values: Dict[str, Any]) -> Tuple[str, int]:
+    """
+    Store cached results on the formula cells of worksheet XML.
+
+    Each formula cell listed in ``values`` gets a ``<v>`` element holding the
+    result and a matching ``t`` attribute, the way Excel writes calculated
+    formulas, so viewers and ``data_only`` readers see the result without
+    recalculating.
+
+    Args:
+        xml: The worksheet XML
+        values: Cached results keyed by cell coordinate (e.g. {'B14': 'a'})
+
+    Returns:
+        Tuple of the updated XML and the number of cells updated
+    """
+    updated = 0
+
+    def cell(match: "re.Match") -> str:
+        nonlocal updated
+        attrs, content = match.group(1), match.group(3)
+        if content is None or "<f" not in content:
+            return match.group(0)
+        coordinate = _attributes(attrs).get("r")
+        if coordinate not in values:
+            return match.group(0)
+        cell_type, text = _cached_value_xml(values[coordinate])
+        tag = _TYPE_ATTR_RE.sub("", f"<c{attrs}>")
+        if cell_type is not None:
+            tag = _set_attribute(tag, "t", cell_type)
+        content = _FORMULA_VALUE_RE.sub(lambda f: f"{f.group(1)}<v>{text}</v>", content, count=1)
+        updated += 1
+        return f"{tag}{content}</c>"
+
+    return _SHEET_DATA_RE.sub(lambda m: _CELL_RE.sub(cell, m.group(0)), xml, count=1), updated
+
+
+class FormulaCell(NamedTuple):
+    """A formula cell found in worksheet XML."""
+    coordinate: str
+    formula: Optional[str]  # '=...' text, or None for data tables
+    has_value: bool         # whether a cached result is stored
+
+
+def iter_formula_cells(xml: str) -> Iterator[FormulaCell]:
+    """
+    List the formula cells of worksheet XML without parsing the sheet.
+
+    Shared formulas are expanded to the text each cell would show in Excel.
+
+    Args:
+        xml: The worksheet XML
+
+    Yields:
+        FormulaCell: One entry per formula cell, in document order
+    """
+    shared: Dict[str, Tuple[str, str]] = {}
+    sheet_data = _SHEET_DATA_RE.search(xml)
+    if sheet_data is None:
+        return
+    for match in _CELL_RE.finditer(sheet_data.group(0)):
+        content = match.group(3)
+        if content is None or "<f" not in content:
+            continue
+        formula_match = _FORMULA_RE.search(content)
+        if formula_match is None:
+            continue
+        coordinate = _attributes(match.group(1)).get("r")
+        if coordinate is None:
+            continue
+        attrs = _attributes(f"<f{formula_match.group(1)}>")
+        text = html.unescape(formula_match.group(2) or "")
+        if attrs.get("t") == "shared":
+            if text:
+                shared[attrs.get("si")] = (text, coordinate)
+            elif attrs.get("si") in shared:
+                master, origin = shared[attrs["si"]]
+                text = Translator(f"={master}", origin=origin).translate_formula(coordinate)[1:]
+        formula = None if attrs.get("t") == "dataTable" or not text else f"={text}"
+        yield FormulaCell(coordinate, formula, bool(_HAS_VALUE_RE.search(content)))
+
+
+def _strip_relationships(xml: str, kept_ids: Set[str]) -> str:
+    """
+    Remove worksheet elements whose relationship is not carried over.
+
+    Args:
+        xml: The worksheet XML
+        kept_ids: Relationship ids that remain valid (external hyperlinks)
+
+    Returns:
+        str: The worksheet XML without dangling relationship references
+    """
+    prefix_match = re.search(rf'xmlns:(\w+)="{re.escape(REL_NS)}"', xml)
+    prefix = prefix_match.group(1) if prefix_match else "r"
+    rel_attr = re.compile(rf'\s{prefix}:id="([^"]*)"')
+
+    def hyperlink(match: "re.Match") -> str:
+        rel = rel_attr.search(match.group(0))
+        if rel is None or rel.group(1) in kept_ids:
+            return match.group(0)
+        return ""
+
+    xml = re.sub(r'<hyperlink\b[^>]*?(?:/>|>.*?</hyperlink>)', hyperlink, xml, flags=re.S)
+    xml = re.sub(r'<hyperlinks\b[^>]*>\s*</hyperlinks>|<hyperlinks\b[^>]*/>', "", xml)
+    for tag in _RELATED_ELEMENTS:
+        xml = re.sub(rf'<{tag}\b[^>]*?(?:/>|>.*?</{tag}>)', "", xml, flags=re.S)
+    xml = re.sub(
+        r'<mc:AlternateContent\b[^>]*>\s*<mc:Choice\b[^>]*>\s*</mc:Choice>\s*'
+        r'(?:<mc:Fallback\b[^>]*>\s*</mc:Fallback>\s*)?</mc:AlternateContent>',
+        "", xml
+    )
+    xml = re.sub(r'<ext\b[^>]*>(?:(?!</ext>).)*?</ext>',
+                 lambda m: "" if rel_attr.search(m.group(0)) else m.group(0), xml, flags=re.S)
+    xml = re.sub(r'<extLst>\s*</extLst>', "", xml)
+    xml = re.sub(r'(<pageSetup\b[^>]*?)' + rel_attr.pattern, r'\1', xml)
+    return xml
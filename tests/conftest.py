@@ -0,0 +1,171 @@
+"""
+Shared fixtures for the test suite.
+
+Provides a factory that writes small .xlsx files, optionally with cached
+formula results and a shared-strings table, which openpyxl itself never
+writes but Excel always does, and the input files of a small reconciliation
+run.
+"""
+
+import re
+import zipfile
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import pytest
+from openpyxl import Workbook
+
+
+def inject_cached_values(path: Path, sheet_index: int, cached: Dict[str, Any]) -> None:
+    """
+    Write cached ``<v>`` results into formula cells of a saved workbook.
+
+    Args:
+        path: Path of the .xlsx file written by openpyxl
+        sheet_index: 1-based worksheet part number (xl/worksheets/sheetN.xml)
+        cached: Mapping of cell coordinate to cached value
+    """
+    part = f"xl/worksheets/sheet{sheet_index}.xml"
+    with zipfile.ZipFile(path) as archive:
+        entries = {name: archive.read(name) for name in archive.namelist()}
+
+    xml = entries[part].decode("utf-8")
+    for coordinate, value in cached.items():
+        pattern = re.compile(rf'<c r="{coordinate}"([^>]*)><f>(.*?)</f><v\s*/>')
+        type_attr = ' t="str"' if isinstance(value, str) else ""
+        xml, count = pattern.subn(
+            lambda m: (f'<c r="{coordinate}"{m.group(1)}{type_attr}>'
+                       f'<f>{m.group(2)}</f><v>{value}</v>'),
+            xml
+        )
+        assert count == 1, f"No formula cell {coordinate} in {part}"
+    entries[part] = xml.encode("utf-8")
+
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in entries.items():
+            archive.writestr(name, data)
+
+
+def share_strings(path: Path) -> None:
+    """
+    Move the inline strings of a saved workbook into a sharedStrings part.
+
+    Args:
+        path: Path of the .xlsx file written by openpyxl
+    """
+    with zipfile.ZipFile(path) as archive:
+        entries = {name: archive.read(name) for name in archive.namelist()}
+
+    strings: Dict[str, int] = {}
+
+    def shared(match: "re.Match") -> str:
+        index = strings.setdefault(match.group(2), len(strings))
+        return f'<c{match.group(1)} t="s"><v>{index}</v></c>'
+
+    for name in [n for n in entries if n.startswith("xl/worksheets/sheet")]:
+        xml = entries[name].decode("utf-8")
+        xml = re.sub(r'<c([^>]*?) t="inlineStr"><is><t>([^<]*)</t></is></c>', shared, xml)
+        entries[name] = xml.encode("utf-8")
+
+    items = "".join(f"<si><t>{text}</t></si>" for text in strings)
+    entries["xl/sharedStrings.xml"] = (
+        '<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        f'count="{len(strings)}" uniqueCount="{len(strings)}">{items}</sst>'
+    ).encode("utf-8")
+    entries["xl/_rels/workbook.xml.rels"] = entries["xl/_rels/workbook.xml.rels"].replace(
+        b"</Relationships>",
+        b'<Relationship Id="rIdSst" Target="sharedStrings.xml" Type="http://schemas.openxmlformats.org/'
+        b'officeDocument/2006/relationships/sharedStrings"/></Relationships>'
+    )
+    entries["[Content_Types].xml"] = entries["[Content_Types].xml"].replace(
+        b"</Types>",
+        b'<Override PartName="/xl/sharedStrings.xml" ContentType="application/vnd.openxmlformats-'
+        b'officedocument.spreadsheetml.sharedStrings+xml"/></Types>'
+    )
+
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in entries.items():
+            archive.writestr(name, data)
+
+
+@pytest.fixture
+def shared_strings_converter() -> Callable[[Path], None]:
+    """Expose :func:`share_strings` to tests that build their own workbooks."""
+    return share_strings
+
+
+@pytest.fixture
+def build_workbook(tmp_path: Path) -> Callable[..., Path]:
+    """
+    Factory fixture that writes a workbook from plain dictionaries.
+
+    The factory takes ``sheets`` ({title: {coordinate: value}}), an optional
+    ``cached`` mapping ({title: {coordinate: cached value}}), a file name and
+    ``shared_strings`` to store text the way Excel does.
+    """
+    def _build(
+        sheets: Dict[str, Dict[str, Any]],
+        cached: Optional[Dict[str, Dict[str, Any]]] = None,
+        name: str = "book.xlsx",
+        shared_strings: bool = False
+    ) -> Path:
+        wb = Workbook()
+        wb.remove(wb.active)
+        for title, cells in sheets.items():
+            ws = wb.create_sheet(title)
+            for coordinate, value in cells.items():
+                ws[coordinate] = value
+        path = tmp_path / name
+        wb.save(path)
+
+        titles = list(sheets)
+        for title, values in (cached or {}).items():
+            inject_cached_values(path, titles.index(title) + 1, values)
+        if shared_strings:
+            share_strings(path)
+        return path
+
+    return _build
+
+
+@pytest.fixture
+def recon_files(build_workbook):
+    """Target, trial balance and TIER files for one WMD component."""
+    component = {
+        "A3": "UCO total reported in TIER", "B3": 20,
+        "C5": "UDO total reported in TIER", "D5": 20,
+        "A10": "Contract / Agreement / Sales Order #",
+        "B11": 20, "D11": 20, "E11": 20, "F11": 20, "G11": 20, "H11": 20,
+        "A12": "Providing Bureau UCO Total via their system records:",
+        **{f"{col}12": f"=SUM({col}11:{col}11)" for col in "BDEFGH"},
+        "A20": "Difference between: System of Record vs TIER", "B20": 0, "D20": 0,
+        "C22": "UDO total via system records", "D22": 20,
+        "C24": "UDO after high level adjustments", "D24": 20,
+        "C26": "Difference between: System of Record (after adjustments) vs TIER",
+    }
+    target = build_workbook(
+        {
+            "Instructions": {"A1": "Read me"},
+            "Certification": {
+                "A5": "Trading Partner Number", "B5": "TIER Component",
+                "A6": 7023, "B6": "WMD", "D6": 20, "E6": 20, "F6": 0, "G6": "CWMD-7023",
+                "A7": "Total ", "D7": "=SUM(D6:D6)",
+            },
+            "CWMD-7023": component,
+        },
+        cached={"Certification": {"D7": 20}, "CWMD-7023": {f"{col}12": 20 for col in "BDEFGH"}},
+        name="target.xlsx",
+    )
+    trial_balance = build_workbook(
+        {"WMD Total": {"C10": "422100", "F10": 60, "H10": "=F10"}},
+        cached={"WMD Total": {"H10": 60}}, name="tb.xlsx", shared_strings=True,
+    )
+    tier = build_workbook(
+        {"UCO to UDO": {
+            "A3": "Component", "A5": "Component", "E5": "UCO",
+            "A6": "WMD", "E6": 20, "H6": 20, "L6": 0,
+            "A7": "WMD Total", "E7": "=SUM(E6:E6)",
+        }},
+        cached={"UCO to UDO": {"E7": 20}}, name="tier.xlsx",
+    )
+    return target, trial_balance, tier
@@ -0,0 +1,109 @@
+"""
+Tests for the async pipeline module.
+
+This module contains tests for awaiting reconciliation runs, following
+their progress and running several of them concurrently.
+"""
+
+import asyncio
+import shutil
+import threading
+import time
+
+import pytest
+from openpyxl import load_workbook
+
+from src.uco_to_udo_recon.core.async_pipeline import (
+    AsyncProgress,
+    ReconciliationJob,
+    reconcile,
+    reconcile_components,
+)
+from src.uco_to_udo_recon.core.pipeline import ReconciliationPipeline
+from src.uco_to_udo_recon.utils.cancellation import sleep_unless_cancelled
+
+
+class TestReconcile:
+    """Tests for reconcile."""
+
+    def test_progress_iterator(self, recon_files):
+        """A run can be awaited while its progress is read with async for."""
+        target, trial_balance, tier = recon_files
+
+        async def main():
+            progress = AsyncProgress()
+            run = progress.follow(reconcile(
+                str(target), str(trial_balance), str(tier), "WMD", backend="none", progress=progress
+            ))
+            updates = [update async for update in progress]
+            return await run, updates
+
+        output, updates = asyncio.run(main())
+        assert load_workbook(output, read_only=True).sheetnames[-2:] == ["DO TB", "DO UCO to UDO"]
+        assert {update.component_name for update in updates} == {"WMD"}
+        assert updates[0].value == 0 and updates[-1].value == 100
+
+    def test_cancel_stops_stage(self, recon_files, monkeypatch):
+        """Cancelling the task cancels the running stage through its token."""
+        target, trial_balance, tier = recon_files
+        stopped = threading.Event()
+
+        def slow_import(self, imports, progress_callback=None, cancellation_check=None):
+            if sleep_unless_cancelled(5, cancellation_check):
+                stopped.set()
+            return False
+
+        monkeypatch.setattr(ReconciliationPipeline, "import_sheets", slow_import)
+
+        async def main():
+            run = asyncio.ensure_future(
+                reconcile(str(target), str(trial_balance), str(tier), "WMD"))
+            await asyncio.sleep(0.2)
+            run.cancel()
+            start = time.perf_counter()
+            with pytest.raises(asyncio.CancelledError):
+                await run
+            return time.perf_counter() - start
+
+        assert asyncio.run(main()) < 0.5
+        assert stopped.is_set()
+
+
+class TestReconcileComponents:
+    """Tests for reconcile_components."""
+
+    def test_concurrency_limit(self, recon_files, tmp_path, monkeypatch):
+        """Runs are gathered with at most max_concurrency in progress."""
+        target, trial_balance, tier = recon_files
+        jobs = []
+        for index in range(3):
+            copy = tmp_path / f"target{index}.xlsx"
+            shutil.copy(target, copy)
+            jobs.append(ReconciliationJob(str(copy), str(trial_balance), str(tier), "WMD"))
+
+        lock = threading.Lock()
+        running = [0, 0]  # current, peak
+        prepare = ReconciliationPipeline.prepare_working_copy
+
+        def counted_prepare(self):
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            time.sleep(0.1)
+            prepare(self)
+            with lock:
+                running[0] -= 1
+
+        monkeypatch.setattr(ReconciliationPipeline, "prepare_working_copy", counted_prepare)
+        results = asyncio.run(reconcile_components(jobs, max_concurrency=2, backend="none"))
+
+        assert running[1] == 2
+        assert all(isinstance(result, str) and result.endswith(".xlsx") for result in results)
+        assert len(set(results)) == 3
+
+    def test_shared_target_rejected(self, recon_files):
+        """Two jobs writing the same working copy are refused."""
+        target, trial_balance, tier = recon_files
+        job = ReconciliationJob(str(target), str(trial_balance), str(tier), "WMD")
+        with pytest.raises(ValueError):
+            asyncio.run(reconcile_components([job, job]))
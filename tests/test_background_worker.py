@@ -6,16 +6,24 @@ classes, demonstrating their usage in a simulated Excel operation workflow.
 """
 
 import os
+import queue
 import sys
+import tempfile
+import threading
 import time
 import logging
 import unittest
+from concurrent.futures import CancelledError, as_completed
 from unittest.mock import MagicMock, patch
 
 # Add the src directory to the path for imports
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from src.uco_to_udo_recon.modules.background_worker import BackgroundWorker, ProgressTracker, TaskManager
+from src.uco_to_udo_recon.modules.background_worker import (
+    BackgroundWorker, ProcessTaskRunner, ProgressTracker, TaskFuture, TaskManager, WorkflowTiming,
+    task_fingerprint
+)
+from src.uco_to_udo_recon.utils.cancellation import sleep_unless_cancelled
 
 
 # Sample functions for testing
@@ -43,11 +51,29 @@ def long_running_task(duration=1, progress_callback=None, cancellation_check=Non
     return f"Task completed in {duration} seconds"
 
 
+def wait_for_cancellation(cancellation_check=None):
+    """A task that idles until it is cancelled."""
+    if sleep_unless_cancelled(10, cancellation_check):
+        raise InterruptedError("Task was cancelled")
+    return "not cancelled"
+
+
 def task_with_error():
     """A task that raises an exception."""
     raise ValueError("Simulated task error")
 
 
+def process_id_task():
+    """A task that logs a warning and returns the ID of the process running it."""
+    logging.getLogger("test_logger").warning("Running in process %s", os.getpid())
+    return os.getpid()
+
+
+def crashing_task():
+    """A task that kills the process running it."""
+    os._exit(3)
+
+
 class TestBackgroundWorker(unittest.TestCase):
     """Test cases for the BackgroundWorker class."""
     
@@ -136,6 +162,370 @@ class TestBackgroundWorker(unittest.TestCase):
         self.assertIsInstance(error, Exception)
         self.assertIn("cancelled", str(error).lower())
 
+    def test_cancel_latency(self):
+        """A task waiting on its cancellation token stops right after cancel_task."""
+        task_id = self.worker.queue_task(wait_for_cancellation)
+        time.sleep(0.3)
+        self.worker.cancel_task(task_id)
+
+        timeout = time.time() + 3
+        while self.complete_mock.call_count == 0 and time.time() < timeout:
+            time.sleep(0.01)
+        success, result, error = self.complete_mock.call_args[0]
+        self.assertIsInstance(error, InterruptedError)
+        self.assertLess(self.worker.cancel_latencies[-1], 0.2)
+
+
+class TestWorkerLifecycle(unittest.TestCase):
+    """Test cases for starting and stopping a BackgroundWorker."""
+
+    def setUp(self):
+        """Set up a started worker."""
+        self.complete_mock = MagicMock()
+        self.worker = BackgroundWorker(on_complete=self.complete_mock,
+                                       logger=logging.getLogger("test_logger"))
+        self.worker.start()
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.worker.stop()
+
+    def test_start_latency(self):
+        """A task queued on an idle worker starts within milliseconds."""
+        started = threading.Event()
+        time.sleep(0.1)  # let the worker thread block on the empty queue
+        self.worker.queue_task(started.set)
+        self.assertTrue(started.wait(timeout=1))
+        self.assertLess(self.worker.start_latencies[-1], 0.05)
+
+    def test_stop_drain(self):
+        """Draining runs every queued task, then every worker thread has exited."""
+        for _ in range(3):
+            self.worker.queue_task(time.sleep, args=(0.05,))
+        self.assertTrue(self.worker.stop(mode="drain"))
+        self.assertEqual(self.complete_mock.call_count, 3)
+        self.assertTrue(all(call[0][0] for call in self.complete_mock.call_args_list))
+        self.assertFalse(any(thread.is_alive() for thread in self.worker.worker_threads))
+
+    def test_stop_abort(self):
+        """Aborting cancels the running task and discards queued ones before returning."""
+        self.worker.queue_task(long_running_task, args=(5,), task_name="running")
+        queued_complete = MagicMock()
+        self.worker.queue_task(long_running_task, args=(5,), on_complete=queued_complete)
+        time.sleep(0.2)
+
+        start = time.time()
+        self.assertTrue(self.worker.stop(mode="abort"))
+        self.assertLess(time.time() - start, 1)
+        self.assertFalse(self.worker.worker_threads[0].is_alive())
+
+        success, result, error = queued_complete.call_args[0]
+        self.assertFalse(success)
+        self.assertIsInstance(error, CancelledError)
+        self.assertEqual(self.complete_mock.call_count, 2)
+        self.assertEqual(self.worker.queue_depth, 0)
+
+    def test_restart(self):
+        """A stopped worker starts again when a task is queued."""
+        self.worker.stop()
+        done = threading.Event()
+        self.worker.queue_task(done.set)
+        self.assertTrue(done.wait(timeout=1))
+
+
+class TestProcessExecution(TestBackgroundWorker):
+    """Run the BackgroundWorker tests with tasks executed in a child process."""
+
+    def setUp(self):
+        """Set up a worker using the process execution backend."""
+        super().setUp()
+        self.worker.stop()
+        self.worker = BackgroundWorker(
+            on_progress=self.progress_mock,
+            on_complete=self.complete_mock,
+            on_message=self.message_mock,
+            logger=self.logger,
+            execution_backend="process",
+            max_tasks_per_child=2
+        )
+        self.worker.start()
+
+    def test_child_recycled(self):
+        """The child process is replaced after max_tasks_per_child tasks."""
+        runner = self.worker.process_runners[0]
+        with self.assertLogs("test_logger", level="WARNING") as logs:
+            pids = [runner.run(process_id_task) for _ in range(3)]
+        self.assertNotIn(os.getpid(), pids)
+        self.assertEqual(pids[0], pids[1])
+        self.assertNotEqual(pids[1], pids[2])
+        self.assertEqual(logs.output[0], f"WARNING:test_logger:Running in process {pids[0]}")
+
+    def test_child_crash(self):
+        """A child that dies fails its task, and the next task gets a new child."""
+        runner = self.worker.process_runners[0]
+        with self.assertRaisesRegex(RuntimeError, "exit code 3"):
+            runner.run(crashing_task)
+        self.assertIsInstance(runner.run(long_running_task, (0.1,)), str)
+
+    def test_unpicklable_task(self):
+        """Tasks must be module-level functions."""
+        runner = ProcessTaskRunner()
+        try:
+            with self.assertRaises(TypeError):
+                runner.run(lambda: None)
+        finally:
+            runner.close()
+
+
+class TestQueuePolicies(unittest.TestCase):
+    """Test cases for task priorities, coalescing and the bounded queue."""
+
+    def setUp(self):
+        """Set up a worker whose only worker thread is held by a blocking task."""
+        self.logger = logging.getLogger("test_logger")
+        self.release = threading.Event()
+        self.ran = []
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.release.set()
+        self.worker.stop()
+
+    def start_worker(self, **options):
+        """Start a worker and occupy its worker thread until ``release`` is set."""
+        self.worker = BackgroundWorker(logger=self.logger, **options)
+        started = threading.Event()
+        self.worker.queue_task(self.release.wait, args=(5,), on_start=started.set)
+        self.assertTrue(started.wait(timeout=1))
+
+    def test_priority_order(self):
+        """Waiting tasks run by priority, then in the order they were queued."""
+        self.start_worker()
+        for name, priority in [("low", "low"), ("normal 1", "normal"),
+                               ("high", "high"), ("normal 2", "normal")]:
+            self.worker.queue_task(self.ran.append, args=(name,), priority=priority)
+        self.release.set()
+        self.worker.stop(mode="drain")
+        self.assertEqual(self.ran, ["high", "normal 1", "normal 2", "low"])
+        with self.assertRaises(ValueError):
+            self.worker.queue_task(self.ran.append, args=("x",), priority="urgent")
+
+    def test_coalesce_identical_submissions(self):
+        """Resubmitting a task for unchanged files reuses the queued task."""
+        self.start_worker()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "input.xlsx")
+            with open(path, "wb") as fh:
+                fh.write(b"first")
+            callbacks = [MagicMock(), MagicMock()]
+            first = self.worker.queue_task(self.ran.append, args=(path,), coalesce=True,
+                                           on_complete=callbacks[0])
+            second = self.worker.queue_task(self.ran.append, args=(path,), coalesce=True,
+                                            on_complete=callbacks[1])
+            self.assertEqual(first, second)
+            self.assertEqual(self.worker.queue_depth, 1)
+
+            with open(path, "wb") as fh:
+                fh.write(b"edited")
+            third = self.worker.queue_task(self.ran.append, args=(path,), coalesce=True)
+            self.assertNotEqual(third, first)
+
+            self.release.set()
+            self.worker.stop(mode="drain")
+        self.assertEqual(len(self.ran), 2)
+        for callback in callbacks:
+            callback.assert_called_once_with(True, None, None)
+
+    def test_fingerprint_does_not_read_files(self):
+        """Fingerprinting a file argument only looks at its metadata."""
+        self.start_worker()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "input.xlsx")
+            with open(path, "wb") as fh:
+                fh.write(b"first")
+            with patch("builtins.open", side_effect=AssertionError("file was read")):
+                fingerprint = task_fingerprint(self.ran.append, (path,))
+            self.assertEqual(fingerprint, task_fingerprint(self.ran.append, (path,)))
+
+    def test_cancelled_task_removed_lazily(self):
+        """Cancelling a queued task leaves its entry in place and never runs it."""
+        self.start_worker()
+        on_complete = MagicMock()
+        task_id = self.worker.queue_task(self.ran.append, args=("cancelled",),
+                                         on_complete=on_complete)
+        self.assertTrue(self.worker.cancel_task(task_id))
+        self.assertEqual(self.worker.queue_depth, 0)
+        self.assertEqual(self.worker.task_queue.qsize(), 1)
+
+        self.release.set()
+        self.worker.stop(mode="drain")
+        self.assertEqual(self.ran, [])
+        self.assertIsInstance(on_complete.call_args[0][2], CancelledError)
+        self.assertEqual(self.worker.task_cancellation_flags, {})
+
+    def test_overflow_reject(self):
+        """A full queue rejects new tasks under the "reject" policy."""
+        self.start_worker(max_queue_size=1, overflow_policy="reject")
+        self.worker.queue_task(self.ran.append, args=("queued",))
+        with self.assertRaises(queue.Full):
+            self.worker.queue_task(self.ran.append, args=("rejected",))
+
+    def test_overflow_block(self):
+        """A full queue makes queue_task wait for a free slot under the "block" policy."""
+        self.start_worker(max_queue_size=1)
+        self.worker.queue_task(self.ran.append, args=("first",))
+        queued = threading.Event()
+
+        def queue_second():
+            self.worker.queue_task(self.ran.append, args=("second",))
+            queued.set()
+
+        threading.Thread(target=queue_second, daemon=True).start()
+        self.assertFalse(queued.wait(timeout=0.2))
+        self.release.set()
+        self.assertTrue(queued.wait(timeout=1))
+        self.worker.stop(mode="drain")
+        self.assertEqual(self.ran, ["first", "second"])
+
+    def test_overflow_drop_lowest(self):
+        """A full queue drops a lower-priority task for a higher-priority one."""
+        self.start_worker(max_queue_size=2, overflow_policy="drop_lowest")
+        self.worker.queue_task(self.ran.append, args=("low",), priority="low")
+        self.worker.queue_task(self.ran.append, args=("normal",))
+        self.worker.queue_task(self.ran.append, args=("high",), priority="high")
+        with self.assertRaises(queue.Full):
+            self.worker.queue_task(self.ran.append, args=("another low",), priority="low")
+        self.release.set()
+        self.worker.stop(mode="drain")
+        self.assertEqual(self.ran, ["high", "normal"])
+
+
+class TestTaskFutures(unittest.TestCase):
+    """Test cases for the futures returned by queue_task and add_task."""
+
+    def setUp(self):
+        """Set up a worker that runs two tasks at a time."""
+        self.logger = logging.getLogger("test_logger")
+        self.worker = BackgroundWorker(logger=self.logger, max_workers=2)
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.worker.stop()
+
+    def test_results_as_completed(self):
+        """Futures deliver results and errors, and work with as_completed."""
+        futures = [self.worker.queue_task(long_running_task, args=(duration,))
+                   for duration in (0.2, 0.05)]
+        failing = self.worker.queue_task(task_with_error, task_id="failing")
+        self.assertIsInstance(futures[0], TaskFuture)
+        self.assertEqual(failing.task_id, "failing")
+
+        finished = [future.task_id for future in as_completed(futures, timeout=5)]
+        self.assertEqual(finished, [futures[1].task_id, futures[0].task_id])
+        self.assertEqual(futures[0].result(), "Task completed in 0.2 seconds")
+        self.assertIsInstance(failing.exception(timeout=5), ValueError)
+
+    def test_cancel_queued_future(self):
+        """Cancelling the future of a queued task means it never runs."""
+        release = threading.Event()
+        for _ in range(2):
+            self.worker.queue_task(release.wait, args=(5,))
+        ran = []
+        future = self.worker.queue_task(ran.append, args=("queued",))
+        self.assertTrue(future.cancel())
+        release.set()
+        self.assertTrue(self.worker.stop(mode="drain"))
+        self.assertTrue(future.cancelled())
+        self.assertEqual(ran, [])
+
+    def test_cancel_running_task_by_handle(self):
+        """cancel_task takes a future; the future ends with the task's error."""
+        future = self.worker.queue_task(long_running_task, args=(5,))
+        time.sleep(0.2)
+        self.assertTrue(self.worker.cancel_task(future))
+        self.assertIn("cancelled", str(future.exception(timeout=2)).lower())
+        self.assertFalse(future.cancelled())
+
+    def test_task_manager_futures(self):
+        """add_task futures hold results; those of skipped tasks are cancelled."""
+        task_manager = TaskManager(self.worker, self.logger)
+        copy = task_manager.add_task("copy", lambda: "copied")
+        report = task_manager.add_task("report", lambda copy_result=None: copy_result.upper(),
+                                       dependencies=["copy"])
+        failing = task_manager.add_task("failing", task_with_error)
+        skipped = task_manager.add_task("skipped", MagicMock(), dependencies=["failing"])
+        task_manager.execute_workflow()
+
+        self.assertEqual(copy.result(timeout=5), "copied")
+        self.assertEqual(report.result(timeout=5), "COPIED")
+        self.assertIsInstance(failing.exception(timeout=5), ValueError)
+        with self.assertRaises(CancelledError):
+            skipped.result(timeout=5)
+
+
+class TestParallelExecution(unittest.TestCase):
+    """Test cases for a BackgroundWorker with several workers."""
+
+    def setUp(self):
+        """Set up a worker that runs two tasks at a time."""
+        self.logger = logging.getLogger("test_logger")
+        self.worker = BackgroundWorker(logger=self.logger, max_workers=2)
+        self.worker.start()
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.worker.stop()
+
+    def test_tasks_run_in_parallel(self):
+        """Two tasks that wait for each other both finish."""
+        barrier = threading.Barrier(2, timeout=2)
+        done = {}
+        finished = threading.Event()
+
+        def on_complete(name):
+            def callback(success, result, error):
+                done[name] = success
+                if len(done) == 2:
+                    finished.set()
+            return callback
+
+        for name in ("WMD", "CWMD"):
+            self.worker.queue_task(barrier.wait, task_name=name, on_complete=on_complete(name))
+
+        self.assertTrue(finished.wait(timeout=3))
+        self.assertEqual(done, {"WMD": True, "CWMD": True})
+
+    def test_per_task_progress_and_queue_depth(self):
+        """Each task's progress goes to its own callback; waiting tasks are counted."""
+        release = threading.Event()
+        progress = {"a": [], "b": []}
+        finished = threading.Event()
+
+        def reporting_task(progress_callback=None):
+            progress_callback(50, "Halfway")
+            release.wait(timeout=2)
+
+        for name in ("a", "b"):
+            def on_progress(value, message, name=name):
+                progress[name].append(value)
+
+            self.worker.queue_task(reporting_task, task_name=name, on_progress=on_progress)
+        self.worker.queue_task(time.sleep, args=(0,), on_complete=lambda *result: finished.set())
+
+        timeout = time.time() + 2
+        while len(self.worker.active_tasks) < 2 and time.time() < timeout:
+            time.sleep(0.01)
+        self.assertEqual(self.worker.queue_depth, 1)
+        self.assertEqual(sorted(self.worker.active_tasks.values()), ["a", "b"])
+
+        release.set()
+        self.assertTrue(finished.wait(timeout=3))
+        timeout = time.time() + 2
+        while min(len(values) for values in progress.values()) < 2 and time.time() < timeout:
+            time.sleep(0.01)
+        self.assertEqual(progress, {"a": [50, 100], "b": [50, 100]})
+        self.assertEqual(self.worker.queue_depth, 0)
+
 
 class TestProgressTracker(unittest.TestCase):
     """Test cases for the ProgressTracker class."""
@@ -245,6 +635,125 @@ class TestTaskManager(unittest.TestCase):
         self.assertIn("Result C", self.task_manager.results["task_d"])
 
 
+class TestTaskManagerScheduling(unittest.TestCase):
+    """Test cases for scheduling TaskManager workflows on several workers."""
+
+    def setUp(self):
+        """Set up a task manager on a worker that runs two tasks at a time."""
+        self.logger = logging.getLogger("test_logger")
+        self.worker = BackgroundWorker(logger=self.logger, max_workers=2)
+        self.worker.start()
+        self.task_manager = TaskManager(self.worker, self.logger)
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.worker.stop()
+
+    def test_ready_tasks_run_in_parallel(self):
+        """Both copy stages start together; reconciliation waits for both."""
+        barrier = threading.Barrier(2, timeout=2)
+
+        def copy_stage(seconds):
+            barrier.wait()
+            time.sleep(seconds)
+            return seconds
+
+        def reconcile(copy_tb_result=None, copy_uco_result=None):
+            return copy_tb_result + copy_uco_result
+
+        self.task_manager.add_task("copy_tb", copy_stage, args=(0.2,))
+        self.task_manager.add_task("copy_uco", copy_stage, args=(0.05,))
+        self.task_manager.add_task("reconcile", reconcile, dependencies=["copy_tb", "copy_uco"])
+        self.task_manager.execute_workflow()
+
+        self.assertTrue(self.task_manager.wait(timeout=5))
+        self.assertEqual(self.task_manager.results["reconcile"], 0.25)
+        timing = self.task_manager.timing
+        self.assertIsInstance(timing, WorkflowTiming)
+        self.assertEqual(timing.critical_path, ["copy_tb", "reconcile"])
+        self.assertLess(timing.wall_seconds, sum(timing.task_seconds.values()))
+
+    def test_failure_skips_dependants(self):
+        """Tasks downstream of a failed task do not run; independent ones do."""
+        self.task_manager.add_task("copy_tb", task_with_error)
+        self.task_manager.add_task("reconcile", MagicMock(), dependencies=["copy_tb"])
+        self.task_manager.add_task("report", MagicMock(), dependencies=["reconcile"])
+        self.task_manager.add_task("copy_uco", lambda: "UCO")
+        self.task_manager.execute_workflow()
+
+        self.assertTrue(self.task_manager.wait(timeout=5))
+        self.assertEqual(self.task_manager.get_workflow_status(), {
+            "copy_tb": "failed", "reconcile": "skipped", "report": "skipped",
+            "copy_uco": "completed"
+        })
+        self.assertIsInstance(self.task_manager.errors["copy_tb"], ValueError)
+
+    def test_cancel_propagates(self):
+        """Cancelling a running task cancels its dependants."""
+        self.task_manager.add_task("copy_tb", long_running_task, args=(2,))
+        self.task_manager.add_task("reconcile", MagicMock(), dependencies=["copy_tb"])
+        self.task_manager.execute_workflow()
+        time.sleep(0.2)
+        self.task_manager.cancel_task("copy_tb")
+
+        self.assertTrue(self.task_manager.wait(timeout=1))
+        self.assertEqual(self.task_manager.get_workflow_status(),
+                         {"copy_tb": "cancelled", "reconcile": "cancelled"})
+
+    def test_wait_for_cancelled_running_task(self):
+        """wait() returns only once a cancelled running task has returned."""
+        self.task_manager.add_task("copy_tb", time.sleep, args=(1,))
+        self.task_manager.execute_workflow()
+        time.sleep(0.2)
+        self.task_manager.cancel_workflow()
+        self.assertEqual(self.task_manager.get_workflow_status(), {"copy_tb": "cancelling"})
+
+        self.assertFalse(self.task_manager.wait(timeout=0.3))
+        self.assertTrue(self.task_manager.wait(timeout=5))
+        self.assertEqual(self.task_manager.get_workflow_status(), {"copy_tb": "cancelled"})
+        self.assertGreaterEqual(self.task_manager.timing.task_seconds["copy_tb"], 0.9)
+
+    def test_bounded_queue_blocks_without_deadlock(self):
+        """Dependants queued by a finishing task do not wait for a full queue."""
+        worker = BackgroundWorker(logger=self.logger, max_queue_size=1, overflow_policy="block")
+        self.addCleanup(worker.stop)
+        task_manager = TaskManager(worker, self.logger)
+        task_manager.add_task("a", lambda: "A")
+        task_manager.add_task("b", lambda a_result=None: a_result, dependencies=["a"])
+        task_manager.add_task("c", lambda a_result=None: a_result, dependencies=["a"])
+        task_manager.execute_workflow()
+
+        self.assertTrue(task_manager.wait(timeout=5))
+        self.assertEqual(set(task_manager.get_workflow_status().values()), {"completed"})
+
+    def test_rejected_dispatch_fails_task(self):
+        """A dependant the full queue rejects fails, and its own dependants are skipped."""
+        worker = BackgroundWorker(logger=self.logger, max_queue_size=1, overflow_policy="reject")
+        self.addCleanup(worker.stop)
+        task_manager = TaskManager(worker, self.logger)
+        task_manager.add_task("a", lambda: "A")
+        task_manager.add_task("b", lambda a_result=None: a_result, dependencies=["a"])
+        future = task_manager.add_task("c", lambda a_result=None: a_result, dependencies=["a"])
+        task_manager.add_task("d", MagicMock(), dependencies=["c"])
+        task_manager.execute_workflow()
+
+        self.assertTrue(task_manager.wait(timeout=5))
+        self.assertEqual(task_manager.get_workflow_status(),
+                         {"a": "completed", "b": "completed", "c": "failed", "d": "skipped"})
+        self.assertIsInstance(future.exception(timeout=1), queue.Full)
+
+    def test_invalid_dependencies(self):
+        """Unknown dependencies and cycles are rejected before anything runs."""
+        self.task_manager.add_task("a", MagicMock(), dependencies=["b"])
+        self.task_manager.add_task("b", MagicMock(), dependencies=["a"])
+        with self.assertRaisesRegex(ValueError, "cycle"):
+            self.task_manager.execute_workflow()
+        self.task_manager.add_task("c", MagicMock(), dependencies=["missing"])
+        with self.assertRaisesRegex(ValueError, "unknown"):
+            self.task_manager.execute_workflow()
+        self.assertEqual(set(self.task_manager.get_workflow_status().values()), {"pending"})
+
+
 if __name__ == '__main__':
     # Configure logging
     logging.basicConfig(
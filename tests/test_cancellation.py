@@ -0,0 +1,89 @@
+"""
+Tests for the cancellation module.
+
+This module contains tests for CancellationToken and for how quickly the
+workbook loading and saving code stops once a token is cancelled.
+"""
+
+import threading
+import time
+
+import pytest
+from openpyxl import Workbook
+
+from src.uco_to_udo_recon.core.workbook_loader import LazyWorkbook
+from src.uco_to_udo_recon.utils.cancellation import CancellationToken, sleep_unless_cancelled
+from src.uco_to_udo_recon.utils.xlsx_package import XlsxPackage
+
+
+@pytest.fixture
+def large_workbook(tmp_path):
+    """A workbook with one sheet large enough to take a while to parse."""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Data"
+    for row in range(1, 20001):
+        ws.append([row, f"Item {row}", row * 1.5, f"=A{row}*2"])
+    path = tmp_path / "large.xlsx"
+    wb.save(path)
+    return path
+
+
+class TestCancellationToken:
+    """Tests for CancellationToken."""
+
+    def test_cancel(self):
+        """The token is a cancellation check that turns True once cancelled."""
+        token = CancellationToken()
+        assert not token() and not token.cancelled
+        assert token.seconds_since_cancel() is None
+        token.cancel()
+        assert token() and token.cancelled
+        assert token.seconds_since_cancel() >= 0
+
+    def test_callbacks_run_once(self):
+        """Callbacks run on the first cancel, or right away when already cancelled."""
+        token = CancellationToken()
+        calls = []
+        token.add_callback(lambda: calls.append("early"))
+        token.cancel()
+        token.cancel()
+        token.add_callback(lambda: calls.append("late"))
+        assert calls == ["early", "late"]
+
+    def test_sleep_wakes_on_cancel(self):
+        """A sleep on a token ends as soon as the token is cancelled."""
+        token = CancellationToken()
+        threading.Timer(0.05, token.cancel).start()
+        start = time.perf_counter()
+        assert sleep_unless_cancelled(5, token)
+        assert time.perf_counter() - start < 0.5
+
+    def test_sleep_polls_plain_checks(self):
+        """Plain cancellation checks are polled; without one the full time is slept."""
+        flag = threading.Event()
+        threading.Timer(0.05, flag.set).start()
+        assert sleep_unless_cancelled(5, flag.is_set)
+        assert not sleep_unless_cancelled(0.01)
+
+
+class TestCancellationLatency:
+    """Tests that long-running stages stop shortly after cancellation."""
+
+    def test_worksheet_parse(self, large_workbook):
+        """Parsing a large worksheet stops within a few rows of the cancel."""
+        token = CancellationToken()
+        book = LazyWorkbook(str(large_workbook), cancellation_check=token)
+        threading.Timer(0.05, token.cancel).start()
+        with pytest.raises(InterruptedError, match="Data"):
+            book["Data"]
+        assert token.seconds_since_cancel() < 0.2
+
+    def test_save_removes_partial_file(self, large_workbook, tmp_path):
+        """A cancelled save does not leave a truncated workbook behind."""
+        token = CancellationToken()
+        token.cancel()
+        target = tmp_path / "out.xlsx"
+        with pytest.raises(InterruptedError):
+            XlsxPackage(str(large_workbook)).save(str(target), cancellation_check=token)
+        assert not target.exists()
@@ -0,0 +1,77 @@
+"""
+Tests for the checkpoint module.
+
+This module contains tests for recording completed stages in a run journal
+and for discarding the journal when its input files change.
+"""
+
+import logging
+
+from src.uco_to_udo_recon.core.checkpoint import RunJournal
+
+
+def make_journal(tmp_path, source):
+    """Create the journal of a run on one input file."""
+    return RunJournal.for_output(
+        str(tmp_path / "result.xlsx"), {"source": str(source)}, {"component_name": "WMD"},
+        logging.getLogger("test_checkpoint")
+    )
+
+
+class TestRunJournal:
+    """Tests for RunJournal."""
+
+    def test_resume_after_recorded_stage(self, tmp_path):
+        """A journal on unchanged inputs returns its last intact checkpoint."""
+        source = tmp_path / "source.xlsx"
+        source.write_bytes(b"source")
+        journal = make_journal(tmp_path, source)
+        artifact = journal.artifact_path("import_sheets")
+        with open(artifact, "wb") as fh:
+            fh.write(b"imported")
+        journal.record("import_sheets", artifact, replaced_sheets=["DO TB"])
+
+        resumed = make_journal(tmp_path, source)
+        assert resumed.load()
+        checkpoint = resumed.latest(["import_sheets"])
+        assert checkpoint.artifact == artifact
+        assert checkpoint.data == {"replaced_sheets": ["DO TB"]}
+
+    def test_modified_artifact_not_used(self, tmp_path):
+        """A checkpoint whose file changed after it was recorded is skipped."""
+        source = tmp_path / "source.xlsx"
+        source.write_bytes(b"source")
+        journal = make_journal(tmp_path, source)
+        artifact = journal.artifact_path("import_sheets")
+        with open(artifact, "wb") as fh:
+            fh.write(b"imported")
+        journal.record("import_sheets", artifact)
+        with open(artifact, "wb") as fh:
+            fh.write(b"truncated")
+
+        resumed = make_journal(tmp_path, source)
+        assert resumed.load()
+        assert resumed.latest(["import_sheets"]) is None
+
+    def test_changed_input_invalidates(self, tmp_path):
+        """Editing an input file discards the journal and its intermediate files."""
+        source = tmp_path / "source.xlsx"
+        source.write_bytes(b"source")
+        journal = make_journal(tmp_path, source)
+        artifact = journal.artifact_path("import_sheets")
+        with open(artifact, "wb") as fh:
+            fh.write(b"imported")
+        journal.record("import_sheets", artifact)
+
+        source.write_bytes(b"edited")
+        resumed = make_journal(tmp_path, source)
+        assert not resumed.load()
+        assert not (tmp_path / "result.journal.json").exists()
+        assert not (tmp_path / "result.checkpoint-import_sheets.xlsx").exists()
+
+    def test_corrupt_journal_ignored(self, tmp_path):
+        """An unreadable journal is treated as having no checkpoints."""
+        source = tmp_path / "source.xlsx"
+        source.write_bytes(b"source")
+        (tmp_path / "result.journal.json").write_text("{not json")
+        assert not make_journal(tmp_path, source).load()
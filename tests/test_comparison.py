@@ -0,0 +1,64 @@
+"""
+Tests for the comparison module.
+
+This module contains tests for matching Certification rows against the
+DO UCO to UDO range.
+"""
+
+import logging
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.uco_to_udo_recon.core.comparison import compare_ranges
+from src.uco_to_udo_recon.core.workbook_loader import load_dual_view_workbook
+
+
+@pytest.fixture
+def mock_logger():
+    """Create a mock logger for testing."""
+    return MagicMock(spec=logging.Logger)
+
+
+@pytest.fixture
+def recon_book(build_workbook):
+    """Certification and DO UCO to UDO sheets with a duplicated component name."""
+    path = build_workbook({
+        "Certification": {
+            "A1": "Trading Partner Number", "B1": "TIER Component",
+            "A2": 7023, "B2": "WMD", "D2": 100, "E2": 100, "F2": 0,
+            "A3": 7005, "B3": "CBP", "D3": 50, "E3": 40, "F3": 10,
+            "A4": 7006, "B4": "FEMA", "D4": 5, "E4": 5, "F4": 0,
+        },
+        "DO UCO to UDO": {
+            "A1": "WMD", "E1": 100, "H1": 100, "L1": 0,
+            "A2": "CBP", "E2": 50, "H2": 40, "L2": 10,
+            "A3": "WMD", "E3": 100, "H3": 100, "L3": 0,
+            "A4": "CBP", "E4": 50, "H4": 45, "L4": 5,
+        },
+    })
+    return load_dual_view_workbook(path)
+
+
+def _ranges(book):
+    certification = tuple(book["Certification"].iter_rows(min_row=1, max_row=4, max_col=8))
+    uco_to_udo = tuple(book["DO UCO to UDO"].iter_rows(min_row=1, max_row=4, max_col=14))
+    return certification, uco_to_udo
+
+
+class TestCompareRanges:
+    """Tests for compare_ranges."""
+
+    def test_every_matching_row_gets_tickmark(self, recon_book, mock_logger):
+        """Duplicate component names are all matched, mismatches are left alone."""
+        certification, uco_to_udo = _ranges(recon_book)
+        compare_ranges(certification, uco_to_udo, recon_book, None, mock_logger, MagicMock(), None)
+
+        certification_sheet = recon_book["Certification"]
+        assert certification_sheet["H2"].value == "i"
+        assert certification_sheet["H3"].value == "i"
+        assert certification_sheet["H4"].value is None
+
+        uco_to_udo_sheet = recon_book["DO UCO to UDO"]
+        tickmarks = [uco_to_udo_sheet.cell(row=r, column=14).value for r in range(1, 5)]
+        assert tickmarks == ["8", "8", "8", None]
@@ -0,0 +1,85 @@
+"""
+Tests for the component resolver module.
+
+This module contains tests for resolving Certification rows to component sheets.
+"""
+
+import itertools
+import json
+
+from openpyxl import Workbook
+
+from src.uco_to_udo_recon.core.component_resolver import (
+    ComponentSheetResolver,
+    get_component_resolver,
+    load_component_registry,
+)
+
+SHEETNAMES = [
+    "Instructions", "Certification", "DO TB", "DO UCO to UDO",
+    "USCG-7006", "CBP-7005", "CISA-7009", "FEMA-7007", "USSS-7004", "STA-7008", "CWMD-7023",
+]
+
+
+def _scan(sheetnames, search_patterns, skip_sheets):
+    """The sheet-by-sheet search the resolver replaces."""
+    for sheet_name in sheetnames:
+        if sheet_name in skip_sheets:
+            continue
+        for pattern, pattern_type in search_patterns:
+            if pattern and pattern.upper() in sheet_name.upper():
+                return sheet_name, pattern, pattern_type
+    return None
+
+
+class TestComponentSheetResolver:
+    """Tests for ComponentSheetResolver."""
+
+    def test_matches_sheet_scan(self):
+        """Every query resolves exactly as the sheet-by-sheet scan does."""
+        resolver = ComponentSheetResolver(SHEETNAMES)
+        skip = resolver.registry.skip_sheets
+        tab_names = [None, "", "CBP-7005", "fema", "Missing"]
+        components = [None, "CG", "CIS", "ST", "SS", "WMD", "XYZ"]
+        partners = [None, 7005, "7008", 7023, 9999]
+        for query in itertools.product(tab_names, components, partners):
+            match = resolver.resolve(*query)
+            expected = _scan(SHEETNAMES, resolver.search_patterns(*query), skip)
+            assert (tuple(match) if match else None) == expected, query
+
+    def test_skip_sheets_never_match(self):
+        """Reserved sheets are not candidates even when a pattern matches them."""
+        resolver = ComponentSheetResolver(SHEETNAMES)
+        assert resolver.resolve("Certification", None, None) is None
+
+    def test_earliest_sheet_wins(self):
+        """A later pattern matching an earlier sheet beats an earlier pattern."""
+        resolver = ComponentSheetResolver(SHEETNAMES)
+        match = resolver.resolve("CWMD-7023", "CBP", None)
+        assert match.sheet_name == "CBP-7005"
+        assert match.pattern_type == "component_mapping_CBP"
+
+
+class TestComponentRegistry:
+    """Tests for the registry file and the per-workbook cache."""
+
+    def test_custom_registry(self, tmp_path):
+        """Mappings come from the registry file."""
+        path = tmp_path / "registry.json"
+        path.write_text(json.dumps({
+            "skip_sheets": ["Summary"],
+            "component_mappings": {"NEW": ["NEWCO-8001"]},
+            "trading_partner_mappings": {},
+        }))
+        registry = load_component_registry(str(path))
+        resolver = ComponentSheetResolver(["Summary", "NEWCO-8001"], registry)
+        assert resolver.resolve(None, "NEW", None).pattern_type == "component_mapping_NEW"
+
+    def test_recompiled_when_sheets_change(self):
+        """The cached resolver follows sheets added to the workbook."""
+        wb = Workbook()
+        resolver = get_component_resolver(wb)
+        assert get_component_resolver(wb) is resolver
+        assert resolver.resolve(None, "CBP", None) is None
+        wb.create_sheet("CBP-7005")
+        assert get_component_resolver(wb).resolve(None, "CBP", None).sheet_name == "CBP-7005"
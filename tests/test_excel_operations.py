@@ -0,0 +1,81 @@
+"""
+Tests for the Excel operations module.
+
+This module contains tests for copying sheets between workbooks.
+"""
+
+import logging
+
+import pytest
+from openpyxl import load_workbook
+
+from src.uco_to_udo_recon.core.excel_operations import (
+    SheetImport,
+    copy_and_rename_sheet,
+    import_sheets,
+)
+
+
+@pytest.fixture
+def logger():
+    return logging.getLogger("test_excel_operations")
+
+
+@pytest.fixture
+def files(build_workbook):
+    """A target workbook plus trial balance and TIER source workbooks."""
+    target = build_workbook(
+        {"Instructions": {}, "Certification": {}, "CWMD-7023": {}, "CBP-7005": {}},
+        name="target.xlsx"
+    )
+    trial_balance = build_workbook(
+        {"WMD Total": {"C10": "422100", "F10": 60, "H10": "=F10"}},
+        cached={"WMD Total": {"H10": 60}}, name="tb.xlsx", shared_strings=True
+    )
+    tier = build_workbook({"UCO to UDO": {"A5": "Component", "E6": 100}}, name="tier.xlsx")
+    return target, trial_balance, tier
+
+
+class TestImportSheets:
+    """Tests for import_sheets and copy_and_rename_sheet."""
+
+    def test_batch_import(self, files, logger):
+        """Both sheets are inserted at their positions with values and formulas."""
+        target, trial_balance, tier = files
+        assert import_sheets(
+            [
+                SheetImport(str(trial_balance), "WMD Total", "DO TB", 3),
+                SheetImport(str(tier), "UCO to UDO", "DO UCO to UDO", 4),
+            ],
+            str(target), logger
+        )
+        wb = load_workbook(target)
+        assert wb.sheetnames == [
+            "Instructions", "Certification", "CWMD-7023", "DO TB", "DO UCO to UDO", "CBP-7005"
+        ]
+        assert wb["DO TB"]["C10"].value == "422100"
+        assert wb["DO TB"]["H10"].value == "=F10"
+        assert load_workbook(target, data_only=True)["DO TB"]["H10"].value == 60
+        assert wb["DO UCO to UDO"]["E6"].value == 100
+
+    def test_missing_sheet_writes_nothing(self, files, logger):
+        """A missing source sheet fails the batch before the target is touched."""
+        target, trial_balance, tier = files
+        before = target.read_bytes()
+        assert not import_sheets(
+            [
+                SheetImport(str(trial_balance), "WMD Total", "DO TB", 3),
+                SheetImport(str(tier), "Missing", "DO UCO to UDO", 4),
+            ],
+            str(target), logger
+        )
+        assert target.read_bytes() == before
+
+    def test_cancelled_before_start(self, files, logger):
+        """A cancelled import returns False without copying."""
+        target, trial_balance, _ = files
+        assert not copy_and_rename_sheet(
+            str(trial_balance), "WMD Total", str(target), "DO TB", logger,
+            cancellation_check=lambda: True
+        )
+        assert "DO TB" not in load_workbook(target).sheetnames
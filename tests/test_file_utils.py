@@ -0,0 +1,86 @@
+"""
+Tests for the file utilities module.
+
+This module contains tests for file-readiness polling.
+"""
+
+import logging
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.uco_to_udo_recon.utils.file_utils import (
+    ensure_file_handle_release,
+    file_digest,
+    wait_for_file_ready,
+)
+
+
+@pytest.fixture
+def mock_logger():
+    """Create a mock logger for testing."""
+    return MagicMock(spec=logging.Logger)
+
+
+class TestFileDigest:
+    """Tests for the file_digest function."""
+
+    def test_digest_follows_contents(self, tmp_path):
+        """Files with the same contents share a digest; an edit changes it."""
+        first, second = tmp_path / "a.xlsx", tmp_path / "b.xlsx"
+        first.write_bytes(b"data")
+        second.write_bytes(b"data")
+        assert file_digest(str(first)) == file_digest(str(second))
+        second.write_bytes(b"edited")
+        assert file_digest(str(first)) != file_digest(str(second))
+
+
+class TestWaitForFileReady:
+    """Tests for the wait_for_file_ready function."""
+
+    def test_free_file_returns_immediately(self, tmp_path):
+        """A file nobody holds is ready on the first probe."""
+        path = tmp_path / "book.xlsx"
+        path.write_bytes(b"data")
+        result = wait_for_file_ready(str(path))
+        assert result.ready
+        assert result.attempts == 1
+        assert result.waited < 0.5
+
+    def test_retries_until_released(self, tmp_path, mock_logger):
+        """Probing backs off and stops as soon as the handle is released."""
+        path = tmp_path / "book.xlsx"
+        path.write_bytes(b"data")
+        probes = iter([False, False, False, True])
+        with patch("src.uco_to_udo_recon.utils.file_utils._probe_file_ready",
+                   side_effect=lambda _: next(probes)), \
+                patch("src.uco_to_udo_recon.utils.file_utils.time.sleep") as sleep:
+            result = wait_for_file_ready(str(path), mock_logger, initial_delay=0.01)
+        assert result.ready and result.attempts == 4
+        delays = [call.args[0] for call in sleep.call_args_list]
+        assert delays == pytest.approx([0.01, 0.02, 0.04], rel=0.5)
+        mock_logger.info.assert_called_once()
+
+    def test_deadline(self, tmp_path):
+        """A file that never becomes available gives up at the deadline."""
+        result = wait_for_file_ready(str(tmp_path / "missing.xlsx"), timeout=0.05)
+        assert not result.ready
+        assert result.waited >= 0.05
+        assert result.attempts > 1
+
+
+class TestEnsureFileHandleRelease:
+    """Tests for the ensure_file_handle_release function."""
+
+    def test_logs_wait_time(self, tmp_path, mock_logger):
+        """The release logs how long it waited instead of sleeping."""
+        path = tmp_path / "book.xlsx"
+        path.write_bytes(b"data")
+        ensure_file_handle_release(str(path), mock_logger)
+        assert "waited" in mock_logger.info.call_args.args[0]
+        mock_logger.warning.assert_not_called()
+
+    def test_warns_when_still_locked(self, tmp_path, mock_logger):
+        """A handle that is not released in time produces a warning."""
+        ensure_file_handle_release(str(tmp_path / "missing.xlsx"), mock_logger, timeout=0.02)
+        mock_logger.warning.assert_called_once()
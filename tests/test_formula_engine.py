@@ -0,0 +1,122 @@
+"""
+Tests for the formula engine module.
+
+This module contains tests for the Python evaluator of the tickmark formulas.
+"""
+
+import pytest
+from openpyxl import Workbook
+
+from src.uco_to_udo_recon.core.formula_engine import (
+    FormulaEvaluator,
+    FormulaSyntaxError,
+    excel_round,
+    formula_functions,
+    formula_references,
+)
+from src.uco_to_udo_recon.core.workbook_loader import load_dual_view_workbook
+
+
+@pytest.fixture
+def recon_sheet():
+    """A recon table with the tickmark formulas process_recon_table writes."""
+    ws = Workbook().active
+    for col in "BDEFGH":
+        ws[f"{col}11"] = 10.125
+        ws[f"{col}12"] = 9.875
+        ws[f"{col}13"] = f"=SUM({col}11:{col}12)"
+    ws["B14"] = '=IF(ROUND(SUM(B$11:B12)-B13,0)=0,"a","û")'
+    ws["I14"] = '=IF(AND((ROUND(SUM(E13:G13)-H13,0)=0),ROUND((+B13+D13)-E13,0)=0),"b","û")'
+    ws["B6"] = "i"
+    ws["B5"] = 20
+    ws["B20"] = 5
+    ws["B21"] = (
+        '=IF(AND(B6="i",B20>0),IF(ROUND(B13-B5+B20,0)=0,"a","û"),'
+        'IF(ROUND(B13-B5-IF(B20<0,-B20,B20),0)=0,"a","û"))'
+    )
+    return ws
+
+
+class TestFormulaEvaluator:
+    """Tests for FormulaEvaluator."""
+
+    def test_tickmark_formulas(self, recon_sheet):
+        """The recon table formulas evaluate to their tickmark characters."""
+        evaluator = FormulaEvaluator(recon_sheet.parent)
+        assert evaluator.evaluate_cell(recon_sheet, "B13") == 20
+        assert evaluator.evaluate_cell(recon_sheet, "B14") == "a"
+        assert evaluator.evaluate_cell(recon_sheet, "I14") == "û"
+        assert evaluator.evaluate_cell(recon_sheet, "B21") == "û"
+
+    def test_uses_cached_values(self, build_workbook):
+        """Formula inputs come from cached values when the workbook has them."""
+        path = build_workbook(
+            {"DO TB": {"N10": "=F10", "N11": 90, "N12": "=N10+N11"}},
+            cached={"DO TB": {"N10": 60}},
+        )
+        book = load_dual_view_workbook(path)
+        assert FormulaEvaluator(book).evaluate_cell("DO TB", "N12") == 150
+        assert FormulaEvaluator(book, use_cached=False).evaluate_cell("DO TB", "N12") == 90
+
+    @pytest.mark.parametrize("formula, expected", [
+        ("=ROUND(2.675,2)", 2.68),
+        ("=ROUND(-2.5,0)", -3),
+        ("=ROUND(1234.5,-2)", 1200),
+        ("=-2^2", 4),
+        ('=A1="I"', True),
+        ("=A2>0", False),
+        ('="x"+1', "#VALUE!"),
+        ("=1/0", "#DIV/0!"),
+        ("=NOSUCH(1)", "#NAME?"),
+        ("=IF(1>2,1)", False),
+    ])
+    def test_excel_semantics(self, formula, expected):
+        """Rounding, comparisons and errors follow Excel."""
+        ws = Workbook().active
+        ws["A1"] = "i"
+        ws["B1"] = formula
+        assert FormulaEvaluator(ws.parent).evaluate_cell(ws, "B1") == expected
+
+    def test_circular_reference(self):
+        """A cycle evaluates to an error instead of recursing forever."""
+        ws = Workbook().active
+        ws["A1"] = "=A2+1"
+        ws["A2"] = "=A1+1"
+        assert FormulaEvaluator(ws.parent).evaluate_cell(ws, "A1") == "#REF!"
+
+    def test_unsupported_syntax(self):
+        """Syntax outside the subset is reported, not guessed at."""
+        ws = Workbook().active
+        ws["A1"] = "={1,2}"
+        with pytest.raises(FormulaSyntaxError):
+            FormulaEvaluator(ws.parent).evaluate_cell(ws, "A1")
+
+
+class TestHelpers:
+    """Tests for the module-level helpers."""
+
+    def test_excel_round_uses_15_digits(self):
+        """Binary noise below 15 significant digits does not change the rounding."""
+        assert excel_round(0.1 + 0.2 - 0.3, 0) == 0
+        assert excel_round(1.005, 2) == 1.01
+
+    def test_excel_round_beyond_precision(self):
+        """Values with no digits at the rounding position are returned unchanged."""
+        assert excel_round(1e30, 0) == 1e30
+        assert excel_round(1234567890123.45, 16) == 1234567890123.45
+        assert excel_round(1e30, -31) == 0
+        assert excel_round(-2.5, 0) == -3
+
+    def test_formula_functions(self):
+        """Called functions are listed without looking inside strings."""
+        assert formula_functions('=IF(TODAY()>A1,"SUM(x)",_xlfn.IFS(B1,1))') == {
+            "IF", "TODAY", "IFS"
+        }
+        assert formula_functions("=INDIRECT(Table1[Col])") == {"INDIRECT"}
+
+    def test_formula_references(self):
+        """References are listed with their sheet and bounds."""
+        assert formula_references("=SUM(B$11:B12)-'DO TB'!N12") == [
+            (None, (11, 2), (12, 2)),
+            ("DO TB", (12, 14), (12, 14)),
+        ]
@@ -0,0 +1,147 @@
+"""
+Tests for the formula graph module.
+
+This module contains tests for the formula dependency graph and the
+staleness check that decides whether Excel needs to recalculate.
+"""
+
+import logging
+
+import pytest
+
+from src.uco_to_udo_recon.core.formula_graph import (
+    CHANGED_INPUT,
+    MISMATCHED_RESULT,
+    MISSING_RESULT,
+    STALE_INPUT,
+    UNKNOWN_INPUT,
+    VOLATILE_RESULT,
+    FormulaDependencyGraph,
+    check_formula_staleness,
+)
+from src.uco_to_udo_recon.core.workbook_loader import load_dual_view_workbook, load_lazy_workbook
+
+
+@pytest.fixture
+def logger():
+    """Logger for the staleness checks."""
+    return logging.getLogger("test_formula_graph")
+
+
+@pytest.fixture
+def tb_path(build_workbook):
+    """A calculated workbook: a DO TB sheet and a summary sheet reading it."""
+    return build_workbook(
+        {
+            "DO TB": {"N10": 60, "N11": 90, "N12": "=N10+N11", "C10": "422100"},
+            "Summary": {
+                "B2": "=VLOOKUP(\"422100\",'DO TB'!C10:N11,12,FALSE)",
+                "B3": "=B2*2",
+                "B4": "=COUNTA(B2:B3)",
+            },
+        },
+        cached={"DO TB": {"N12": 150}, "Summary": {"B2": 60, "B3": 120, "B4": 2}},
+    )
+
+
+class TestFormulaDependencyGraph:
+    """Tests for FormulaDependencyGraph."""
+
+    def test_dependents(self):
+        """Formulas are found by the cells and ranges they read."""
+        graph = FormulaDependencyGraph()
+        graph.add_formula("S", 3, 2, "=SUM(B1:C2)")
+        graph.add_formula("S", 4, 2, "=B3+'Other'!A1")
+        graph.add_formula("S", 5, 2, "={1,2}")
+        assert graph.dependents("S", 2, 3) == [("S", 3, 2)]
+        assert graph.dependents("S", 3, 2) == [("S", 4, 2)]
+        assert graph.dependents("Other", 1, 1) == [("S", 4, 2)]
+        assert graph.dependents("S", 3, 3) == []
+        assert graph.references[("S", 5, 2)] is None
+
+
+class TestCheckFormulaStaleness:
+    """Tests for check_formula_staleness."""
+
+    def test_calculated_workbook_is_current(self, tb_path, logger):
+        """A workbook whose results match their inputs needs no recalculation."""
+        report = check_formula_staleness(load_dual_view_workbook(tb_path), logger)
+        assert report.formula_count == 4
+        assert not report.needs_recalculation
+
+    def test_missing_result(self, build_workbook, logger):
+        """A formula without a cached result is stale, and so are its readers."""
+        path = build_workbook({"S": {"A1": 1, "A2": "=A1", "A3": "=NOW()-A2"}})
+        report = check_formula_staleness(load_dual_view_workbook(path), logger)
+        assert report.stale == {"S!A2": MISSING_RESULT, "S!A3": MISSING_RESULT}
+
+    def test_edited_inputs(self, tb_path, logger):
+        """Edits make unsupported readers stale; supported ones are recomputed."""
+        book = load_dual_view_workbook(tb_path)
+        book["DO TB"]["N11"] = 90
+        stale = {
+            "Summary!B2": CHANGED_INPUT,
+            "Summary!B3": STALE_INPUT,
+            "Summary!B4": STALE_INPUT,
+        }
+        assert check_formula_staleness(book, logger).stale == stale
+
+        book["DO TB"]["N10"] = 70
+        assert check_formula_staleness(book, logger).stale == {
+            "DO TB!N12": MISMATCHED_RESULT, **stale}
+
+    def test_edit_outside_inputs(self, tb_path, logger):
+        """Edits to cells no formula reads keep the results current."""
+        book = load_dual_view_workbook(tb_path)
+        book["DO TB"]["A1"] = "Trial Balance"
+        book["Summary"]["C3"] = "note"
+        assert not check_formula_staleness(book, logger).needs_recalculation
+
+    def test_stored_result_is_current(self, tb_path, logger):
+        """A new formula whose result was stored is current."""
+        book = load_dual_view_workbook(tb_path)
+        book["DO TB"]["N13"] = "=N12-N11"
+        book["DO TB"]["N13"].cached_value = 60
+        assert not check_formula_staleness(book, logger).needs_recalculation
+
+    def test_replaced_sheet_unparsed_reader(self, tb_path, logger):
+        """Sheets not parsed yet are checked from their XML."""
+        book = load_lazy_workbook(tb_path)
+        book["DO TB"]
+        assert book.loaded_sheetnames == ["DO TB"]
+        assert not check_formula_staleness(book, logger).needs_recalculation
+
+        report = check_formula_staleness(book, logger, replaced_sheets={"DO TB"})
+        assert report.stale == {
+            "Summary!B2": CHANGED_INPUT,
+            "Summary!B3": STALE_INPUT,
+            "Summary!B4": STALE_INPUT,
+        }
+        assert book.loaded_sheetnames == ["DO TB"]
+
+    def test_volatile_functions(self, build_workbook, logger):
+        """Formulas calling a volatile function are always stale."""
+        path = build_workbook(
+            {"S": {"A1": "=TODAY()", "A2": "=RAND()*0+1", "A3": 5}},
+            cached={"S": {"A1": 45000, "A2": 1}},
+        )
+        report = check_formula_staleness(load_dual_view_workbook(path), logger)
+        assert report.stale == {"S!A1": VOLATILE_RESULT, "S!A2": VOLATILE_RESULT}
+
+    def test_dynamic_references(self, build_workbook, logger):
+        """Formulas that compute the cells they read are stale after any change."""
+        path = build_workbook(
+            {
+                "DO TB": {"F10": 60},
+                "Summary": {
+                    "B2": "=INDIRECT(\"'DO TB'!F10\")",
+                    "B3": "=OFFSET(A1,1,0)",
+                    "B4": "=A1",
+                },
+            },
+            cached={"Summary": {"B2": 60, "B3": 0, "B4": 0}},
+        )
+        book = load_lazy_workbook(path)
+        assert not check_formula_staleness(book, logger).needs_recalculation
+        report = check_formula_staleness(book, logger, replaced_sheets={"DO TB"})
+        assert report.stale == {"Summary!B2": UNKNOWN_INPUT, "Summary!B3": UNKNOWN_INPUT}
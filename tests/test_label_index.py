@@ -0,0 +1,89 @@
+"""
+Tests for the label index module.
+
+This module contains tests for the one-pass worksheet label index.
+"""
+
+import pytest
+from openpyxl import Workbook
+
+from src.uco_to_udo_recon.utils.label_index import (
+    LabelIndex,
+    get_label_index,
+    invalidate_label_index,
+)
+
+
+@pytest.fixture
+def sheet():
+    """A worksheet with labels in Columns A and C."""
+    ws = Workbook().active
+    ws["A2"] = "Trading Partner Number"
+    ws["C3"] = "UCO total reported in TIER (FY)"
+    ws["A5"] = "Total "
+    ws["A7"] = "WMD Total"
+    ws["C8"] = "Total"
+    ws["A9"] = "=A5"
+    ws["B9"] = 42
+    return ws
+
+
+class TestLabelIndex:
+    """Tests for the LabelIndex class."""
+
+    def test_exact_matches_raw_text(self, sheet):
+        """Exact lookups compare the cell text including surrounding whitespace."""
+        index = LabelIndex(sheet)
+        assert index.exact("Trading Partner Number") == (2, 1)
+        assert index.exact("Total ") == (5, 1)
+        assert index.exact("Total") == (8, 3)
+
+    def test_exact_skips_stripped_match_above(self, sheet):
+        """A "Total" header above the "Total " row does not match "Total "."""
+        sheet["A1"] = "Total"
+        index = LabelIndex(sheet)
+        assert index.exact("Total ", column=1) == (5, 1)
+        assert index.find_all("Total ", column=1, strip=True) == [(1, 1), (5, 1)]
+
+    def test_column_filter(self, sheet):
+        """A column restricts the search to that column."""
+        index = LabelIndex(sheet)
+        assert index.exact("Total", column=3) == (8, 3)
+        assert index.exact("Total", column=1) is None
+        assert index.find_all("Total") == [(8, 3)]
+        assert index.find_all("Total", strip=True) == [(5, 1), (8, 3)]
+        assert index.exact("Trading Partner Number", column=3) is None
+
+    def test_prefix_and_contains(self, sheet):
+        """Prefix and substring lookups return the first match in row-major order."""
+        index = LabelIndex(sheet)
+        assert index.prefix("UCO total") == (3, 3)
+        assert index.contains("Total") == (5, 1)
+        assert index.contains("reported in TIER") == (3, 3)
+        assert index.contains("missing") is None
+
+    def test_formulas_and_numbers_not_indexed(self, sheet):
+        """Only plain text values are indexed."""
+        index = LabelIndex(sheet)
+        assert index.exact("=A5") is None
+        assert index.exact("42") is None
+
+    def test_does_not_create_cells(self, sheet):
+        """Building and querying the index leaves the sheet untouched."""
+        before = len(sheet._cells)
+        LabelIndex(sheet).contains("missing", column=20)
+        assert len(sheet._cells) == before
+
+
+class TestGetLabelIndex:
+    """Tests for the shared index cache."""
+
+    def test_cached_until_invalidated(self, sheet):
+        """The index is reused until it is invalidated."""
+        index = get_label_index(sheet)
+        assert get_label_index(sheet) is index
+        sheet.insert_rows(1)
+        invalidate_label_index(sheet)
+        refreshed = get_label_index(sheet)
+        assert refreshed is not index
+        assert refreshed.exact("Trading Partner Number") == (3, 1)
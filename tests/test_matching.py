@@ -0,0 +1,73 @@
+"""
+Tests for the matching module.
+
+This module contains tests for the Certification vs DO UCO to UDO matching engine.
+"""
+
+import random
+
+import pytest
+
+from src.uco_to_udo_recon.core import matching
+from src.uco_to_udo_recon.core.matching import match_amounts
+
+ENGINES = [
+    False,
+    pytest.param(True, marks=pytest.mark.skipif(matching.np is None, reason="NumPy not installed")),
+]
+
+
+def _reference(cert_names, cert_amounts, uco_names, uco_amounts):
+    """The pairwise comparison the engine replaces."""
+    cert_rows = list(zip(cert_names, *cert_amounts))
+    uco_rows = list(zip(uco_names, *uco_amounts))
+    cert_mask = [False] * len(cert_rows)
+    uco_mask = [False] * len(uco_rows)
+    for i, cert in enumerate(cert_rows):
+        for j, uco in enumerate(uco_rows):
+            if uco[0] and cert == uco:
+                cert_mask[i] = uco_mask[j] = True
+    return cert_mask, uco_mask
+
+
+@pytest.mark.parametrize("use_numpy", ENGINES)
+class TestMatchAmounts:
+    """Tests for match_amounts."""
+
+    def test_duplicates_and_mismatches(self, use_numpy):
+        """Every row with an equal name and amounts is flagged, others are not."""
+        cert_names = ["WMD", "CBP", "FEM"]
+        cert_amounts = [[10000, 5000, 500], [10000, 4000, 500], [0, 1000, 0]]
+        uco_names = ["WMD", "CBP", "WMD", "CBP", None]
+        uco_amounts = [[10000, 5000, 10000, 5000, 500],
+                       [10000, 4000, 10000, 4500, 500],
+                       [0, 1000, 0, 500, 0]]
+        cert_mask, uco_mask = match_amounts(cert_names, cert_amounts, uco_names, uco_amounts,
+                                            use_numpy)
+        assert cert_mask == [True, True, False]
+        assert uco_mask == [True, True, True, False, False]
+
+    def test_amounts_beyond_64_bits(self, use_numpy):
+        """Amounts that overflow int64 are still matched exactly."""
+        huge = 2 ** 70
+        cert_amounts = [[huge, huge + 1], [0, 0], [0, 0]]
+        uco_amounts = [[huge], [0], [0]]
+        cert_mask, uco_mask = match_amounts(["WMD", "WMD"], cert_amounts, ["WMD"], uco_amounts,
+                                            use_numpy)
+        assert cert_mask == [True, False]
+        assert uco_mask == [True]
+
+    def test_matches_pairwise_comparison(self, use_numpy):
+        """Random tables give the same masks as comparing every pair."""
+        rng = random.Random(11)
+        names = ["CBP", "CG", "WMD", "ICE"]
+        cert_names = [rng.choice(names) for _ in range(300)]
+        uco_names = [rng.choice(names + [None]) for _ in range(400)]
+        cert_amounts = [[rng.randint(0, 3) for _ in cert_names] for _ in range(3)]
+        uco_amounts = [[rng.randint(0, 3) for _ in uco_names] for _ in range(3)]
+        result = match_amounts(cert_names, cert_amounts, uco_names, uco_amounts, use_numpy)
+        assert result == _reference(cert_names, cert_amounts, uco_names, uco_amounts)
+
+    def test_empty(self, use_numpy):
+        """Empty tables match nothing."""
+        assert match_amounts([], [[], [], []], ["WMD"], [[1], [2], [3]], use_numpy) == ([], [False])
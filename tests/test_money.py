@@ -0,0 +1,84 @@
+"""
+Tests for the money module.
+
+This module contains tests for the integer-cent money helpers.
+"""
+
+import logging
+import random
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.uco_to_udo_recon.utils.excel_utils import safe_convert_to_decimal
+from src.uco_to_udo_recon.utils.money import (
+    cents_to_decimal,
+    column_to_cents,
+    format_cents,
+    to_cents,
+)
+
+
+@pytest.fixture
+def mock_logger():
+    """Create a mock logger for testing."""
+    return MagicMock(spec=logging.Logger)
+
+
+class TestToCents:
+    """Tests for the to_cents function."""
+
+    @pytest.mark.parametrize("value", [
+        None, "", 0, 7, -3, 123.45, 1.005, -1.005, 2.675, 0.125, -0.125,
+        1e20, -0.0, "12.345", "-0.005", Decimal("9.995"), "1,000", "abc", "=A1",
+        True, float("inf"),
+    ])
+    def test_matches_safe_convert_to_decimal(self, value, mock_logger):
+        """Rounding and error handling agree with safe_convert_to_decimal."""
+        expected = safe_convert_to_decimal(value, MagicMock(spec=logging.Logger))
+        assert cents_to_decimal(to_cents(value, mock_logger)) == expected
+
+    def test_random_floats(self, mock_logger):
+        """Arbitrary floats and three-place amounts round like Decimal quantize."""
+        rng = random.Random(7)
+        values = [rng.uniform(-1e7, 1e7) for _ in range(2000)]
+        values += [round(rng.uniform(-1e5, 1e5), 3) for _ in range(2000)]
+        for value in values:
+            expected = safe_convert_to_decimal(value, mock_logger)
+            assert cents_to_decimal(to_cents(value, mock_logger)) == expected
+
+    def test_errors_logged(self, mock_logger):
+        """Formulas and invalid text are logged and converted to 0."""
+        assert to_cents("=SUM(A1:A2)", mock_logger) == 0
+        assert to_cents("not a number", mock_logger) == 0
+        assert mock_logger.error.call_count == 2
+
+    def test_nan_is_zero(self, mock_logger):
+        """NaN has no cent value and converts to 0 with an error."""
+        assert to_cents(float("nan"), mock_logger) == 0
+        mock_logger.error.assert_called_once()
+
+
+class TestColumnHelpers:
+    """Tests for the bulk and formatting helpers."""
+
+    def test_column_to_cents(self, mock_logger):
+        """A column converts to an int64 array."""
+        column = column_to_cents([1, 2.5, None, "3.333"], mock_logger)
+        assert column.typecode == "q"
+        assert list(column) == [100, 250, 0, 333]
+
+    def test_column_to_cents_overflow(self, mock_logger):
+        """Amounts beyond 64 bits give a list with the same values as to_cents."""
+        values = [1, 1e17, "123456789012345678901.23"]
+        column = column_to_cents(values, mock_logger)
+        assert isinstance(column, list)
+        assert column == [to_cents(value, mock_logger) for value in values]
+        mock_logger.error.assert_not_called()
+
+    def test_format_cents(self):
+        """Cents print like a quantized Decimal."""
+        assert format_cents(12345) == "123.45"
+        assert format_cents(-5) == "-0.05"
+        assert format_cents(0) == str(Decimal("0.00"))
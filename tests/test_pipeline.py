@@ -0,0 +1,227 @@
+"""
+Tests for the reconciliation pipeline module.
+
+This module contains tests for running the reconciliation stages against a
+single in-memory workbook and for resuming interrupted runs.
+"""
+
+import logging
+import os
+
+import pytest
+from openpyxl import load_workbook
+
+from src.uco_to_udo_recon.core.excel_operations import SheetImport
+from src.uco_to_udo_recon.core.pipeline import ReconciliationPipeline, run_reconciliation
+from src.uco_to_udo_recon.core.recalculation import FakeBackend
+from src.uco_to_udo_recon.modules.background_worker import ProcessTaskRunner
+
+
+def fail_once(monkeypatch, method):
+    """Make a ReconciliationPipeline method raise on its first call only."""
+    original = getattr(ReconciliationPipeline, method)
+    calls = []
+
+    def flaky(self, *args, **kwargs):
+        calls.append(method)
+        if len(calls) == 1:
+            raise RuntimeError("Interrupted")
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(ReconciliationPipeline, method, flaky)
+    return calls
+
+
+def certification_formula_target(build_workbook, formula):
+    """Target file whose Certification total for WMD is a formula with an outdated result."""
+    return build_workbook(
+        {
+            "Certification": {
+                "A5": "Trading Partner Number", "B5": "TIER Component",
+                "A6": 7023, "B6": "WMD", "D6": formula, "E6": 20, "F6": 0, "G6": "CWMD-7023",
+                "A7": "Total ", "D7": "=SUM(D6:D6)",
+            },
+            "CWMD-7023": {"A10": "Contract / Agreement / Sales Order #"},
+        },
+        cached={"Certification": {"D6": 999, "D7": 999}},
+        name="formula_target.xlsx",
+    )
+
+
+class TestReconciliationPipeline:
+    """Tests for ReconciliationPipeline."""
+
+    def test_single_save_at_end(self, recon_files):
+        """The working copy is only written by save(), with every stage's changes."""
+        target, trial_balance, tier = recon_files
+        before = target.read_bytes()
+        pipeline = ReconciliationPipeline(str(target), "WMD", logging.getLogger("test_pipeline"))
+
+        pipeline.prepare_working_copy()
+        assert pipeline.import_sheets([
+            SheetImport(str(trial_balance), "WMD Total", "DO TB", 3),
+            SheetImport(str(tier), "UCO to UDO", "DO UCO to UDO", 3),
+        ])
+        assert pipeline.reconcile(lambda value, message=None: None)
+        assert not os.path.exists(pipeline.output_file)
+
+        output = pipeline.save()
+        assert target.read_bytes() == before
+        wb = load_workbook(output)
+        assert wb.sheetnames == [
+            "Instructions", "Certification", "CWMD-7023", "DO UCO to UDO", "DO TB"
+        ]
+        assert wb["Certification"]["H5"].value == "Tickmark"
+        assert wb["DO UCO to UDO"]["N3"].value == "Tickmark"
+
+    def test_saved_with_formula_results(self, recon_files):
+        """Generated formulas are saved with their results, so no recalculation is needed."""
+        target, trial_balance, tier = recon_files
+        pipeline = ReconciliationPipeline(str(target), "WMD", logging.getLogger("test_pipeline"))
+        pipeline.prepare_working_copy()
+        assert pipeline.import_sheets([
+            SheetImport(str(trial_balance), "WMD Total", "DO TB", 3),
+            SheetImport(str(tier), "UCO to UDO", "DO UCO to UDO", 3),
+        ])
+        assert pipeline.reconcile(lambda value, message=None: None)
+        output = pipeline.save()
+
+        assert not pipeline.needs_recalculation()
+        values = load_workbook(output, data_only=True)["CWMD-7023"]
+        assert values["B12"].value == 20
+        assert [values[f"{col}13"].value for col in "BDEFGH"] == ["a"] * 6
+
+    def test_formula_reading_imported_sheet(self, recon_files, build_workbook):
+        """A Certification formula reading an imported sheet is compared with its current result."""
+        _, trial_balance, tier = recon_files
+        target = certification_formula_target(build_workbook, "='DO UCO to UDO'!E6")
+        pipeline = ReconciliationPipeline(str(target), "WMD", logging.getLogger("test_pipeline"))
+        pipeline.prepare_working_copy()
+        assert pipeline.import_sheets([
+            SheetImport(str(trial_balance), "WMD Total", "DO TB", 3),
+            SheetImport(str(tier), "UCO to UDO", "DO UCO to UDO", 3),
+        ])
+        assert pipeline.reconcile(lambda value, message=None: None)
+        output = pipeline.save()
+
+        wb = load_workbook(output, data_only=True)
+        assert wb["Certification"]["D6"].value == 20
+        assert wb["Certification"]["H6"].value == "i"
+        assert wb["DO UCO to UDO"]["N6"].value == "8"
+        assert not pipeline.needs_recalculation()
+
+    def test_unsupported_formula_recalculated_first(self, recon_files, build_workbook):
+        """A stale formula outside the supported subset is recalculated before comparison."""
+        _, trial_balance, tier = recon_files
+        target = certification_formula_target(
+            build_workbook, "=VLOOKUP(\"WMD\",'DO UCO to UDO'!A6:E6,5,FALSE)")
+        backend = FakeBackend()
+        pipeline = ReconciliationPipeline(str(target), "WMD", logging.getLogger("test_pipeline"),
+                                          backend=backend)
+        pipeline.prepare_working_copy()
+        assert pipeline.import_sheets([
+            SheetImport(str(trial_balance), "WMD Total", "DO TB", 3),
+            SheetImport(str(tier), "UCO to UDO", "DO UCO to UDO", 3),
+        ])
+        assert pipeline.reconcile(lambda value, message=None: None)
+
+        assert backend.calls == [pipeline.output_file]
+        assert load_workbook(pipeline.output_file).sheetnames[-2:] == ["DO TB", "DO UCO to UDO"]
+
+    def test_missing_source_sheet(self, recon_files):
+        """A missing source sheet fails the import stage."""
+        target, trial_balance, _ = recon_files
+        pipeline = ReconciliationPipeline(str(target), "WMD", logging.getLogger("test_pipeline"))
+        pipeline.prepare_working_copy()
+        assert not pipeline.import_sheets([
+            SheetImport(str(trial_balance), "CBP Total", "DO TB", 3)
+        ])
+
+
+class TestRunReconciliation:
+    """Tests for run_reconciliation."""
+
+    def test_runs_in_worker_process(self, recon_files):
+        """The whole run can be sent to a worker process, with progress relayed back."""
+        target, trial_balance, tier = recon_files
+        progress = []
+        runner = ProcessTaskRunner(logger=logging.getLogger("test_pipeline"))
+        try:
+            output = runner.run(
+                run_reconciliation,
+                (str(target), str(trial_balance), str(tier), "WMD"),
+                {"backend": "none"},
+                progress_callback=lambda value, message=None: progress.append(value),
+                cancellation_check=lambda: False,
+            )
+        finally:
+            runner.close()
+
+        assert load_workbook(output, read_only=True).sheetnames[-2:] == ["DO TB", "DO UCO to UDO"]
+        assert progress[0] == 0 and progress[-1] >= 98
+
+    def test_no_checkpoints_without_resume(self, recon_files, monkeypatch):
+        """A run without resume neither hashes its inputs nor writes checkpoint files."""
+        target, trial_balance, tier = recon_files
+        args = (str(target), str(trial_balance), str(tier), "WMD")
+        digests = []
+        monkeypatch.setattr("src.uco_to_udo_recon.core.checkpoint.file_digest",
+                            lambda path, *a, **k: digests.append(path))
+        fail_once(monkeypatch, "reconcile")
+        with pytest.raises(RuntimeError):
+            run_reconciliation(*args, backend="none")
+        output = run_reconciliation(*args, backend="none")
+
+        assert not digests
+        assert not list(target.parent.glob("*.checkpoint-*.xlsx"))
+        assert not list(target.parent.glob("*.journal.json"))
+        assert sorted(p.name for p in target.parent.glob("target - DO*")) == [
+            os.path.basename(output)]
+
+    def test_resume_skips_completed_stages(self, recon_files, monkeypatch):
+        """A resumed run continues after the sheet imports of the interrupted run."""
+        target, trial_balance, tier = recon_files
+        args = (str(target), str(trial_balance), str(tier), "WMD")
+        fail_once(monkeypatch, "reconcile")
+        with pytest.raises(RuntimeError):
+            run_reconciliation(*args, backend="none", resume=True)
+        journal = target.with_name("target - DO.journal.json")
+        assert journal.exists()
+
+        imported = []
+        original_import = ReconciliationPipeline.import_sheets
+
+        def record_import(self, *a, **k):
+            imported.append(a)
+            return original_import(self, *a, **k)
+
+        monkeypatch.setattr(ReconciliationPipeline, "import_sheets", record_import)
+        output = run_reconciliation(*args, backend="none", resume=True)
+
+        assert not imported
+        assert load_workbook(output)["DO UCO to UDO"]["N3"].value == "Tickmark"
+        assert not journal.exists()
+        assert sorted(p.name for p in target.parent.glob("target - DO*")) == [
+            os.path.basename(output)]
+
+    def test_changed_input_restarts(self, recon_files, monkeypatch, build_workbook):
+        """Editing an input file after an interrupted run makes the next run start over."""
+        target, trial_balance, tier = recon_files
+        args = (str(target), str(trial_balance), str(tier), "WMD")
+        fail_once(monkeypatch, "reconcile")
+        with pytest.raises(RuntimeError):
+            run_reconciliation(*args, backend="none", resume=True)
+
+        build_workbook({"WMD Total": {"C10": "422100", "F10": 75}}, name="tb.xlsx")
+        imported = []
+        original_import = ReconciliationPipeline.import_sheets
+
+        def record_import(self, *a, **k):
+            imported.append(a)
+            return original_import(self, *a, **k)
+
+        monkeypatch.setattr(ReconciliationPipeline, "import_sheets", record_import)
+        output = run_reconciliation(*args, backend="none", resume=True)
+
+        assert len(imported) == 1
+        assert load_workbook(output)["DO TB"]["F10"].value == 75
@@ -0,0 +1,165 @@
+"""
+Tests for the recalculation module.
+
+This module contains tests for the recalculation backends and the batch
+recalculation helper.
+"""
+
+import logging
+import random
+import threading
+
+import pytest
+from openpyxl import load_workbook
+
+from src.uco_to_udo_recon.core.recalculation import (
+    ExcelComBackend,
+    FakeBackend,
+    LibreOfficeBackend,
+    NoOpBackend,
+    PythonEvaluatorBackend,
+    RecalculationBackend,
+    RecalculationTimeout,
+    RecalculationWatchdog,
+    create_recalculation_backend,
+    recalculate_workbooks,
+)
+
+
+@pytest.fixture
+def logger():
+    """Logger for the recalculation tests."""
+    return logging.getLogger("test_recalculation")
+
+
+class BarrierBackend(RecalculationBackend):
+    """Backend that waits until ``concurrency`` workbooks are being recalculated."""
+
+    name = "barrier"
+
+    def __init__(self, concurrency):
+        self.concurrency = concurrency
+        self.barrier = threading.Barrier(concurrency, timeout=5)
+        self.done = []
+
+    def recalculate(self, file_path, logger, progress_callback=None, cancellation_check=None):
+        self.barrier.wait()
+        if file_path == "bad.xlsx":
+            raise RuntimeError("engine crashed")
+        self.done.append(file_path)
+
+
+class TestBackends:
+    """Tests for the individual backends."""
+
+    def test_python_backend(self, build_workbook, logger):
+        """Supported formulas get results; others keep their cached result."""
+        path = build_workbook(
+            {"S": {"A1": 4, "A2": "=A1*2", "A3": "=VLOOKUP(A1,A1:A2,2,FALSE)", "A4": "=A3+A2"}},
+            cached={"S": {"A3": 8}},
+        )
+        PythonEvaluatorBackend().recalculate(str(path), logger)
+
+        values = load_workbook(path, data_only=True)["S"]
+        assert [values[f"A{row}"].value for row in range(1, 5)] == [4, 8, 8, 16]
+        assert load_workbook(path)["S"]["A3"].value == "=VLOOKUP(A1,A1:A2,2,FALSE)"
+
+    def test_python_backend_unparsable_input(self, build_workbook, logger):
+        """A formula reading an unparsable formula without a result is skipped."""
+        path = build_workbook({"S": {"A1": "=A2+1", "A2": "=SUM(Table1[Col])", "A3": 4,
+                                     "A4": "=A3*2"}})
+        PythonEvaluatorBackend().recalculate(str(path), logger)
+
+        values = load_workbook(path, data_only=True)["S"]
+        assert [values[f"A{row}"].value for row in range(1, 5)] == [None, None, 4, 8]
+
+    def test_no_op_backend(self, build_workbook, logger):
+        """The no-op backend leaves the file untouched."""
+        path = build_workbook({"S": {"A1": 1, "A2": "=A1"}})
+        before = path.read_bytes()
+        NoOpBackend().recalculate(str(path), logger)
+        assert path.read_bytes() == before
+
+    def test_libreoffice_requires_uno(self):
+        """The LibreOffice pool reports a missing UNO bridge up front."""
+        try:
+            import uno  # noqa: F401
+            pytest.skip("LibreOffice UNO bridge is installed")
+        except ImportError:
+            pass
+        with pytest.raises(ImportError):
+            LibreOfficeBackend()
+
+
+class TestRecalculationWatchdog:
+    """Tests for RecalculationWatchdog, using FakeBackend."""
+
+    def watchdog(self, backend, **options):
+        options.setdefault("base_delay", 0.01)
+        return RecalculationWatchdog(backend, rng=random.Random(3), **options)
+
+    def test_hung_engine_is_stopped_and_retried(self, logger):
+        """An attempt over the timeout is aborted, then the retry succeeds."""
+        backend = FakeBackend([10.0, 0.0])
+        watchdog = self.watchdog(backend, timeout=0.2)
+        watchdog.recalculate("book.xlsx", logger)
+
+        assert backend.calls == ["book.xlsx", "book.xlsx"]
+        assert backend.aborts == 1
+        assert [timing.outcome for timing in watchdog.last_attempts] == ["timed out", "succeeded"]
+        assert 0.2 <= watchdog.last_attempts[0].seconds < 1.0
+
+    def test_errors_exhaust_retries(self, logger):
+        """The last error is raised once every attempt failed."""
+        backend = FakeBackend([OSError("busy"), OSError("still busy")])
+        watchdog = self.watchdog(backend, retries=2)
+        with pytest.raises(OSError, match="still busy"):
+            watchdog.recalculate("book.xlsx", logger)
+        assert [timing.outcome for timing in watchdog.last_attempts] == ["failed", "failed"]
+
+    def test_timeout_raised(self, logger):
+        """A backend that always hangs ends in RecalculationTimeout."""
+        watchdog = self.watchdog(FakeBackend([5.0]), timeout=0.1, retries=2)
+        with pytest.raises(RecalculationTimeout):
+            watchdog.recalculate("book.xlsx", logger)
+
+    def test_cancellation_stops_engine(self, logger):
+        """A cancelled attempt that does not stop by itself has its engine stopped."""
+        backend = FakeBackend([10.0])
+        cancelled = threading.Event()
+        threading.Timer(0.1, cancelled.set).start()
+        watchdog = self.watchdog(backend, cancel_grace=0.1)
+        watchdog.recalculate("book.xlsx", logger, cancellation_check=cancelled.is_set)
+        assert backend.aborts == 1
+        assert [timing.outcome for timing in watchdog.last_attempts] == ["cancelled"]
+
+
+class TestCreateRecalculationBackend:
+    """Tests for create_recalculation_backend."""
+
+    def test_by_name(self):
+        """Backends are created by name, with options passed through."""
+        assert isinstance(create_recalculation_backend("python").backend, PythonEvaluatorBackend)
+        assert isinstance(create_recalculation_backend("none").backend, NoOpBackend)
+        backend = create_recalculation_backend("excel", timeout=30, retries=2)
+        assert (backend.name, backend.timeout, backend.retries) == ("excel", 30, 2)
+        with pytest.raises(ValueError):
+            create_recalculation_backend("numbers")
+
+    def test_auto_falls_back_to_python(self, monkeypatch):
+        """Without Excel or LibreOffice the Python evaluator is used."""
+        monkeypatch.setattr(ExcelComBackend, "available", staticmethod(lambda: False))
+        monkeypatch.setattr(LibreOfficeBackend, "available", staticmethod(lambda: False))
+        assert isinstance(create_recalculation_backend().backend, PythonEvaluatorBackend)
+
+
+class TestRecalculateWorkbooks:
+    """Tests for recalculate_workbooks."""
+
+    def test_concurrent_batch(self, logger):
+        """Workbooks run at the backend's concurrency and failures are reported per file."""
+        backend = BarrierBackend(3)
+        results = recalculate_workbooks(["a.xlsx", "b.xlsx", "bad.xlsx"], backend, logger)
+        assert sorted(backend.done) == ["a.xlsx", "b.xlsx"]
+        assert results["a.xlsx"] is None and results["b.xlsx"] is None
+        assert isinstance(results["bad.xlsx"], RuntimeError)
@@ -0,0 +1,29 @@
+"""
+Tests for the retry module.
+
+This module contains tests for the backoff delay helper.
+"""
+
+import random
+
+from src.uco_to_udo_recon.utils.retry import backoff_delay
+
+
+class TestBackoffDelay:
+    """Tests for backoff_delay."""
+
+    def test_doubles_within_jitter(self):
+        """Delays double per attempt, with jitter between half and the full ceiling."""
+        rng = random.Random(1)
+        for attempt, ceiling in [(1, 1.0), (2, 2.0), (3, 4.0), (4, 8.0)]:
+            delay = backoff_delay(attempt, base_delay=1.0, max_delay=30.0, rng=rng)
+            assert ceiling / 2 <= delay <= ceiling
+
+    def test_capped(self):
+        """Delays never exceed max_delay."""
+        assert backoff_delay(20, base_delay=1.0, max_delay=5.0) <= 5.0
+
+    def test_jitter_spreads_delays(self):
+        """Concurrent retries do not all wait the same time."""
+        rng = random.Random(2)
+        assert len({round(backoff_delay(3, rng=rng), 6) for _ in range(10)}) == 10
@@ -0,0 +1,184 @@
+"""
+Tests for the workbook loader module.
+
+This module contains tests for the single-parse dual-view workbook loader
+and its lazy, per-sheet variant.
+"""
+
+import zipfile
+
+import pytest
+from openpyxl import load_workbook
+from openpyxl.comments import Comment
+from openpyxl.styles import Font
+
+from src.uco_to_udo_recon.core.workbook_loader import (
+    load_dual_view_workbook,
+    load_lazy_workbook,
+    resolve_workbook_views,
+)
+
+
+def _parts(path):
+    with zipfile.ZipFile(path) as archive:
+        return {name: archive.read(name) for name in archive.namelist()}
+
+
+@pytest.fixture
+def recon_file(build_workbook):
+    """A small workbook with formulas and cached results."""
+    return build_workbook(
+        {
+            "Certification": {
+                "A1": "Trading Partner Number",
+                "D2": 100.25,
+                "D3": 50,
+                "D4": "=SUM(D2:D3)",
+                "E4": '=IF(D4>0,"a","b")',
+            },
+            "Notes": {"A1": "untouched"},
+        },
+        cached={"Certification": {"D4": 150.25, "E4": "a"}},
+    )
+
+
+class TestLoadDualViewWorkbook:
+    """Tests for load_dual_view_workbook."""
+
+    def test_formula_and_cached_value(self, recon_file):
+        """Formula text and cached value come from the same load."""
+        book = load_dual_view_workbook(recon_file)
+        assert book["Certification"]["D4"].value == "=SUM(D2:D3)"
+        assert book.values["Certification"].cell(row=4, column=4).value == 150.25
+        assert book.values["Certification"]["E4"].value == "a"
+
+    def test_matches_data_only_load(self, recon_file):
+        """The value view agrees with a data_only=True load for every cell."""
+        book = load_dual_view_workbook(recon_file)
+        data_wb = load_workbook(recon_file, data_only=True)
+        for title in data_wb.sheetnames:
+            for row in data_wb[title].iter_rows():
+                for cell in row:
+                    value = book.values[title].cell(row=cell.row, column=cell.column).value
+                    assert value == cell.value
+
+    def test_range_access(self, recon_file):
+        """Ranges and whole rows return tuples shaped like openpyxl's."""
+        values = load_dual_view_workbook(recon_file).values["Certification"]
+        table = values["A2:E4"]
+        assert len(table) == 3 and len(table[0]) == 5
+        assert table[2][3].value == 150.25
+        assert values[4][4].value == "a"
+
+    def test_view_does_not_create_cells(self, recon_file):
+        """Reading empty positions through the view leaves the sheet untouched."""
+        book = load_dual_view_workbook(recon_file)
+        before = len(book["Notes"]._cells)
+        assert book.values["Notes"].cell(row=50, column=20).value is None
+        assert len(book["Notes"]._cells) == before
+
+    def test_assignment_clears_cached_value(self, recon_file):
+        """Writing a new formula drops the stale cached result."""
+        book = load_dual_view_workbook(recon_file)
+        book["Certification"]["D4"] = "=D2-D3"
+        assert book.values["Certification"]["D4"].value is None
+
+    def test_cached_value_follows_inserted_rows(self, recon_file):
+        """Cached results stay with their cell when rows are inserted."""
+        book = load_dual_view_workbook(recon_file)
+        book["Certification"].insert_rows(1)
+        assert book.values["Certification"]["D5"].value == 150.25
+
+
+class TestResolveWorkbookViews:
+    """Tests for resolve_workbook_views."""
+
+    def test_dual_view(self, recon_file):
+        """A DualViewWorkbook is split into its formula and value views."""
+        book = load_dual_view_workbook(recon_file)
+        target_wb, data_wb = resolve_workbook_views(book)
+        assert target_wb is book.workbook
+        assert data_wb is book.values
+
+    def test_plain_pair(self, recon_file):
+        """A plain workbook pair is passed through unchanged."""
+        target_wb = load_workbook(recon_file)
+        data_wb = load_workbook(recon_file, data_only=True)
+        assert resolve_workbook_views(target_wb, data_wb) == (target_wb, data_wb)
+
+    def test_missing_data_workbook(self, recon_file):
+        """A plain workbook without a data workbook is rejected."""
+        with pytest.raises(ValueError):
+            resolve_workbook_views(load_workbook(recon_file))
+
+
+class TestLazyWorkbook:
+    """Tests for load_lazy_workbook."""
+
+    def test_sheets_parsed_on_access(self, recon_file):
+        """Opening parses no worksheet; lookups parse only the named sheet."""
+        book = load_lazy_workbook(recon_file)
+        assert book.sheetnames == ["Certification", "Notes"]
+        assert book.loaded_sheetnames == []
+        assert book.values["Certification"]["D4"].value == 150.25
+        assert book.loaded_sheetnames == ["Certification"]
+
+    def test_untouched_sheets_written_unchanged(self, recon_file, tmp_path):
+        """Only accessed sheets are re-serialized on save."""
+        book = load_lazy_workbook(recon_file)
+        book["Certification"]["F2"] = "Tickmark"
+        book["Certification"]["F2"].font = Font(bold=True)
+        out = tmp_path / "out.xlsx"
+        book.save(out)
+
+        before, after = _parts(recon_file), _parts(out)
+        assert after["xl/worksheets/sheet2.xml"] == before["xl/worksheets/sheet2.xml"]
+        assert after["xl/worksheets/sheet1.xml"] != before["xl/worksheets/sheet1.xml"]
+
+        saved = load_workbook(out)
+        assert saved["Certification"]["F2"].value == "Tickmark"
+        assert saved["Certification"]["F2"].font.b
+        assert saved["Certification"]["D4"].value == "=SUM(D2:D3)"
+        assert saved["Notes"]["A1"].value == "untouched"
+
+    def test_parent_save_goes_through_splice(self, recon_file, tmp_path):
+        """Saving via a worksheet's parent keeps the unparsed sheets."""
+        book = load_lazy_workbook(recon_file)
+        sheet = book["Certification"]
+        out = tmp_path / "out.xlsx"
+        sheet.parent.save(out)
+        assert load_workbook(out).sheetnames == ["Certification", "Notes"]
+
+    def test_full_save_when_related_parts(self, recon_file, tmp_path):
+        """A sheet with comments falls back to a full save without losing sheets."""
+        book = load_lazy_workbook(recon_file)
+        book["Notes"]["A1"].comment = Comment("checked", "recon")
+        out = tmp_path / "out.xlsx"
+        book.save(out)
+
+        saved = load_workbook(out)
+        assert saved.sheetnames == ["Certification", "Notes"]
+        assert saved["Notes"]["A1"].comment.text == "checked"
+        assert saved["Certification"]["D4"].value == "=SUM(D2:D3)"
+
+    def test_cached_values_saved(self, recon_file, tmp_path):
+        """Formulas keep their cached results on save; new formulas can be given one."""
+        book = load_lazy_workbook(recon_file)
+        sheet = book["Certification"]
+        sheet["D5"] = "=D4*2"
+        assert book.missing_cached_values() == ["Certification!D5"]
+        sheet["D5"].cached_value = 300.5
+        assert book.missing_cached_values() == []
+        out = tmp_path / "out.xlsx"
+        book.save(out)
+
+        values = load_workbook(out, data_only=True)["Certification"]
+        assert values["D4"].value == 150.25
+        assert values["E4"].value == "a"
+        assert values["D5"].value == 300.5
+        assert load_workbook(out)["Certification"]["D5"].value == "=D4*2"
+
+    def test_unknown_sheet(self, recon_file):
+        """Looking up a missing sheet raises KeyError like openpyxl."""
+        with pytest.raises(KeyError):
+            load_lazy_workbook(recon_file)["Missing"]
@@ -0,0 +1,188 @@
+"""
+Tests for the xlsx package module.
+
+This module contains tests for zip-level worksheet transplanting between
+.xlsx packages.
+"""
+
+import pytest
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Font, PatternFill
+
+from src.uco_to_udo_recon.utils.xlsx_package import (
+    FormulaCell,
+    XlsxPackage,
+    XlsxPackageError,
+    iter_formula_cells,
+    set_cached_values,
+)
+
+
+@pytest.fixture
+def styled_source(tmp_path):
+    """A workbook using shared strings, fonts, fills and a number format."""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Data"
+    ws["A1"] = "Component"
+    ws["A1"].font = Font(bold=True, color="FF0000")
+    ws["B1"] = "Total"
+    ws["B1"].fill = PatternFill("solid", fgColor="FFFF00")
+    ws["C1"] = 1234.5
+    ws["C1"].number_format = "#,##0.00;(#,##0.00)"
+    ws["A2"] = "Component"
+    path = tmp_path / "source.xlsx"
+    wb.save(path)
+    return path
+
+
+class TestXlsxPackage:
+    """Tests for XlsxPackage."""
+
+    def test_sheet_entries(self, build_workbook):
+        """Sheet names and parts come from workbook.xml and its rels."""
+        package = XlsxPackage(build_workbook({"First": {"A1": 1}, "Second": {"A1": 2}}))
+        assert package.sheetnames == ["First", "Second"]
+        assert package.sheet("Second").part == "xl/worksheets/sheet2.xml"
+
+    def test_not_a_package(self, tmp_path):
+        """Non-zip input raises XlsxPackageError."""
+        path = tmp_path / "bad.xlsx"
+        path.write_bytes(b"not a zip")
+        with pytest.raises(XlsxPackageError):
+            XlsxPackage(path)
+
+    def test_replace_sheet_remaps_strings_and_styles(
+        self, build_workbook, styled_source, shared_strings_converter, tmp_path
+    ):
+        """Replaced sheets keep their text and formatting in the target tables."""
+        shared_strings_converter(styled_source)
+        target = build_workbook({"Data": {"A1": "old"}, "Other": {"A1": "Total"}},
+                                shared_strings=True)
+
+        package = XlsxPackage(target)
+        package.replace_sheet("Data", XlsxPackage(styled_source))
+        out = tmp_path / "out.xlsx"
+        package.save(out)
+
+        ws = load_workbook(out)["Data"]
+        assert [ws["A1"].value, ws["B1"].value, ws["A2"].value] == [
+            "Component", "Total", "Component"]
+        assert ws["A1"].font.b and ws["A1"].font.color.rgb == "00FF0000"
+        assert ws["B1"].fill.fgColor.rgb == "00FFFF00"
+        assert ws["C1"].number_format == "#,##0.00;(#,##0.00)"
+        assert load_workbook(out)["Other"]["A1"].value == "Total"
+        assert package.shared_strings.items.count("<si><t>Total</t></si>") == 1
+
+    def test_repeated_import_reuses_styles(self, styled_source, build_workbook):
+        """Importing the same sheet twice does not grow the style tables."""
+        package = XlsxPackage(build_workbook({"Data": {"A1": 1}}))
+        package.replace_sheet("Data", XlsxPackage(styled_source))
+        counts = len(package.styles.cell_xfs.items), len(package.styles.fonts.items)
+        package.replace_sheet("Data", XlsxPackage(styled_source))
+        assert (len(package.styles.cell_xfs.items), len(package.styles.fonts.items)) == counts
+
+    def test_add_sheet_at_index(self, build_workbook, styled_source, tmp_path):
+        """A spliced sheet lands at the requested tab position with its content."""
+        target = build_workbook({"First": {"A1": 1}, "Second": {"A1": 2}})
+        package = XlsxPackage(target)
+        name = package.add_sheet(XlsxPackage(styled_source), "Data", "DO TB", 1)
+        out = tmp_path / "out.xlsx"
+        package.save(out)
+
+        assert name == "DO TB"
+        wb = load_workbook(out)
+        assert wb.sheetnames == ["First", "DO TB", "Second"]
+        assert wb["DO TB"]["A1"].value == "Component"
+        assert wb["DO TB"]["A1"].font.b
+        assert wb["DO TB"]["C1"].value == 1234.5
+
+    def test_add_sheet_duplicate_name(self, build_workbook, styled_source):
+        """Duplicate names get a numeric suffix, as openpyxl's create_sheet does."""
+        package = XlsxPackage(build_workbook({"DO TB": {"A1": 1}}))
+        assert package.add_sheet(XlsxPackage(styled_source), "Data", "DO TB") == "DO TB1"
+
+    def test_add_sheet_shifts_sheet_references(self, styled_source, tmp_path):
+        """Print titles and the active tab still point at the same sheets."""
+        wb = Workbook()
+        wb.active.title = "First"
+        second = wb.create_sheet("Second")
+        second.print_title_rows = "1:2"
+        wb.active = 1
+        path = tmp_path / "target.xlsx"
+        wb.save(path)
+
+        package = XlsxPackage(path)
+        package.add_sheet(XlsxPackage(styled_source), "Data", "Inserted", 0)
+        out = tmp_path / "out.xlsx"
+        package.save(out)
+
+        saved = load_workbook(out)
+        assert saved.sheetnames == ["Inserted", "First", "Second"]
+        assert saved["Second"].print_title_rows == "1:2"
+        assert saved.active.title == "Second"
+
+    def test_add_sheet_keeps_external_hyperlinks(self, build_workbook, tmp_path):
+        """External hyperlinks are carried over with their relationship."""
+        wb = Workbook()
+        wb.active.title = "Links"
+        wb.active["A1"] = "site"
+        wb.active["A1"].hyperlink = "https://example.com/"
+        source = tmp_path / "links.xlsx"
+        wb.save(source)
+
+        package = XlsxPackage(build_workbook({"First": {"A1": 1}}))
+        package.add_sheet(XlsxPackage(source), "Links", "Links")
+        out = tmp_path / "out.xlsx"
+        package.save(out)
+        assert load_workbook(out)["Links"]["A1"].hyperlink.target == "https://example.com/"
+
+    def test_add_sheet_missing_source(self, build_workbook, styled_source):
+        """Copying a sheet that does not exist raises KeyError."""
+        package = XlsxPackage(build_workbook({"First": {"A1": 1}}))
+        with pytest.raises(KeyError):
+            package.add_sheet(XlsxPackage(styled_source), "Nope", "New")
+
+
+class TestSetCachedValues:
+    """Tests for set_cached_values."""
+
+    def test_typed_values(self):
+        """Results are written with the cell type Excel uses for them."""
+        xml = (
+            '<worksheet><sheetData><row r="1">'
+            '<c r="A1"><f>1+1</f><v /></c>'
+            '<c r="B1" s="2"><f>IF(1,"a&amp;b")</f><v></v></c>'
+            '<c r="C1"><f>1=1</f><v/></c>'
+            '<c r="D1"><f>1/0</f></c>'
+            '<c r="E1" t="s"><v>0</v></c>'
+            '</row></sheetData></worksheet>'
+        )
+        values = {"A1": 2, "B1": "a&b", "C1": True, "D1": "#DIV/0!", "E1": "ignored"}
+        result, updated = set_cached_values(xml, values)
+        assert updated == 4
+        assert '<c r="A1"><f>1+1</f><v>2</v></c>' in result
+        assert '<c r="B1" s="2" t="str"><f>IF(1,"a&amp;b")</f><v>a&amp;b</v></c>' in result
+        assert '<c r="C1" t="b"><f>1=1</f><v>1</v></c>' in result
+        assert '<c r="D1" t="e"><f>1/0</f><v>#DIV/0!</v></c>' in result
+        assert '<c r="E1" t="s"><v>0</v></c>' in result
+
+
+class TestIterFormulaCells:
+    """Tests for iter_formula_cells."""
+
+    def test_shared_and_plain_formulas(self):
+        """Shared formulas are expanded for every cell that uses them."""
+        xml = (
+            '<worksheet><sheetData>'
+            '<row r="1"><c r="A1"><v>1</v></c>'
+            '<c r="B1"><f t="shared" ref="B1:B2" si="0">A1*2</f><v>2</v></c></row>'
+            '<row r="2"><c r="B2"><f t="shared" si="0"/><v>4</v></c>'
+            '<c r="C2" t="str"><f>IF(A1&gt;0,"x")</f></c></row>'
+            '</sheetData></worksheet>'
+        )
+        assert list(iter_formula_cells(xml)) == [
+            FormulaCell("B1", "=A1*2", True),
+            FormulaCell("B2", "=A2*2", True),
+            FormulaCell("C2", '=IF(A1>0,"x")', False),
+        ]